@@ -0,0 +1,4 @@
+"""
+Benchmarks for the performance critical paths of JobAdder. They are not part of the test suite and are run manually,
+e.g. python3 -m benchmark.startup
+"""
@@ -0,0 +1,81 @@
+"""
+Measures how many Commands per second a CommandHandler handles when every Command is sent over a new connection, as
+it was done before, compared to sending them in a session one after another and pipelined.
+"""
+from argparse import ArgumentParser
+from threading import Thread
+from time import perf_counter
+from typing import Callable, Dict, List
+import os
+import tempfile
+
+from ja.common.message.codec import CODECS
+from ja.common.proxy.command_handler import CommandHandler
+from ja.common.proxy.pipeline import CommandSession, SessionPool, send_once
+from ja.common.proxy.remote import prepare_command
+
+
+class _EchoCommandHandler(CommandHandler):
+    _unordered_commands = {"EchoCommand"}
+
+    def _process_command_dict(
+            self, command_dict: Dict[str, object], type_name: str, username: str) -> Dict[str, object]:
+        return dict(result_string=command_dict["payload"], is_success=True)
+
+
+def _measure(send: Callable[[List[bytes]], None], commands: List[bytes], threads: int) -> float:
+    chunk = len(commands) // threads
+    workers = [Thread(target=send, args=(commands[index * chunk:(index + 1) * chunk],)) for index in range(threads)]
+    start = perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return chunk * threads / (perf_counter() - start)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the throughput of a CommandHandler.")
+    parser.add_argument("--commands", type=int, default=5000, help="The amount of Commands per measurement.")
+    parser.add_argument("--threads", type=int, default=4, help="The amount of client threads in the concurrent runs.")
+    parser.add_argument("--codec", default="json", choices=list(CODECS), help="The codec to encode Commands with.")
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "benchmark.socket")
+    handler = _EchoCommandHandler(socket_path, max_workers=args.threads)
+    Thread(target=handler.main_loop, daemon=True).start()
+    codec = CODECS[args.codec]
+    commands = [prepare_command(codec.encode(dict(command=dict(payload="x" * 100), type_name="EchoCommand")))
+                for _ in range(args.commands)]
+
+    def one_per_connection(chunk: List[bytes]) -> None:
+        for command in chunk:
+            send_once(socket_path, command)
+
+    def session(chunk: List[bytes]) -> None:
+        command_session = CommandSession(socket_path)
+        for command in chunk:
+            command_session.request(command)
+        command_session.close()
+
+    def pipelined(chunk: List[bytes]) -> None:
+        command_session = CommandSession(socket_path)
+        command_session.request_all(chunk)
+        command_session.close()
+
+    pool = SessionPool(socket_path, max_idle=args.threads)
+
+    def session_pool(chunk: List[bytes]) -> None:
+        for command in chunk:
+            pool.request(command)
+
+    print("%-28s %8s %14s" % ("mode", "threads", "commands/s"))
+    for name, send in [("one connection per command", one_per_connection), ("session", session),
+                       ("session, pipelined", pipelined), ("session pool", session_pool)]:
+        for threads in sorted({1, args.threads}):
+            print("%-28s %8d %14.0f" % (name, threads, _measure(send, commands, threads)))
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Measures how long encoding and decoding typical messages takes with every available codec, compared to the YAML
+serialization with the pure Python implementation of PyYAML which was used before.
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+import yaml
+
+from ja.common.docker_context import DockerContext, DockerConstraints, MountPoint
+from ja.common.job import Job, JobPriority, JobSchedulingConstraints, JobStatus
+from ja.common.message.base import Response
+from ja.common.message.codec import CODECS
+from ja.common.message.worker_commands.start_job import StartJobCommand
+from ja.common.proxy.ssh import SSHConfig
+from ja.user.config.base import UserConfig, Verbosity
+from ja.user.message.query import QueryCommand
+
+
+def _messages() -> List[Tuple[str, Dict[str, object]]]:
+    job = Job(
+        owner_id=1000, email="user@example.com",
+        scheduling_constraints=JobSchedulingConstraints(JobPriority.MEDIUM, is_preemptible=True,
+                                                        special_resources=["gpu"]),
+        docker_context=DockerContext(dockerfile_source="FROM alpine\nRUN apk add python3\nCMD python3 job.py",
+                                     mount_points=[MountPoint(source_path="/home/user", mount_path="/data")]),
+        docker_constraints=DockerConstraints(cpu_threads=4, memory=4096), label="training")
+    job.uid = "user1600000000000000"
+    job.status = JobStatus.QUEUED
+    start = StartJobCommand(job)
+    query = QueryCommand(UserConfig(SSHConfig(hostname="server"), Verbosity.DETAILED), label=["training"],
+                         status=[JobStatus.RUNNING, JobStatus.QUEUED])
+    report = Response("\n".join(str(job) for _ in range(100)), True)
+    return [
+        ("Job", job.to_dict()),
+        ("StartJobCommand", dict(command=start.to_dict(), type_name="StartJobCommand", username="user")),
+        ("QueryCommand", dict(command=query.to_dict(), type_name="QueryCommand", username="user")),
+        ("Response (100 jobs)", report.to_dict()),
+    ]
+
+
+def _legacy_encode(message_dict: Dict[str, object]) -> bytes:
+    return yaml.dump(message_dict).encode()
+
+
+def _legacy_decode(data: bytes) -> Dict[str, object]:
+    return yaml.load(data.decode(), Loader=yaml.SafeLoader)  # type: ignore
+
+
+def _measure(function: Callable[[], object], iterations: int) -> float:
+    start = perf_counter()
+    for _ in range(iterations):
+        function()
+    return (perf_counter() - start) / iterations * 1e6
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the message codecs.")
+    parser.add_argument("--iterations", type=int, default=1000, help="The amount of round trips per message.")
+    args = parser.parse_args()
+
+    codecs: List[Tuple[str, Callable[[Dict[str, object]], bytes], Callable[[bytes], Dict[str, object]]]] = [
+        ("legacy yaml", _legacy_encode, _legacy_decode)]
+    codecs += [(codec.name, codec.encode, codec.decode) for codec in CODECS.values()]
+    print("%-20s %-12s %10s %12s %12s" % ("message", "codec", "bytes", "encode [us]", "decode [us]"))
+    for message_name, message_dict in _messages():
+        for codec_name, encode, decode in codecs:
+            data = encode(message_dict)
+            assert decode(data) == message_dict
+            encode_time = _measure(lambda: encode(message_dict), args.iterations)
+            decode_time = _measure(lambda: decode(data), args.iterations)
+            print("%-20s %-12s %10d %12.1f %12.1f" % (message_name, codec_name, len(data), encode_time, decode_time))
+
+
+if __name__ == "__main__":
+    main()
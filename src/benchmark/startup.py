@@ -0,0 +1,95 @@
+"""
+Measures how long the central server needs to recover the database on startup, i.e. to mark all jobs which were running
+when the server stopped as crashed and to set all work machines offline.
+"""
+from argparse import ArgumentParser
+from copy import deepcopy
+from time import perf_counter
+from typing import List
+
+from ja.common.docker_context import DockerContext, DockerConstraints
+from ja.common.job import Job, JobPriority, JobSchedulingConstraints, JobStatus
+from ja.common.proxy.ssh import SSHConfig
+from ja.common.work_machine import ResourceAllocation
+from ja.server.database.database import ServerDatabase
+from ja.server.database.sql.sqlite import SQLiteDatabase
+from ja.server.database.types.job_entry import DatabaseJobEntry
+from ja.server.database.types.work_machine import WorkMachine, WorkMachineResources, WorkMachineState
+from ja.server.main import JobCenter
+
+
+def _populate(database: ServerDatabase, job_count: int, machine_count: int) -> None:
+    machines: List[WorkMachine] = []
+    for index in range(machine_count):
+        machine = WorkMachine("worker%d" % index, WorkMachineState.ONLINE,
+                              WorkMachineResources(ResourceAllocation(1024, 1024 * 1024, 0)),
+                              SSHConfig(hostname="worker%d" % index))
+        database.update_work_machine(machine)
+        machines.append(machine)
+
+    job_template = Job(
+        owner_id=0, email=None,
+        scheduling_constraints=JobSchedulingConstraints(JobPriority.MEDIUM, is_preemptible=True, special_resources=[]),
+        docker_context=DockerContext(dockerfile_source="FROM alpine\nCMD sleep 1000", mount_points=[]),
+        docker_constraints=DockerConstraints(cpu_threads=1, memory=16))
+    started_jobs: ServerDatabase.JobDistribution = []
+    paused_jobs: ServerDatabase.JobDistribution = []
+    for index in range(job_count):
+        job = deepcopy(job_template)
+        job.uid = "job%d" % index
+        job.status = JobStatus.QUEUED
+        database.update_job(job)
+        # Half of the jobs are running, a quarter is paused and the rest is queued.
+        if index % 4 < 3:
+            job = deepcopy(job)
+            job.status = JobStatus.RUNNING
+            started_jobs.append(DatabaseJobEntry(job, None, machines[index % machine_count]))
+            if index % 4 == 2:
+                job = deepcopy(job)
+                job.status = JobStatus.PAUSED
+                paused_jobs.append(DatabaseJobEntry(job, None, machines[index % machine_count]))
+    database.apply_schedule(started_jobs, machines)
+    database.apply_schedule(paused_jobs, [])
+
+
+def _legacy_cleanup(database: ServerDatabase) -> None:
+    # The recovery as it was done before, with one transaction per job and work machine.
+    for job_entry in database.get_current_schedule():
+        if job_entry.job.status in [JobStatus.RUNNING, JobStatus.PAUSED]:
+            job_entry.job.status = JobStatus.CRASHED
+            database.update_job(job_entry.job)
+            database.assign_job_machine(job_entry.job, None)
+
+    for machine in database.get_work_machines():
+        machine.resources.deallocate(machine.resources.total_resources - machine.resources.free_resources)
+        machine.state = WorkMachineState.OFFLINE
+        database.update_work_machine(machine)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the database recovery on server startup.")
+    parser.add_argument("--jobs", type=int, default=50000, help="The amount of jobs in the database.")
+    parser.add_argument("--machines", type=int, default=100, help="The amount of work machines in the database.")
+    parser.add_argument("--database", default=None, help="SQLite database file to use, in memory by default.")
+    parser.add_argument("--legacy", action="store_true", help="Also measure the per-job recovery for comparison.")
+    args = parser.parse_args()
+
+    recovery_functions = [("bulk", JobCenter.crash_active_jobs)]
+    if args.legacy:
+        recovery_functions.append(("legacy", _legacy_cleanup))
+    for name, recover in recovery_functions:
+        database = SQLiteDatabase(args.database)
+        start = perf_counter()
+        _populate(database, args.jobs, args.machines)
+        print("%s: populated database with %d jobs in %.2fs" % (name, args.jobs, perf_counter() - start))
+        start = perf_counter()
+        recover(database)
+        print("%s: recovered database in %.2fs" % (name, perf_counter() - start))
+        crashed_jobs = [job_entry for job_entry in database.query_jobs(None, -1, None)
+                        if job_entry.job.status == JobStatus.CRASHED]
+        assert len(crashed_jobs) == len([index for index in range(args.jobs) if index % 4 < 3])
+        del database
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+An optional core for the daemons which hosts their services in a single asyncio event loop instead of giving each of
+them its own threads. Idle connections and timers then cost no thread at all; only work which blocks, like database
+access and Docker calls, is run on the threads of a shared pool.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional, TypeVar
+
+import logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+"""A service of a daemon, started with the core it runs in. The daemon stops once any of its services returns."""
+Service = Callable[["AsyncDaemonCore"], Awaitable[None]]
+
+
+class AsyncDaemonCore:
+    """
+    Runs the services and timers of a daemon in one event loop until one of the services ends or stop() is called.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        """!
+        @param max_workers: The maximum amount of blocking calls run at the same time, see run_blocking().
+        """
+        if max_workers < 1:
+            raise ValueError("The daemon core needs at least one thread.")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="daemon-core")
+        self._services: List[Service] = []
+        self._timers: List[Service] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def run_blocking(self, function: Callable[..., T], *args: Any) -> T:
+        """!
+        Run a blocking function on the thread pool of the core without blocking the event loop.
+        @param function: The function to call.
+        @param args: The arguments to call @function with.
+        @return: The result of @function.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def add_service(self, service: Service) -> None:
+        """!
+        Add a service, which is started by run().
+        @param service: The service to add.
+        """
+        self._services.append(service)
+
+    def add_timer(self, interval: float, function: Callable[[], object], name: str) -> None:
+        """!
+        Call a blocking function at a fixed interval, starting one interval after run() has been called. The next
+        interval starts when the call has finished, so the calls never overlap.
+        @param interval: The time between two calls, in seconds.
+        @param function: The function to call on the thread pool.
+        @param name: The name of the timer, for the log.
+        """
+        if interval <= 0:
+            raise ValueError("The interval of a timer must be positive.")
+
+        async def timer(core: AsyncDaemonCore) -> None:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await core.run_blocking(function)
+                except Exception as e:
+                    logger.error("Timer %s failed: %s" % (name, e))
+
+        self._timers.append(timer)
+
+    def stop(self) -> None:
+        """!
+        Make run() return. May be called from any thread.
+        """
+        loop, stopped = self._loop, self._stopped
+        if loop is not None and stopped is not None:
+            loop.call_soon_threadsafe(stopped.set)
+
+    async def _main(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        tasks: List[asyncio.Future[Any]] = [asyncio.ensure_future(service(self))
+                                            for service in self._services + self._timers]
+        tasks.append(asyncio.ensure_future(self._stopped.wait()))
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error("A service of the daemon failed: %s" % task.exception())
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._loop = None
+
+    def run(self) -> None:
+        """!
+        Run all services and timers until one of the services ends or stop() is called. Blocking calls in progress
+        are finished before run() returns.
+        """
+        try:
+            asyncio.run(self._main())
+        finally:
+            self._executor.shutdown(wait=True)
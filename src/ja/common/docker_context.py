@@ -4,11 +4,22 @@ These include, but are not limited to, mount points, program environment
 and hardware constraints.
 """
 from abc import abstractmethod
-from typing import List, Dict, cast
-from ja.common.message.base import Serializable
+from copy import deepcopy
+from hashlib import sha256
+from typing import List, Dict, Optional, cast
+from ja.common.message.base import SchemaSerializable, Serializable
+from ja.common.message.schema import IntField, StrField
 
 
-class MountPoint(Serializable):
+def get_dockerfile_hash(dockerfile_source: str) -> str:
+    """!
+    @param dockerfile_source The string contents of a Dockerfile.
+    @return The content hash (SHA-256, hexadecimal) which identifies the Dockerfile.
+    """
+    return sha256(dockerfile_source.encode()).hexdigest()
+
+
+class MountPoint(SchemaSerializable):
     """!
     A mount point consists of:
     1. A directory to be mounted(@source_path).
@@ -16,6 +27,8 @@ class MountPoint(Serializable):
     mounted(@mount_path).
     """
 
+    _schema = [StrField("source_path"), StrField("mount_path")]
+
     def __init__(self, source_path: str, mount_path: str):
         """!
         Initializes a new mount point.
@@ -48,35 +61,49 @@ class MountPoint(Serializable):
         """
         return self._mount_path
 
-    def to_dict(self) -> Dict[str, object]:
-        return {"source_path": self.source_path, "mount_path": self.mount_path}
-
-    @classmethod
-    def from_dict(cls, property_dict: Dict[str, object]) -> "MountPoint":
-        source_path = cls._get_str_from_dict(property_dict=property_dict, key="source_path")
-        mount_path = cls._get_str_from_dict(property_dict=property_dict, key="mount_path")
-        cls._assert_all_properties_used(property_dict)
-        return MountPoint(source_path=source_path, mount_path=mount_path)
-
 
 class IDockerContext(Serializable):
     """
     A docker context consists of the necessary data to build a docker image to
     run a job in.
+    The Dockerfile is identified by its content hash, so a docker context can also be sent as a reference to a
+    Dockerfile which the receiver already knows, without its contents.
     """
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, IDockerContext):
-            return self.dockerfile_source == other.dockerfile_source and self.mount_points == other.mount_points
+            return self.dockerfile_hash == other.dockerfile_hash and self.mount_points == other.mount_points
         else:
             return False
 
     @property
     @abstractmethod
-    def dockerfile_source(self) -> str:
+    def dockerfile_source(self) -> Optional[str]:
         """!
         @return The string contents of a Dockerfile which can be used to build
-        the docker image.
+        the docker image, or None if this docker context only references the Dockerfile by its hash.
+        """
+
+    @property
+    @abstractmethod
+    def dockerfile_hash(self) -> str:
+        """!
+        @return The content hash of the Dockerfile, see get_dockerfile_hash().
+        """
+
+    @abstractmethod
+    def without_source(self) -> "IDockerContext":
+        """!
+        @return A copy of this docker context which only references the Dockerfile by its hash.
+        """
+
+    @abstractmethod
+    def attach_dockerfile_source(self, dockerfile_source: str) -> None:
+        """!
+        Fill in the contents of the referenced Dockerfile.
+        This will cause a ValueError if the hash of @dockerfile_source does not match the referenced hash.
+
+        @param dockerfile_source The string contents of the Dockerfile.
         """
 
     @property
@@ -97,31 +124,59 @@ class DockerContext(IDockerContext):
     An implementation of the IDockerContext interface
     """
 
-    def __init__(self, dockerfile_source: str, mount_points: List[MountPoint]):
+    def __init__(self, dockerfile_source: Optional[str], mount_points: List[MountPoint], dockerfile_hash: str = None):
         """
-        @param dockerfile_source: The string contents of a Dockerfile which can be used to build the docker image.
+        @param dockerfile_source: The string contents of a Dockerfile which can be used to build the docker image, or
+          None if the Dockerfile is only referenced by @dockerfile_hash.
         @param mount_points: A list of all mount points for the job.
+        @param dockerfile_hash: The content hash of the Dockerfile. Computed from @dockerfile_source if not given.
         """
+        if dockerfile_source is None:
+            if dockerfile_hash is None:
+                raise ValueError("Either the contents or the hash of the Dockerfile must be given.")
+        elif dockerfile_hash is None:
+            dockerfile_hash = get_dockerfile_hash(dockerfile_source)
+        elif dockerfile_hash != get_dockerfile_hash(dockerfile_source):
+            raise ValueError("The Dockerfile does not match the hash %s." % dockerfile_hash)
         self._dockerfile_source = dockerfile_source
+        self._dockerfile_hash = dockerfile_hash
         self._mount_points = mount_points
 
     @property
-    def dockerfile_source(self) -> str:
+    def dockerfile_source(self) -> Optional[str]:
         return self._dockerfile_source
 
+    @property
+    def dockerfile_hash(self) -> str:
+        return self._dockerfile_hash
+
     @property
     def mount_points(self) -> List[MountPoint]:
         return self._mount_points
 
+    def without_source(self) -> "DockerContext":
+        return DockerContext(dockerfile_source=None, mount_points=deepcopy(self.mount_points),
+                             dockerfile_hash=self.dockerfile_hash)
+
+    def attach_dockerfile_source(self, dockerfile_source: str) -> None:
+        if get_dockerfile_hash(dockerfile_source) != self.dockerfile_hash:
+            raise ValueError("The Dockerfile does not match the hash %s." % self.dockerfile_hash)
+        self._dockerfile_source = dockerfile_source
+
     def to_dict(self) -> Dict[str, object]:
         return_dict: Dict[str, object] = dict()
-        return_dict["dockerfile_source"] = self.dockerfile_source
+        if self.dockerfile_source is None:
+            return_dict["dockerfile_hash"] = self.dockerfile_hash
+        else:
+            return_dict["dockerfile_source"] = self.dockerfile_source
         return_dict["mount_points"] = [_mount_point.to_dict() for _mount_point in self.mount_points]
         return return_dict
 
     @classmethod
     def from_dict(cls, property_dict: Dict[str, object]) -> "DockerContext":
-        dockerfile_source = cls._get_str_from_dict(property_dict=property_dict, key="dockerfile_source")
+        dockerfile_hash = cls._get_str_from_dict(property_dict=property_dict, key="dockerfile_hash", mandatory=False)
+        dockerfile_source = cls._get_str_from_dict(
+            property_dict=property_dict, key="dockerfile_source", mandatory=dockerfile_hash is None)
 
         prop: object = cls._get_from_dict(property_dict=property_dict, key="mount_points")
         if not isinstance(prop, list):
@@ -141,14 +196,17 @@ class DockerContext(IDockerContext):
                 cast(Dict[str, object], _object)
             ))
         cls._assert_all_properties_used(property_dict)
-        return DockerContext(dockerfile_source=dockerfile_source, mount_points=mount_point_list)
+        return DockerContext(dockerfile_source=dockerfile_source, mount_points=mount_point_list,
+                             dockerfile_hash=dockerfile_hash)
 
 
-class DockerConstraints(Serializable):
+class DockerConstraints(SchemaSerializable):
     """
     A list of constraints of the docker container.
     """
 
+    _schema = [IntField("cpu_threads"), IntField("memory")]
+
     def __init__(self, cpu_threads: int = -1, memory: int = 1):
         """!
         Create a new set of Docker constraints.
@@ -197,16 +255,3 @@ class DockerConstraints(Serializable):
         @return The maximum amount of RAM in MB to allocate for this container.
         """
         return self._memory
-
-    def to_dict(self) -> Dict[str, object]:
-        return_dict: Dict[str, object] = dict()
-        return_dict["cpu_threads"] = self.cpu_threads
-        return_dict["memory"] = self.memory
-        return return_dict
-
-    @classmethod
-    def from_dict(cls, property_dict: Dict[str, object]) -> "DockerConstraints":
-        cpu_threads = cls._get_int_from_dict(property_dict=property_dict, key="cpu_threads")
-        memory = cls._get_int_from_dict(property_dict=property_dict, key="memory")
-        cls._assert_all_properties_used(property_dict)
-        return DockerConstraints(cpu_threads=cpu_threads, memory=memory)
@@ -0,0 +1,137 @@
+"""
+A cache for the lookups of users and groups. With user databases backed by LDAP or another network service, every
+lookup may be a network round trip, which would otherwise dominate the latency of handling a Command.
+"""
+from threading import Lock
+from time import monotonic
+from typing import Callable, Dict, FrozenSet, Generic, Optional, Set, Tuple, TypeVar
+import grp
+import pwd
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class _ExpiringCache(Generic[K, V]):
+    """
+    Maps keys to values or to the knowledge that there is no value, for a limited time. Not thread-safe.
+    """
+
+    def __init__(self, ttl: float, negative_ttl: float, max_entries: int, clock: Callable[[], float]):
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        # The value, or None if there is none, and the time the entry expires at, by key.
+        self._entries: Dict[K, Tuple[Optional[V], float]] = dict()
+
+    def get(self, key: K) -> Tuple[bool, Optional[V]]:
+        """!
+        @return Whether @key is known, and its value, None if there is none.
+        """
+        entry = self._entries.get(key, None)
+        if entry is None or entry[1] <= self._clock():
+            return False, None
+        return True, entry[0]
+
+    def put(self, key: K, value: Optional[V]) -> None:
+        now = self._clock()
+        if len(self._entries) >= self._max_entries:
+            self._entries = {k: entry for k, entry in self._entries.items() if entry[1] > now}
+            if len(self._entries) >= self._max_entries:
+                self._entries.clear()
+        self._entries[key] = (value, now + (self._ttl if value is not None else self._negative_ttl))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class IdentityCache:
+    """
+    Caches the uids of users by name, the names of users by uid and the groups users are members of. Unknown users are
+    remembered for a shorter time, so that a new user can use JobAdder soon. Thread-safe; the lookups themselves do not
+    hold the lock, so a slow lookup does not block lookups of other users.
+    """
+
+    def __init__(self, ttl: float = 300, negative_ttl: float = 30, max_entries: int = 4096,
+                 clock: Callable[[], float] = monotonic):
+        """!
+        @param ttl The time in seconds a user or the group memberships are remembered for.
+        @param negative_ttl The time in seconds an unknown user is remembered for.
+        @param max_entries The maximum amount of users remembered, by name and by uid each.
+        @param clock Returns the current time in seconds.
+        """
+        if ttl < 0 or negative_ttl < 0 or max_entries < 1:
+            raise ValueError("The times must not be negative and at least one user must be remembered.")
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = Lock()
+        self._uids: _ExpiringCache[str, int] = _ExpiringCache(ttl, negative_ttl, max_entries, clock)
+        self._names: _ExpiringCache[int, str] = _ExpiringCache(ttl, negative_ttl, max_entries, clock)
+        # The groups of every user listed as member of a group, and the time they expire at.
+        self._groups: Optional[Tuple[Dict[str, FrozenSet[str]], float]] = None
+
+    def uid(self, user: str) -> int:
+        """!
+        @param user The name of a user.
+        @return The uid of @user.
+        @raise KeyError If there is no such user.
+        """
+        with self._lock:
+            known, uid = self._uids.get(user)
+        if not known:
+            try:
+                uid = pwd.getpwnam(user).pw_uid
+            except KeyError:
+                uid = None
+            with self._lock:
+                self._uids.put(user, uid)
+        if uid is None:
+            raise KeyError("getpwnam(): name not found: %s" % user)
+        return uid
+
+    def user_name(self, uid: int) -> str:
+        """!
+        @param uid The uid of a user.
+        @return The name of the user with @uid.
+        @raise KeyError If there is no such user.
+        """
+        with self._lock:
+            known, name = self._names.get(uid)
+        if not known:
+            try:
+                name = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                name = None
+            with self._lock:
+                self._names.put(uid, name)
+        if name is None:
+            raise KeyError("getpwuid(): uid not found: %d" % uid)
+        return name
+
+    def groups(self, user: str) -> FrozenSet[str]:
+        """!
+        @param user The name of a user.
+        @return The names of the groups @user is listed as a member of, empty for unknown users.
+        """
+        with self._lock:
+            groups = self._groups
+        if groups is None or groups[1] <= self._clock():
+            # A single scan of all groups answers the lookups of all users until it expires.
+            members: Dict[str, Set[str]] = dict()
+            for group in grp.getgrall():
+                for member in group.gr_mem:
+                    members.setdefault(member, set()).add(group.gr_name)
+            groups = {member: frozenset(names) for member, names in members.items()}, self._clock() + self._ttl
+            with self._lock:
+                self._groups = groups
+        return groups[0].get(user, frozenset())
+
+    def clear(self) -> None:
+        """!
+        Forget everything, for example after the user database has been changed.
+        """
+        with self._lock:
+            self._uids.clear()
+            self._names.clear()
+            self._groups = None
@@ -1,10 +1,11 @@
 """
 This module contains the definition of the Job class and related structures.
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, cast
 from enum import Enum
 from ja.common.docker_context import DockerConstraints, IDockerContext, DockerContext
-from ja.common.message.base import Serializable
+from ja.common.message.base import SchemaSerializable, Serializable
+from ja.common.message.schema import BoolField, EnumField, IntField, NestedField, StrField, StrListField
 
 
 class JobStatus(Enum):
@@ -30,12 +31,14 @@ class JobPriority(Enum):
     URGENT = 3
 
 
-class JobSchedulingConstraints(Serializable):
+class JobSchedulingConstraints(SchemaSerializable):
     """
     JobConstraints is a collection of job properties which affect how it is
     scheduled.
     """
 
+    _schema = [EnumField("priority", JobPriority), BoolField("is_preemptible"), StrListField("special_resources")]
+
     def __init__(self,
                  priority: JobPriority,
                  is_preemptible: bool,
@@ -73,26 +76,8 @@ class JobSchedulingConstraints(Serializable):
         """
         return self._special_resources
 
-    def to_dict(self) -> Dict[str, object]:
-        return_dict: Dict[str, object] = dict()
-        return_dict["priority"] = self.priority.value
-        return_dict["is_preemptible"] = self.is_preemptible
-        return_dict["special_resources"] = self.special_resources
-        return return_dict
-
-    @classmethod
-    def from_dict(cls, property_dict: Dict[str, object]) -> "JobSchedulingConstraints":
-        priority = JobPriority(cls._get_from_dict(property_dict=property_dict, key="priority"))
-        is_preemptible = cls._get_bool_from_dict(property_dict=property_dict, key="is_preemptible")
-        special_resources = cls._get_str_list_from_dict(property_dict=property_dict, key="special_resources")
-
-        cls._assert_all_properties_used(property_dict)
 
-        return JobSchedulingConstraints(
-            priority=priority, is_preemptible=is_preemptible, special_resources=special_resources)
-
-
-class Job(Serializable):
+class Job(SchemaSerializable):
     """!
     Represents a job with all of its attributes.
     @param owner_id The unix user id of the user who owns this job.
@@ -102,6 +87,17 @@ class Job(Serializable):
     @param label The label set by the user for the job.
     """
 
+    _schema = [
+        StrField("uid", mandatory=False),
+        IntField("owner_id"),
+        StrField("email", mandatory=False),
+        NestedField("scheduling_constraints", JobSchedulingConstraints),
+        NestedField("docker_context", DockerContext),
+        NestedField("docker_constraints", DockerConstraints),
+        EnumField("status", JobStatus),  # Passed to the constructor, which does not check the transition from NEW.
+        StrField("label", mandatory=False),
+    ]
+
     def __init__(self,
                  owner_id: int,
                  email: str,
@@ -245,46 +241,18 @@ class Job(Serializable):
     def label(self, label: str) -> None:
         self._label = label
 
-    def to_dict(self) -> Dict[str, object]:
-        return_dict: Dict[str, object] = dict()
-        return_dict["uid"] = self.uid
-        return_dict["owner_id"] = self.owner_id
-        return_dict["email"] = self.email
-        return_dict["scheduling_constraints"] = self.scheduling_constraints.to_dict()
-        return_dict["docker_context"] = self.docker_context.to_dict()
-        return_dict["docker_constraints"] = self.docker_constraints.to_dict()
-        return_dict["status"] = self.status.value
-        return_dict["label"] = self.label
-        return return_dict
+    def with_dockerfile_reference(self) -> "Job":
+        """!
+        @return A copy of this job whose docker context only references the Dockerfile by its hash.
+        """
+        job_dict = self.to_dict()
+        job_dict["docker_context"] = self.docker_context.without_source().to_dict()
+        return Job.from_dict(job_dict)
 
     @classmethod
-    def from_dict(cls, property_dict: Dict[str, object]) -> "Job":
-        uid = cls._get_str_from_dict(property_dict=property_dict, key="uid", mandatory=False)
-        owner_id = cls._get_int_from_dict(property_dict=property_dict, key="owner_id")
-        email = cls._get_str_from_dict(property_dict=property_dict, key="email", mandatory=False)
-
-        scheduling_constraints = JobSchedulingConstraints.from_dict(
-            cls._get_dict_from_dict(property_dict=property_dict, key="scheduling_constraints")
-        )
-
-        docker_context: DockerContext = DockerContext.from_dict(
-            cls._get_dict_from_dict(property_dict=property_dict, key="docker_context")
-        )
-
-        docker_constraints = DockerConstraints.from_dict(
-            cls._get_dict_from_dict(property_dict=property_dict, key="docker_constraints")
-        )
-
-        status = JobStatus(cls._get_from_dict(property_dict=property_dict, key="status"))
-
-        label = cls._get_str_from_dict(property_dict=property_dict, key="label", mandatory=False)
-
-        cls._assert_all_properties_used(property_dict)
-
-        job = Job(
-            owner_id=owner_id, email=email, scheduling_constraints=scheduling_constraints,
-            docker_context=docker_context, docker_constraints=docker_constraints, label=label
-        )
+    def _from_properties(cls, **properties: object) -> "Job":
+        # The UID is not known when a job is created, so it is not a constructor argument.
+        uid = cast(Optional[str], properties.pop("uid"))
+        job = cls(**properties)  # type: ignore
         job.uid = uid
-        job._status = status  # Bypass check whether transition from JobStatus.NEW is legal
         return job
@@ -4,9 +4,13 @@ implemented in order for a class to be transferable between the components
 of JobAdder.
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, cast
+from typing import TYPE_CHECKING, ClassVar, List, Dict, Type, TypeVar, cast
 import yaml
 
+from ja.common.message.codec import YAML_DUMPER, YAML_LOADER
+from ja.common.message.schema import BoolField, Field, IntField, NestedListField, StrField, generate_from_dict, \
+    generate_to_dict
+
 
 class Serializable(ABC):
     """
@@ -20,12 +24,16 @@ class Serializable(ABC):
     def _get_from_dict(cls, property_dict: Dict[str, object], key: str, mandatory: bool = True) -> object:
         prop = property_dict.pop(key, None)
         if mandatory and prop is None:
-            raise ValueError(
-                "Cannot read in object of type %s because the dictionary does not have the mandatory property %s"
-                % (cls, key)
-            )
+            cls._raise_error_missing(key)
         return prop
 
+    @classmethod
+    def _raise_error_missing(cls, key: str) -> None:
+        raise ValueError(
+            "Cannot read in object of type %s because the dictionary does not have the mandatory property %s"
+            % (cls, key)
+        )
+
     @classmethod
     def _raise_error_wrong_type(cls, key: str, expected_type: str, actual_type: str) -> None:
         raise ValueError(
@@ -104,7 +112,7 @@ class Serializable(ABC):
         """!
         @return A YAML document (string) representation of this object.
         """
-        as_yaml = yaml.dump(self.to_dict())
+        as_yaml = yaml.dump(self.to_dict(), Dumper=YAML_DUMPER)
         assert isinstance(as_yaml, str)
         return as_yaml
 
@@ -116,11 +124,60 @@ class Serializable(ABC):
         @return A new Serializable object based on the properties encoded in
         the YAML document.
         """
-        as_dict = yaml.load(yaml_string, Loader=yaml.SafeLoader)
+        as_dict = yaml.load(yaml_string, Loader=YAML_LOADER)
         assert isinstance(as_dict, dict)
         return cls.from_dict(as_dict)
 
 
+_SchemaSerializableType = TypeVar("_SchemaSerializableType", bound="SchemaSerializable")
+
+
+class SchemaSerializable(Serializable, ABC):
+    """
+    A Serializable which declares its dictionary representation as a list of fields (see ja.common.message.schema)
+    instead of implementing to_dict() and from_dict(). Both methods are generated from the fields when the class is
+    created, and again for subclasses overriding _schema or _from_properties(). By default, the entries are read from
+    the attributes with the same names and passed to the constructor as keyword arguments with the same names; classes
+    can override _from_properties() to create objects differently. A TypeError is raised when a class which is not
+    derived from ABC directly neither declares a schema nor implements both methods itself.
+    """
+
+    _schema: ClassVar[List[Field]]
+
+    def __init_subclass__(cls, **kwargs: object) -> None:
+        super().__init_subclass__(**kwargs)
+        if "_schema" not in cls.__dict__ and "_from_properties" not in cls.__dict__:
+            # Classes deriving from ABC directly may leave both methods to their subclasses.
+            if ABC in cls.__bases__:
+                return
+            for name in ["to_dict", "from_dict"]:
+                if getattr(getattr(cls, name), "__isabstractmethod__", False):
+                    raise TypeError("%s neither declares a schema nor implements %s()." % (cls.__name__, name))
+            return
+        construct = None
+        if cls._from_properties.__func__ is not SchemaSerializable._from_properties.__func__:  # type: ignore
+            construct = "_from_properties"
+        schema = [field.resolve(cls) for field in cls._schema]
+        if "to_dict" not in cls.__dict__:
+            setattr(cls, "to_dict", generate_to_dict(schema))
+        if "from_dict" not in cls.__dict__:
+            setattr(cls, "from_dict", classmethod(generate_from_dict(schema, construct)))
+
+    @classmethod
+    def _from_properties(cls: Type[_SchemaSerializableType], **properties: object) -> _SchemaSerializableType:
+        return cls(**properties)
+
+    if TYPE_CHECKING:
+        # The methods are generated by __init_subclass__(), which type checkers cannot follow.
+        def to_dict(self) -> Dict[str, object]:
+            pass
+
+        @classmethod
+        def from_dict(cls: Type[_SchemaSerializableType],
+                      property_dict: Dict[str, object]) -> _SchemaSerializableType:
+            pass
+
+
 class Message(Serializable, ABC):
     """
     A base class for all messages which can be transferred between the
@@ -141,21 +198,26 @@ class Command(Message, ABC):
         """
 
 
-class Response(Message):
+class Response(Message, SchemaSerializable):
     """
     A base class for messages which are sent as a response to Commands. They
     indicate the result of the action on the remote component.
     """
-    def __init__(self, result_string: str, is_success: bool, uid: str = None):
+    def __init__(self, result_string: str, is_success: bool, uid: str = None, retry_after: int = None,
+                 responses: List["Response"] = None):
         self._result_string = result_string
         self._is_success = is_success
         self._uid = uid
+        self._retry_after = retry_after
+        self._responses = responses
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, self.__class__):
             return self.result_string == other.result_string \
                 and self.is_success == other.is_success \
-                and self.uid == other.uid
+                and self.uid == other.uid \
+                and self.retry_after == other.retry_after \
+                and self.responses == other.responses
         else:
             return False
 
@@ -181,17 +243,24 @@ class Response(Message):
         """
         return self._uid
 
-    def to_dict(self) -> Dict[str, object]:
-        return {"result_string": self.result_string, "is_success": self.is_success, "uid": self.uid}
+    @property
+    def retry_after(self) -> int:
+        """!
+        @return: The time in seconds after which a Command which was rejected because the server is busy may be sent
+        again, None otherwise.
+        """
+        return self._retry_after
+
+    @property
+    def responses(self) -> List["Response"]:
+        """!
+        @return: The Responses to the single Commands of a Command sent on their behalf, in order, None otherwise.
+        """
+        return self._responses
+
+    _schema = [StrField("result_string"), BoolField("is_success"), StrField("uid", mandatory=False),
+               IntField("retry_after", mandatory=False), NestedListField("responses", None, mandatory=False)]
 
     @classmethod
     def from_string(cls, yaml_string: str) -> "Response":
         return cast(Response, super().from_string(yaml_string))
-
-    @classmethod
-    def from_dict(cls, property_dict: Dict[str, object]) -> "Response":
-        result_string = cls._get_str_from_dict(property_dict=property_dict, key="result_string")
-        is_success = cls._get_bool_from_dict(property_dict=property_dict, key="is_success")
-        uid = cls._get_str_from_dict(property_dict=property_dict, key="uid", mandatory=False)
-        cls._assert_all_properties_used(property_dict)
-        return cls(result_string=result_string, is_success=is_success, uid=uid)
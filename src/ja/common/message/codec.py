@@ -0,0 +1,173 @@
+"""
+The codecs which can be used to transfer Messages between the components of JobAdder. Every Message is converted to a
+dictionary first (see Serializable.to_dict()), which is then encoded by a codec.
+
+YAML is understood by every component and remains the default. JSON and, if the msgpack package is installed, the
+binary msgpack format are much faster to encode and decode. The codec of a request can be recognized from its first
+byte, so a receiver always answers in the codec it was addressed in.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, cast
+import json
+import yaml
+
+try:
+    import msgpack  # type: ignore
+except ImportError:
+    msgpack = None
+
+# The libyaml bindings produce the same documents as the pure Python implementation, but much faster.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+
+
+class Codec(ABC):
+    """
+    Converts message dictionaries to bytes and back.
+    """
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """!
+        @return The name the codec is announced by.
+        """
+
+    @abstractmethod
+    def encode(self, message_dict: Dict[str, object]) -> bytes:
+        """!
+        @param message_dict The dictionary to encode.
+        @return The encoded dictionary.
+        """
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Dict[str, object]:
+        """!
+        @param data Bytes produced by encode().
+        @return The decoded dictionary.
+        @raise ValueError If @data does not encode a dictionary.
+        """
+
+    @staticmethod
+    def _check_dict(decoded: object) -> Dict[str, object]:
+        if not isinstance(decoded, dict):
+            raise ValueError("Expected a dictionary, but decoded %s." % decoded.__class__.__name__)
+        return cast(Dict[str, object], decoded)
+
+
+class YAMLCodec(Codec):
+    """
+    The human readable codec which all components support.
+    """
+
+    @property
+    def name(self) -> str:
+        return "yaml"
+
+    def encode(self, message_dict: Dict[str, object]) -> bytes:
+        return yaml.dump(message_dict, Dumper=YAML_DUMPER).encode()
+
+    def decode(self, data: bytes) -> Dict[str, object]:
+        try:
+            return self._check_dict(yaml.load(data.decode(), Loader=YAML_LOADER))
+        except yaml.YAMLError as e:
+            raise ValueError("Malformed YAML message: %s" % e)
+
+
+class JSONCodec(Codec):
+    """
+    A fast text codec from the standard library.
+    """
+
+    @property
+    def name(self) -> str:
+        return "json"
+
+    def encode(self, message_dict: Dict[str, object]) -> bytes:
+        return json.dumps(message_dict, separators=(",", ":")).encode()
+
+    def decode(self, data: bytes) -> Dict[str, object]:
+        return self._check_dict(json.loads(data.decode()))
+
+
+class MsgpackCodec(Codec):
+    """
+    A compact binary codec. Only available if the msgpack package is installed.
+    """
+
+    @property
+    def name(self) -> str:
+        return "msgpack"
+
+    def encode(self, message_dict: Dict[str, object]) -> bytes:
+        return cast(bytes, msgpack.packb(message_dict, use_bin_type=True))
+
+    def decode(self, data: bytes) -> Dict[str, object]:
+        try:
+            return self._check_dict(msgpack.unpackb(data, raw=False))
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as e:
+            raise ValueError("Malformed msgpack message: %s" % e)
+
+
+YAML = YAMLCodec()
+JSON = JSONCodec()
+CODECS: Dict[str, Codec] = {YAML.name: YAML, JSON.name: JSON}
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+# Codec names from the most to the least preferred one.
+PREFERENCE = ["msgpack", "json", "yaml"]
+
+
+def available_codecs() -> List[str]:
+    """!
+    @return The names of the codecs supported by this installation, from the most to the least preferred one.
+    """
+    return [name for name in PREFERENCE if name in CODECS]
+
+
+def choose_codec(remote_codecs: List[str]) -> Codec:
+    """!
+    @param remote_codecs The names of the codecs supported by the other side of a connection.
+    @return The most preferred codec which both sides support, YAML if there is none.
+    """
+    for name in available_codecs():
+        if name in remote_codecs:
+            return CODECS[name]
+    return YAML
+
+
+def detect_codec(data: bytes) -> Codec:
+    """!
+    Recognize the codec of an encoded message dictionary by its first byte: msgpack maps start with a byte from
+    0x80 to 0x8f or with 0xde or 0xdf, JSON objects with "{" and YAML documents produced by YAMLCodec with a key.
+
+    @param data The encoded message dictionary.
+    @return The codec to decode @data with.
+    """
+    stripped = data.lstrip()
+    if not stripped:
+        return YAML
+    first = stripped[0]
+    if (0x80 <= first <= 0x8f or first in (0xde, 0xdf)) and "msgpack" in CODECS:
+        return CODECS["msgpack"]
+    if first == ord("{"):
+        return JSON
+    return YAML
+
+
+def decode_any(data: bytes) -> Dict[str, object]:
+    """!
+    Decode a message dictionary in any supported codec, see detect_codec().
+
+    @param data The encoded message dictionary.
+    @return The decoded dictionary.
+    """
+    codec = detect_codec(data)
+    if codec is JSON:
+        try:
+            return JSON.decode(data)
+        except ValueError:
+            # A YAML document in flow style, for example "{}".
+            return YAML.decode(data)
+    return codec.decode(data)
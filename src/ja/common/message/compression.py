@@ -0,0 +1,109 @@
+"""
+Transparent compression of encoded Messages. Commands like StartJobCommand carry whole Dockerfiles, and the Responses
+to detailed queries list many jobs, so over SSH it pays off to compress large messages.
+
+Compression is only used between components which have agreed on it: a remote agent announces the compressions it
+supports in its hello (see ja.common.proxy.channel), and a client which knows the agent supports them wraps its
+Commands in an envelope. The envelope starts with a byte no codec produces, followed by a byte telling whether the rest
+is compressed. A receiver only wraps its Response in an envelope, possibly compressed, if the Command came in one, so
+components which do not know about compression are never sent an envelope.
+"""
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import zlib
+
+# The name compression is announced by.
+ZLIB = "zlib"
+# The names of all supported compressions.
+COMPRESSIONS: List[str] = [ZLIB]
+# Messages shorter than this many bytes are not worth compressing.
+DEFAULT_THRESHOLD = 1024
+
+_ENVELOPE = 0x00
+_PLAIN = ord("p")
+_COMPRESSED = ord("z")
+# zlib level 1 compresses YAML and JSON messages about as well as the default level, but much faster.
+_LEVEL = 1
+
+
+class CompressionMetrics:
+    """
+    Counts the messages wrapped in an envelope and their bytes before and after compression.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._counts: Dict[str, int] = dict(messages=0, compressed_messages=0, bytes_before=0, bytes_after=0)
+
+    def record(self, length_before: int, length_after: int, compressed: bool) -> None:
+        """!
+        @param length_before The length of the message in bytes.
+        @param length_after The length of the message in bytes as it was sent.
+        @param compressed True if the message was compressed.
+        """
+        with self._lock:
+            self._counts["messages"] += 1
+            self._counts["compressed_messages"] += int(compressed)
+            self._counts["bytes_before"] += length_before
+            self._counts["bytes_after"] += length_after
+
+    def snapshot(self) -> Dict[str, int]:
+        """!
+        @return How many messages were sent, how many of them were compressed, and how many bytes they had before and
+        after compression.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+
+def is_enveloped(data: bytes) -> bool:
+    """!
+    @param data A message as received.
+    @return True if @data is wrapped in an envelope, so that the sender accepts compressed messages.
+    """
+    return len(data) >= 2 and data[0] == _ENVELOPE and data[1] in (_PLAIN, _COMPRESSED)
+
+
+def pack(data: bytes, threshold: Optional[int] = DEFAULT_THRESHOLD, metrics: CompressionMetrics = None) -> bytes:
+    """!
+    Wrap an encoded message in an envelope, compressed if it is long enough and compressing makes it shorter.
+
+    @param data The encoded message.
+    @param threshold The minimum length in bytes of a message to compress, or None to never compress.
+    @param metrics Records the length of the message before and after compression, if given.
+    @return The message in an envelope.
+    """
+    packed = bytes((_ENVELOPE, _PLAIN)) + data
+    if threshold is not None and len(data) >= threshold:
+        compressed = zlib.compress(data, _LEVEL)
+        if len(compressed) < len(data):
+            packed = bytes((_ENVELOPE, _COMPRESSED)) + compressed
+    if metrics is not None:
+        metrics.record(len(data), len(packed), packed[1] == _COMPRESSED)
+    return packed
+
+
+def unpack(data: bytes, max_length: int = None) -> Tuple[bytes, bool]:
+    """!
+    Take an encoded message out of its envelope and decompress it if needed.
+
+    @param data A message as received, which need not be in an envelope.
+    @param max_length The maximum length in bytes of the decompressed message.
+    @return The encoded message and whether it was in an envelope.
+    @raise ValueError If the message cannot be decompressed or is longer than @max_length.
+    """
+    if not is_enveloped(data):
+        return data, False
+    if data[1] == _PLAIN:
+        return data[2:], True
+    decompressor = zlib.decompressobj()
+    try:
+        # Limit the output, so that a small malicious message cannot use up all memory.
+        unpacked = decompressor.decompress(data[2:], max_length or 0)
+    except zlib.error as e:
+        raise ValueError("Malformed compressed message: %s" % e)
+    if decompressor.unconsumed_tail:
+        raise ValueError("Compressed message exceeds the maximum length of %d bytes." % max_length)
+    if not decompressor.eof:
+        raise ValueError("Compressed message is truncated.")
+    return unpacked, True
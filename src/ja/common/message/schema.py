@@ -0,0 +1,303 @@
+"""
+Declarative schemas for Serializable classes. A schema is a list of fields, one per entry of the dictionary
+representation of an object. The to_dict() and from_dict() methods of a class with a schema are generated from it
+once, when the class is created (see SchemaSerializable), so converting objects does not have to walk through generic
+helper methods for every property. The generated from_dict() raises the same ValueErrors as the helper methods of
+Serializable.
+"""
+from abc import ABC, abstractmethod
+from enum import Enum
+from copy import copy
+from typing import Callable, Dict, List, Optional, Type
+
+
+class Field(ABC):
+    """
+    One entry of the dictionary representation of a Serializable object.
+    """
+
+    def __init__(self, key: str, mandatory: bool = True, attribute: str = None, argument: str = None):
+        """!
+        @param key The key of the entry.
+        @param mandatory Whether reading in an object fails if the entry is missing or None.
+        @param attribute The attribute of the object the entry is read from, @key by default.
+        @param argument The keyword argument of the constructor the entry is passed to, @key by default.
+        """
+        self._key = key
+        self._mandatory = mandatory
+        self._attribute = attribute if attribute is not None else key
+        self._argument = argument if argument is not None else key
+        if not self._attribute.isidentifier() or not self._argument.isidentifier():
+            raise ValueError("Invalid attribute or argument name for field %s." % key)
+
+    @property
+    def key(self) -> str:
+        """!
+        @return The key of the entry.
+        """
+        return self._key
+
+    @property
+    def mandatory(self) -> bool:
+        """!
+        @return Whether reading in an object fails if the entry is missing or None.
+        """
+        return self._mandatory
+
+    @property
+    def attribute(self) -> str:
+        """!
+        @return The attribute of the object the entry is read from.
+        """
+        return self._attribute
+
+    @property
+    def argument(self) -> str:
+        """!
+        @return The keyword argument of the constructor the entry is passed to.
+        """
+        return self._argument
+
+    @abstractmethod
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        """!
+        @param value The name of the variable holding the entry, which is not None.
+        @param wrong_type Produces the statement raising the error for a wrong type from the expected type and the
+        expression for the actual type.
+        @return The source lines validating the type of the entry.
+        """
+
+    def decode(self, value: str) -> str:
+        """!
+        @param value The name of the variable holding the validated entry, which is not None.
+        @return The expression converting the entry to the value passed to the constructor.
+        """
+        return value
+
+    def encode(self, value: str) -> str:
+        """!
+        @param value The expression for the attribute, which is not None.
+        @return The expression converting the attribute to the entry.
+        """
+        return value
+
+    @property
+    def globals(self) -> Dict[str, object]:
+        """!
+        @return The names the expressions of this field refer to, apart from builtins.
+        """
+        return dict()
+
+    def resolve(self, declaring_type: type) -> "Field":
+        """!
+        @param declaring_type The class the methods are generated for.
+        @return This field, with references to the declaring class filled in.
+        """
+        return self
+
+    def _simple_check(self, value: str, wrong_type: Callable[[str, str], str], type_name: str) -> List[str]:
+        return ["if not isinstance(%s, %s):" % (value, type_name),
+                "    " + wrong_type(type_name, "%s.__class__.__name__" % value)]
+
+
+class StrField(Field):
+    """
+    An entry which is a string.
+    """
+
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        return self._simple_check(value, wrong_type, "str")
+
+
+class IntField(Field):
+    """
+    An entry which is an integer.
+    """
+
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        return self._simple_check(value, wrong_type, "int")
+
+
+class BoolField(Field):
+    """
+    An entry which is a boolean.
+    """
+
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        return self._simple_check(value, wrong_type, "bool")
+
+
+class StrListField(Field):
+    """
+    An entry which is a list of strings.
+    """
+
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        return ["if not isinstance(%s, list):" % value,
+                "    " + wrong_type("List[str]", "%s.__class__.__name__" % value),
+                "for element in %s:" % value,
+                "    if not isinstance(element, str):",
+                "        " + wrong_type("List[str]", "'List[object]'")]
+
+
+class EnumField(Field):
+    """
+    An entry which is the value of an Enum member. Invalid values make the Enum raise a ValueError.
+    """
+
+    def __init__(self, key: str, enum_type: Type[Enum], mandatory: bool = True, attribute: str = None,
+                 argument: str = None):
+        """!
+        @param key The key of the entry.
+        @param enum_type The Enum the attribute is a member of.
+        @param mandatory Whether reading in an object fails if the entry is missing or None.
+        @param attribute The attribute of the object the entry is read from, @key by default.
+        @param argument The keyword argument of the constructor the entry is passed to, @key by default.
+        """
+        super().__init__(key, mandatory, attribute, argument)
+        self._enum_type = enum_type
+
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        return []
+
+    def decode(self, value: str) -> str:
+        return "%s(%s)" % (self._enum_type.__name__, value)
+
+    def encode(self, value: str) -> str:
+        return "%s.value" % value
+
+    @property
+    def globals(self) -> Dict[str, object]:
+        return {self._enum_type.__name__: self._enum_type}
+
+
+class NestedField(Field):
+    """
+    An entry which is the dictionary representation of another Serializable object.
+    """
+
+    def __init__(self, key: str, serializable_type: Optional[type], mandatory: bool = True, attribute: str = None,
+                 argument: str = None):
+        """!
+        @param key The key of the entry.
+        @param serializable_type The Serializable class of the attribute, None for the class declaring the field, which
+        cannot be referred to while it is being declared.
+        @param mandatory Whether reading in an object fails if the entry is missing or None.
+        @param attribute The attribute of the object the entry is read from, @key by default.
+        @param argument The keyword argument of the constructor the entry is passed to, @key by default.
+        """
+        super().__init__(key, mandatory, attribute, argument)
+        self._serializable_type = serializable_type
+
+    def resolve(self, declaring_type: type) -> "Field":
+        if self._serializable_type is not None:
+            return self
+        resolved = copy(self)
+        resolved._serializable_type = declaring_type
+        return resolved
+
+    @property
+    def _type_name(self) -> str:
+        assert self._serializable_type is not None, "The schema of field %s has not been resolved." % self.key
+        return self._serializable_type.__name__
+
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        return self._simple_check(value, wrong_type, "dict")
+
+    def decode(self, value: str) -> str:
+        return "%s.from_dict(%s)" % (self._type_name, value)
+
+    def encode(self, value: str) -> str:
+        return "%s.to_dict()" % value
+
+    @property
+    def globals(self) -> Dict[str, object]:
+        return {self._type_name: self._serializable_type}
+
+
+class NestedListField(NestedField):
+    """
+    An entry which is a list of dictionary representations of other Serializable objects.
+    """
+
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        expected_type = "List[%s]" % self._type_name
+        return ["if not isinstance(%s, list):" % value,
+                "    " + wrong_type(expected_type, "%s.__class__.__name__" % value),
+                "for element in %s:" % value,
+                "    if not isinstance(element, dict):",
+                "        " + wrong_type(expected_type, "'List[object]'")]
+
+    def decode(self, value: str) -> str:
+        return "[%s.from_dict(element) for element in %s]" % (self._type_name, value)
+
+    def encode(self, value: str) -> str:
+        return "[element.to_dict() for element in %s]" % value
+
+
+def _compile(name: str, lines: List[str], namespace: Dict[str, object]) -> Callable[..., object]:
+    exec("\n".join(lines), namespace)
+    return namespace[name]  # type: ignore
+
+
+def generate_to_dict(schema: List[Field]) -> Callable[..., Dict[str, object]]:
+    """!
+    @param schema The fields of a Serializable class.
+    @return The to_dict() method for the class.
+    """
+    namespace: Dict[str, object] = dict()
+    lines = ["def to_dict(self):"]
+    entries: List[str] = []
+    for index, field in enumerate(schema):
+        namespace.update(field.globals)
+        attribute = "self.%s" % field.attribute
+        if field.encode("value") == "value":
+            entries.append("%r: %s" % (field.key, attribute))
+        elif field.mandatory:
+            entries.append("%r: %s" % (field.key, field.encode(attribute)))
+        else:
+            lines.append("    value%d = %s" % (index, attribute))
+            value = "value%d" % index
+            entries.append("%r: None if %s is None else %s" % (field.key, value, field.encode(value)))
+    lines.append("    return {%s}" % ", ".join(entries))
+    return _compile("to_dict", lines, namespace)  # type: ignore
+
+
+def generate_from_dict(schema: List[Field], construct: str = None) -> Callable[..., object]:
+    """!
+    @param schema The fields of a Serializable class.
+    @param construct The name of the class method creating the object from the keyword arguments. The constructor of
+    the class is called directly if None.
+    @return The function underlying the from_dict() class method for the class.
+    """
+    keys = frozenset(field.key for field in schema)
+    if len(keys) != len(schema):
+        raise ValueError("Duplicate keys in schema.")
+    namespace: Dict[str, object] = dict(_keys=keys)
+    lines = ["def from_dict(cls, property_dict):"]
+    arguments: List[str] = []
+    for index, field in enumerate(schema):
+        namespace.update(field.globals)
+        value = "value%d" % index
+
+        def wrong_type(expected_type: str, actual_type: str) -> str:
+            return "cls._raise_error_wrong_type(key=%r, expected_type=%r, actual_type=%s)" % (
+                field.key, expected_type, actual_type)
+
+        lines.append("    %s = property_dict.get(%r)" % (value, field.key))
+        if field.mandatory:
+            lines.append("    if %s is None:" % value)
+            lines.append("        cls._raise_error_missing(%r)" % field.key)
+            body = field.check(value, wrong_type) + ["%s = %s" % (value, field.decode(value))]
+            lines += ["    " + line for line in body]
+        else:
+            body = field.check(value, wrong_type) + ["%s = %s" % (value, field.decode(value))]
+            lines.append("    if %s is not None:" % value)
+            lines += ["        " + line for line in body]
+        arguments.append("%s=%s" % (field.argument, value))
+    lines.append("    if not _keys.issuperset(property_dict):")
+    lines.append("        cls._assert_all_properties_used(")
+    lines.append("            {key: value for key, value in property_dict.items() if key not in _keys})")
+    constructor = "cls" if construct is None else "cls.%s" % construct
+    lines.append("    return %s(%s)" % (constructor, ", ".join(arguments)))
+    return _compile("from_dict", lines, namespace)
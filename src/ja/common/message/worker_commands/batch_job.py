@@ -0,0 +1,131 @@
+"""
+This command will perform several job actions on the work machine at once
+"""
+from typing import Callable, Dict, List, Type, cast
+
+from ja.common.message.base import Response, SchemaSerializable
+from ja.common.message.schema import Field
+from ja.common.message.worker import WorkerCommand
+from ja.common.message.worker_commands.cancel_job import CancelJobCommand
+from ja.common.message.worker_commands.pause_job import PauseJobCommand
+from ja.common.message.worker_commands.resume_job import ResumeJobCommand
+from ja.common.message.worker_commands.start_job import StartJobCommand
+from ja.worker.docker import DockerInterface
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _encode_actions(commands: List[WorkerCommand]) -> List[Dict[str, object]]:
+    return [dict(type_name=type(command).__name__, command=command.to_dict()) for command in commands]
+
+
+def _decode_actions(cls: Type["BatchJobCommand"], actions: List[object]) -> List[WorkerCommand]:
+    commands: List[WorkerCommand] = []
+    for element in actions:
+        if not isinstance(element, dict):
+            cls._raise_error_wrong_type(key="commands", expected_type="List[dict]", actual_type="List[object]")
+        element_dict = dict(cast(Dict[str, object], element))
+        type_name = cls._get_str_from_dict(property_dict=element_dict, key="type_name")
+        command_dict = cls._get_dict_from_dict(property_dict=element_dict, key="command")
+        cls._assert_all_properties_used(element_dict)
+        if type_name not in cls.ACTIONS:
+            raise ValueError("%s cannot be part of a batch." % type_name)
+        commands.append(cast(WorkerCommand, cls.ACTIONS[type_name].from_dict(command_dict)))
+    return commands
+
+
+class _ActionListField(Field):
+    """
+    An entry which is a list of commands, each of them together with its type name.
+    """
+
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        return self._simple_check(value, wrong_type, "list")
+
+    def decode(self, value: str) -> str:
+        return "_decode_actions(cls, %s)" % value
+
+    def encode(self, value: str) -> str:
+        return "_encode_actions(%s)" % value
+
+    @property
+    def globals(self) -> Dict[str, object]:
+        return {"_decode_actions": _decode_actions, "_encode_actions": _encode_actions}
+
+
+class BatchJobCommand(WorkerCommand, SchemaSerializable):
+    """
+    Sent by the server instead of several single commands if it has more than one action for a work machine in one
+    scheduling cycle, so that they need only one round trip. The actions are executed in order, each of them even if
+    the ones before failed. The Response lists the Responses to the single actions; it is successful if all actions
+    were successful.
+    """
+
+    RESPONSE_FAILED_ACTION = "%s failed on worker with UID %s: %s"
+
+    # The commands which can be part of a batch, by type name.
+    ACTIONS: Dict[str, Type[WorkerCommand]] = {
+        "StartJobCommand": StartJobCommand,
+        "PauseJobCommand": PauseJobCommand,
+        "ResumeJobCommand": ResumeJobCommand,
+        "CancelJobCommand": CancelJobCommand,
+    }
+
+    _schema = [_ActionListField("commands")]
+
+    def __init__(self, commands: List[WorkerCommand]):
+        """!
+        @param commands: The commands to execute on the worker client, in order.
+        """
+        for command in commands:
+            if type(command).__name__ not in self.ACTIONS:
+                raise ValueError("%s cannot be part of a batch." % type(command).__name__)
+        self._commands = commands
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, BatchJobCommand) and self.commands == other.commands
+
+    @property
+    def commands(self) -> List[WorkerCommand]:
+        """!
+        @return: The commands to execute on the worker client, in order.
+        """
+        return self._commands
+
+    def _execute_action(self, command: WorkerCommand, docker_interface: DockerInterface) -> Response:
+        try:
+            return command.execute(docker_interface)
+        except Exception as e:
+            logger.exception("%s of a batch failed" % type(command).__name__)
+            return Response(self.RESPONSE_FAILED_ACTION % (type(command).__name__, docker_interface.worker_uid, e),
+                            is_success=False)
+
+    def execute(self, docker_interface: DockerInterface) -> Response:
+        """!
+        Execute all commands on the worker machine using the provided @worker_client. A command which raises an
+        exception is answered with a failed Response, and the following commands are executed nonetheless.
+        @param docker_interface: the docker interface to use for the execution.
+        @return: a Response with the Responses to the single commands
+        """
+        return self.create_response([self._execute_action(command, docker_interface) for command in self._commands])
+
+    @staticmethod
+    def create_response(responses: List[Response]) -> Response:
+        """!
+        @param responses: the Responses to the single commands of a batch, in order.
+        @return: the Response to the batch.
+        """
+        succeeded = sum(1 for response in responses if response.is_success)
+        return Response("%d of %d commands succeeded." % (succeeded, len(responses)),
+                        is_success=succeeded == len(responses), responses=responses)
+
+    @staticmethod
+    def get_responses(response: Response) -> List[Response]:
+        """!
+        @param response: a Response to a BatchJobCommand.
+        @return: the Responses to the single commands of the batch, in order.
+        """
+        if response.responses is None:
+            raise ValueError("Malformed batch response: %s" % response.result_string)
+        return response.responses
@@ -1,20 +1,22 @@
 """
 This command will pause a running job on the work machine
 """
-from typing import Dict
 from docker.errors import APIError  # type: ignore
 
 from ja.common.message.worker import WorkerCommand
-from ja.common.message.base import Response
+from ja.common.message.base import Response, SchemaSerializable
+from ja.common.message.schema import StrField
 from ja.worker.docker import DockerInterface
 
 
-class PauseJobCommand(WorkerCommand):
+class PauseJobCommand(WorkerCommand, SchemaSerializable):
 
     RESPONSE_SUCCESS = "Successfully paused job with UID %s on worker with UID %s."
     RESPONSE_NOT_RUNNING = "Could not pause job with UID %s on worker with UID %s because the job is not running."
     RESPONSE_UNKNOWN_JOB = "Could not pause job with UID %s because worker with UID %s does not have this job."
 
+    _schema = [StrField("uid")]
+
     def __init__(self, uid: str):
         """!
         @param uid: The uid of the Job to pause on the worker client.
@@ -44,20 +46,3 @@ class PauseJobCommand(WorkerCommand):
             return Response(self.RESPONSE_UNKNOWN_JOB % (self.uid, docker_interface.worker_uid), is_success=False)
         except APIError:
             return Response(self.RESPONSE_NOT_RUNNING % (self.uid, docker_interface.worker_uid), is_success=False)
-
-    def to_dict(self) -> Dict[str, object]:
-        """!
-        @return: returns a dictionary that represents this object
-        """
-        return {"uid": self._uid}
-
-    @classmethod
-    def from_dict(cls, property_dict: Dict[str, object]) -> "PauseJobCommand":
-        """!
-        @param property_dict A Python dictionary defining the command
-        @return A new Serializable object based on the property entries of the
-        specified dictionary.
-        """
-        uid = cls._get_str_from_dict(property_dict=property_dict, key="uid")
-        cls._assert_all_properties_used(property_dict)
-        return PauseJobCommand(uid)
@@ -0,0 +1,66 @@
+"""
+This command asks the work machine for the jobs it currently holds
+"""
+from typing import Dict
+import yaml
+
+from ja.common.job import JobStatus
+from ja.common.message.worker import WorkerCommand
+from ja.common.message.base import Response
+from ja.worker.docker import DockerInterface
+
+
+class ReportJobsCommand(WorkerCommand):
+    """
+    Sent by the server after a restart to find out which of its jobs are still held by the worker. The result string
+    of a successful Response is a YAML document mapping job UIDs to the names of their JobStatus.
+    """
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ReportJobsCommand)
+
+    def execute(self, docker_interface: DockerInterface) -> Response:
+        """!
+        Report the jobs held by the worker machine using the provided @worker_client
+        @param docker_interface: the docker interface to use for the execution.
+        @return: a Response with the held jobs
+        """
+        return self.create_response(docker_interface.report_jobs())
+
+    @staticmethod
+    def create_response(job_statuses: Dict[str, JobStatus]) -> Response:
+        """!
+        @param job_statuses: the statuses of the jobs held by the worker, by job UID.
+        @return: a successful Response reporting these jobs.
+        """
+        return Response(yaml.dump({uid: status.name for uid, status in job_statuses.items()}), is_success=True)
+
+    @staticmethod
+    def get_job_statuses(response: Response) -> Dict[str, JobStatus]:
+        """!
+        @param response: a successful Response to a ReportJobsCommand.
+        @return: the statuses of the jobs held by the worker, by job UID.
+        """
+        as_dict = yaml.load(response.result_string, Loader=yaml.SafeLoader)
+        if not isinstance(as_dict, dict):
+            raise ValueError("Malformed job report: %s" % response.result_string)
+        try:
+            return {str(uid): JobStatus[status] for uid, status in as_dict.items()}
+        except KeyError as e:
+            raise ValueError("Malformed job report, unknown job status %s." % e)
+
+    def to_dict(self) -> Dict[str, object]:
+        """!
+        @return: returns a dictionary that represents this object
+        """
+        return dict()
+
+    @classmethod
+    def from_dict(cls, property_dict: Dict[str, object]) -> "ReportJobsCommand":
+        """!
+        @param property_dict A Python dictionary defining the command
+        @return A new Serializable object based on the property entries of the
+        specified dictionary.
+        """
+        cls._assert_all_properties_used(property_dict)
+        return ReportJobsCommand()
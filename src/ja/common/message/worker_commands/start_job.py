@@ -1,18 +1,21 @@
 """
 This command will start a new job on the work machine
 """
-from typing import Dict
-
 from ja.common.job import Job
 from ja.common.message.worker import WorkerCommand
-from ja.common.message.base import Response
+from ja.common.message.base import Response, SchemaSerializable
+from ja.common.message.schema import NestedField
 from ja.worker.docker import DockerInterface
 
 
-class StartJobCommand(WorkerCommand):
+class StartJobCommand(WorkerCommand, SchemaSerializable):
 
     RESPONSE_SUCCESS = "Successfully dispatched job with UID %s to worker with UID %s."
     RESPONSE_DUPLICATE = "Could not dispatch job with UID %s because worker with UID %s already has this job."
+    RESPONSE_UNKNOWN_DOCKERFILE = "Could not dispatch job with UID %s because worker with UID %s does not know the " \
+                                  "Dockerfile with hash %s."
+
+    _schema = [NestedField("job", Job)]
 
     def __init__(self, job: Job):
         """!
@@ -36,25 +39,15 @@ class StartJobCommand(WorkerCommand):
         @param docker_interface: the docker interface to use for the execution.
         @return: a Response with the appropriate response
         """
+        docker_context = self.job.docker_context
+        if docker_context.dockerfile_source is None:
+            dockerfile_source = docker_interface.find_dockerfile(docker_context.dockerfile_hash)
+            if dockerfile_source is None:
+                return Response(self.RESPONSE_UNKNOWN_DOCKERFILE % (
+                    self.job.uid, docker_interface.worker_uid, docker_context.dockerfile_hash), is_success=False)
+            docker_context.attach_dockerfile_source(dockerfile_source)
         try:
             docker_interface.add_job(job=self.job)
             return Response(self.RESPONSE_SUCCESS % (self.job.uid, docker_interface.worker_uid), is_success=True)
         except ValueError:
             return Response(self.RESPONSE_DUPLICATE % (self.job.uid, docker_interface.worker_uid), is_success=False)
-
-    def to_dict(self) -> Dict[str, object]:
-        """!
-        @return: returns a dictionary that represents this object
-        """
-        return {"job": self._job.to_dict()}
-
-    @classmethod
-    def from_dict(cls, property_dict: Dict[str, object]) -> "StartJobCommand":
-        """!
-        @param property_dict A Python dictionary defining the command
-        @return A new Serializable object based on the property entries of the
-        specified dictionary.
-        """
-        job = Job.from_dict(cls._get_dict_from_dict(property_dict=property_dict, key="job"))
-        cls._assert_all_properties_used(property_dict)
-        return StartJobCommand(job)
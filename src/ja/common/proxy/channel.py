@@ -0,0 +1,219 @@
+from threading import Event, Lock, Thread
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from ja.common.message.compression import COMPRESSIONS
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Every frame starts with the request ID and the length of the payload, both 8 byte big endian integers.
+FRAME_HEADER_LENGTH = 16
+# The agent announces itself with a payload starting with this prefix in a frame with request ID 0 when it starts. The
+# prefix may be followed by a space and the comma separated names of the codecs and compressions the agent supports.
+AGENT_HELLO = b"ja-remote-agent 1"
+
+
+def agent_hello(codecs: List[str]) -> bytes:
+    """!
+    @param codecs: The names of the codecs and compressions the agent supports.
+    @return: The payload the agent announces itself with.
+    """
+    return AGENT_HELLO + b" " + ",".join(codecs).encode()
+
+
+def parse_agent_hello(payload: bytes) -> Optional[List[str]]:
+    """!
+    @param payload: The payload of a frame with request ID 0.
+    @return: The names of the codecs and compressions the agent supports, or None if @payload is not a hello. Agents
+    which do not announce any codecs support YAML only.
+    """
+    if payload == AGENT_HELLO:
+        return ["yaml"]
+    if not payload.startswith(AGENT_HELLO + b" "):
+        return None
+    return [name for name in payload[len(AGENT_HELLO) + 1:].decode().split(",") if name]
+
+
+def _read_exactly(stream: BinaryIO, length: int) -> Optional[bytes]:
+    data = bytes(0)
+    while len(data) < length:
+        chunk = stream.read(length - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def write_frame(stream: BinaryIO, request_id: int, payload: bytes) -> None:
+    """!
+    Write a single frame and flush the stream.
+    @param stream: The stream to write to.
+    @param request_id: The ID of the request the frame belongs to.
+    @param payload: The content of the frame.
+    """
+    header = request_id.to_bytes(length=8, byteorder="big") + len(payload).to_bytes(length=8, byteorder="big")
+    stream.write(header + payload)
+    stream.flush()
+
+
+def read_frame(stream: BinaryIO) -> Optional[Tuple[int, bytes]]:
+    """!
+    Read a single frame.
+    @param stream: The stream to read from.
+    @return: The request ID and the payload of the frame, or None if the stream ended.
+    """
+    header = _read_exactly(stream, FRAME_HEADER_LENGTH)
+    if header is None:
+        return None
+    length = int.from_bytes(header[8:], byteorder="big")
+    payload = _read_exactly(stream, length)
+    if payload is None:
+        return None
+    return int.from_bytes(header[:8], byteorder="big"), payload
+
+
+class AgentUnavailableError(ConnectionError):
+    """
+    Raised if no request could be sent to the remote agent, so the request was certainly not executed.
+    """
+
+
+class AgentChannel:
+    """
+    The client side of a channel to a long-lived remote agent, see RemoteAgent. Requests are sent as frames with a
+    unique request ID, and the responses are matched to them by a reader thread, so several threads can use the
+    channel at the same time. If the channel breaks, it is opened again for the next request.
+    """
+
+    """Writes to the agent, reads from the agent and closes the channel."""
+    Streams = Tuple[BinaryIO, BinaryIO, Callable[[], None]]
+
+    def __init__(self, open_streams: Callable[[], Streams], timeout: float, hello_timeout: float = 10):
+        """!
+        @param open_streams: Starts the remote agent and returns the streams connected to it.
+        @param timeout: The maximum time to wait for a response, in seconds.
+        @param hello_timeout: The maximum time to wait for a newly started agent to announce itself, in seconds.
+        """
+        self._open_streams = open_streams
+        self._timeout = timeout
+        self._hello_timeout = hello_timeout
+        self._lock = Lock()
+        self._write_lock = Lock()
+        self._next_request_id = 1
+        self._streams: Optional[AgentChannel.Streams] = None
+        self._remote_names: List[str] = []
+        # Requests waiting for a response by request ID, with the streams they were sent on.
+        self._pending: Dict[int, Tuple[AgentChannel.Streams, Event, Dict[str, bytes]]] = dict()
+
+    def _open(self) -> Streams:
+        # Must be called while holding _lock.
+        if self._streams is not None:
+            return self._streams
+        try:
+            streams = self._open_streams()
+        except Exception as e:
+            raise AgentUnavailableError("Failed to start the remote agent: %s" % e)
+        # The reader thread sets the event when the agent has announced itself or when the channel has ended.
+        started = Event()
+        announced: Dict[str, List[str]] = dict()
+        Thread(target=self._reader_thread, args=(streams, started, announced), daemon=True).start()
+        if not started.wait(self._hello_timeout) or not announced:
+            streams[2]()
+            raise AgentUnavailableError("The remote agent did not announce itself.")
+        self._streams = streams
+        self._remote_names = announced["codecs"]
+        return streams
+
+    def _reader_thread(self, streams: Streams, started: Event, announced: Dict[str, List[str]]) -> None:
+        try:
+            while True:
+                frame = read_frame(streams[1])
+                if frame is None:
+                    break
+                request_id, payload = frame
+                if request_id == 0:
+                    codecs = parse_agent_hello(payload)
+                    if codecs is not None:
+                        announced["codecs"] = codecs
+                        started.set()
+                    continue
+                with self._lock:
+                    pending = self._pending.pop(request_id, None)
+                if pending is not None:
+                    pending[2]["response"] = payload
+                    pending[1].set()
+        except Exception as e:
+            logger.warning("Lost channel to the remote agent: %s" % e)
+        started.set()
+        with self._lock:
+            if self._streams is streams:
+                self._streams = None
+            # Wake up all requests waiting for this channel, they have no response set.
+            for request_id, (request_streams, event, _) in list(self._pending.items()):
+                if request_streams is streams:
+                    event.set()
+                    del self._pending[request_id]
+        streams[2]()
+
+    def remote_codecs(self) -> List[str]:
+        """!
+        Open the channel if it is not open yet and return the codecs announced by the remote agent.
+        @return: The names of the codecs the remote agent supports.
+        @raise AgentUnavailableError: if the channel could not be opened.
+        """
+        with self._lock:
+            self._open()
+            return [name for name in self._remote_names if name not in COMPRESSIONS]
+
+    def remote_compressions(self) -> List[str]:
+        """!
+        Open the channel if it is not open yet and return the compressions announced by the remote agent (see
+        ja.common.message.compression).
+        @return: The names of the compressions the remote agent supports.
+        @raise AgentUnavailableError: if the channel could not be opened.
+        """
+        with self._lock:
+            self._open()
+            return [name for name in self._remote_names if name in COMPRESSIONS]
+
+    def request(self, payload: bytes) -> bytes:
+        """!
+        Send a request to the remote agent and wait for the response.
+        @param payload: The request.
+        @return: The response.
+        @raise AgentUnavailableError: if the request could not be sent.
+        @raise ConnectionError: if the request was sent, but no response was received.
+        """
+        event = Event()
+        result: Dict[str, bytes] = dict()
+        with self._lock:
+            streams = self._open()
+            request_id = self._next_request_id
+            self._next_request_id += 1
+            self._pending[request_id] = (streams, event, result)
+        try:
+            with self._write_lock:
+                write_frame(streams[0], request_id, payload)
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            self.close()
+            raise AgentUnavailableError("Failed to send the request to the remote agent: %s" % e)
+
+        if not event.wait(self._timeout):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise ConnectionError("The remote agent did not respond in time.")
+        if "response" not in result:
+            raise ConnectionError("Lost channel to the remote agent before the response arrived.")
+        return result["response"]
+
+    def close(self) -> None:
+        """!
+        Close the channel. This makes the remote agent exit.
+        """
+        with self._lock:
+            streams = self._streams
+            self._streams = None
+        if streams is not None:
+            streams[2]()
@@ -1,20 +1,84 @@
+import asyncio
 import os
+import selectors
 import socket
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from ja.common.async_core import AsyncDaemonCore
+from ja.common.identity import IdentityCache
 from ja.common.message.base import Response
-import yaml
-from typing import Dict
-import grp
+from ja.common.message.codec import YAML, Codec, decode_any, detect_codec
+from ja.common.message.compression import DEFAULT_THRESHOLD, CompressionMetrics, pack, unpack
+from ja.common.proxy.pipeline import SESSION_MARKER, frame, receive_exactly
+from threading import Lock, Semaphore
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar, cast
 import logging
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+class CommandStatistics:
+    """
+    The latencies of all handled Commands of one type.
+    """
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_wait = 0.0
+        self.total_execution = 0.0
+        self.max_execution = 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        """!
+        @return: The amount of Commands and their mean waiting time, mean execution time and maximum execution time
+        in milliseconds.
+        """
+        return dict(count=self.count, mean_wait_ms=1000 * self.total_wait / self.count,
+                    mean_execution_ms=1000 * self.total_execution / self.count,
+                    max_execution_ms=1000 * self.max_execution)
+
+
+class CommandMetrics:
+    """
+    Collects the latencies of the Commands handled by a CommandHandler, by type of Command. The waiting time is the
+    time between accepting the connection and starting to execute the Command, including the time waiting for other
+    Commands which must not run at the same time.
+    """
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._statistics: Dict[str, CommandStatistics] = dict()
+
+    def record(self, type_name: str, wait: float, execution: float) -> None:
+        """!
+        @param type_name: The type of the handled Command.
+        @param wait: The waiting time in seconds.
+        @param execution: The execution time in seconds.
+        """
+        with self._lock:
+            statistics = self._statistics.get(type_name)
+            if statistics is None:
+                statistics = self._statistics[type_name] = CommandStatistics()
+            statistics.count += 1
+            statistics.total_wait += wait
+            statistics.total_execution += execution
+            statistics.max_execution = max(statistics.max_execution, execution)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """!
+        @return: The statistics of every type of Command handled so far, see CommandStatistics.to_dict().
+        """
+        with self._lock:
+            return {type_name: statistics.to_dict() for type_name, statistics in self._statistics.items()}
+
 
 class CommandHandler(ABC):
     """
     Abstract base class that handles Commands received by Remote objects.
     Commands are transferred from Remote to MessageHandler by socket as YAML
-    string. Once initialized, continuously listens for Commands.
+    string or in another codec (see ja.common.message.codec). Once
+    initialized, continuously listens for Commands.
     When a Command is received it is validated syntactically first: the
     CommandHandler tries to construct a Command of the correct type from the
     YAML string.
@@ -22,18 +86,46 @@ class CommandHandler(ABC):
     if the user has the necessary permissions to perform the Command, if any
     specified objects actually exist, etc.
     If both validations pass, the Command is executed.
-    Always prints back a Response as YAML string to the socket at the end. The
+    Always prints back a Response in the codec of the Command to the socket at the end, compressed if it is large and
+    the Command came in an envelope (see ja.common.message.compression). The
     success property of the Response is True if both validations were passed
     and the Command was executed without error, and is false otherwise.
+
+    Connections are handled by a pool of threads, so slow clients and long-running Commands do not hold up others.
+    A client may send many Commands over one connection in a session (see ja.common.proxy.pipeline); while it has no
+    Command waiting, its session does not occupy a thread.
+    Commands which change the state of the daemon are still executed one after another, in the order they arrive;
+    only the types of Commands listed in _unordered_commands run concurrently with them.
     """
-    def __init__(self, socket_path: str, admin_group: str = "jobadder"):
+
+    """Commands longer than this many bytes are rejected."""
+    MAX_COMMAND_LENGTH = 256 * 1024 * 1024
+    """Timeout in seconds for receiving a Command and sending its Response."""
+    CONNECTION_TIMEOUT = 120
+    """Responses longer than this many bytes are compressed if the sender of the Command accepts it."""
+    COMPRESSION_THRESHOLD = DEFAULT_THRESHOLD
+    """Sessions which have not sent a Command for this many seconds are closed."""
+    SESSION_IDLE_TIMEOUT = 600
+
+    def __init__(self, socket_path: str, admin_group: str = "jobadder", max_workers: int = 8,
+                 backlog: int = socket.SOMAXCONN, identities: IdentityCache = None):
         """!
         @param socket_path: The Unix named socket to listen for Commands on.
         @param admin_group The name of the administrator group.
+        @param max_workers: The maximum amount of connections handled at the same time.
+        @param backlog: The maximum amount of connections waiting to be accepted by the operating system.
+        @param identities: The cache for looking up users and groups. A new one is created if None.
         """
+        if max_workers < 1:
+            raise ValueError("The command handler needs at least one thread.")
         self._socket_path = socket_path
         self._running = True
         self._admin_group = admin_group
+        self._identities = identities if identities is not None else IdentityCache()
+        self._max_workers = max_workers
+        self._ordered_lock = Lock()
+        self._metrics = CommandMetrics()
+        self._compression_metrics = CompressionMetrics()
 
         # Make sure the socket does not already exist
         try:
@@ -43,11 +135,43 @@ class CommandHandler(ABC):
                 raise
         self._named_socket = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
         self._named_socket.bind(self._socket_path)
-        self._named_socket.listen(10)
+        self._named_socket.listen(backlog)
+        # Sessions waiting for their next Command are handed to the main loop, which is woken up by this socket pair.
+        self._parked_lock = Lock()
+        self._parked: List[socket.socket] = []
+        self._park_receiver, self._park_sender = socket.socketpair()
+        self._park_sender.setblocking(False)
 
     _INSUFFICIENT_PERM_TEMPLATE = "User %s has insufficient permissions for the requested action %s."
     _UNKNOWN_COMMAND_TEMPLATE = "Unknown command: %s."
 
+    """Types of Commands which only read the state of the daemon and need not wait for other Commands."""
+    _unordered_commands: Set[str] = set()
+
+    @property
+    def metrics(self) -> CommandMetrics:
+        """!
+        @return: The latencies of the Commands handled so far.
+        """
+        return self._metrics
+
+    @property
+    def compression_metrics(self) -> CompressionMetrics:
+        """!
+        @return: The sizes of the Responses sent in an envelope so far, before and after compression.
+        """
+        return self._compression_metrics
+
+    def run_ordered(self, function: Callable[[], T]) -> T:
+        """!
+        Call a function which changes the state of the daemon from outside of a Command. It is executed like a Command
+        which is not in _unordered_commands, so it never runs concurrently with one.
+        @param function: The function to call.
+        @return: The result of @function.
+        """
+        with self._ordered_lock:
+            return function()
+
     @abstractmethod
     def _process_command_dict(
             self, command_dict: Dict[str, object], type_name: str, username: str) -> Dict[str, object]:
@@ -66,35 +190,292 @@ class CommandHandler(ABC):
     def _user_is_admin(self, user: str) -> bool:
         if user == "root":
             return True
-        groups = [g.gr_name for g in grp.getgrall() if user in g.gr_mem]
-        return self._admin_group in groups or user == self._admin_group
+        return user == self._admin_group or self._admin_group in self._identities.groups(user)
 
-    def main_loop(self) -> None:
+    def _wake_up(self) -> None:
+        # Unblock accept() in the main loop, so it notices that it should stop.
+        wake_up_socket = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+        try:
+            wake_up_socket.connect(self._socket_path)
+        except OSError:
+            pass
+        finally:
+            wake_up_socket.close()
+
+    def _command_length(self, header: bytes) -> int:
+        # The header, the first 8 bytes, encodes the command length
+        command_length = int.from_bytes(header, byteorder="big")
+        if command_length > self.MAX_COMMAND_LENGTH:
+            raise ValueError("Command of %d bytes exceeds the maximum length." % command_length)
+        return command_length
+
+    def _receive_command(self, connection: socket.socket, header: bytes) -> bytes:
+        return receive_exactly(connection, self._command_length(header))
+
+    def _process_input_dict(self, input_dict: Dict[str, object]) -> Dict[str, object]:
+        return self._check_exit_or_process_command(
+            command_dict=cast(Dict[str, object], input_dict["command"]),
+            type_name=cast(str, input_dict["type_name"]),
+            username=cast(str, input_dict["username"])
+        )
+
+    def _admit(self, type_name: str, username: str) -> Optional[Response]:
         """!
-        Run the main loop of a JobAdder daemon (server or worker).
+        Decide whether a Command is handled at all. Called before the Command waits for other Commands, so that
+        rejecting it is fast. All Commands are accepted by default.
+        @param type_name: The type of the Command.
+        @param username: The name of the user sending the Command.
+        @return: None if the Command is handled, otherwise the Response rejecting it.
+        """
+        return None
+
+    def _handle_command(self, raw_command: bytes, accepted: float) -> bytes:
+        """!
+        Handle a received Command.
+        @param raw_command: The Command as received.
+        @param accepted: The time the Command was received at, see time.perf_counter().
+        @return: The Response, encoded with the codec of the Command.
+        """
+        codec: Codec = YAML
+        enveloped = False
+        type_name = "unknown"
+
+        def encode_response(response_dict: Dict[str, object]) -> bytes:
+            response_bytes = codec.encode(response_dict)
+            if enveloped:
+                return pack(response_bytes, self.COMPRESSION_THRESHOLD, self._compression_metrics)
+            return response_bytes
+
+        try:
+            command_bytes, enveloped = unpack(raw_command, self.MAX_COMMAND_LENGTH)
+
+            # The Response is encoded with the codec of the Command.
+            codec = detect_codec(command_bytes)
+            input_dict = decode_any(command_bytes)
+            type_name = cast(str, input_dict["type_name"])
+            logger.info("handling %s command" % type_name)
+            logger.debug(input_dict["command"])
+            rejection = self._admit(type_name, cast(str, input_dict["username"]))
+            if rejection is not None:
+                started = perf_counter()
+                response_dict = rejection.to_dict()
+            elif type_name in self._unordered_commands:
+                started = perf_counter()
+                response_dict = self._process_input_dict(input_dict)
+            else:
+                with self._ordered_lock:
+                    started = perf_counter()
+                    response_dict = self._process_input_dict(input_dict)
+            finished = perf_counter()
+            response_bytes = encode_response(response_dict)
+            self._metrics.record(type_name, started - accepted, finished - started)
+            logger.debug("handled %s command in %.1f ms" % (type_name, 1000 * (finished - started)))
+            return response_bytes
+        except Exception as e:
+            logger.exception("failed to handle %s command" % type_name)
+            return encode_response(Response("Failed to handle command: %s" % e, False).to_dict())
+
+    def _peek(self, connection: socket.socket) -> Optional[bytes]:
+        # Returns None if no data has arrived yet, and an empty string if the client has closed the connection.
+        connection.settimeout(0)
+        try:
+            return connection.recv(1, socket.MSG_PEEK)
+        except BlockingIOError:
+            return None
+        finally:
+            connection.settimeout(self.CONNECTION_TIMEOUT)
+
+    def _serve_session(self, connection: socket.socket, accepted: float) -> bool:
+        """!
+        Handle the Commands of a session (see ja.common.proxy.pipeline) as long as they arrive without delay.
+        @param connection: The connection of the session.
+        @param accepted: The time the connection became readable at, see time.perf_counter().
+        @return: True if the session has been parked to wait for further Commands, False if it has ended.
         """
         while self._running:
-            connection, client_address = self._named_socket.accept()
+            data = self._peek(connection)
+            if data is None:
+                return self._park(connection)
+            if not data:
+                # The client has ended the session.
+                return False
+            header = receive_exactly(connection, 8)
             try:
-                command_bytes = bytes(0)  # First 8 bytes encode command length
-                command_length = None
-                while command_length is None or len(command_bytes) < command_length:
-                    command_bytes += connection.recv(1024)
-                    if command_length is None and len(command_bytes) >= 8:
-                        command_length = int.from_bytes(bytes=command_bytes[:8], byteorder="big")
-                        command_bytes = command_bytes[8:]
-
-                input_string = command_bytes.decode()
-
-                input_dict = yaml.load(input_string, yaml.SafeLoader)
-                logger.info("handling %s command" % input_dict["type_name"])
-                logger.debug(input_dict["command"])
-                response_dict = self._check_exit_or_process_command(
-                    command_dict=input_dict["command"],
-                    type_name=input_dict["type_name"],
-                    username=input_dict["username"]
-                )
-                response_string = yaml.dump(response_dict)
-                connection.sendall(response_string.encode())
-            finally:
+                raw_command = self._receive_command(connection, header)
+            except ValueError as e:
+                # The rest of the session cannot be read without the Command, so it ends here.
+                connection.sendall(frame(YAML.encode(Response("Failed to handle command: %s" % e, False).to_dict())))
+                return False
+            connection.sendall(frame(self._handle_command(raw_command, accepted)))
+            accepted = perf_counter()
+        return False
+
+    def _park(self, connection: socket.socket) -> bool:
+        # Sessions waiting for Commands do not occupy a thread, the main loop resumes them once a Command arrives.
+        with self._parked_lock:
+            if not self._running:
+                return False
+            self._parked.append(connection)
+        try:
+            self._park_sender.send(b"\0")
+        except BlockingIOError:
+            # The main loop has not yet been woken up by the previous sessions, and will see this one as well.
+            pass
+        return True
+
+    def _handle_connection(self, connection: socket.socket, accepted: float, in_session: bool = False) -> None:
+        parked = False
+        try:
+            if not in_session:
+                connection.settimeout(self.CONNECTION_TIMEOUT)
+                header = receive_exactly(connection, 8)
+                if header != SESSION_MARKER:
+                    connection.sendall(self._handle_command(self._receive_command(connection, header), accepted))
+                    return
+                connection.sendall(SESSION_MARKER)
+            parked = self._serve_session(connection, accepted)
+        except (ConnectionError, socket.timeout) as e:
+            logger.warning("lost connection to a client: %s" % e)
+        except Exception as e:
+            logger.exception("failed to receive a command")
+            try:
+                connection.sendall(YAML.encode(Response("Failed to handle command: %s" % e, False).to_dict()))
+            except Exception:
+                pass
+        finally:
+            if not parked:
                 connection.close()
+            if not self._running:
+                self._wake_up()
+
+    def _handle_and_release(self, connection: socket.socket, accepted: float, slots: Semaphore,
+                            in_session: bool = False) -> None:
+        try:
+            self._handle_connection(connection, accepted, in_session)
+        finally:
+            slots.release()
+
+    def main_loop(self) -> None:
+        """!
+        Run the main loop of a JobAdder daemon (server or worker). Returns after a KillCommand, when all Commands
+        received before have been handled.
+        """
+        # Connections beyond the ones being handled and a few waiting for a thread are left to the backlog of the
+        # socket instead of piling up in the process.
+        slots = Semaphore(4 * self._max_workers)
+        selector = selectors.DefaultSelector()
+        selector.register(self._named_socket, selectors.EVENT_READ)
+        selector.register(self._park_receiver, selectors.EVENT_READ)
+        # The parked sessions, with the time they were parked at.
+        sessions: Dict[socket.socket, float] = dict()
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="command-handler") as executor:
+            while self._running:
+                for key, _ in selector.select(timeout=1):
+                    if key.fileobj is self._named_socket:
+                        slots.acquire()
+                        connection, client_address = self._named_socket.accept()
+                        if not self._running:
+                            connection.close()
+                            break
+                        executor.submit(self._handle_and_release, connection, perf_counter(), slots)
+                    elif key.fileobj is self._park_receiver:
+                        self._park_receiver.recv(4096)
+                        with self._parked_lock:
+                            parked, self._parked = self._parked, []
+                        for session in parked:
+                            selector.register(session, selectors.EVENT_READ)
+                            sessions[session] = monotonic()
+                    else:
+                        session = cast(socket.socket, key.fileobj)
+                        selector.unregister(session)
+                        del sessions[session]
+                        slots.acquire()
+                        executor.submit(self._handle_and_release, session, perf_counter(), slots, True)
+                now = monotonic()
+                for session, parked_at in list(sessions.items()):
+                    if now - parked_at > self.SESSION_IDLE_TIMEOUT:
+                        selector.unregister(session)
+                        del sessions[session]
+                        session.close()
+        with self._parked_lock:
+            for session in list(sessions) + self._parked:
+                session.close()
+            self._parked = []
+        selector.close()
+        self._named_socket.close()
+        self._park_receiver.close()
+        self._park_sender.close()
+
+    async def _receive_header_async(self, reader: asyncio.StreamReader, timeout: float) -> Optional[bytes]:
+        # Returns None if the client has closed the connection before sending another Command.
+        try:
+            return await asyncio.wait_for(reader.readexactly(8), timeout)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            return None
+
+    async def _handle_async(self, core: AsyncDaemonCore, reader: asyncio.StreamReader,
+                            header: bytes) -> Tuple[bytes, bool]:
+        # Returns the encoded Response and whether further Commands can be read from the connection.
+        try:
+            length = self._command_length(header)
+        except ValueError as e:
+            return YAML.encode(Response("Failed to handle command: %s" % e, False).to_dict()), False
+        raw_command = await asyncio.wait_for(reader.readexactly(length), self.CONNECTION_TIMEOUT)
+        return await self._run_blocking(core, self._handle_command, raw_command, perf_counter()), True
+
+    async def _run_blocking(self, core: AsyncDaemonCore, function: Callable[..., T], *args: Any) -> T:
+        """!
+        Run the blocking handling of a Command from the event loop, on the thread pool of @core by default.
+        @param core: The core of the daemon.
+        @param function: The function to call.
+        @param args: The arguments to call @function with.
+        @return: The result of @function.
+        """
+        return await core.run_blocking(function, *args)
+
+    async def _serve_connection_async(self, core: AsyncDaemonCore, reader: asyncio.StreamReader,
+                                      writer: asyncio.StreamWriter) -> None:
+        try:
+            header = await self._receive_header_async(reader, self.CONNECTION_TIMEOUT)
+            if header is None:
+                return
+            if header != SESSION_MARKER:
+                response_bytes, _ = await self._handle_async(core, reader, header)
+                writer.write(response_bytes)
+                await asyncio.wait_for(writer.drain(), self.CONNECTION_TIMEOUT)
+                return
+            writer.write(SESSION_MARKER)
+            while self._running:
+                # Waiting for the next Command of a session costs no thread.
+                header = await self._receive_header_async(reader, self.SESSION_IDLE_TIMEOUT)
+                if header is None:
+                    # The client has ended the session.
+                    return
+                response_bytes, reusable = await self._handle_async(core, reader, header)
+                writer.write(frame(response_bytes))
+                await asyncio.wait_for(writer.drain(), self.CONNECTION_TIMEOUT)
+                if not reusable:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            logger.warning("lost connection to a client: %s" % e)
+        finally:
+            writer.close()
+            if not self._running:
+                core.stop()
+
+    async def serve(self, core: AsyncDaemonCore) -> None:
+        """!
+        Like main_loop(), but the socket is served by the event loop of @core (see ja.common.async_core), and the
+        Commands are executed on its thread pool. A KillCommand stops @core once its Response has been sent.
+        @param core: The core of the daemon.
+        """
+        server = await asyncio.start_unix_server(
+            lambda reader, writer: self._serve_connection_async(core, reader, writer), sock=self._named_socket)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._park_receiver.close()
+            self._park_sender.close()
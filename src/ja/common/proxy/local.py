@@ -0,0 +1,123 @@
+"""
+Connections which reach a CommandHandler without SSH, for clients running on the same host as the CommandHandler or
+talking to a local ConnectionMultiplexer (see ja.user.multiplexer).
+"""
+from ipaddress import ip_address
+from typing import Dict, Optional, Set
+import os
+import socket
+import subprocess
+
+from ja.common.message.base import Command, Response
+from ja.common.message.codec import JSON, YAML, Codec, decode_any
+from ja.common.proxy.pipeline import SessionPool
+from ja.common.proxy.remote import forward_command, prepare_command
+from ja.common.proxy.ssh import ISSHConnection
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def is_local_host(hostname: str) -> bool:
+    """!
+    @param hostname: The name or address of a host.
+    @return: True if @hostname refers to the host this process runs on.
+    """
+    if hostname in ("localhost", socket.gethostname(), socket.getfqdn()):
+        return True
+    try:
+        addresses = {str(info[4][0]) for info in socket.getaddrinfo(hostname, None)}
+    except (socket.gaierror, UnicodeError):
+        return False
+    local_addresses: Set[str] = set()
+    try:
+        local_addresses = {str(info[4][0]) for info in socket.getaddrinfo(socket.gethostname(), None)}
+    except socket.gaierror:
+        pass
+    return any(address in local_addresses or ip_address(address.split("%")[0]).is_loopback
+               for address in addresses)
+
+
+class UnixSocketConnection(ISSHConnection):
+    """
+    Sends Commands directly to a Unix named socket, like Remote does on the far side of an SSHConnection. The calling
+    user is attached to every Command.
+    """
+
+    def __init__(self, socket_path: str, codec: Codec = JSON, pipelined: bool = False):
+        """!
+        @param socket_path: The Unix named socket the CommandHandler or ConnectionMultiplexer listens on.
+        @param codec: The codec to encode Commands with.
+        @param pipelined: Whether to keep the connections to a CommandHandler open as sessions (see
+        ja.common.proxy.pipeline) for the following Commands, instead of opening a connection per Command.
+        """
+        self._socket_path = socket_path
+        self._codec = codec
+        self._sessions: Optional[SessionPool] = SessionPool(socket_path) if pipelined else None
+
+    def send_command(self, command: Command) -> Response:
+        command_dict: Dict[str, object] = dict(command=command.to_dict(), type_name=command.__class__.__name__)
+        try:
+            if self._sessions is not None:
+                response_bytes = self._sessions.request(prepare_command(self._codec.encode(command_dict)))
+            else:
+                response_bytes = forward_command(self._socket_path, self._codec.encode(command_dict))
+            return Response.from_dict(decode_any(response_bytes))
+        except (OSError, ValueError) as e:
+            logger.error("Failed to communicate with %s: %s" % (self._socket_path, e))
+            return Response("Failed communication with remote", False)
+
+    def close(self) -> None:
+        if self._sessions is not None:
+            self._sessions.close()
+
+    def send_dummy_command(self) -> None:
+        dummy_socket = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+        try:
+            dummy_socket.connect(self._socket_path)
+        finally:
+            dummy_socket.close()
+
+
+class LocalConnection(ISSHConnection):
+    """
+    Sends Commands to a CommandHandler on the same host without SSH. If the calling user may access the socket of the
+    CommandHandler, Commands are written to it directly. Otherwise the remote program, which is allowed to access the
+    socket, is started locally for every Command, exactly as SSHConnection would start it on the host.
+    """
+
+    """Timeout of a Command in seconds."""
+    TIMEOUT = 120
+
+    def __init__(self, socket_path: str, command_string: str):
+        """!
+        @param socket_path: The Unix named socket the CommandHandler listens on.
+        @param command_string: The template for starting the remote program with the socket path.
+        """
+        self._socket_path = socket_path
+        self._command_string = command_string
+        self._direct = UnixSocketConnection(socket_path, pipelined=True)
+
+    def _can_connect_directly(self) -> bool:
+        return os.access(self._socket_path, os.R_OK | os.W_OK)
+
+    def send_command(self, command: Command) -> Response:
+        if self._can_connect_directly():
+            return self._direct.send_command(command)
+        command_dict: Dict[str, object] = dict(command=command.to_dict(), type_name=command.__class__.__name__)
+        try:
+            # Like SSH, the command string is run by a shell.
+            completed = subprocess.run(self._command_string % self._socket_path, shell=True,
+                                       input=YAML.encode(command_dict), stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, timeout=LocalConnection.TIMEOUT)
+            return Response.from_dict(decode_any(completed.stdout))
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            logger.error("Failed to communicate with remote: %s" % e)
+            return Response("Failed communication with remote", False)
+
+    def close(self) -> None:
+        self._direct.close()
+
+    def send_dummy_command(self) -> None:
+        if not os.path.exists(self._socket_path):
+            raise ConnectionError("%s does not exist." % self._socket_path)
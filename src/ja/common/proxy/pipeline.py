@@ -0,0 +1,264 @@
+"""
+Sessions for sending many Commands over a single connection to the socket of a CommandHandler.
+
+Without a session, a client writes a single Command prefixed with its length to the socket, and the CommandHandler
+writes back the Response and closes the connection. A client opens a session instead by writing SESSION_MARKER in
+place of the length of a Command. A CommandHandler which supports sessions answers with SESSION_MARKER as well; one
+which does not rejects it as a Command which is too long. In a session, Commands and Responses are both prefixed with
+their length, and the Responses are written in the order of the Commands. The client may write any amount of Commands
+before reading their Responses, and ends the session by closing the connection.
+"""
+from threading import Condition, Lock
+from typing import List, Optional
+import socket
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Written by the client in place of the length of a Command to open a session, and answered by the CommandHandler.
+SESSION_MARKER = b"\xff" * 8
+
+
+class SessionUnsupportedError(ConnectionError):
+    """
+    Raised if the CommandHandler does not support sessions, so Commands have to be sent one per connection.
+    """
+
+
+def receive_exactly(connection: socket.socket, length: int) -> bytes:
+    """!
+    Receive a given amount of bytes, no matter in how many pieces they arrive.
+    @param connection: The socket to receive from.
+    @param length: The amount of bytes to receive.
+    @return: The received bytes.
+    """
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+    received = 0
+    while received < length:
+        count = connection.recv_into(view[received:], length - received)
+        if count == 0:
+            raise ConnectionError("Connection closed after %d of %d bytes." % (received, length))
+        received += count
+    return bytes(buffer)
+
+
+def frame(payload: bytes) -> bytes:
+    """!
+    @param payload: An encoded Command or Response.
+    @return: @payload prefixed with its length, as sent in a session.
+    """
+    return len(payload).to_bytes(length=8, byteorder="big") + payload
+
+
+def send_once(socket_path: str, payload: bytes) -> bytes:
+    """!
+    Send a single Command over a new connection, without a session.
+    @param socket_path: The Unix named socket of the CommandHandler.
+    @param payload: The encoded Command.
+    @return: The encoded Response.
+    """
+    named_socket = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+    try:
+        named_socket.connect(socket_path)
+        # First 8 bytes encode command length:
+        named_socket.sendall(frame(payload))
+        chunks: List[bytes] = []
+        while True:
+            data = named_socket.recv(65536)
+            if not data:  # Becomes True when socket is closed by CommandHandler.
+                break
+            chunks.append(data)
+        return b"".join(chunks)
+    finally:
+        named_socket.close()
+
+
+class CommandSession:
+    """
+    The client side of a session. Several threads may send Commands at the same time; each of them waits only for the
+    Responses to the Commands sent before its own.
+    """
+
+    """The maximum amount of Commands written by request_all() before reading their Responses."""
+    WINDOW = 32
+
+    def __init__(self, socket_path: str, timeout: float = 120):
+        """!
+        Connect to the socket and open a session.
+        @param socket_path: The Unix named socket of the CommandHandler.
+        @param timeout: The maximum time to wait for a Response, in seconds.
+        @raise SessionUnsupportedError: if the CommandHandler does not support sessions.
+        @raise OSError: if the connection failed.
+        """
+        self._timeout = timeout
+        self._socket = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+        try:
+            self._socket.settimeout(timeout)
+            self._socket.connect(socket_path)
+            self._socket.sendall(SESSION_MARKER)
+            if receive_exactly(self._socket, len(SESSION_MARKER)) != SESSION_MARKER:
+                raise SessionUnsupportedError("The command handler at %s does not support sessions." % socket_path)
+        except (OSError, ConnectionError):
+            self._socket.close()
+            raise
+        self._write_lock = Lock()
+        self._read_condition = Condition()
+        # Every Command gets a ticket when it is written, and its Response is the one read for this ticket.
+        self._next_ticket = 0
+        self._next_read = 0
+        self._error: Optional[Exception] = None
+
+    def _write(self, payloads: List[bytes]) -> int:
+        with self._write_lock:
+            if self._error is not None:
+                raise ConnectionError("The session has broken: %s" % self._error)
+            first_ticket = self._next_ticket
+            try:
+                self._socket.sendall(b"".join(frame(payload) for payload in payloads))
+            except OSError as e:
+                self._fail(e)
+                raise ConnectionError("Failed to send to the command handler: %s" % e)
+            self._next_ticket += len(payloads)
+            return first_ticket
+
+    def _read(self, ticket: int) -> bytes:
+        with self._read_condition:
+            while self._next_read != ticket and self._error is None:
+                self._read_condition.wait()
+            if self._error is not None:
+                raise ConnectionError("The session has broken: %s" % self._error)
+            try:
+                length = int.from_bytes(receive_exactly(self._socket, 8), byteorder="big")
+                response = receive_exactly(self._socket, length)
+            except (OSError, ConnectionError) as e:
+                self._fail(e)
+                raise ConnectionError("Failed to receive from the command handler: %s" % e)
+            self._next_read += 1
+            self._read_condition.notify_all()
+            return response
+
+    def _fail(self, error: Exception) -> None:
+        # The position of the Responses in the stream is lost, so no further Response can be matched.
+        self._error = error
+        self._socket.close()
+        with self._read_condition:
+            self._read_condition.notify_all()
+
+    def request(self, payload: bytes) -> bytes:
+        """!
+        Send a Command and wait for its Response.
+        @param payload: The encoded Command.
+        @return: The encoded Response.
+        @raise ConnectionError: if the session has broken.
+        """
+        return self._read(self._write([payload]))
+
+    def request_all(self, payloads: List[bytes]) -> List[bytes]:
+        """!
+        Send several Commands at once, then wait for all their Responses.
+        @param payloads: The encoded Commands.
+        @return: The encoded Responses, in the order of the Commands.
+        @raise ConnectionError: if the session has broken.
+        """
+        responses: List[bytes] = []
+        # The CommandHandler stops reading while its Responses are not read, so only a window of Commands is written
+        # before reading, or both sides could wait for each other.
+        for start in range(0, len(payloads), CommandSession.WINDOW):
+            window = payloads[start:start + CommandSession.WINDOW]
+            first_ticket = self._write(window)
+            responses += [self._read(first_ticket + index) for index in range(len(window))]
+        return responses
+
+    @property
+    def is_open(self) -> bool:
+        """!
+        @return: False if the session has broken or has been closed, or if the CommandHandler has ended it while no
+        Command was pending.
+        """
+        with self._read_condition:
+            if self._error is None and self._next_read == self._next_ticket:
+                self._socket.settimeout(0)
+                try:
+                    if not self._socket.recv(1, socket.MSG_PEEK):
+                        self._fail(ConnectionError("The command handler has ended the session."))
+                except BlockingIOError:
+                    pass
+                except OSError as e:
+                    self._fail(e)
+                finally:
+                    if self._error is None:
+                        self._socket.settimeout(self._timeout)
+            return self._error is None
+
+    def close(self) -> None:
+        """!
+        End the session.
+        """
+        if self._error is None:
+            self._fail(ConnectionError("The session has been closed."))
+
+
+class SessionPool:
+    """
+    Keeps sessions to a CommandHandler open for reuse. Every session is used by one thread at a time, so a slow Command
+    does not hold up the Commands of other threads. Commands are sent one per connection instead if the
+    CommandHandler does not support sessions.
+    """
+
+    def __init__(self, socket_path: str, max_idle: int = 4, timeout: float = 120):
+        """!
+        @param socket_path: The Unix named socket of the CommandHandler.
+        @param max_idle: The maximum amount of sessions kept open while they are not used.
+        @param timeout: The maximum time to wait for a Response, in seconds.
+        """
+        self._socket_path = socket_path
+        self._max_idle = max_idle
+        self._timeout = timeout
+        self._lock = Lock()
+        self._idle: List[CommandSession] = []
+        self._supported = True
+
+    def _acquire(self) -> Optional[CommandSession]:
+        with self._lock:
+            if not self._supported:
+                return None
+            while self._idle:
+                session = self._idle.pop()
+                if session.is_open:
+                    return session
+        try:
+            return CommandSession(self._socket_path, self._timeout)
+        except SessionUnsupportedError:
+            logger.info("%s does not support sessions, sending one command per connection" % self._socket_path)
+            with self._lock:
+                self._supported = False
+            return None
+
+    def request(self, payload: bytes) -> bytes:
+        """!
+        Send a Command and wait for its Response.
+        @param payload: The encoded Command.
+        @return: The encoded Response.
+        @raise OSError: if the CommandHandler could not be reached.
+        @raise ConnectionError: if the Command was sent, but no Response was received.
+        """
+        session = self._acquire()
+        if session is None:
+            return send_once(self._socket_path, payload)
+        response = session.request(payload)
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(session)
+                return response
+        session.close()
+        return response
+
+    def close(self) -> None:
+        """!
+        Close all idle sessions.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
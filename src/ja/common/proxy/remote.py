@@ -1,8 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
 from sys import stdin, stdout
-from typing import TextIO
+from threading import Lock, Semaphore
+from typing import BinaryIO, TextIO
 from getpass import getuser
-import yaml
-import socket
+
+from ja.common.message.base import Response
+from ja.common.message.codec import available_codecs, decode_any, detect_codec
+from ja.common.message.compression import COMPRESSIONS, is_enveloped, pack, unpack
+from ja.common.proxy.channel import agent_hello, read_frame, write_frame
+from ja.common.proxy.pipeline import SessionPool, send_once
+
+
+def prepare_command(input_bytes: bytes) -> bytes:
+    """!
+    Add the user calling this function to a Command, which keeps its codec (see ja.common.message.codec). If the
+    Command was sent in an envelope (see ja.common.message.compression), it is passed on uncompressed in an envelope,
+    so that the CommandHandler may compress the Response.
+    @param input_bytes: The encoded Command, as sent by SSHConnection.
+    @return: The encoded Command to write to the socket of the CommandHandler.
+    """
+    input_bytes, enveloped = unpack(input_bytes)
+    codec = detect_codec(input_bytes)
+    command_dict = decode_any(input_bytes)
+    command_dict["username"] = getuser()
+    command_string_bytes = codec.encode(command_dict)
+    if enveloped:
+        command_string_bytes = pack(command_string_bytes, threshold=None)
+    return command_string_bytes
+
+
+def forward_command(socket_path: str, input_bytes: bytes) -> bytes:
+    """!
+    Pass on a Command to the CommandHandler listening on a socket and wait for its Response, see prepare_command().
+    @param socket_path: The Unix named socket to write the Command to.
+    @param input_bytes: The encoded Command, as sent by SSHConnection.
+    @return: The encoded Response, in the codec of the Command.
+    """
+    return send_once(socket_path, prepare_command(input_bytes))
 
 
 class Remote(object):
@@ -21,25 +55,66 @@ class Remote(object):
         @param socket_path: The Unix named socket to write the Command to.
         @param output_stream: The output stream to write the Response to.
         """
-        input_string = input_stream.read()
-        command_dict = yaml.load(input_string, Loader=yaml.SafeLoader)
-        command_dict["username"] = getuser()
-        command_string = yaml.dump(command_dict)
+        output_stream.write(forward_command(socket_path, input_stream.read().encode()).decode())
 
-        named_socket = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
-        try:
-            named_socket.connect(socket_path)
-            command_string_bytes = command_string.encode()
-            # First 8 bytes encode command length:
-            named_socket.sendall(len(command_string_bytes).to_bytes(length=8, byteorder="big"))
-            named_socket.sendall(command_string_bytes)
-            response_string = ""
+
+class RemoteAgent(object):
+    """
+    Long-lived variant of Remote, started once per AgentChannel instead of once per Command.
+
+    Announces itself with a hello frame listing the codecs and compressions it supports, then reads Commands as frames
+    (see ja.common.proxy.channel) from the input stream until it ends. Every Command is passed on to the
+    CommandHandler exactly like Remote does it, on a bounded pool of threads, and the Response is written back as a
+    frame with the request ID of the Command, in the codec of the Command. The connections to the CommandHandler are
+    kept open as sessions (see ja.common.proxy.pipeline) and reused for the following Commands.
+
+    Commands which are passed on at the same time may reach the CommandHandler in any order. This does not reorder the
+    Commands of any sender: AgentChannel.request() only returns once the Response has arrived, so a sender's next
+    Command is read only after its previous one was handled. Only Commands of different senders are in flight at the
+    same time, and they are not ordered with respect to each other in the first place.
+    """
+    def __init__(self, socket_path: str, input_stream: BinaryIO = None, output_stream: BinaryIO = None,
+                 max_workers: int = 8):
+        """!
+        @param socket_path: The Unix named socket to write the Commands to.
+        @param input_stream: The input stream to read the Command frames from, binary stdin by default.
+        @param output_stream: The output stream to write the Response frames to, binary stdout by default.
+        @param max_workers: The maximum amount of Commands passed on at the same time.
+        """
+        if max_workers < 1:
+            raise ValueError("The remote agent needs at least one thread.")
+        input_stream = input_stream if input_stream is not None else stdin.buffer
+        output_stream = output_stream if output_stream is not None else stdout.buffer
+        self._sessions = SessionPool(socket_path, max_idle=max_workers)
+        self._output_stream = output_stream
+        self._write_lock = Lock()
+        write_frame(output_stream, 0, agent_hello(available_codecs() + COMPRESSIONS))
+
+        # Commands beyond the ones being passed on and a few waiting for a thread are left in the input stream, so
+        # that the client is slowed down instead of the agent piling them up.
+        slots = Semaphore(4 * max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="remote-agent") as executor:
             while True:
-                data = named_socket.recv(1024)
-                if not data:  # Becomes True when socket is closed by CommandHandler.
+                slots.acquire()
+                frame = read_frame(input_stream)
+                if frame is None:
                     break
-                response_string += data.decode()
-            output_stream.write(response_string)
-            output_stream.write(response_string)
+                executor.submit(self._handle, slots, *frame)
+        self._sessions.close()
+
+    def _handle(self, slots: Semaphore, request_id: int, payload: bytes) -> None:
+        try:
+            self._respond(request_id, payload)
         finally:
-            named_socket.close()
+            slots.release()
+
+    def _respond(self, request_id: int, payload: bytes) -> None:
+        try:
+            response_bytes = self._sessions.request(prepare_command(payload))
+        except Exception as e:
+            # A compressed Command is detected as YAML, which every client understands.
+            command_bytes = payload[2:] if is_enveloped(payload) else payload
+            response = Response("Remote agent failed: %s" % e, False)
+            response_bytes = detect_codec(command_bytes).encode(response.to_dict())
+        with self._write_lock:
+            write_frame(self._output_stream, request_id, response_bytes)
@@ -1,9 +1,13 @@
-from typing import Dict
+from typing import Dict, Optional
 from abc import ABC, abstractmethod
+from threading import Lock
+from time import monotonic
 from paramiko import SSHClient, AutoAddPolicy  # type: ignore
-import yaml
 
 from ja.common.message.base import Response, Command
+from ja.common.message.codec import YAML, choose_codec, decode_any
+from ja.common.message.compression import DEFAULT_THRESHOLD, ZLIB, CompressionMetrics, pack, unpack
+from ja.common.proxy.channel import AgentChannel, AgentUnavailableError
 from ja.common.config import Config
 
 import logging
@@ -14,10 +18,15 @@ class ISSHConnection(ABC):
     """
     Establishes an SSH connection to a Remote object. Writes Command objects to
     the stdin of said Remote objects. Then reads a Response object from stdout
-    of the Remote objects. Message objects are read/written as YAML strings.
+    of the Remote objects. Message objects are read/written as YAML strings, or in the fastest codec supported by both
+    sides if a long-lived remote agent is used. Large messages sent to and from a remote agent are compressed if the
+    agent supports it.
     Uses paramiko as the backend for establishing an ssh connection.
     """
 
+    """The result string of the Response returned by send_command() if no Response was received from the Remote."""
+    RESPONSE_FAILED_COMMUNICATION = "Failed communication with remote"
+
     @abstractmethod
     def send_command(self, command: Command) -> Response:
         """!
@@ -40,12 +49,25 @@ class ISSHConnection(ABC):
         Sends a dummy command to the remote on the host.
         """
 
+    def is_active(self) -> bool:
+        """!
+        Check locally, without contacting the host, whether the connection is still usable.
+        @return: False if the connection is known to be broken.
+        """
+        return True
+
 
 class SSHConnection(ISSHConnection):
     """Timeout of an SSH connection in seconds."""
     TIMEOUT = 120
+    """Time in seconds for which commands are executed without the remote agent after it could not be started. The
+    time doubles with every further failed start."""
+    AGENT_RETRY_DELAY = 5.0
+    """Maximum time in seconds for which commands are executed without the remote agent."""
+    AGENT_MAX_RETRY_DELAY = 600.0
 
-    def __init__(self, ssh_config: "SSHConfig", remote_module: str, command_string: str = "python3 -m %s"):
+    def __init__(self, ssh_config: "SSHConfig", remote_module: str, command_string: str = "python3 -m %s",
+                 agent_command_string: str = None, compression_threshold: Optional[int] = DEFAULT_THRESHOLD):
         """!
         Creates a new SSHConnection object. Arguments for establishing the
         actual ssh connection are packaged in @ssh_config. If no credentials
@@ -54,22 +76,108 @@ class SSHConnection(ISSHConnection):
         @param ssh_config: Config for paramiko.
         @param remote_module: The Python module to execute on the host.
         @param command_string: the template for executing commands on the remote component.
+        @param agent_command_string: the template for starting a long-lived RemoteAgent on the host, which then
+        executes all commands sent over this connection. If None, every command is executed by a new process started
+        with @command_string. This is also done while the agent cannot be started; it is started again after
+        AGENT_RETRY_DELAY seconds, backing off up to AGENT_MAX_RETRY_DELAY seconds.
+        @param compression_threshold: the minimum length in bytes of a Command sent to the remote agent to compress, or
+        None to never compress Commands. Responses are compressed by the remote side as it sees fit.
         """
+        self._ssh_config = ssh_config
         self._username = ssh_config.username
         self._client = SSHClient()
         self._client.set_missing_host_key_policy(AutoAddPolicy())
-        self._client.connect(
-            hostname=ssh_config.hostname, username=self._username, password=ssh_config.password,
-            key_filename=ssh_config.key_filename, passphrase=ssh_config.passphrase
-        )
+        self._connect()
         self._remote_module = remote_module
         self._command_string = command_string
+        self._agent_command_string = agent_command_string
+        self._compression_threshold = compression_threshold
+        self._compression_metrics = CompressionMetrics()
+        self._agent: Optional[AgentChannel] = None
+        self._agent_lock = Lock()
+        self._agent_retry_delay = SSHConnection.AGENT_RETRY_DELAY
+        # The time (see monotonic()) until which commands are executed without the agent.
+        self._agent_retry_at: Optional[float] = None
+        if agent_command_string is not None:
+            self._agent = AgentChannel(self._open_agent_streams, SSHConnection.TIMEOUT)
+
+    def _connect(self) -> None:
+        self._client.connect(
+            hostname=self._ssh_config.hostname, username=self._username, password=self._ssh_config.password,
+            key_filename=self._ssh_config.key_filename, passphrase=self._ssh_config.passphrase
+        )
+
+    def _open_agent_streams(self) -> AgentChannel.Streams:
+        transport = self._client.get_transport()
+        if transport is None or not transport.is_active():
+            logger.info("reconnecting to %s" % self._ssh_config.hostname)
+            self._connect()
+        stdin, stdout, stderr = self._client.exec_command(self._agent_command_string % self._remote_module)
+        return stdin, stdout, stdin.channel.close
+
+    @property
+    def compression_metrics(self) -> CompressionMetrics:
+        """!
+        @return: The sizes of the Commands sent to the remote agent in an envelope, before and after compression.
+        """
+        return self._compression_metrics
 
     def send_command(self, command: Command) -> Response:
-        command_dict = dict(command=command.to_dict(), type_name=command.__class__.__name__)
+        return self.send_command_dict(dict(command=command.to_dict(), type_name=command.__class__.__name__))
+
+    def send_command_dict(self, command_dict: Dict[str, object]) -> Response:
+        """!
+        Like send_command(), for a Command which has already been converted to a dictionary.
+        @param command_dict: The type name of the Command and its dictionary representation.
+        @return: The Response received from the Remote.
+        """
+        agent = self._available_agent()
+        if agent is not None:
+            try:
+                codec = choose_codec(agent.remote_codecs())
+                command_bytes = codec.encode(command_dict)
+                if ZLIB in agent.remote_compressions():
+                    command_bytes = pack(command_bytes, self._compression_threshold, self._compression_metrics)
+                response_bytes, _ = unpack(agent.request(command_bytes))
+                response = Response.from_dict(decode_any(response_bytes))
+            except AgentUnavailableError as e:
+                # The command was not sent, so it is safe to send it again without the agent.
+                self._back_off_agent(agent, e)
+            except (ConnectionError, ValueError) as e:
+                logger.error("Failed to communicate with remote agent: %s" % e)
+                # The agent may be stuck or out of step with this side, so a new one is started for the next command.
+                agent.close()
+                return Response(self.RESPONSE_FAILED_COMMUNICATION, False)
+            else:
+                self._reset_agent_retry_delay()
+                return response
+        return self._send_command_exec(command_dict)
+
+    def _available_agent(self) -> Optional[AgentChannel]:
+        with self._agent_lock:
+            if self._agent_retry_at is not None and monotonic() < self._agent_retry_at:
+                return None
+            return self._agent
+
+    def _back_off_agent(self, agent: AgentChannel, error: Exception) -> None:
+        agent.close()
+        with self._agent_lock:
+            logger.warning("Remote agent unavailable, starting a new remote process for every command for %d seconds: "
+                           "%s" % (self._agent_retry_delay, error))
+            self._agent_retry_at = monotonic() + self._agent_retry_delay
+            self._agent_retry_delay = min(2 * self._agent_retry_delay, SSHConnection.AGENT_MAX_RETRY_DELAY)
+
+    def _reset_agent_retry_delay(self) -> None:
+        if self._agent_retry_at is None:
+            return
+        with self._agent_lock:
+            self._agent_retry_at = None
+            self._agent_retry_delay = SSHConnection.AGENT_RETRY_DELAY
+
+    def _send_command_exec(self, command_dict: Dict[str, object]) -> Response:
         remote_cmd = self._command_string % self._remote_module
         stdin, stdout, stderr = self._client.exec_command(remote_cmd, timeout=SSHConnection.TIMEOUT)
-        stdin.write(yaml.dump(command_dict))
+        stdin.write(YAML.encode(command_dict))
         stdin.close()
         response: Response = None
         try:
@@ -77,18 +185,24 @@ class SSHConnection(ISSHConnection):
         except AssertionError:
             logger.error("Failed to communicate with remote:\n" + stderr.read().decode())
             logger.debug("Failure when executing " + remote_cmd)
-            response = Response("Failed communication with remote", False)
+            response = Response(self.RESPONSE_FAILED_COMMUNICATION, False)
 
         stdout.close()
         stderr.close()
         return response
 
     def close(self) -> None:
+        if self._agent is not None:
+            self._agent.close()
         self._client.close()
 
     def send_dummy_command(self) -> None:
         self._client.exec_command("pwd", timeout=SSHConnection.TIMEOUT)
 
+    def is_active(self) -> bool:
+        transport = self._client.get_transport()
+        return transport is not None and bool(transport.is_active())
+
 
 class SSHConfig(Config):
     """
@@ -79,14 +79,212 @@ class LoginConfig(Config):
         return LoginConfig(host, port, username, password)
 
 
+class DatabaseConfig(LoginConfig):
+    """
+    Config for the database used on the central server.
+    """
+
+    BACKENDS = ["postgresql", "sqlite", "memory"]
+
+    def __init__(self, host: str, port: int, username: str, password: str, backend: str = "postgresql",
+                 path: str = None, pool_size: int = 5, max_overflow: int = 10, pool_timeout: int = 30):
+        super().__init__(host, port, username, password)
+        if backend not in DatabaseConfig.BACKENDS:
+            raise ValueError("Unknown database backend %s, must be one of %s." % (backend, DatabaseConfig.BACKENDS))
+        if pool_size < 1:
+            raise ValueError("The connection pool must hold at least one connection.")
+        if max_overflow < 0 or pool_timeout < 0:
+            raise ValueError("The connection pool overflow and timeout must not be negative.")
+        self._backend = backend
+        self._path = path
+        self._pool_size = pool_size
+        self._max_overflow = max_overflow
+        self._pool_timeout = pool_timeout
+
+    def __eq__(self, o: object) -> bool:
+        if isinstance(o, DatabaseConfig):
+            return super().__eq__(o) \
+                and self._backend == o.backend \
+                and self._path == o.path \
+                and self._pool_size == o.pool_size \
+                and self._max_overflow == o.max_overflow \
+                and self._pool_timeout == o.pool_timeout
+        else:
+            return False
+
+    @property
+    def backend(self) -> str:
+        """!
+        "postgresql" by default.
+        @return: The kind of database to use: "postgresql", "sqlite" or "memory".
+        """
+        return self._backend
+
+    @property
+    def path(self) -> str:
+        """!
+        Only used by, and required for, the "sqlite" backend.
+        @return: Path of the database file.
+        """
+        return self._path
+
+    @property
+    def pool_size(self) -> int:
+        """!
+        Only used by the "postgresql" backend. 5 by default.
+        @return: The amount of connections to the database server which are kept open.
+        """
+        return self._pool_size
+
+    @property
+    def max_overflow(self) -> int:
+        """!
+        Only used by the "postgresql" backend. 10 by default.
+        @return: The amount of connections which may be opened in addition to the pool size under load.
+        """
+        return self._max_overflow
+
+    @property
+    def pool_timeout(self) -> int:
+        """!
+        Only used by the "postgresql" backend. 30 by default.
+        @return: The time in seconds to wait for a free connection before giving up.
+        """
+        return self._pool_timeout
+
+    def to_dict(self) -> Dict[str, object]:
+        d = super().to_dict()
+        d["backend"] = self._backend
+        d["path"] = self._path
+        d["pool_size"] = self._pool_size
+        d["max_overflow"] = self._max_overflow
+        d["pool_timeout"] = self._pool_timeout
+        return d
+
+    @classmethod
+    def from_dict(cls, property_dict: Dict[str, object]) -> "DatabaseConfig":
+        backend = cls._get_str_from_dict(property_dict=property_dict, key="backend", mandatory=False)
+        if backend is None:
+            backend = "postgresql"
+        # Only the PostgreSQL backend connects to a database server.
+        needs_login = backend == "postgresql"
+        host = cls._get_str_from_dict(property_dict=property_dict, key="host", mandatory=needs_login)
+        port = cls._get_int_from_dict(property_dict=property_dict, key="port", mandatory=False)
+        username = cls._get_str_from_dict(property_dict=property_dict, key="username", mandatory=needs_login)
+        password = cls._get_str_from_dict(property_dict=property_dict, key="password", mandatory=needs_login)
+        path = cls._get_str_from_dict(property_dict=property_dict, key="path", mandatory=False)
+        pool_size = cls._get_int_from_dict(property_dict=property_dict, key="pool_size", mandatory=False)
+        max_overflow = cls._get_int_from_dict(property_dict=property_dict, key="max_overflow", mandatory=False)
+        pool_timeout = cls._get_int_from_dict(property_dict=property_dict, key="pool_timeout", mandatory=False)
+
+        cls._assert_all_properties_used(property_dict)
+        return DatabaseConfig(host, port, username, password, backend, path,
+                              pool_size=5 if pool_size is None else pool_size,
+                              max_overflow=10 if max_overflow is None else max_overflow,
+                              pool_timeout=30 if pool_timeout is None else pool_timeout)
+
+
+class AdmissionConfig(Config):
+    """
+    Config for the admission control of the commands adding jobs on the central server. Each limit is disabled if it
+    is 0, which is the default.
+    """
+
+    def __init__(self, user_jobs_per_minute: int = 0, user_burst: int = 0, global_jobs_per_minute: int = 0,
+                 global_burst: int = 0, max_queued_jobs_per_user: int = 0):
+        if min(user_jobs_per_minute, user_burst, global_jobs_per_minute, global_burst, max_queued_jobs_per_user) < 0:
+            raise ValueError("The limits of the admission control must not be negative.")
+        self._user_jobs_per_minute = user_jobs_per_minute
+        self._user_burst = user_burst
+        self._global_jobs_per_minute = global_jobs_per_minute
+        self._global_burst = global_burst
+        self._max_queued_jobs_per_user = max_queued_jobs_per_user
+
+    def __eq__(self, o: object) -> bool:
+        if isinstance(o, AdmissionConfig):
+            return self._user_jobs_per_minute == o.user_jobs_per_minute \
+                and self._user_burst == o.user_burst \
+                and self._global_jobs_per_minute == o.global_jobs_per_minute \
+                and self._global_burst == o.global_burst \
+                and self._max_queued_jobs_per_user == o.max_queued_jobs_per_user
+        else:
+            return False
+
+    @property
+    def user_jobs_per_minute(self) -> int:
+        """!
+        @return: The average amount of jobs a user may add per minute.
+        """
+        return self._user_jobs_per_minute
+
+    @property
+    def user_burst(self) -> int:
+        """!
+        @return: The amount of jobs a user may add at once. If 0, a second's worth of jobs at the average rate.
+        """
+        return self._user_burst
+
+    @property
+    def global_jobs_per_minute(self) -> int:
+        """!
+        @return: The average amount of jobs all users together may add per minute.
+        """
+        return self._global_jobs_per_minute
+
+    @property
+    def global_burst(self) -> int:
+        """!
+        @return: The amount of jobs all users together may add at once. If 0, a second's worth of jobs at the average
+          rate.
+        """
+        return self._global_burst
+
+    @property
+    def max_queued_jobs_per_user(self) -> int:
+        """!
+        @return: The maximum amount of queued jobs of a user. Further jobs of the user are rejected.
+        """
+        return self._max_queued_jobs_per_user
+
+    def to_dict(self) -> Dict[str, object]:
+        d: Dict[str, object] = dict()
+        d["user_jobs_per_minute"] = self._user_jobs_per_minute
+        d["user_burst"] = self._user_burst
+        d["global_jobs_per_minute"] = self._global_jobs_per_minute
+        d["global_burst"] = self._global_burst
+        d["max_queued_jobs_per_user"] = self._max_queued_jobs_per_user
+        return d
+
+    @classmethod
+    def from_dict(cls, property_dict: Dict[str, object]) -> "AdmissionConfig":
+        limits: Dict[str, int] = dict()
+        for key in ["user_jobs_per_minute", "user_burst", "global_jobs_per_minute", "global_burst",
+                    "max_queued_jobs_per_user"]:
+            value = cls._get_int_from_dict(property_dict=property_dict, key=key, mandatory=False)
+            if value is not None:
+                limits[key] = value
+
+        cls._assert_all_properties_used(property_dict)
+        return AdmissionConfig(**limits)
+
+
 class ServerConfig(Config):
     """
     Config for the central server.
     """
 
-    def __init__(self, admin_group: str, database_config: LoginConfig, email_config: LoginConfig,
+    def __init__(self, admin_group: str, database_config: DatabaseConfig, email_config: LoginConfig,
                  special_resources: Dict[str, int],
-                 blocking_enabled: bool = True, preemption_enabled: bool = True, web_server_port: int = 0):
+                 blocking_enabled: bool = True, preemption_enabled: bool = True, web_server_port: int = 0,
+                 job_archive_days: int = 30, reconcile_jobs: bool = False, command_threads: int = 8,
+                 heartbeat_interval: int = 30, heartbeat_misses: int = 3, admission_config: AdmissionConfig = None,
+                 event_loop: bool = False):
+        if job_archive_days is not None and job_archive_days < 0:
+            raise ValueError("The job archive age must not be negative.")
+        if command_threads < 1:
+            raise ValueError("At least one thread is needed to handle commands.")
+        if heartbeat_interval < 0 or heartbeat_misses < 1:
+            raise ValueError("The heartbeat interval must not be negative and at least one heartbeat must be missed.")
         self._admin_group = admin_group
         self._database_config = database_config
         self._email_config = email_config
@@ -94,6 +292,13 @@ class ServerConfig(Config):
         self._blocking_enabled = blocking_enabled
         self._preemption_enabled = preemption_enabled
         self._web_server_port = web_server_port
+        self._job_archive_days = job_archive_days
+        self._reconcile_jobs = reconcile_jobs
+        self._command_threads = command_threads
+        self._heartbeat_interval = heartbeat_interval
+        self._heartbeat_misses = heartbeat_misses
+        self._admission_config = admission_config if admission_config is not None else AdmissionConfig()
+        self._event_loop = event_loop
 
     def __eq__(self, o: object) -> bool:
         if isinstance(o, ServerConfig):
@@ -103,7 +308,14 @@ class ServerConfig(Config):
                 and self._special_resources == o.special_resources \
                 and self._blocking_enabled == o.blocking_enabled \
                 and self._preemption_enabled == o.preemption_enabled \
-                and self._web_server_port == o.web_server_port
+                and self._web_server_port == o.web_server_port \
+                and self._job_archive_days == o.job_archive_days \
+                and self._reconcile_jobs == o.reconcile_jobs \
+                and self._command_threads == o.command_threads \
+                and self._heartbeat_interval == o.heartbeat_interval \
+                and self._heartbeat_misses == o.heartbeat_misses \
+                and self._admission_config == o.admission_config \
+                and self._event_loop == o.event_loop
         else:
             return False
 
@@ -115,7 +327,7 @@ class ServerConfig(Config):
         return self._admin_group
 
     @property
-    def database_config(self) -> LoginConfig:
+    def database_config(self) -> DatabaseConfig:
         """!
         @return: Config describing parameters for accessing the server database.
         """
@@ -163,6 +375,68 @@ class ServerConfig(Config):
         """
         return self._web_server_port
 
+    @property
+    def job_archive_days(self) -> int:
+        """!
+        Finished jobs are moved from the active job tables to the job history when they are older than this.
+        30 by default. If set to 0, jobs are never archived.
+
+        @return: The age in days after which finished jobs are archived, or 0 if archiving is disabled.
+        """
+        return self._job_archive_days
+
+    @property
+    def reconcile_jobs(self) -> bool:
+        """!
+        False by default.
+        @return: If True, running jobs are left alone when the server stops and re-adopted from the work machines when
+          it starts again. Otherwise they are marked as crashed.
+        """
+        return self._reconcile_jobs
+
+    @property
+    def command_threads(self) -> int:
+        """!
+        8 by default.
+        @return: The maximum amount of commands handled at the same time. Commands which change the database are
+          still executed one after another.
+        """
+        return self._command_threads
+
+    @property
+    def heartbeat_interval(self) -> int:
+        """!
+        30 by default.
+        @return: The time between two pings of a work machine in seconds. If 0, the work machines are pinged in every
+          scheduling cycle instead.
+        """
+        return self._heartbeat_interval
+
+    @property
+    def heartbeat_misses(self) -> int:
+        """!
+        3 by default.
+        @return: The amount of consecutive pings a work machine must miss to be considered lost.
+        """
+        return self._heartbeat_misses
+
+    @property
+    def admission_config(self) -> AdmissionConfig:
+        """!
+        All limits are disabled by default.
+        @return: Config describing the limits for adding jobs.
+        """
+        return self._admission_config
+
+    @property
+    def event_loop(self) -> bool:
+        """!
+        False by default.
+        @return: If True, the command socket, the WebAPI and the periodic tasks are served by a single event loop, and
+          only blocking work like database access takes up threads. Otherwise each of them runs on its own threads.
+        """
+        return self._event_loop
+
     def to_dict(self) -> Dict[str, object]:
         d: Dict[str, object] = dict()
         d["admin_group"] = self._admin_group
@@ -172,23 +446,53 @@ class ServerConfig(Config):
         d["blocking_enabled"] = self._blocking_enabled
         d["preemption_enabled"] = self._preemption_enabled
         d["web_server_port"] = self._web_server_port
+        d["job_archive_days"] = self._job_archive_days
+        d["reconcile_jobs"] = self._reconcile_jobs
+        d["command_threads"] = self._command_threads
+        d["heartbeat_interval"] = self._heartbeat_interval
+        d["heartbeat_misses"] = self._heartbeat_misses
+        d["admission_config"] = self._admission_config.to_dict()
+        d["event_loop"] = self._event_loop
         return d
 
     @classmethod
     def from_dict(cls, property_dict: Dict[str, object]) -> "ServerConfig":
         admin_group = cls._get_str_from_dict(property_dict=property_dict, key="admin_group")
-        database_config = LoginConfig.from_dict(cls._get_dict_from_dict(property_dict=property_dict,
-                                                                        key="database_config"))
+        database_config = DatabaseConfig.from_dict(cls._get_dict_from_dict(property_dict=property_dict,
+                                                                           key="database_config"))
         email_config = LoginConfig.from_dict(cls._get_dict_from_dict(property_dict=property_dict, key="email_config"))
         special_resources: Dict[str, int] = cast(Dict[str, int], cls._get_dict_from_dict(property_dict=property_dict,
                                                                                          key="special_resources"))
         blocking_enabled = cls._get_bool_from_dict(property_dict=property_dict, key="blocking_enabled")
         preemption_enabled = cls._get_bool_from_dict(property_dict=property_dict, key="preemption_enabled")
         web_server_port = cls._get_int_from_dict(property_dict=property_dict, key="web_server_port")
+        job_archive_days = cls._get_int_from_dict(property_dict=property_dict, key="job_archive_days", mandatory=False)
+        if job_archive_days is None:
+            job_archive_days = 30
+        reconcile_jobs = cls._get_bool_from_dict(property_dict=property_dict, key="reconcile_jobs", mandatory=False)
+        if reconcile_jobs is None:
+            reconcile_jobs = False
+        command_threads = cls._get_int_from_dict(property_dict=property_dict, key="command_threads", mandatory=False)
+        if command_threads is None:
+            command_threads = 8
+        heartbeat_interval = cls._get_int_from_dict(property_dict=property_dict, key="heartbeat_interval",
+                                                    mandatory=False)
+        if heartbeat_interval is None:
+            heartbeat_interval = 30
+        heartbeat_misses = cls._get_int_from_dict(property_dict=property_dict, key="heartbeat_misses", mandatory=False)
+        if heartbeat_misses is None:
+            heartbeat_misses = 3
+        admission_dict = cls._get_dict_from_dict(property_dict=property_dict, key="admission_config", mandatory=False)
+        admission_config = AdmissionConfig.from_dict(admission_dict) if admission_dict is not None else None
+        event_loop = cls._get_bool_from_dict(property_dict=property_dict, key="event_loop", mandatory=False)
+        if event_loop is None:
+            event_loop = False
 
         cls._assert_all_properties_used(property_dict)
         return ServerConfig(admin_group, database_config, email_config, special_resources,
-                            blocking_enabled, preemption_enabled, web_server_port)
+                            blocking_enabled, preemption_enabled, web_server_port, job_archive_days,
+                            reconcile_jobs, command_threads, heartbeat_interval, heartbeat_misses, admission_config,
+                            event_loop)
 
     @classmethod
     def from_string(cls, yaml_string: str) -> "ServerConfig":
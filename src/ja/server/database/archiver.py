@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from threading import Event, Thread
+from typing import Callable, Optional
+
+from ja.server.database.database import ServerDatabase
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class JobArchiver:
+    """
+    Periodically moves old finished jobs from the active job store to the job history in the background.
+    Jobs are archived in small batches, each of them in its own transaction, so that the server is never blocked for
+    long while the history is being built up.
+    """
+
+    def __init__(self, database: ServerDatabase, max_age: timedelta, batch_size: int = 100,
+                 interval: float = 600, background: bool = True,
+                 run_ordered: Callable[[Callable[[], int]], int] = None) -> None:
+        """!
+        Start archiving jobs.
+
+        @param database The database to archive jobs in.
+        @param max_age Finished jobs which were added longer than this ago are archived.
+        @param batch_size The maximum amount of jobs to archive in one transaction.
+        @param interval The time to wait between two archiving runs, in seconds.
+        @param background If False, no thread is started and archive() has to be called every @interval instead.
+        @param run_ordered Called with each batch, so that the batch does not run concurrently with commands changing
+        the same jobs, see CommandHandler.run_ordered(). The batches are run directly by default.
+        """
+        self._database = database
+        self._run_ordered = run_ordered if run_ordered is not None else lambda archive_batch: archive_batch()
+        self._max_age = max_age
+        self._batch_size = batch_size
+        self._interval = interval
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+        if background:
+            self._thread = Thread(target=self._archiver_thread)
+            self._thread.setDaemon(True)
+            self._thread.start()
+
+    @property
+    def interval(self) -> float:
+        """!
+        @return The time to wait between two archiving runs, in seconds.
+        """
+        return self._interval
+
+    def archive(self) -> int:
+        """!
+        Archive all jobs which are old enough now, batch by batch.
+
+        @return The amount of archived jobs.
+        """
+        older_than = datetime.now() - self._max_age
+        total = 0
+        while not self._stop_event.is_set():
+            archived = self._run_ordered(lambda: self._database.archive_jobs(older_than, self._batch_size))
+            total += archived
+            if archived < self._batch_size:
+                break
+        return total
+
+    def _archiver_thread(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.archive()
+            except Exception as e:
+                logger.error("Failed to archive jobs.")
+                logger.error(e)
+            self._stop_event.wait(self._interval)
+
+    def stop(self) -> None:
+        """
+        Stop archiving jobs. If a batch is currently being archived, it is finished first.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,126 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, local
+from typing import Any, AsyncGenerator, Callable, Iterable, Optional, Tuple, TypeVar
+
+from ja.server.database.database import ServerDatabase
+
+import logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncServerDatabase:
+    """
+    Gives asyncio code access to a ServerDatabase, which stays the synchronous interface for all other callers.
+    The installed SQLAlchemy has no asyncio engine, so every call is run on a thread of a dedicated pool instead, which
+    should be as large as the connection pool of the database (see DatabaseConfig). Each thread uses its own session
+    and connection, which is returned to the pool after every call, so the calls run concurrently without ever waiting
+    for a connection. Synchronous code can hand its calls to the same pool with call().
+    """
+
+    def __init__(self, database: ServerDatabase, max_workers: int = 5) -> None:
+        """!
+        @param database The database to access.
+        @param max_workers The maximum amount of calls accessing the database at the same time.
+        """
+        if max_workers < 1:
+            raise ValueError("The database needs at least one thread.")
+        self._database = database
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="database")
+        # Marks the threads of the pool while they run a call.
+        self._local = local()
+
+    @property
+    def sync(self) -> ServerDatabase:
+        """!
+        @return The wrapped synchronous database, whose methods can be passed to run(), call() and stream().
+        """
+        return self._database
+
+    def _call(self, function: Callable[..., T], args: Tuple[Any, ...]) -> T:
+        self._local.active = True
+        try:
+            return function(*args)
+        finally:
+            self._local.active = False
+            # The threads of the pool are reused, so the connection is returned to the pool after each call.
+            self._database.release_session()
+
+    async def run(self, function: Callable[..., T], *args: Any) -> T:
+        """!
+        Run a function accessing the database on the pool without blocking the event loop.
+
+        @param function The function to call, for example a method of sync.
+        @param args The arguments to call @function with.
+        @return The result of @function.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, function, args)
+
+    def call(self, function: Callable[..., T], *args: Any) -> T:
+        """!
+        Like run(), for synchronous code: run a function accessing the database on the pool and wait for it. A call
+        made by a function which already runs on the pool is run directly on its thread.
+
+        @param function The function to call, for example a method of sync.
+        @param args The arguments to call @function with.
+        @return The result of @function.
+        """
+        if getattr(self._local, "active", False):
+            return function(*args)
+        return self._executor.submit(self._call, function, args).result()
+
+    def _produce(self, function: Callable[..., Iterable[T]], args: Tuple[Any, ...], loop: asyncio.AbstractEventLoop,
+                 items: "asyncio.Queue[Tuple[bool, Optional[T], Optional[Exception]]]", abandoned: Event) -> None:
+        def put(entry: Tuple[bool, Optional[T], Optional[Exception]]) -> None:
+            # Waits while the consumer is slower than the function, so that the items are not buffered in memory.
+            asyncio.run_coroutine_threadsafe(items.put(entry), loop).result()
+
+        try:
+            for item in function(*args):
+                put((False, item, None))
+                if abandoned.is_set():
+                    return
+            put((True, None, None))
+        except Exception as e:
+            put((True, None, e))
+
+    async def stream(self, function: Callable[..., Iterable[T]], *args: Any, max_queued: int = 16) \
+            -> AsyncGenerator[T, None]:
+        """!
+        Iterate over the items produced by a function accessing the database, for example one streaming its results
+        in chunks. The function runs on one thread of the pool, at most @max_queued items ahead of the consumer.
+
+        @param function The function returning the items, for example a method of sync.
+        @param args The arguments to call @function with.
+        @param max_queued The maximum amount of items produced ahead of the consumer.
+        @return An iterator over the items. The function is stopped early when the iterator is closed.
+        """
+        loop = asyncio.get_running_loop()
+        items: "asyncio.Queue[Tuple[bool, Optional[T], Optional[Exception]]]" = asyncio.Queue(max_queued)
+        abandoned = Event()
+        producer = loop.run_in_executor(self._executor, self._call, self._produce,
+                                        (function, args, loop, items, abandoned))
+        try:
+            while True:
+                done, item, error = await items.get()
+                if error is not None:
+                    raise error
+                if done:
+                    break
+                yield item
+        finally:
+            abandoned.set()
+            # Unblock the function if it is waiting for room in the queue, until it notices that it was abandoned.
+            while not producer.done():
+                while not items.empty():
+                    items.get_nowait()
+                await asyncio.wait([producer], timeout=0.01)
+            await asyncio.gather(producer, return_exceptions=True)
+
+    def shutdown(self) -> None:
+        """!
+        Wait for the running calls to finish and stop the pool.
+        """
+        self._executor.shutdown(wait=True)
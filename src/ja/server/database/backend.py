@@ -0,0 +1,37 @@
+from typing import Dict
+
+from ja.server.config import DatabaseConfig
+from ja.server.database.database import ServerDatabase
+from ja.server.database.memory.database import MemoryDatabase
+from ja.server.database.sql.database import SQLDatabase
+from ja.server.database.sql.sqlite import SQLiteDatabase
+
+
+def create_database(config: DatabaseConfig, database_name: str = "jobadder",
+                    max_special_resources: Dict[str, int] = None) -> ServerDatabase:
+    """!
+    Create the ServerDatabase for the storage backend selected in the given config.
+
+    @param config The config describing which database to use and how to access it.
+    @param database_name The name of the database to use on a database server.
+    @param max_special_resources Maximum available special resources on the server.
+    @return The database, already connected.
+    @raise ValueError If the "sqlite" backend is selected without a path.
+    """
+    if config.backend == "memory":
+        return MemoryDatabase(max_special_resources=max_special_resources)
+    if config.backend == "sqlite":
+        if config.path is None:
+            # An SQLite database in memory has a single connection, on which the transactions of the threads of the
+            # server would interleave.
+            raise ValueError("The sqlite database backend needs the path of the database file.")
+        return SQLiteDatabase(path=config.path, max_special_resources=max_special_resources)
+    return SQLDatabase(host=config.host,
+                       port=config.port,
+                       user=config.username,
+                       password=config.password,
+                       database_name=database_name,
+                       max_special_resources=max_special_resources,
+                       pool_size=config.pool_size,
+                       max_overflow=config.max_overflow,
+                       pool_timeout=config.pool_timeout)
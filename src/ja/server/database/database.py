@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List, Callable, Dict
+from typing import List, Callable, Dict, Iterator, Optional
 from ja.common.job import Job
+from ja.server.database.types.event import JobEvent, MachineEvent, UtilizationRollup
 from ja.server.database.types.job_entry import DatabaseJobEntry
 from ja.server.database.types.work_machine import WorkMachine
 
@@ -19,6 +20,21 @@ class ServerDatabase(ABC):
         @return The stored data about the job, or None if no such job was found.
         """
 
+    def find_jobs_by_ids(self, job_ids: List[str]) -> Dict[str, DatabaseJobEntry]:
+        """!
+        Load several jobs from the database by their ids. Implementations load all jobs with a constant amount of
+        queries. By default, this simply calls find_job_by_id() for each id.
+
+        @param job_ids The ids of the jobs.
+        @return The stored data about the jobs by job id. Jobs which were not found are left out.
+        """
+        job_entries: Dict[str, DatabaseJobEntry] = dict()
+        for job_id in job_ids:
+            job_entry = self.find_job_by_id(job_id)
+            if job_entry is not None:
+                job_entries[job_id] = job_entry
+        return job_entries
+
     @abstractmethod
     def find_job_by_label(self, label: str) -> List[Job]:
         """!
@@ -32,12 +48,34 @@ class ServerDatabase(ABC):
     def update_job(self, job: Job) -> str:
         """!
         Update the job in the database.
-        If no job with the id of @job has been stored up to now, a new entry will be created in the database.
+        If no job with the id of @job has been stored up to now, a new entry will be created in the database. In this
+        case, the docker context of @job may reference a Dockerfile which is already in the database instead of
+        containing it; a ValueError is raised if the Dockerfile is unknown.
 
         @param job The job to update stored data for.
         @return the uid of the updated job.
         """
 
+    @abstractmethod
+    def count_queued_jobs(self, owner_id: int) -> int:
+        """!
+        Count the jobs of a user which wait to be started, without loading them.
+
+        @param owner_id The ID of the owner of the jobs.
+        @return The amount of jobs of the user which are in state NEW or QUEUED.
+        """
+
+    @abstractmethod
+    def find_dockerfile(self, dockerfile_hash: str) -> Optional[str]:
+        """!
+        Load a Dockerfile from the database by its content hash.
+        Dockerfiles are stored once for all jobs which use them, whenever a job with the full contents of its
+        Dockerfile is added. Afterwards, jobs can be added with a docker context which only references the Dockerfile.
+
+        @param dockerfile_hash The content hash of the Dockerfile, see get_dockerfile_hash().
+        @return The contents of the Dockerfile, or None if no such Dockerfile was found.
+        """
+
     @abstractmethod
     def assign_job_machine(self, job: Job, machine: WorkMachine) -> None:
         """!
@@ -65,6 +103,21 @@ class ServerDatabase(ABC):
 
     JobDistribution = List[DatabaseJobEntry]
 
+    @abstractmethod
+    def apply_schedule(self, schedule: JobDistribution, machines: List[WorkMachine]) -> None:
+        """!
+        Write a whole job distribution back to the database in a single transaction.
+
+        For each entry of @schedule, the status of the job (together with its runtime statistics) and its assigned work
+        machine are updated, as update_job() and assign_job_machine() would do. Each of @machines is updated as
+        update_work_machine() would do. The job status callback is invoked for every job whose status changed only
+        after the transaction has been committed, and the scheduler callback is invoked at most once at the end.
+        This will cause a RuntimeError if any of the jobs is not in the database.
+
+        @param schedule The job entries to write back.
+        @param machines The work machines to update.
+        """
+
     @abstractmethod
     def get_current_schedule(self) -> JobDistribution:
         """!
@@ -89,6 +142,83 @@ class ServerDatabase(ABC):
         @return A list of the jobs which fall into the criteria above.
         """
 
+    def stream_jobs(self, since: datetime, user_id: int, work_machine: WorkMachine, chunk_size: int = 500) \
+            -> Iterator[DatabaseJobEntry]:
+        """!
+        Iterate over the same jobs as query_jobs(), in the same order. Implementations read the jobs from the
+        database in chunks, so that memory usage stays bounded no matter how many jobs match. By default, this simply
+        iterates over the result of query_jobs().
+
+        @param since See query_jobs().
+        @param user_id See query_jobs().
+        @param work_machine See query_jobs().
+        @param chunk_size The maximum amount of jobs to read from the database at once.
+        @return An iterator over the jobs which fall into the criteria of query_jobs().
+        """
+        yield from self.query_jobs(since, user_id, work_machine)
+
+    def stream_jobs_by_label(self, label: str, chunk_size: int = 500) -> Iterator[Job]:
+        """!
+        Iterate over the same jobs as find_job_by_label(), in the same order, reading them in chunks like
+        stream_jobs(). By default, this simply iterates over the result of find_job_by_label().
+
+        @param label The label of the jobs.
+        @param chunk_size The maximum amount of jobs to read from the database at once.
+        @return An iterator over the jobs with the given label.
+        """
+        yield from self.find_job_by_label(label) or []
+
+    def release_session(self) -> None:
+        """!
+        Release the database session and connection held for the calling thread, if any. Threads which only access
+        the database for a while, for example the threads serving web requests, call this when they are done, so
+        that the connection is returned to the connection pool. By default, this does nothing.
+        """
+
+    @abstractmethod
+    def archive_jobs(self, older_than: datetime, limit: int) -> int:
+        """!
+        Move finished jobs (DONE, CRASHED or CANCELLED) which were added before @older_than and which are not assigned
+        to any work machine out of the active job store into the job history.
+        Archived jobs are not part of the current schedule anymore, but they can still be found by find_job_by_id(),
+        find_job_by_label() and query_jobs(), unless the query is limited to a work machine.
+
+        @param older_than Only jobs which were added before this date and time are archived.
+        @param limit The maximum amount of jobs to archive in this call.
+        @return The amount of jobs which were archived.
+        """
+
+    @abstractmethod
+    def get_job_events(self, job_uid: str) -> List[JobEvent]:
+        """!
+        Every change of the status of a job, including the first one when the job is added, is appended to the event
+        log of the database.
+
+        @param job_uid The UID of the job.
+        @return The events logged for the job, oldest first.
+        """
+
+    @abstractmethod
+    def get_machine_events(self, machine_uid: str) -> List[MachineEvent]:
+        """!
+        Every time a work machine is added or changes its state, this is appended to the event log of the database.
+
+        @param machine_uid The UID of the work machine.
+        @return The events logged for the work machine, oldest first.
+        """
+
+    @abstractmethod
+    def get_utilization(self, since: datetime, until: datetime) -> List[UtilizationRollup]:
+        """!
+        Get the hourly utilization rollups, which are updated incrementally whenever a job event is logged.
+        See compute_rollups() for how the rollups are computed.
+
+        @param since Only rollups for hours starting at or after this date and time are returned.
+        @param until Only rollups for hours starting before this date and time are returned.
+        @return The rollups, ordered by hour. There is one rollup per hour, work machine and job owner, and none for
+          hours in which nothing happened.
+        """
+
     RescheduleCallback = Callable[['ServerDatabase'], None]
 
     @abstractmethod
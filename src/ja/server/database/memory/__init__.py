@@ -0,0 +1,4 @@
+"""
+This package contains a ServerDatabase which keeps all data in the memory of
+the central server.
+"""
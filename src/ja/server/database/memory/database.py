@@ -0,0 +1,330 @@
+from copy import deepcopy
+from datetime import datetime
+from pwd import getpwuid
+from threading import RLock
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+import logging
+
+from ja.common.job import Job, JobStatus
+from ja.server.database.database import ServerDatabase
+from ja.server.database.types.event import JobEvent, MachineEvent, UtilizationRollup, compute_rollups, \
+    merge_rollups
+from ja.server.database.types.job_entry import DatabaseJobEntry, JobRuntimeStatistics
+from ja.server.database.types.work_machine import WorkMachine, WorkMachineState
+from ja.server.database.uid import UIDAllocator
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_SCHEDULED_STATES = [JobStatus.RUNNING, JobStatus.NEW, JobStatus.PAUSED, JobStatus.QUEUED]
+_FINISHED_STATES = [JobStatus.DONE, JobStatus.CRASHED, JobStatus.CANCELLED]
+_QUEUED_STATES = [JobStatus.NEW, JobStatus.QUEUED]
+
+
+def _is_archivable(job_entry: DatabaseJobEntry, older_than: datetime) -> bool:
+    return job_entry.job.status in _FINISHED_STATES and job_entry.assigned_machine is None \
+        and job_entry.statistics.time_added < older_than
+
+
+def _is_on_machine(job_entry: DatabaseJobEntry, machine: WorkMachine) -> bool:
+    return job_entry.assigned_machine is not None and job_entry.assigned_machine.uid == machine.uid
+
+
+class MemoryDatabase(ServerDatabase):
+    """
+    A ServerDatabase which keeps all jobs and work machines in memory. Nothing is persisted, so all data is lost when
+    the server stops. Objects are copied when they are stored and when they are returned, exactly like SQLDatabase
+    does it.
+    """
+
+    def __init__(self, max_special_resources: Dict[str, int] = None):
+        """!
+        Create an empty MemoryDatabase.
+
+        @param max_special_resources Maximum available special resources on the server.
+        """
+        self._max_special_resources = deepcopy(max_special_resources)
+        self._uid_allocator = UIDAllocator(find_last_uid=self._find_last_uid)
+        self.scheduler_callback: Callable[["ServerDatabase"], None] = None
+        self.status_callback: Callable[["Job"], None] = lambda *args: None
+        self.in_scheduler_callback: bool = False
+        self.in_atomic_update: bool = False
+        self._lock = RLock()
+        # Both dictionaries keep insertion order, which mirrors the order of the primary keys in SQLDatabase.
+        self._jobs: Dict[str, DatabaseJobEntry] = dict()
+        self._work_machines: Dict[str, WorkMachine] = dict()
+        # Finished jobs moved out of _jobs by archive_jobs().
+        self._history: Dict[str, DatabaseJobEntry] = dict()
+        self._dockerfiles: Dict[str, str] = dict()
+        self._job_events: Dict[str, List[JobEvent]] = dict()
+        self._machine_events: Dict[str, List[MachineEvent]] = dict()
+        # Rollups by hour, then by work machine and owner.
+        self._rollups: Dict[datetime, Dict[UtilizationRollup.Key, UtilizationRollup]] = dict()
+
+    def _find_job_by_id(self, job_id: str) -> Optional[DatabaseJobEntry]:
+        job_entry = self._jobs.get(job_id, None)
+        if job_entry is not None:
+            job_entry.refresh_statistics(datetime.now())
+        return job_entry
+
+    def find_job_by_id(self, job_id: str) -> Optional[DatabaseJobEntry]:
+        with self._lock:
+            job_entry = self._find_job_by_id(job_id)
+            if job_entry is None:
+                job_entry = self._history.get(job_id, None)
+            if job_entry is None:
+                logger.info("job with id: %s not found" % job_id)
+            return deepcopy(job_entry)
+
+    def find_jobs_by_ids(self, job_ids: List[str]) -> Dict[str, DatabaseJobEntry]:
+        job_entries: Dict[str, DatabaseJobEntry] = dict()
+        with self._lock:
+            for job_id in job_ids:
+                job_entry = self._find_job_by_id(job_id)
+                if job_entry is None:
+                    job_entry = self._history.get(job_id, None)
+                if job_entry is not None:
+                    job_entries[job_id] = job_entry
+            return deepcopy(job_entries)
+
+    def find_job_by_label(self, label: str) -> List[Job]:
+        if label is None:
+            return None
+        return list(self.stream_jobs_by_label(label))
+
+    def stream_jobs_by_label(self, label: str, chunk_size: int = 500) -> Iterator[Job]:
+        if label is None:
+            return
+        with self._lock:
+            jobs = [job_entry.job for job_entry in list(self._history.values()) + list(self._jobs.values())
+                    if job_entry.job.label == label]
+        yield from self._stream_copies(jobs, chunk_size)
+
+    def _stream_copies(self, objects: List[T], chunk_size: int) -> Iterator[T]:
+        # Only references are collected up front. The objects are copied chunk by chunk while the caller iterates.
+        for start in range(0, len(objects), chunk_size):
+            with self._lock:
+                chunk = deepcopy(objects[start:start + chunk_size])
+            yield from chunk
+
+    def find_work_machine_by_uid(self, uid: str) -> WorkMachine:
+        with self._lock:
+            return deepcopy(self._work_machines.get(uid, None))
+
+    def _find_last_uid(self, username: str) -> Optional[str]:
+        lowest, highest = UIDAllocator.uid_range(username)
+        uids = [uid for uid in list(self._jobs) + list(self._history)
+                if lowest <= uid <= highest and len(uid) == len(lowest)]
+        return max(uids, default=None)
+
+    def update_job(self, job: Job) -> str:
+        status_changed = False
+        with self._lock:
+            job_entry = self._find_job_by_id(job.uid)
+            if job_entry is None:
+                stored_job = deepcopy(job)
+                docker_context = stored_job.docker_context
+                if docker_context.dockerfile_source is None:
+                    dockerfile_source = self._dockerfiles.get(docker_context.dockerfile_hash, None)
+                    if dockerfile_source is None:
+                        raise ValueError(
+                            "Dockerfile with hash %s is not in the database." % docker_context.dockerfile_hash)
+                    docker_context.attach_dockerfile_source(dockerfile_source)
+                else:
+                    self._dockerfiles[docker_context.dockerfile_hash] = docker_context.dockerfile_source
+                if job.uid is None:
+                    job.uid = self._uid_allocator.allocate(getpwuid(job.owner_id).pw_name)
+                    stored_job.uid = job.uid
+                self._jobs[job.uid] = DatabaseJobEntry(job=stored_job,
+                                                       stats=JobRuntimeStatistics(datetime.now(), None, 0, 0),
+                                                       machine=None)
+                self._log_job_events([self._jobs[job.uid]], datetime.now())
+                logger.info("first add for job: %s" % job.uid)
+            else:
+                now = datetime.now()
+                status_changed = job_entry.update_status(job.status, now)
+                if status_changed:
+                    self._log_job_events([job_entry], now)
+                logger.info("update job: %s" % job.uid)
+        if status_changed:
+            self.status_callback(job)
+        self._call_scheduler()
+        return job.uid
+
+    def count_queued_jobs(self, owner_id: int) -> int:
+        with self._lock:
+            return sum(1 for job_entry in self._jobs.values()
+                       if job_entry.job.owner_id == owner_id and job_entry.job.status in _QUEUED_STATES)
+
+    def find_dockerfile(self, dockerfile_hash: str) -> Optional[str]:
+        with self._lock:
+            return self._dockerfiles.get(dockerfile_hash, None)
+
+    def get_jobs_on_machine(self, machine: WorkMachine) -> Optional[List[Job]]:
+        with self._lock:
+            return deepcopy([job_entry.job for job_entry in self._jobs.values() if _is_on_machine(job_entry, machine)])
+
+    def assign_job_machine(self, job: Job, machine: WorkMachine) -> None:
+        with self._lock:
+            job_entry = self._jobs.get(job.uid, None)
+            if job_entry is None:
+                raise RuntimeError("Job with uid %s is not in the database." % job.uid)
+            job_entry.assigned_machine = None if machine is None else self._work_machines.get(machine.uid, None)
+            logger.info("assign job: %s, to machine %s" % (job.uid, machine.uid if machine is not None else None))
+        self._call_scheduler()
+
+    def _update_work_machine(self, machine: WorkMachine) -> None:
+        work_machine = self._work_machines.get(machine.uid, None)
+        if work_machine is None or work_machine.state != machine.state:
+            self._machine_events.setdefault(machine.uid, []).append(
+                MachineEvent(datetime.now(), machine.uid, machine.state))
+        if work_machine is None:
+            self._work_machines[machine.uid] = deepcopy(machine)
+            logger.info("adding work machine: %s" % machine.uid)
+        else:
+            # The stored object is updated in place because the job entries reference it.
+            work_machine.state = machine.state
+            work_machine.ssh_config = deepcopy(machine.ssh_config)
+            work_machine.resources = deepcopy(machine.resources)
+            logger.info("updated work machine with uid: %s" % machine.uid)
+
+    def update_work_machine(self, machine: WorkMachine) -> None:
+        with self._lock:
+            self._update_work_machine(machine)
+        self._call_scheduler()
+
+    def apply_schedule(self, schedule: ServerDatabase.JobDistribution, machines: List[WorkMachine]) -> None:
+        changed_jobs: List[Job] = []
+        with self._lock:
+            for entry in schedule:
+                if entry.job.uid not in self._jobs:
+                    raise RuntimeError("Job with uid %s is not in the database." % entry.job.uid)
+            for machine in machines:
+                self._update_work_machine(machine)
+            now = datetime.now()
+            changed_entries: List[DatabaseJobEntry] = []
+            for entry in schedule:
+                job_entry = self._jobs[entry.job.uid]
+                status_changed = job_entry.update_status(entry.job.status, now)
+                if entry.assigned_machine is None:
+                    job_entry.assigned_machine = None
+                else:
+                    job_entry.assigned_machine = self._work_machines.get(entry.assigned_machine.uid, None)
+                if status_changed:
+                    changed_jobs.append(entry.job)
+                    changed_entries.append(job_entry)
+            self._log_job_events(changed_entries, now)
+            logger.info("applied schedule with %d jobs and %d work machines" % (len(schedule), len(machines)))
+
+        for job in changed_jobs:
+            self.status_callback(job)
+        self._call_scheduler()
+
+    def get_all_work_machines(self) -> Optional[List[WorkMachine]]:
+        return list(self.stream_all_work_machines())
+
+    def stream_all_work_machines(self, chunk_size: int = 500) -> Iterator[WorkMachine]:
+        """!
+        Iterate over all work machines, including the offline ones, copying them in chunks.
+
+        @param chunk_size The maximum amount of work machines to copy at once.
+        @return An iterator over all work machines.
+        """
+        with self._lock:
+            work_machines = list(self._work_machines.values())
+        yield from self._stream_copies(work_machines, chunk_size)
+
+    def get_work_machines(self) -> Optional[List[WorkMachine]]:
+        with self._lock:
+            return deepcopy([work_machine for work_machine in self._work_machines.values()
+                             if work_machine.state != WorkMachineState.OFFLINE])
+
+    def get_current_schedule(self) -> Optional[ServerDatabase.JobDistribution]:
+        with self._lock:
+            return deepcopy([job_entry for job_entry in self._jobs.values()
+                             if job_entry.job.status in _SCHEDULED_STATES or job_entry.assigned_machine is not None])
+
+    def query_jobs(self, since: Optional[datetime], user_id: Optional[int], work_machine: Optional[WorkMachine]) \
+            -> List[DatabaseJobEntry]:
+        jobs = list(self.stream_jobs(since, user_id, work_machine))
+        if len(jobs) == 0:
+            logger.info("no jobs found")
+        return jobs
+
+    def stream_jobs(self, since: Optional[datetime], user_id: Optional[int], work_machine: Optional[WorkMachine],
+                    chunk_size: int = 500) -> Iterator[DatabaseJobEntry]:
+        with self._lock:
+            if work_machine is not None:
+                jobs = [job_entry for job_entry in self._jobs.values() if _is_on_machine(job_entry, work_machine)]
+            else:
+                jobs = list(self._history.values()) + list(self._jobs.values())
+            if user_id != -1:
+                jobs = [job_entry for job_entry in jobs if job_entry.job.owner_id == user_id]
+            if since is not None:
+                jobs = [job_entry for job_entry in jobs if job_entry.statistics.time_added >= since]
+        yield from self._stream_copies(jobs, chunk_size)
+
+    def archive_jobs(self, older_than: datetime, limit: int) -> int:
+        with self._lock:
+            archived = [job_entry for job_entry in self._jobs.values() if _is_archivable(job_entry, older_than)][:limit]
+            for job_entry in archived:
+                del self._jobs[job_entry.job.uid]
+                self._history[job_entry.job.uid] = job_entry
+        if archived:
+            logger.info("archived %d jobs" % len(archived))
+        return len(archived)
+
+    def _log_job_events(self, job_entries: List[DatabaseJobEntry], now: datetime) -> None:
+        # Like SQLDatabase, the rollup increments of all events are merged before they are added to the rollups.
+        increments: List[UtilizationRollup] = []
+        for job_entry in job_entries:
+            machine = job_entry.assigned_machine
+            event = JobEvent(now, job_entry.job.uid, job_entry.job.owner_id, machine.uid if machine else None,
+                             job_entry.job.status)
+            events = self._job_events.setdefault(event.job_uid, [])
+            increments += compute_rollups(job_entry.job, event, events[-1] if events else None)
+            events.append(event)
+        for key, increment in merge_rollups(increments).items():
+            rollups = self._rollups.setdefault(increment.hour, dict())
+            if key in rollups:
+                rollups[key].add(increment)
+            else:
+                rollups[key] = increment
+
+    def get_job_events(self, job_uid: str) -> List[JobEvent]:
+        with self._lock:
+            return deepcopy(self._job_events.get(job_uid, []))
+
+    def get_machine_events(self, machine_uid: str) -> List[MachineEvent]:
+        with self._lock:
+            return deepcopy(self._machine_events.get(machine_uid, []))
+
+    def get_utilization(self, since: datetime, until: datetime) -> List[UtilizationRollup]:
+        with self._lock:
+            return deepcopy([rollup for hour in sorted(self._rollups) if since <= hour < until
+                             for rollup in self._rollups[hour].values()])
+
+    def _call_scheduler(self) -> None:
+        if not self.in_scheduler_callback and not self.in_atomic_update and self.scheduler_callback:
+            self.in_scheduler_callback = True
+            logger.info("calling scheduler callback")
+            self.scheduler_callback(self)
+            self.in_scheduler_callback = False
+
+    def set_scheduler_callback(self, callback: ServerDatabase.RescheduleCallback) -> None:
+        self.scheduler_callback = callback
+
+    def set_job_status_callback(self, callback: ServerDatabase.JobStatusCallback) -> None:
+        self.status_callback = callback
+
+    def start_atomic_update(self) -> None:
+        self.in_atomic_update = True
+
+    def end_atomic_update(self) -> None:
+        self.in_atomic_update = False
+        self._call_scheduler()
+
+    @property
+    def max_special_resources(self) -> Dict[str, int]:
+        return deepcopy(self._max_special_resources)
@@ -1,20 +1,38 @@
-import testing.postgresql
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 from ja.server.database.sql.database import SQLDatabase
 import logging
 from typing import Dict
 
-Postgresql = testing.postgresql.PostgresqlFactory(cache_initialized_db=True)
-
 logger = logging.getLogger(__name__)
 
+_postgresql_factory = None
+
 
 class MockDatabase(SQLDatabase):
+    """
+    An SQLDatabase for testing which is kept in an in-memory SQLite database.
+    """
+
+    def __init__(self, max_special_resources: Dict[str, int] = None) -> None:
+        super().__init__(max_special_resources=max_special_resources, url="sqlite://")
+        self.session = self.scoped()
+        logger.info("connection to mock database")
+
+
+class PostgresMockDatabase(SQLDatabase):
+    """
+    An SQLDatabase for testing which is stored in a temporary PostgreSQL server.
+    Requires testing.postgresql and a local PostgreSQL installation.
+    """
 
     def __init__(self, max_special_resources: Dict[str, int] = None) -> None:
+        global _postgresql_factory
+        import testing.postgresql
+        if _postgresql_factory is None:
+            _postgresql_factory = testing.postgresql.PostgresqlFactory(cache_initialized_db=True)
         super().__init__(max_special_resources=max_special_resources)
-        self.postgresql = Postgresql()
+        self.postgresql = _postgresql_factory()
         # connect to PostgreSQL
         self.engine = create_engine(self.postgresql.url())
         self.scoped = scoped_session(sessionmaker(self.engine))
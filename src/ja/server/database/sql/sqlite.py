@@ -0,0 +1,20 @@
+from typing import Dict
+
+from ja.server.database.sql.database import SQLDatabase
+
+
+class SQLiteDatabase(SQLDatabase):
+    """
+    An SQLDatabase which is stored in an embedded SQLite database file, so that no database server is required.
+    """
+
+    def __init__(self, path: str = None, max_special_resources: Dict[str, int] = None):
+        """!
+        Create the SQLiteDatabase object and open the given database file, creating it if it does not exist yet.
+
+        @param path The path of the database file, or None to keep the database in memory. All sessions then share a
+        single connection, so a database in memory must only be used by one thread at a time.
+        @param max_special_resources Maximum available special resources on the server.
+        """
+        url = "sqlite://" if path is None else "sqlite:///%s" % path
+        super().__init__(max_special_resources=max_special_resources, url=url)
@@ -0,0 +1,261 @@
+from copy import copy
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ja.common.job import Job, JobStatus
+from ja.server.database.types.work_machine import WorkMachineState
+
+_FINISHED_STATES = [JobStatus.DONE, JobStatus.CRASHED, JobStatus.CANCELLED]
+
+
+class JobEvent:
+    """
+    An entry of the event log recording that a job entered a new status.
+    """
+
+    def __init__(self, time: datetime, job_uid: str, owner_id: int, machine_uid: Optional[str], status: JobStatus):
+        """!
+        @param time The date and time of the status change.
+        @param job_uid The UID of the job.
+        @param owner_id The ID of the owner of the job.
+        @param machine_uid The UID of the work machine the job was assigned to after the change, if any.
+        @param status The new status of the job.
+        """
+        self._time = time
+        self._job_uid = job_uid
+        self._owner_id = owner_id
+        self._machine_uid = machine_uid
+        self._status = status
+
+    def __eq__(self, o: object) -> bool:
+        if isinstance(o, JobEvent):
+            return self._time == o.time and self._job_uid == o.job_uid and self._owner_id == o.owner_id \
+                and self._machine_uid == o.machine_uid and self._status == o.status
+        return False
+
+    def __repr__(self) -> str:
+        return "JobEvent(%s, %s, %s)" % (self._time, self._job_uid, self._status.name)
+
+    @property
+    def time(self) -> datetime:
+        """!
+        @return The date and time of the status change.
+        """
+        return self._time
+
+    @property
+    def job_uid(self) -> str:
+        """!
+        @return The UID of the job.
+        """
+        return self._job_uid
+
+    @property
+    def owner_id(self) -> int:
+        """!
+        @return The ID of the owner of the job.
+        """
+        return self._owner_id
+
+    @property
+    def machine_uid(self) -> Optional[str]:
+        """!
+        @return The UID of the work machine the job was assigned to after the change, or None.
+        """
+        return self._machine_uid
+
+    @property
+    def status(self) -> JobStatus:
+        """!
+        @return The new status of the job.
+        """
+        return self._status
+
+
+class MachineEvent:
+    """
+    An entry of the event log recording that a work machine was added or entered a new state.
+    """
+
+    def __init__(self, time: datetime, machine_uid: str, state: WorkMachineState):
+        """!
+        @param time The date and time of the state change.
+        @param machine_uid The UID of the work machine.
+        @param state The new state of the work machine.
+        """
+        self._time = time
+        self._machine_uid = machine_uid
+        self._state = state
+
+    def __eq__(self, o: object) -> bool:
+        if isinstance(o, MachineEvent):
+            return self._time == o.time and self._machine_uid == o.machine_uid and self._state == o.state
+        return False
+
+    def __repr__(self) -> str:
+        return "MachineEvent(%s, %s, %s)" % (self._time, self._machine_uid, self._state.name)
+
+    @property
+    def time(self) -> datetime:
+        """!
+        @return The date and time of the state change.
+        """
+        return self._time
+
+    @property
+    def machine_uid(self) -> str:
+        """!
+        @return The UID of the work machine.
+        """
+        return self._machine_uid
+
+    @property
+    def state(self) -> WorkMachineState:
+        """!
+        @return The new state of the work machine.
+        """
+        return self._state
+
+
+class UtilizationRollup:
+    """
+    The utilization of one work machine by the jobs of one owner during one hour. Rollups are updated whenever a job
+    event is logged, so statistics over time never have to look at the jobs themselves.
+    """
+
+    Key = Tuple[datetime, Optional[str], int]
+
+    def __init__(self, hour: datetime, machine_uid: Optional[str], owner_id: int, jobs_started: int = 0,
+                 jobs_finished: int = 0, cpu_hours: float = 0, memory_hours: float = 0):
+        """!
+        @param hour The start of the hour.
+        @param machine_uid The UID of the work machine, or None for jobs which finished without ever being assigned.
+        @param owner_id The ID of the owner of the jobs.
+        @param jobs_started The amount of jobs started for the first time during the hour.
+        @param jobs_finished The amount of jobs which became DONE, CRASHED or CANCELLED during the hour.
+        @param cpu_hours The CPU threads used by running jobs during the hour, multiplied by hours.
+        @param memory_hours The memory in MB used by running jobs during the hour, multiplied by hours.
+        """
+        self._hour = hour
+        self._machine_uid = machine_uid
+        self._owner_id = owner_id
+        self.jobs_started = jobs_started
+        self.jobs_finished = jobs_finished
+        self.cpu_hours = cpu_hours
+        self.memory_hours = memory_hours
+
+    def __eq__(self, o: object) -> bool:
+        if isinstance(o, UtilizationRollup):
+            return self.key == o.key and self.jobs_started == o.jobs_started \
+                and self.jobs_finished == o.jobs_finished and abs(self.cpu_hours - o.cpu_hours) < 1e-6 \
+                and abs(self.memory_hours - o.memory_hours) < 1e-6
+        return False
+
+    def __repr__(self) -> str:
+        return "UtilizationRollup(%s, %s, %d, started=%d, finished=%d, cpu_hours=%f, memory_hours=%f)" % (
+            self._hour, self._machine_uid, self._owner_id, self.jobs_started, self.jobs_finished, self.cpu_hours,
+            self.memory_hours)
+
+    @property
+    def hour(self) -> datetime:
+        """!
+        @return The start of the hour.
+        """
+        return self._hour
+
+    @property
+    def machine_uid(self) -> Optional[str]:
+        """!
+        @return The UID of the work machine, or None.
+        """
+        return self._machine_uid
+
+    @property
+    def owner_id(self) -> int:
+        """!
+        @return The ID of the owner of the jobs.
+        """
+        return self._owner_id
+
+    @property
+    def key(self) -> Key:
+        """!
+        @return The hour, work machine and owner this rollup is for.
+        """
+        return self._hour, self._machine_uid, self._owner_id
+
+    def add(self, other: "UtilizationRollup") -> None:
+        """!
+        Add the counters of @other to the counters of this rollup.
+
+        @param other Another rollup.
+        """
+        self.jobs_started += other.jobs_started
+        self.jobs_finished += other.jobs_finished
+        self.cpu_hours += other.cpu_hours
+        self.memory_hours += other.memory_hours
+
+
+def start_of_hour(time: datetime) -> datetime:
+    """!
+    @param time A date and time.
+    @return The start of the hour @time is in.
+    """
+    return time.replace(minute=0, second=0, microsecond=0)
+
+
+def compute_rollups(job: Job, event: JobEvent, previous: Optional[JobEvent]) -> List[UtilizationRollup]:
+    """!
+    Compute the changes to the utilization rollups caused by a new job event.
+
+    A job counts as started when it becomes RUNNING for the first time and as finished when it becomes DONE, CRASHED
+    or CANCELLED. The resources of a job are accounted for when it stops running, split among the hours it has been
+    running in since the previous event. Jobs which were running before the event log existed are not accounted for.
+
+    @param job The job the event is for.
+    @param event The new event.
+    @param previous The event logged for the job before @event, or None if there is none.
+    @return The rollup increments, at most one per hour.
+    """
+    rollups: Dict[UtilizationRollup.Key, UtilizationRollup] = dict()
+
+    def rollup(hour: datetime, machine_uid: Optional[str]) -> UtilizationRollup:
+        key = (hour, machine_uid, event.owner_id)
+        if key not in rollups:
+            rollups[key] = UtilizationRollup(hour, machine_uid, event.owner_id)
+        return rollups[key]
+
+    previous_machine_uid = previous.machine_uid if previous is not None else None
+    if event.status == JobStatus.RUNNING and (previous is None or previous.status != JobStatus.PAUSED):
+        rollup(start_of_hour(event.time), event.machine_uid).jobs_started += 1
+    if previous is not None and previous.status == JobStatus.RUNNING and event.status != JobStatus.RUNNING:
+        cpu_threads = max(job.docker_constraints.cpu_threads, 0)
+        memory = max(job.docker_constraints.memory, 0)
+        start = previous.time
+        while start < event.time:
+            end = min(start_of_hour(start) + timedelta(hours=1), event.time)
+            hours = (end - start).total_seconds() / 3600
+            running = rollup(start_of_hour(start), previous_machine_uid)
+            running.cpu_hours += cpu_threads * hours
+            running.memory_hours += memory * hours
+            start = end
+    if event.status in _FINISHED_STATES:
+        machine_uid = event.machine_uid if event.machine_uid is not None else previous_machine_uid
+        rollup(start_of_hour(event.time), machine_uid).jobs_finished += 1
+    return list(rollups.values())
+
+
+def merge_rollups(rollups: Iterable[UtilizationRollup]) -> Dict[UtilizationRollup.Key, UtilizationRollup]:
+    """!
+    Add up the rollups for the same hour, work machine and owner, so that each of them is stored only once.
+
+    @param rollups Rollups or rollup increments, which are left unchanged.
+    @return The sums of the rollups by hour, work machine and owner.
+    """
+    merged: Dict[UtilizationRollup.Key, UtilizationRollup] = dict()
+    for rollup in rollups:
+        if rollup.key in merged:
+            merged[rollup.key].add(rollup)
+        else:
+            merged[rollup.key] = copy(rollup)
+    return merged
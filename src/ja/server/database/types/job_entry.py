@@ -1,6 +1,6 @@
 from datetime import datetime
 from copy import deepcopy
-from ja.common.job import Job
+from ja.common.job import Job, JobStatus
 from ja.server.database.types.work_machine import WorkMachine
 from typing import Dict, Optional
 
@@ -146,3 +146,35 @@ class DatabaseJobEntry:
     @assigned_machine.setter
     def assigned_machine(self, machine: WorkMachine) -> None:
         self._machine = machine
+
+    def update_status(self, status: JobStatus, now: datetime) -> bool:
+        """!
+        Change the status of the stored job and update the runtime statistics accordingly.
+
+        @param status The new status of the job.
+        @param now The date and time of the status change.
+        @return True if the status of the job changed, False otherwise.
+        """
+        old_status = self.job.status
+        if old_status == JobStatus.PAUSED and status != JobStatus.PAUSED:
+            self.statistics.paused_time = (now - self.statistics.time_started).seconds - self.statistics.running_time
+        # first start
+        elif old_status != JobStatus.RUNNING and status == JobStatus.RUNNING:
+            self.statistics.time_started = now
+        elif old_status == JobStatus.RUNNING and status != JobStatus.RUNNING:
+            self.statistics.running_time = (now - self.statistics.time_started).seconds - self.statistics.paused_time
+        if status != old_status:
+            self.job.status = status
+            return True
+        return False
+
+    def refresh_statistics(self, now: datetime) -> None:
+        """!
+        Bring the running or paused time of a currently running or paused job up to date.
+
+        @param now The current date and time.
+        """
+        if self.job.status is JobStatus.RUNNING:
+            self.statistics.running_time = (now - self.statistics.time_started).seconds - self.statistics.paused_time
+        if self.job.status is JobStatus.PAUSED:
+            self.statistics.paused_time = (now - self.statistics.time_started).seconds - self.statistics.running_time
@@ -0,0 +1,81 @@
+from threading import Lock
+from typing import Callable, Optional, Set, Tuple
+import time
+
+
+class UIDAllocator:
+    """
+    Allocates the UIDs of new jobs. A UID consists of the name of the job owner, the time of the allocation in
+    milliseconds since the epoch and a sequence number, for example "jdoe1593000000000042". The time and the sequence
+    number have a fixed width, so the UIDs of a user sort lexicographically in the order in which they were allocated,
+    which keeps range scans by submission time on the UID index.
+
+    The allocator is monotonic: every allocated UID is greater than all UIDs allocated before by the same allocator for
+    the same user, even if many UIDs are requested within one millisecond or the system clock is set back. If all
+    sequence numbers of a millisecond are used up, allocation continues with the next millisecond. Before the first UID
+    of a user is allocated, the allocator continues after the greatest UID already stored for the user, so this also
+    holds across restarts of the server.
+    """
+
+    SEQUENCE_DIGITS = 3
+    TIME_DIGITS = 13
+
+    def __init__(self, clock: Callable[[], float] = time.time,
+                 find_last_uid: Callable[[str], Optional[str]] = lambda username: None) -> None:
+        """!
+        @param clock Returns the current time in seconds since the epoch.
+        @param find_last_uid Returns the greatest stored UID within uid_range() of the given user, or None. It is
+        called once per user, before the first UID of the user is allocated.
+        """
+        self._clock = clock
+        self._find_last_uid = find_last_uid
+        self._lock = Lock()
+        self._last_millis = 0
+        self._last_sequence = -1
+        self._seeded_users: Set[str] = set()
+
+    @staticmethod
+    def uid_range(username: str) -> Tuple[str, str]:
+        """!
+        @param username The name of a user.
+        @return The smallest and the greatest UID which can be allocated for the user.
+        """
+        digits = UIDAllocator.TIME_DIGITS + UIDAllocator.SEQUENCE_DIGITS
+        return username + "0" * digits, username + "9" * digits
+
+    def _seed(self, username: str) -> None:
+        # Continues after the greatest UID stored for @username. Must be called with the lock held.
+        if username in self._seeded_users:
+            return
+        last_uid = self._find_last_uid(username)
+        self._seeded_users.add(username)
+        if last_uid is None or len(last_uid) != len(self.uid_range(username)[0]):
+            return
+        digits = last_uid[len(username):]
+        if not last_uid.startswith(username) or not digits.isdigit():
+            return
+        sequence_size: int = 10 ** UIDAllocator.SEQUENCE_DIGITS
+        last = self._last_millis * sequence_size + self._last_sequence
+        self._last_millis, self._last_sequence = divmod(max(last, int(digits)), sequence_size)
+
+    def _next(self, username: str) -> int:
+        # Returns the next slot, counting in sequence numbers since the epoch.
+        sequence_size: int = 10 ** UIDAllocator.SEQUENCE_DIGITS
+        with self._lock:
+            self._seed(username)
+            last = self._last_millis * sequence_size + self._last_sequence
+            slot = max(last + 1, int(self._clock() * 1000) * sequence_size)
+            self._last_millis, self._last_sequence = divmod(slot, sequence_size)
+        return slot
+
+    @staticmethod
+    def _format(username: str, slot: int) -> str:
+        millis, sequence = divmod(slot, 10 ** UIDAllocator.SEQUENCE_DIGITS)
+        return "%s%0*d%0*d" % (username, UIDAllocator.TIME_DIGITS, millis, UIDAllocator.SEQUENCE_DIGITS, sequence)
+
+    def allocate(self, username: str) -> str:
+        """!
+        @param username The name of the owner of the new job.
+        @return A new UID.
+        """
+        return self._format(username, self._next(username))
@@ -1,9 +1,21 @@
+from ja.common.message.base import Response
+from ja.common.message.worker import WorkerCommand
+from ja.common.message.worker_commands.cancel_job import CancelJobCommand
+from ja.common.message.worker_commands.pause_job import PauseJobCommand
+from ja.common.message.worker_commands.resume_job import ResumeJobCommand
+from ja.common.message.worker_commands.start_job import StartJobCommand
 from ja.common.job import JobStatus
+from ja.common.proxy.ssh import ISSHConnection
 from ja.server.database.database import ServerDatabase
 from ja.server.database.types.job_entry import DatabaseJobEntry
-from ja.server.database.types.work_machine import WorkMachine
-from ja.server.dispatcher.proxy_factory import WorkerProxyFactoryBase
-from typing import Dict, List
+from ja.server.database.types.work_machine import WorkMachine, WorkMachineState
+from ja.server.dispatcher.liveness import LivenessMonitor
+from ja.server.dispatcher.proxy_factory import ProxyUnavailableError, WorkerProxyFactoryBase
+from ja.server.proxy.proxy import IWorkerProxy
+from ja.server.scheduler.algorithm import get_allocation_for_job
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Dict, List, Optional
 from paramiko.ssh_exception import SSHException  # type: ignore
 
 import logging
@@ -12,19 +24,79 @@ logger = logging.getLogger(__name__)
 JobDistribution = ServerDatabase.JobDistribution
 
 
+class MachineDispatchResult:
+    """
+    The outcome of sending the commands of one dispatch cycle to one work machine.
+    """
+
+    def __init__(self, machine: WorkMachine):
+        """!
+        @param machine The work machine.
+        """
+        self.machine = machine
+        # The statuses of the jobs which the work machine is known to have applied.
+        self.statuses: Dict[str, JobStatus] = dict()
+        self.commands = 0
+        self.failures = 0
+        self.lost = False
+        self.duration = 0.0
+
+
+class DispatchCycle:
+    """
+    The latencies and failures of one call of Dispatcher.set_distribution().
+    """
+
+    def __init__(self, duration: float, results: List[MachineDispatchResult]):
+        """!
+        @param duration The time the whole cycle took, in seconds.
+        @param results The outcomes for the work machines which were contacted.
+        """
+        self.duration = duration
+        self.results = results
+
+    @property
+    def commands(self) -> int:
+        """!
+        @return The amount of commands sent to all work machines.
+        """
+        return sum(result.commands for result in self.results)
+
+    @property
+    def failures(self) -> int:
+        """!
+        @return The amount of commands which failed.
+        """
+        return sum(result.failures for result in self.results)
+
+
+class _MachineBatch:
+    def __init__(self, machine: WorkMachine):
+        self.machine = machine
+        self.proxy: Optional[IWorkerProxy] = None
+        self.entries: List[DatabaseJobEntry] = []
+
+
 class Dispatcher:
     """
     Represents the mediator between the Scheduler and the work machines.
     """
 
-    def __init__(self, proxy_factory: WorkerProxyFactoryBase):
+    def __init__(self, proxy_factory: WorkerProxyFactoryBase, max_workers: int = 32,
+                 liveness_monitor: LivenessMonitor = None):
         """!
         Constructor for the dispatcher class.
         @param proxy_factory The proxy factory to use to create WorkerProxies
+        @param max_workers The maximum amount of work machines contacted at the same time.
+        @param liveness_monitor The monitor to ask whether a work machine is reachable. Without a monitor, every work
+        machine is pinged in every call of set_distribution().
         """
         self._proxy_factory = proxy_factory
+        self._max_workers = max_workers
+        self._liveness_monitor = liveness_monitor
         self._previous_statuses: Dict[str, JobStatus] = dict()
         self._lost_work_machines: List[WorkMachine] = []
+        self._last_cycle: Optional[DispatchCycle] = None
 
     _job_status_order = [JobStatus.QUEUED, JobStatus.CANCELLED, JobStatus.PAUSED, JobStatus.RUNNING]
 
@@ -42,14 +114,16 @@ class Dispatcher:
         """!
         Distributes the newly added jobs to the work machines.
         and potentially pauses jobs that need to be paused.
+        The commands are grouped by work machine and the work machines are contacted in parallel. All commands for
+        one work machine are sent as one batch and executed in order: first cancellations, then pauses, and finally
+        starts.
 
         @param job_distribution the new job distribution.
         @return a list of all work machines that the server has lost connection to.
         """
         logger.debug("Dispatching jobs")
-        new_statuses: Dict[str, JobStatus] = dict()
-
-        self._lost_work_machines.clear()
+        started = perf_counter()
+        batches: Dict[str, _MachineBatch] = dict()
         for job_entry in sorted(job_distribution, key=self._sort_key_function):
             job = job_entry.job
             if job.status == JobStatus.QUEUED:
@@ -57,47 +131,216 @@ class Dispatcher:
                 continue
 
             work_machine = job_entry.assigned_machine
-            proxy = self._proxy_factory.get_proxy(work_machine)
+            batch = batches.get(work_machine.uid, None)
+            if batch is None:
+                batch = _MachineBatch(work_machine)
+                batches[work_machine.uid] = batch
+            batch.entries.append(job_entry)
 
-            logger.debug("Job %s with status %s on %s." % (job.uid, job.status.name, work_machine.uid))
-            proxy = self._proxy_factory.get_proxy(work_machine)
-            try:
-                proxy.check_connection()
-            except SSHException:
-                self._timeout(job_entry)
-            previous_status = self._previous_statuses.get(job.uid, None)
-            if previous_status is None or job.status != previous_status:
-                try:
-                    if job.status == JobStatus.RUNNING:
-                        if previous_status is None or previous_status == JobStatus.QUEUED:
-                            proxy.dispatch_job(job)
-                        elif previous_status == JobStatus.PAUSED:
-                            proxy.resume_job(job.uid)
-                        new_statuses[job.uid] = job.status
-                    elif job.status == JobStatus.CANCELLED:
-                        proxy.cancel_job(job.uid)  # Do not add job back to self._previous_statuses
-                    elif job.status == JobStatus.PAUSED:
-                        proxy.pause_job(job.uid)
-                        new_statuses[job.uid] = job.status
-                    else:
-                        raise ValueError("Received unexpected state %s for job with UID %s." %
-                                         (job.status.name, job.uid))
-                except SSHException:
-                    self._timeout(job_entry)
-            else:
-                # If the job status hasn't changed, try to ping the machine to make sure it is not dead.
-                try:
-                    proxy.check_connection()
-                    new_statuses[job.uid] = job.status
-                except SSHException:
-                    self._timeout(job_entry)
+        results: List[MachineDispatchResult]
+        if len(batches) > 1 and self._max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self._max_workers, len(batches)),
+                                    thread_name_prefix="dispatcher") as executor:
+                results = list(executor.map(self._dispatch_batch, batches.values()))
+        else:
+            results = [self._dispatch_batch(batch) for batch in batches.values()]
 
+        new_statuses: Dict[str, JobStatus] = dict()
+        self._lost_work_machines.clear()
+        for result in results:
+            new_statuses.update(result.statuses)
+            if result.lost:
+                logger.error("Lost connection to Work machine with id %s." % result.machine.uid)
+                self._lost_work_machines.append(result.machine)
+                if self._liveness_monitor is not None:
+                    self._liveness_monitor.forget(result.machine.uid)
+            if result.failures > 0:
+                logger.warning("%d of %d commands to work machine %s failed." %
+                               (result.failures, result.commands, result.machine.uid))
+        if self._liveness_monitor is not None:
+            # Lost work machines without jobs to dispatch are reported as well, so that they are taken offline.
+            reported = {machine.uid for machine in self._lost_work_machines}
+            for machine in self._liveness_monitor.lost_machines():
+                if machine.uid not in reported:
+                    logger.error("Lost connection to Work machine with id %s." % machine.uid)
+                    self._lost_work_machines.append(machine)
+                    self._liveness_monitor.forget(machine.uid)
         self._previous_statuses = new_statuses
+        self._last_cycle = DispatchCycle(perf_counter() - started, results)
+        if self._last_cycle.commands > 0:
+            logger.info("Dispatched %d commands to %d work machines in %.1f ms." %
+                        (self._last_cycle.commands, len(results), 1000 * self._last_cycle.duration))
         return self._lost_work_machines
 
-    def _timeout(self, entry: DatabaseJobEntry) -> None:
-        if any(machine.uid == entry.assigned_machine.uid for machine in self._lost_work_machines):
-            return
+    def _dispatch_batch(self, batch: "_MachineBatch") -> "MachineDispatchResult":
+        result = MachineDispatchResult(batch.machine)
+        started = perf_counter()
+        try:
+            proxy = batch.proxy = self._proxy_factory.get_proxy(batch.machine)
+        except ProxyUnavailableError as e:
+            logger.warning(str(e))
+            result.lost = True
+            result.duration = perf_counter() - started
+            return result
+        monitor = self._liveness_monitor
+        connected = self._check_connection(batch)
+        if not connected:
+            result.lost = True
+        commands: List[WorkerCommand] = []
+        # The UIDs of the jobs the commands are for, in the same order.
+        command_jobs: List[str] = []
+        # The statuses to remember once the commands were applied.
+        changed_statuses: Dict[str, JobStatus] = dict()
+        for job_entry in batch.entries:
+            job = job_entry.job
+            logger.debug("Job %s with status %s on %s." % (job.uid, job.status.name, batch.machine.uid))
+            previous_status = self._previous_statuses.get(job.uid, None)
+            if previous_status is None or job.status != previous_status:
+                if job.status == JobStatus.RUNNING:
+                    if previous_status is None or previous_status == JobStatus.QUEUED:
+                        commands.append(StartJobCommand(job))
+                        command_jobs.append(job.uid)
+                    elif previous_status == JobStatus.PAUSED:
+                        commands.append(ResumeJobCommand(job.uid))
+                        command_jobs.append(job.uid)
+                    changed_statuses[job.uid] = job.status
+                elif job.status == JobStatus.CANCELLED:
+                    commands.append(CancelJobCommand(job.uid))  # Do not add job back to self._previous_statuses
+                    command_jobs.append(job.uid)
+                elif job.status == JobStatus.PAUSED:
+                    commands.append(PauseJobCommand(job.uid))
+                    command_jobs.append(job.uid)
+                    changed_statuses[job.uid] = job.status
+                else:
+                    raise ValueError("Received unexpected state %s for job with UID %s." %
+                                     (job.status.name, job.uid))
+            elif connected:
+                # The status has not changed and the work machine is still reachable.
+                result.statuses[job.uid] = job.status
+
+        result.commands = len(commands)
+        responses: List[Response] = []
+        try:
+            if commands:
+                # Several commands are sent to the work machine as one batch.
+                responses = proxy.execute_batch(commands)
+        except SSHException:
+            result.failures = len(commands)
+            result.lost = True
+            # The connection is probably broken, the next cycle connects again.
+            self._proxy_factory.evict(batch.machine.uid)
+            if monitor is not None:
+                monitor.record_miss(batch.machine.uid)
+        else:
+            received = False
+            # Commands without a Response have failed as well.
+            result.failures = len(commands) - len(responses)
+            for job_uid, response in zip(command_jobs, responses):
+                if response.result_string != ISSHConnection.RESPONSE_FAILED_COMMUNICATION:
+                    received = True
+                if not response.is_success:
+                    logger.warning("Work machine %s failed a command for job %s: %s" %
+                                   (batch.machine.uid, job_uid, response.result_string))
+                    result.failures += 1
+                    # The command is sent again in the next cycle.
+                    changed_statuses.pop(job_uid, None)
+            for job_uid in command_jobs[len(responses):]:
+                changed_statuses.pop(job_uid, None)
+            result.statuses.update(changed_statuses)
+            if monitor is not None and commands:
+                if received:
+                    monitor.record_heartbeat(batch.machine.uid)
+                else:
+                    monitor.record_miss(batch.machine.uid)
+        result.duration = perf_counter() - started
+        return result
+
+    def _check_connection(self, batch: "_MachineBatch") -> bool:
+        monitor = self._liveness_monitor
+        if monitor is not None:
+            monitor.watch(batch.machine)
+            alive = monitor.is_alive(batch.machine.uid)
+            if alive is not None:
+                return alive
+        # Nothing recent is known about the work machine, so it is pinged now.
+        assert batch.proxy is not None
+        try:
+            batch.proxy.check_connection()
+        except SSHException:
+            self._proxy_factory.evict(batch.machine.uid)
+            if monitor is not None:
+                monitor.record_miss(batch.machine.uid)
+            return False
+        if monitor is not None:
+            monitor.record_heartbeat(batch.machine.uid)
+        return True
+
+    @property
+    def last_cycle(self) -> Optional["DispatchCycle"]:
+        """!
+        @return The latencies and failures of the last call of set_distribution(), or None if there was none.
+        """
+        return self._last_cycle
+
+    def reconcile(self, database: ServerDatabase) -> None:
+        """!
+        Re-adopt the jobs which kept running on the work machines while the server was down.
+        Every known work machine is asked for the jobs it holds. Running and paused jobs which are still held by their
+        work machine keep their assignment, and the resources of the work machines are recalculated from them. Jobs
+        which finished in the meantime get their final status, all other running and paused jobs are marked as
+        crashed. Work machines which cannot be reached are set offline. All changes are written back to the database
+        in a single transaction.
+
+        @param database The database to reconcile.
+        """
+        machines = database.get_work_machines()
+        reports: Dict[str, Dict[str, JobStatus]] = dict()
+        for machine in machines:
+            try:
+                reports[machine.uid] = self._proxy_factory.get_proxy(machine).report_jobs()
+            except Exception as e:
+                logger.error("Could not get the jobs of work machine with id %s: %s" % (machine.uid, e))
+                machine.state = WorkMachineState.OFFLINE
+            machine.resources.deallocate(machine.resources.total_resources - machine.resources.free_resources)
+        reachable_machines = {machine.uid: machine for machine in machines if machine.uid in reports}
+
+        reconciled_entries: JobDistribution = []
+        for job_entry in database.get_current_schedule():
+            job = job_entry.job
+            if job.status not in [JobStatus.RUNNING, JobStatus.PAUSED]:
+                continue
+            machine = None
+            reported_status = None
+            if job_entry.assigned_machine is not None:
+                machine = reachable_machines.get(job_entry.assigned_machine.uid, None)
+            if machine is not None:
+                reported_status = reports[machine.uid].pop(job.uid, None)
+
+            if reported_status in [JobStatus.RUNNING, JobStatus.PAUSED]:
+                logger.info("Adopting job %s with status %s on %s." % (job.uid, reported_status.name, machine.uid))
+                if job.status != reported_status:
+                    job.status = reported_status
+                machine.resources.allocate(get_allocation_for_job(job))
+                self._previous_statuses[job.uid] = job.status
+                reconciled_entries.append(DatabaseJobEntry(job, job_entry.statistics, machine))
+            else:
+                job.status = reported_status if reported_status in [JobStatus.DONE, JobStatus.CRASHED] \
+                    else JobStatus.CRASHED
+                logger.info("Job %s was lost, setting status %s." % (job.uid, job.status.name))
+                reconciled_entries.append(DatabaseJobEntry(job, job_entry.statistics, None))
+
+        # Whatever is left in the reports is not supposed to run anymore, e.g. because it was cancelled.
+        for uid, report in reports.items():
+            for job_uid, status in report.items():
+                if status in [JobStatus.RUNNING, JobStatus.PAUSED]:
+                    logger.info("Cancelling unknown job %s on %s." % (job_uid, uid))
+                    try:
+                        self._proxy_factory.get_proxy(reachable_machines[uid]).cancel_job(job_uid)
+                    except Exception as e:
+                        logger.error("Could not cancel unknown job %s on %s: %s" % (job_uid, uid, e))
 
-        logger.error("Lost connection to Work machine with id %s." % entry.assigned_machine.uid)
-        self._lost_work_machines.append(entry.assigned_machine)
+        for machine in machines:
+            if machine.state is WorkMachineState.RETIRED \
+                    and machine.resources.free_resources == machine.resources.total_resources:
+                machine.state = WorkMachineState.OFFLINE
+        database.apply_schedule(reconciled_entries, machines)
@@ -0,0 +1,208 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Callable, Dict, List, Optional
+
+from ja.server.database.types.work_machine import WorkMachine
+from ja.server.dispatcher.proxy_factory import WorkerProxyFactoryBase
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class MachineHealth:
+    """
+    What the LivenessMonitor knows about one work machine.
+    """
+
+    def __init__(self, machine: WorkMachine):
+        """!
+        @param machine The work machine.
+        """
+        self.machine = machine
+        # The monotonic time of the last successful contact, None if there was none yet.
+        self.last_seen: Optional[float] = None
+        # The amount of pings which failed since the last successful contact.
+        self.missed = 0
+
+
+class LivenessMonitor:
+    """
+    Keeps track of which work machines are reachable, so that the Dispatcher does not have to ping every work machine
+    in every scheduling cycle. Every watched work machine is pinged in the background at a fixed interval; every
+    successful command sent to a work machine counts as a heartbeat as well. A work machine is considered alive for
+    a while after its last heartbeat, and lost after a number of consecutive missed pings. Work machines which are
+    lost by a round of pings are reported to the lost callback, so that the server does not have to wait for the next
+    scheduling cycle to notice them.
+    """
+
+    def __init__(self, proxy_factory: WorkerProxyFactoryBase, interval: float = 30, ttl: float = None,
+                 max_missed: int = 3, max_workers: int = 32, clock: Callable[[], float] = monotonic):
+        """!
+        Create a monitor. The background thread is only started by start(), before that, machines are pinged by calling
+        ping_all().
+
+        @param proxy_factory The proxy factory to get the proxies to ping the work machines with.
+        @param interval The time between two pings of a work machine, in seconds.
+        @param ttl The time a heartbeat is trusted for, in seconds. Twice the interval by default.
+        @param max_missed The amount of consecutive failed pings after which a work machine is lost.
+        @param max_workers The maximum amount of work machines pinged at the same time.
+        @param clock Returns the current time in seconds.
+        """
+        if interval <= 0 or max_missed < 1 or max_workers < 1:
+            raise ValueError("The interval, the amount of missed pings and the amount of workers must be positive.")
+        self._proxy_factory = proxy_factory
+        self._interval = interval
+        self._ttl = ttl if ttl is not None else 2 * interval
+        self._max_missed = max_missed
+        self._max_workers = max_workers
+        self._clock = clock
+        self._lock = Lock()
+        self._health: Dict[str, MachineHealth] = dict()
+        self._lost_callback: Optional[Callable[[List[WorkMachine]], None]] = None
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def interval(self) -> float:
+        """!
+        @return The time between two pings of a work machine, in seconds.
+        """
+        return self._interval
+
+    def start(self) -> None:
+        """!
+        Start pinging the watched work machines in the background.
+        """
+        if self._thread is not None:
+            return
+        self._thread = Thread(target=self._monitor_thread, name="liveness-monitor")
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """!
+        Stop pinging the work machines. A round of pings in progress is finished first.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def set_lost_callback(self, callback: Optional[Callable[[List[WorkMachine]], None]]) -> None:
+        """!
+        Set a function which is called with the work machines which were lost by a round of pings.
+
+        @param callback The callback, None to report lost work machines to nobody.
+        """
+        self._lost_callback = callback
+
+    def watch(self, machine: WorkMachine) -> None:
+        """!
+        Start monitoring a work machine. Nothing happens if it is already monitored.
+
+        @param machine The work machine.
+        """
+        with self._lock:
+            if machine.uid not in self._health:
+                self._health[machine.uid] = MachineHealth(machine)
+
+    def forget(self, uid: str) -> None:
+        """!
+        Stop monitoring a work machine, for example because it is offline.
+
+        @param uid The UID of the work machine.
+        """
+        with self._lock:
+            self._health.pop(uid, None)
+
+    def record_heartbeat(self, uid: str) -> None:
+        """!
+        Record a successful contact with a work machine.
+
+        @param uid The UID of the work machine.
+        """
+        with self._lock:
+            health = self._health.get(uid, None)
+            if health is not None:
+                health.last_seen = self._clock()
+                health.missed = 0
+
+    def record_miss(self, uid: str) -> None:
+        """!
+        Record a failed contact with a work machine. Its last heartbeat is no longer trusted.
+
+        @param uid The UID of the work machine.
+        """
+        with self._lock:
+            health = self._health.get(uid, None)
+            if health is not None:
+                health.last_seen = None
+                health.missed += 1
+
+    def is_alive(self, uid: str) -> Optional[bool]:
+        """!
+        @param uid The UID of a work machine.
+        @return True if a heartbeat of the work machine was recorded recently, False if it has missed too many pings
+        and None if its state is unknown, because it is not watched or its last heartbeat has expired.
+        """
+        with self._lock:
+            health = self._health.get(uid, None)
+            if health is None:
+                return None
+            if health.missed >= self._max_missed:
+                return False
+            if health.last_seen is not None and self._clock() - health.last_seen <= self._ttl:
+                return True
+            return None
+
+    def lost_machines(self) -> List[WorkMachine]:
+        """!
+        @return The watched work machines which have missed too many pings.
+        """
+        with self._lock:
+            return [health.machine for health in self._health.values() if health.missed >= self._max_missed]
+
+    def _ping(self, machine: WorkMachine) -> None:
+        try:
+            self._proxy_factory.get_proxy(machine).check_connection()
+        except Exception as e:
+            logger.warning("Work machine %s did not answer a ping: %s" % (machine.uid, e))
+            self.record_miss(machine.uid)
+            # The next ping connects again.
+            self._proxy_factory.evict(machine.uid)
+        else:
+            self.record_heartbeat(machine.uid)
+
+    def ping_all(self) -> None:
+        """!
+        Ping all watched work machines at once, except for those which have sent a heartbeat within the last interval
+        anyway.
+        """
+        now = self._clock()
+        with self._lock:
+            machines = [health.machine for health in self._health.values()
+                        if health.last_seen is None or now - health.last_seen >= self._interval]
+        if not machines:
+            return
+        already_lost = {machine.uid for machine in self.lost_machines()}
+        if len(machines) == 1 or self._max_workers == 1:
+            for machine in machines:
+                self._ping(machine)
+        else:
+            with ThreadPoolExecutor(max_workers=min(self._max_workers, len(machines)),
+                                    thread_name_prefix="liveness") as executor:
+                list(executor.map(self._ping, machines))
+        lost = [machine for machine in self.lost_machines() if machine.uid not in already_lost]
+        callback = self._lost_callback
+        if lost and callback is not None:
+            logger.error("Lost connection to work machines %s." % ", ".join(machine.uid for machine in lost))
+            callback(lost)
+
+    def _monitor_thread(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            try:
+                self.ping_all()
+            except Exception as e:
+                logger.error("Failed to ping the work machines.")
+                logger.error(e)
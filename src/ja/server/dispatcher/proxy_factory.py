@@ -1,41 +1,206 @@
 from abc import ABC, abstractmethod
-from typing import Dict
+from threading import Lock, Semaphore
+from time import monotonic
+from typing import Callable, Dict, Optional, Set, Tuple
 
+from ja.common.proxy.ssh import SSHConfig
 from ja.server.database.database import ServerDatabase
 from ja.server.database.types.work_machine import WorkMachine
 from ja.server.proxy.proxy import IWorkerProxy, WorkerProxy
 
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ProxyUnavailableError(ConnectionError):
+    """
+    Raised if no proxy could be created for a work machine, because connecting to it failed now or a short time ago.
+    """
+
+
+class ProxyPoolMetrics:
+    """
+    Counts how often the proxies of a WorkerProxyFactoryBase are created and closed.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._counts: Dict[str, int] = dict(created=0, reconnected=0, failed=0, backed_off=0, evicted_idle=0,
+                                            evicted_unhealthy=0, evicted_config=0, evicted=0)
+
+    def count(self, event: str) -> None:
+        """!
+        @param event The name of the event, one of the keys of snapshot().
+        """
+        with self._lock:
+            self._counts[event] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """!
+        @return How often proxies were created, recreated for a work machine which had a proxy before, failed to be
+        created, refused to be created because of a recent failure, and closed because they were idle, unhealthy,
+        outdated or evicted explicitly.
+        """
+        with self._lock:
+            return dict(self._counts)
+
 
 class WorkerProxyFactoryBase(ABC):
     """
     An abstract base class for a factory for creating and managing WorkerProxies.
+    The factory keeps one proxy per work machine and reuses it as long as its connection is healthy. Proxies which have
+    not been used for a while, whose connection has broken or whose work machine has a new SSH config are closed and
+    created again on demand. After a failed attempt to connect to a work machine, further attempts are refused for an
+    exponentially growing time, and only a limited amount of connections is set up at the same time.
     """
 
-    def __init__(self, database: ServerDatabase):
+    def __init__(self, database: ServerDatabase, idle_timeout: float = 600, max_concurrent_connects: int = 8,
+                 backoff_base: float = 1, backoff_max: float = 300, clock: Callable[[], float] = monotonic):
         """!
         Create a new WorkerProxyFactory.
 
         @param database The database to update when a connection terminates.
+        @param idle_timeout The time after which an unused proxy is closed, in seconds.
+        @param max_concurrent_connects The maximum amount of proxies created at the same time.
+        @param backoff_base The time to wait after the first failed attempt to connect to a work machine, in seconds.
+        The time is doubled after every further failure.
+        @param backoff_max The maximum time to wait after a failed attempt to connect, in seconds.
+        @param clock Returns the current time in seconds.
         """
         self._database = database
         self._proxy_dict: Dict[str, IWorkerProxy] = dict()
+        self._idle_timeout = idle_timeout
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._clock = clock
+        self._metrics = ProxyPoolMetrics()
+        self._lock = Lock()
+        self._connect_semaphore = Semaphore(max_concurrent_connects)
+        # Serializes the creation of the proxy for one work machine.
+        self._machine_locks: Dict[str, Lock] = dict()
+        self._last_used: Dict[str, float] = dict()
+        self._ssh_configs: Dict[str, SSHConfig] = dict()
+        # The amount of consecutive failed attempts to connect and the time of the next allowed attempt.
+        self._failures: Dict[str, Tuple[int, float]] = dict()
+        self._known_machines: Set[str] = set()
+        self._last_sweep = clock()
 
     @abstractmethod
     def _create_proxy(self, work_machine: WorkMachine) -> IWorkerProxy:
         pass
 
+    @property
+    def metrics(self) -> ProxyPoolMetrics:
+        """!
+        @return The counters of created and closed proxies.
+        """
+        return self._metrics
+
     def get_proxy(self, work_machine: WorkMachine) -> IWorkerProxy:
         """!
         Get a valid proxy for the given @work_machine.
         @work_machine must be online, otherwise a runtime exception is thrown.
 
         @param work_machine The work machine to get a proxy for.
+        @raise ProxyUnavailableError If connecting to the work machine failed.
+        """
+        now = self._clock()
+        if now - self._last_sweep >= self._idle_timeout / 10:
+            self.evict_idle()
+        proxy = self._get_cached_proxy(work_machine, now)
+        if proxy is not None:
+            return proxy
+
+        with self._lock:
+            machine_lock = self._machine_locks.setdefault(work_machine.uid, Lock())
+        with machine_lock:
+            # Another thread might have created the proxy in the meantime.
+            proxy = self._get_cached_proxy(work_machine, now)
+            if proxy is not None:
+                return proxy
+            with self._lock:
+                attempts, next_attempt = self._failures.get(work_machine.uid, (0, now))
+            if now < next_attempt:
+                self._metrics.count("backed_off")
+                raise ProxyUnavailableError("Not connecting to work machine %s again for %.0f seconds." %
+                                            (work_machine.uid, next_attempt - now))
+            try:
+                with self._connect_semaphore:
+                    proxy = self._create_proxy(work_machine)
+            except Exception as e:
+                delay = min(self._backoff_max, self._backoff_base * 2 ** attempts)
+                with self._lock:
+                    self._failures[work_machine.uid] = (attempts + 1, self._clock() + delay)
+                self._metrics.count("failed")
+                raise ProxyUnavailableError("Could not connect to work machine %s: %s" % (work_machine.uid, e)) \
+                    from e
+            with self._lock:
+                self._failures.pop(work_machine.uid, None)
+                self._proxy_dict[work_machine.uid] = proxy
+                self._ssh_configs[work_machine.uid] = work_machine.ssh_config
+                self._last_used[work_machine.uid] = self._clock()
+                reconnected = work_machine.uid in self._known_machines
+                self._known_machines.add(work_machine.uid)
+            self._metrics.count("reconnected" if reconnected else "created")
+            return proxy
+
+    def _get_cached_proxy(self, work_machine: WorkMachine, now: float) -> Optional[IWorkerProxy]:
+        with self._lock:
+            proxy = self._proxy_dict.get(work_machine.uid, None)
+            if proxy is None:
+                return None
+            ssh_config = self._ssh_configs.get(work_machine.uid, work_machine.ssh_config)
+            if ssh_config != work_machine.ssh_config:
+                reason = "evicted_config"
+            elif not proxy.is_connected():
+                reason = "evicted_unhealthy"
+            else:
+                self._last_used[work_machine.uid] = now
+                return proxy
+            self._remove(work_machine.uid)
+        self._metrics.count(reason)
+        self._close(work_machine.uid, proxy)
+        return None
+
+    def _remove(self, uid: str) -> Optional[IWorkerProxy]:
+        # Must be called while holding _lock.
+        self._last_used.pop(uid, None)
+        self._ssh_configs.pop(uid, None)
+        return self._proxy_dict.pop(uid, None)
+
+    @staticmethod
+    def _close(uid: str, proxy: IWorkerProxy) -> None:
+        try:
+            proxy.close_ssh_connection()
+        except Exception as e:
+            logger.warning("Failed to close the connection to work machine %s: %s" % (uid, e))
+
+    def evict(self, uid: str) -> None:
+        """!
+        Close the proxy for a work machine, for example because its connection has broken or because it went offline.
+        The next call of get_proxy() for it connects again.
+
+        @param uid The UID of the work machine.
+        """
+        with self._lock:
+            proxy = self._remove(uid)
+        if proxy is not None:
+            self._metrics.count("evicted")
+            self._close(uid, proxy)
+
+    def evict_idle(self) -> None:
+        """!
+        Close all proxies which have not been used for longer than the idle timeout.
         """
-        proxy = self._proxy_dict.get(work_machine.uid, None)
-        if proxy is None:
-            proxy = self._create_proxy(work_machine)
-            self._proxy_dict[work_machine.uid] = proxy
-        return proxy
+        now = self._clock()
+        with self._lock:
+            self._last_sweep = now
+            idle = [uid for uid, last_used in self._last_used.items() if now - last_used >= self._idle_timeout]
+            proxies = [(uid, self._remove(uid)) for uid in idle]
+        for uid, proxy in proxies:
+            if proxy is not None:
+                self._metrics.count("evicted_idle")
+                self._close(uid, proxy)
 
 
 class WorkerProxyFactory(WorkerProxyFactoryBase):
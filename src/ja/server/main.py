@@ -1,15 +1,25 @@
+from datetime import timedelta
+from typing import List, Optional
+from ja.common.async_core import AsyncDaemonCore
+from ja.common.identity import IdentityCache
 from ja.common.job import JobStatus
 from ja.server.config import ServerConfig
-from ja.server.database.sql.database import SQLDatabase
-from ja.server.database.types.work_machine import WorkMachineState
+from ja.server.database.archiver import JobArchiver
+from ja.server.database.async_database import AsyncServerDatabase
+from ja.server.database.backend import create_database
+from ja.server.database.database import ServerDatabase
+from ja.server.database.types.job_entry import DatabaseJobEntry
+from ja.server.database.types.work_machine import WorkMachine, WorkMachineState
 from ja.server.dispatcher.dispatcher import Dispatcher
+from ja.server.dispatcher.liveness import LivenessMonitor
 from ja.server.dispatcher.proxy_factory import WorkerProxyFactory, WorkerProxyFactoryBase
 from ja.server.email_notifier import EmailNotifier, BasicEmailServer
 from ja.server.scheduler.algorithm import SchedulingAlgorithm
 from ja.server.scheduler.default_algorithm import DefaultSchedulingAlgorithm
 from ja.server.scheduler.scheduler import Scheduler
+from ja.server.proxy.admission import AdmissionController
 from ja.server.proxy.command_handler import ServerCommandHandler
-from ja.server.web.api_server import StatisticsWebServer
+from ja.server.web.api_server import AsyncStatisticsWebServer, StatisticsWebServer
 
 import ja.server.scheduler.default_policies as dp
 
@@ -38,17 +48,30 @@ class JobCenter:
             logger.info("reading %s config file" % config_file)
             return ServerConfig.from_string(f.read())
 
-    def _cleanup(self) -> None:
-        for job in self._database.get_current_schedule():
-            if job.job.status in [JobStatus.RUNNING, JobStatus.PAUSED]:
-                job.job.status = JobStatus.CRASHED
-                self._database.update_job(job.job)
-                self._database.assign_job_machine(job.job, None)
+    @staticmethod
+    def crash_active_jobs(database: ServerDatabase) -> None:
+        """!
+        Mark all running and paused jobs as crashed and set all work machines offline.
+        The current state is loaded once and all changes are written back in a single transaction.
+
+        @param database The database to clean up.
+        """
+        crashed_entries: ServerDatabase.JobDistribution = []
+        for job_entry in database.get_current_schedule():
+            if job_entry.job.status in [JobStatus.RUNNING, JobStatus.PAUSED]:
+                job_entry.job.status = JobStatus.CRASHED
+                crashed_entries.append(DatabaseJobEntry(job_entry.job, job_entry.statistics, None))
 
-        for machine in self._database.get_work_machines():
+        machines = database.get_work_machines()
+        for machine in machines:
             machine.resources.deallocate(machine.resources.total_resources - machine.resources.free_resources)
             machine.state = WorkMachineState.OFFLINE
-            self._database.update_work_machine(machine)
+        database.apply_schedule(crashed_entries, machines)
+        logger.info("marked %d jobs as crashed and %d work machines as offline" %
+                    (len(crashed_entries), len(machines)))
+
+    def _cleanup(self) -> None:
+        self.crash_active_jobs(self._database)
 
     def __init__(self, config_file: str = "/etc/jobadder/server.conf",
                  socket_path: str = "/tmp/jobadder-server.socket", database_name: str = "jobadder") -> None:
@@ -56,24 +79,34 @@ class JobCenter:
         Initialize the JobAdder server daemon.
         This includes:
         1. Parsing the command line arguments and the configuration file.
-        2. Connecting to the configured database.
+        2. Connecting to the configured database and either re-adopting or crashing the jobs which were running when
+           the server stopped.
         3. Initializing the scheduler and the dispatcher.
-        4. Starting the web server and the email notifier.
+        4. Starting the web server, the email notifier and the job archiver.
         @param config_file: the configuration file to use.
         @param socket_path: the path to the unix named socket for the command handler to listen on.
         @param database_name: the name of the database to use.
         """
 
         config = self._read_config(config_file)
-        self._database = SQLDatabase(host=config.database_config.host,
-                                     port=config.database_config.port,
-                                     user=config.database_config.username,
-                                     password=config.database_config.password,
-                                     database_name=database_name,
-                                     max_special_resources=config.special_resources)
-        self._cleanup()
+        self._database = create_database(config.database_config, database_name=database_name,
+                                         max_special_resources=config.special_resources)
+        # Commands and reports access the database through a pool of threads which can use all of its connections.
+        database_config = config.database_config
+        self._async_database = AsyncServerDatabase(self._database,
+                                                   database_config.pool_size + database_config.max_overflow)
+        self._reconcile_jobs = config.reconcile_jobs
         proxy_factory = self._get_proxy_factory()
-        self._dispatcher = Dispatcher(proxy_factory)
+        if config.heartbeat_interval > 0:
+            self._liveness_monitor: Optional[LivenessMonitor] = LivenessMonitor(
+                proxy_factory, interval=config.heartbeat_interval, max_missed=config.heartbeat_misses)
+        else:
+            self._liveness_monitor = None
+        self._dispatcher = Dispatcher(proxy_factory, liveness_monitor=self._liveness_monitor)
+        if self._reconcile_jobs:
+            self._dispatcher.reconcile(self._database)
+        else:
+            self._cleanup()
         self._scheduler = Scheduler(self._init_algorithm(), self._dispatcher, config.special_resources)
 
         self._email = EmailNotifier(BasicEmailServer(config.email_config.host,
@@ -81,14 +114,58 @@ class JobCenter:
                                                      config.email_config.username,
                                                      config.email_config.password))
 
+        admission_config = config.admission_config
+        admission = AdmissionController(user_rate=admission_config.user_jobs_per_minute / 60,
+                                        user_burst=admission_config.user_burst,
+                                        global_rate=admission_config.global_jobs_per_minute / 60,
+                                        global_burst=admission_config.global_burst,
+                                        max_queued_jobs=admission_config.max_queued_jobs_per_user)
+
+        # Users are looked up by the command handler and the web server, which share the results.
+        identities = IdentityCache()
+        self._core: Optional[AsyncDaemonCore] = None
+        if config.event_loop:
+            # The timers and the reports of the WebAPI share the threads with the commands.
+            self._core = AsyncDaemonCore(max_workers=config.command_threads + 2)
+        self._web_server: Optional[StatisticsWebServer] = None
         if config.web_server_port > 0:
-            self._web_server = StatisticsWebServer("", config.web_server_port, self._database)
-        else:
-            self._web_server = None
+            if self._core is not None:
+                self._core.add_service(AsyncStatisticsWebServer("", config.web_server_port, self._async_database,
+                                                                admission, identities).serve)
+            else:
+                self._web_server = StatisticsWebServer("", config.web_server_port, self._database, admission,
+                                                       identities)
 
         self._database.set_scheduler_callback(self._scheduler.reschedule)
         self._database.set_job_status_callback(self._email.handle_job_status_updated)
-        self._handler = ServerCommandHandler(self._database, socket_path, config.admin_group)
+        self._handler = ServerCommandHandler(self._database, socket_path, config.admin_group, config.command_threads,
+                                             admission if admission.is_enabled else None, identities,
+                                             self._async_database)
+        if self._liveness_monitor:
+            self._liveness_monitor.set_lost_callback(self._handle_lost_machines)
+
+        if config.job_archive_days > 0:
+            self._archiver: Optional[JobArchiver] = JobArchiver(self._database, timedelta(days=config.job_archive_days),
+                                                                background=self._core is None,
+                                                                run_ordered=self._handler.run_ordered)
+        else:
+            self._archiver = None
+
+        if self._core is not None:
+            self._core.add_service(self._handler.serve)
+            if self._liveness_monitor:
+                self._core.add_timer(self._liveness_monitor.interval, self._liveness_monitor.ping_all, "liveness")
+            if self._archiver:
+                self._core.add_timer(self._archiver.interval, self._archiver.archive, "archiver")
+
+    def _handle_lost_machines(self, machines: List[WorkMachine]) -> None:
+        # Rescheduling takes the lost work machines offline and crashes their jobs right away.
+        def reschedule() -> None:
+            try:
+                self._scheduler.reschedule(self._database)
+            finally:
+                self._database.release_session()
+        self._handler.run_ordered(reschedule)
 
     def _get_proxy_factory(self) -> WorkerProxyFactoryBase:
         return WorkerProxyFactory(self._database)
@@ -97,10 +174,26 @@ class JobCenter:
         """!
         Run the main loop of the server daemon.
         """
-        logger.info("starting main loop")
-        self._handler.main_loop()
+        # The first scheduling cycle runs only now that the recovery of the database is complete, so that the jobs
+        # which were queued before the restart are not left waiting for the next change.
+        self._scheduler.reschedule(self._database)
+        if self._core is not None:
+            logger.info("starting event loop")
+            self._core.run()
+        else:
+            if self._liveness_monitor:
+                self._liveness_monitor.start()
+            logger.info("starting main loop")
+            self._handler.main_loop()
+        if self._liveness_monitor:
+            self._liveness_monitor.stop()
+        if self._archiver:
+            self._archiver.stop()
         # Cleanup, but don't invoke scheduler anymore.
         self._database.set_scheduler_callback(None)
-        self._cleanup()
+        if not self._reconcile_jobs:
+            # Otherwise the jobs keep running on the work machines and are re-adopted on the next start.
+            self._cleanup()
         if self._web_server:
             self._web_server.stop()
+        self._async_database.shutdown()
@@ -0,0 +1,184 @@
+"""
+Admission control for the commands which add jobs, so that a single user submitting jobs faster than they can be
+handled does not slow down the server for everyone else.
+"""
+from math import ceil
+from threading import Lock
+from time import monotonic
+from typing import Callable, Dict, Optional
+
+from ja.common.message.base import Response
+
+
+class TokenBucket:
+    """
+    Allows events at a given average rate, with bursts up to a given size. Not thread-safe.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = monotonic):
+        """!
+        @param rate The average amount of events allowed per second.
+        @param burst The maximum amount of events allowed at once.
+        @param clock Returns the current time in seconds.
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError("The rate and the burst size must be positive.")
+        self._rate = rate
+        self._burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(float(self._burst), self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """!
+        Take a token if one is available.
+
+        @return 0 if a token was taken, otherwise the time in seconds until the next token is available.
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self._rate
+
+    def give_back(self) -> None:
+        """!
+        Return a token taken by try_acquire(), for an event which did not happen after all.
+        """
+        self._tokens = min(float(self._burst), self._tokens + 1)
+
+    @property
+    def is_full(self) -> bool:
+        """!
+        @return True if a whole burst is available, so that the bucket does not need to be kept.
+        """
+        self._refill()
+        return self._tokens >= self._burst
+
+
+class AdmissionController:
+    """
+    Decides whether a command adding a job is accepted. A command is rejected if its user has exceeded the rate limit
+    for users, if all users together have exceeded the global rate limit, or if the user already has the maximum
+    amount of queued jobs. Rejections are fast and tell the user when to try again. Each limit is disabled if set to 0.
+    """
+
+    # Users whose buckets are full are forgotten once there are more buckets than this.
+    MAX_IDLE_BUCKETS = 1024
+    # The time after which a user with too many queued jobs is told to try again, in seconds. How long it takes until
+    # the jobs leave the queue is not known.
+    QUEUE_FULL_RETRY_AFTER = 60
+
+    def __init__(self, user_rate: float = 0, user_burst: int = 0, global_rate: float = 0, global_burst: int = 0,
+                 max_queued_jobs: int = 0, clock: Callable[[], float] = monotonic):
+        """!
+        @param user_rate The average amount of jobs a user may add per second.
+        @param user_burst The maximum amount of jobs a user may add at once, @user_rate rounded up by default.
+        @param global_rate The average amount of jobs all users together may add per second.
+        @param global_burst The maximum amount of jobs all users together may add at once, @global_rate rounded up by
+        default.
+        @param max_queued_jobs The maximum amount of queued jobs of a user.
+        @param clock Returns the current time in seconds.
+        """
+        if user_rate < 0 or user_burst < 0 or global_rate < 0 or global_burst < 0 or max_queued_jobs < 0:
+            raise ValueError("The limits of the admission control must not be negative.")
+        self._user_rate = user_rate
+        self._user_burst = user_burst or max(1, ceil(user_rate))
+        self._max_queued_jobs = max_queued_jobs
+        self._clock = clock
+        self._lock = Lock()
+        self._user_buckets: Dict[str, TokenBucket] = dict()
+        self._global_bucket: Optional[TokenBucket] = None
+        if global_rate > 0:
+            self._global_bucket = TokenBucket(global_rate, global_burst or max(1, ceil(global_rate)), clock)
+        self._counts: Dict[str, int] = dict(admitted=0, throttled_user_rate=0, throttled_global_rate=0,
+                                            rejected_queue_full=0)
+
+    @property
+    def is_enabled(self) -> bool:
+        """!
+        @return False if all limits are disabled.
+        """
+        return self._user_rate > 0 or self._global_bucket is not None or self._max_queued_jobs > 0
+
+    def _user_bucket(self, user: str) -> TokenBucket:
+        bucket = self._user_buckets.get(user, None)
+        if bucket is None:
+            if len(self._user_buckets) >= AdmissionController.MAX_IDLE_BUCKETS:
+                self._user_buckets = {name: bucket for name, bucket in self._user_buckets.items()
+                                      if not bucket.is_full}
+            bucket = self._user_buckets[user] = TokenBucket(self._user_rate, self._user_burst, self._clock)
+        return bucket
+
+    @staticmethod
+    def _reject(reason: str, retry_after: float) -> Response:
+        seconds = max(1, ceil(retry_after))
+        return Response("%s Try again in %d seconds." % (reason, seconds), False, retry_after=seconds)
+
+    def admit(self, user: str, count_queued_jobs: Callable[[], int]) -> Optional[Response]:
+        """!
+        Decide whether a command of a user adding a job is accepted.
+
+        @param user The name of the user sending the command.
+        @param count_queued_jobs Returns the amount of queued jobs of the user. Only called if needed.
+        @return None if the command is accepted, otherwise the Response rejecting it.
+        """
+        with self._lock:
+            user_bucket = self._user_bucket(user) if self._user_rate > 0 else None
+            if user_bucket is not None:
+                wait = user_bucket.try_acquire()
+                if wait > 0:
+                    self._counts["throttled_user_rate"] += 1
+                    return self._reject("Too many jobs added by user %s." % user, wait)
+            if self._global_bucket is not None:
+                wait = self._global_bucket.try_acquire()
+                if wait > 0:
+                    if user_bucket is not None:
+                        user_bucket.give_back()
+                    self._counts["throttled_global_rate"] += 1
+                    return self._reject("Too many jobs added on the server.", wait)
+        # Counting the jobs queries the database, which must not block the other users.
+        if self._max_queued_jobs > 0:
+            queued_jobs = count_queued_jobs()
+            if queued_jobs >= self._max_queued_jobs:
+                with self._lock:
+                    self._give_back(user)
+                    self._counts["rejected_queue_full"] += 1
+                return self._reject("User %s already has %d queued jobs, the maximum is %d."
+                                    % (user, queued_jobs, self._max_queued_jobs),
+                                    AdmissionController.QUEUE_FULL_RETRY_AFTER)
+        with self._lock:
+            self._counts["admitted"] += 1
+        return None
+
+    def _give_back(self, user: str) -> None:
+        # Must be called with the lock held.
+        user_bucket = self._user_buckets.get(user, None)
+        if user_bucket is not None:
+            user_bucket.give_back()
+        if self._global_bucket is not None:
+            self._global_bucket.give_back()
+
+    def give_back(self, user: str) -> None:
+        """!
+        Return the tokens taken for an accepted command which did not add a job after all, for example because it
+        could not be parsed or referenced a Dockerfile the server does not know, so that it does not count against the
+        rate limits.
+
+        @param user The name of the user who sent the command.
+        """
+        with self._lock:
+            self._give_back(user)
+
+    def snapshot(self) -> Dict[str, int]:
+        """!
+        @return How many commands were admitted, throttled by the rate limit for users, throttled by the global rate
+        limit and rejected because the user had too many queued jobs.
+        """
+        with self._lock:
+            return dict(self._counts)
@@ -3,15 +3,20 @@ This module contains classes and definitions related to handling
 ServerCommands.
 """
 
+from ja.common.async_core import AsyncDaemonCore
+from ja.common.identity import IdentityCache
 from ja.common.message.base import Response
 from ja.common.proxy.command_handler import CommandHandler
+from ja.server.database.async_database import AsyncServerDatabase
 from ja.server.database.database import ServerDatabase
-from typing import Dict, Type, cast
+from ja.server.proxy.admission import AdmissionController
+from typing import Any, Callable, Dict, Optional, Type, TypeVar, cast
 
 from ja.worker.message.base import WorkerServerCommand
 from ja.worker.message.register import RegisterWorkerCommand
 from ja.worker.message.done import JobDoneCommand
 from ja.worker.message.crashed import JobCrashedCommand
+from ja.worker.message.events import JobEventsCommand
 from ja.worker.message.retire import RetireWorkerCommand
 
 from ja.common.message.server import ServerCommand
@@ -20,24 +25,41 @@ from ja.user.message.add import AddCommand
 from ja.user.message.query import QueryCommand
 from ja.user.message.cancel import CancelCommand
 
-import pwd
 import logging
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class ServerCommandHandler(CommandHandler):
     """
     ServerCommandHandler receives ServerMessages and performs the corresponding
     actions on the server.
+    Commands access the database through an AsyncServerDatabase: when the handler is served by an event loop, the
+    Commands are handled on its pool of database threads instead of the thread pool of the core, otherwise the
+    handler threads hand the execution of the Commands to it.
     """
-    def __init__(self, database: ServerDatabase, socket_path: str, admin_group: str):
+    def __init__(self, database: ServerDatabase, socket_path: str, admin_group: str, max_workers: int = 8,
+                 admission: AdmissionController = None, identities: IdentityCache = None,
+                 async_database: AsyncServerDatabase = None):
         """!
         @param database The server database.
         @param socket_path: the path to the unix named socket to listen on.
         @param admin_group: the Unix group to grant administrative privileges to.
+        @param max_workers: the maximum amount of commands handled at the same time.
+        @param admission: decides whether commands adding jobs are accepted. All commands are accepted if None.
+        @param identities: the cache for looking up users and groups. A new one is created if None.
+        @param async_database: the access to @database shared with the rest of the server. A new one with
+        @max_workers threads is created if None.
         """
-        super().__init__(socket_path, admin_group)
+        super().__init__(socket_path, admin_group, max_workers, identities=identities)
         self._database = database
+        self._async_database = async_database if async_database is not None \
+            else AsyncServerDatabase(database, max_workers)
+        self._admission = admission
+
+    # Queries only read the database, all other commands change it and are executed one after another.
+    _unordered_commands = {"QueryCommand"}
 
     _user_commands = {
         "AddCommand": AddCommand,
@@ -49,13 +71,14 @@ class ServerCommandHandler(CommandHandler):
         "RegisterWorkerCommand": RegisterWorkerCommand,
         "JobDoneCommand": JobDoneCommand,
         "JobCrashedCommand": JobCrashedCommand,
+        "JobEventsCommand": JobEventsCommand,
         "RetireWorkerCommand": RetireWorkerCommand,
     }
 
     def _execute_command(self, command: ServerCommand) -> Dict[str, object]:
         logger.info("executing %s command" % type(command).__name__)
         logger.debug(str(command))
-        r_dict = command.execute(self._database)
+        r_dict = self._async_database.call(command.execute, self._database)
         logger.info("Command executed successfully: %s" % r_dict.is_success)
         logger.debug("Response: %s" % str(r_dict))
         return r_dict.to_dict()
@@ -71,15 +94,42 @@ class ServerCommandHandler(CommandHandler):
         worker_command: WorkerServerCommand = cast(WorkerServerCommand, command)
         return self._execute_command(worker_command)
 
+    def _count_queued_jobs(self, user: str) -> int:
+        return self._async_database.call(self._database.count_queued_jobs, self._identities.uid(user))
+
+    async def _run_blocking(self, core: AsyncDaemonCore, function: Callable[..., T], *args: Any) -> T:
+        return await self._async_database.run(function, *args)
+
+    def _admit(self, type_name: str, username: str) -> Optional[Response]:
+        if type_name != "AddCommand" or self._admission is None:
+            return None
+        # Checked before the command is even parsed, so that a flood of commands stays cheap.
+        rejection = self._admission.admit(username, lambda: self._count_queued_jobs(username))
+        if rejection is not None:
+            logger.info("rejected %s of user %s: %s" % (type_name, username, rejection.result_string))
+        return rejection
+
+    def _give_back_admission(self, type_name: str, username: str) -> None:
+        # A rejected command did not add a job, for example one referencing an unknown Dockerfile is sent again with it.
+        if type_name == "AddCommand" and self._admission is not None:
+            self._admission.give_back(username)
+
     def _process_user_message(self, command_dict: Dict[str, object], type_name: str, user: str) -> Dict[str, object]:
         if type_name not in self._user_commands:
             return None
 
-        command = cast(Type[UserServerCommand], self._user_commands[type_name]).from_dict(command_dict)
-        user_command: UserServerCommand = cast(UserServerCommand, command)
-        user_command.effective_user = pwd.getpwnam(user).pw_uid
-        user_command.effective_user_is_admin = self._user_is_admin(user)
-        return self._execute_command(user_command)
+        try:
+            command = cast(Type[UserServerCommand], self._user_commands[type_name]).from_dict(command_dict)
+            user_command: UserServerCommand = cast(UserServerCommand, command)
+            user_command.effective_user = self._identities.uid(user)
+            user_command.effective_user_is_admin = self._user_is_admin(user)
+            response = self._execute_command(user_command)
+        except Exception:
+            self._give_back_admission(type_name, user)
+            raise
+        if not response.get("is_success", False):
+            self._give_back_admission(type_name, user)
+        return response
 
     def _process_command_dict(
             self, command_dict: Dict[str, object], type_name: str, username: str) -> Dict[str, object]:
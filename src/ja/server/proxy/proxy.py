@@ -1,13 +1,18 @@
 from abc import ABC, abstractmethod
+from typing import Dict, List, Set
 
+from ja.common.proxy.command_handler import CommandHandler
 from ja.common.proxy.proxy import ContinuousProxy
 from ja.common.proxy.ssh import SSHConfig, ISSHConnection, SSHConnection
 from ja.common.message.base import Response
+from ja.common.message.worker import WorkerCommand
+from ja.common.message.worker_commands.batch_job import BatchJobCommand
 from ja.common.message.worker_commands.cancel_job import CancelJobCommand
+from ja.common.message.worker_commands.report_jobs import ReportJobsCommand
 from ja.common.message.worker_commands.pause_job import PauseJobCommand
 from ja.common.message.worker_commands.resume_job import ResumeJobCommand
 from ja.common.message.worker_commands.start_job import StartJobCommand
-from ja.common.job import Job
+from ja.common.job import Job, JobStatus
 
 import logging
 logger = logging.getLogger(__name__)
@@ -53,12 +58,47 @@ class IWorkerProxy(ContinuousProxy, ABC):
         @return: The Response from the worker client.
         """
 
+    def execute_batch(self, commands: List[WorkerCommand]) -> List[Response]:
+        """!
+        Perform several actions on the worker client in order. This implementation sends them one by one.
+        @param commands: The StartJobCommands, PauseJobCommands, ResumeJobCommands and CancelJobCommands to perform.
+        @return: The Responses from the worker client, in the same order.
+        """
+        return [self._execute_single(command) for command in commands]
+
+    def _execute_single(self, command: WorkerCommand) -> Response:
+        if isinstance(command, StartJobCommand):
+            return self.dispatch_job(command.job)
+        if isinstance(command, PauseJobCommand):
+            return self.pause_job(command.uid)
+        if isinstance(command, ResumeJobCommand):
+            return self.resume_job(command.uid)
+        if isinstance(command, CancelJobCommand):
+            return self.cancel_job(command.uid)
+        raise ValueError("%s cannot be part of a batch." % type(command).__name__)
+
+    @abstractmethod
+    def report_jobs(self) -> Dict[str, JobStatus]:
+        """!
+        Ask the worker client which jobs it currently holds. Jobs that finished while the server was not reachable are
+        included with their final status.
+        @return: The statuses of the held jobs, by job UID.
+        @raise RuntimeError: If the worker client could not report its jobs.
+        """
+
     @abstractmethod
     def check_connection(self) -> None:
         """!
         Tries to connect to the work machine and throws and exception if it could not.
         """
 
+    def is_connected(self) -> bool:
+        """!
+        Check locally, without contacting the work machine, whether the connection is still usable.
+        @return: False if the connection is known to be broken.
+        """
+        return True
+
 
 class WorkerProxyBase(IWorkerProxy, ABC):
     """
@@ -71,6 +111,8 @@ class WorkerProxyBase(IWorkerProxy, ABC):
         @param ssh_config: Config for paramiko.
         """
         self._uid = uid
+        # Content hashes of the Dockerfiles the worker has received so far.
+        self._known_dockerfiles: Set[str] = set()
         super().__init__(ssh_config=ssh_config)
 
     @property
@@ -78,6 +120,25 @@ class WorkerProxyBase(IWorkerProxy, ABC):
         return self._uid
 
     def dispatch_job(self, job: Job) -> Response:
+        dockerfile_hash = job.docker_context.dockerfile_hash
+        if dockerfile_hash in self._known_dockerfiles:
+            response = self._send_start_job_command(job.with_dockerfile_reference())
+            if not self._lost_dockerfile(job, response):
+                return response
+            # The worker has been restarted in the meantime and lost its Dockerfiles.
+            self._known_dockerfiles.discard(dockerfile_hash)
+        response = self._send_start_job_command(job)
+        if response.is_success:
+            self._known_dockerfiles.add(dockerfile_hash)
+        return response
+
+    def _lost_dockerfile(self, job: Job, response: Response) -> bool:
+        # Only then the job was not started and can be sent again with its Dockerfile. Other failures, like a failed
+        # build or a lost Response, must not lead to a second StartJobCommand.
+        return not response.is_success and response.result_string == StartJobCommand.RESPONSE_UNKNOWN_DOCKERFILE % (
+            job.uid, self.uid, job.docker_context.dockerfile_hash)
+
+    def _send_start_job_command(self, job: Job) -> Response:
         command = StartJobCommand(job)
         logger.info("dispatching job: %s" % job.uid)
         logger.debug("%s" % str(command))
@@ -109,9 +170,65 @@ class WorkerProxyBase(IWorkerProxy, ABC):
         logger.debug("response from the worker: %s" % str(response))
         return response
 
+    def execute_batch(self, commands: List[WorkerCommand]) -> List[Response]:
+        if len(commands) < 2:
+            return super().execute_batch(commands)
+        # Jobs whose Dockerfile the worker already knows are sent with a reference to it, as in dispatch_job().
+        sent: List[WorkerCommand] = []
+        for command in commands:
+            if isinstance(command, StartJobCommand) \
+                    and command.job.docker_context.dockerfile_hash in self._known_dockerfiles:
+                sent.append(StartJobCommand(command.job.with_dockerfile_reference()))
+            else:
+                sent.append(command)
+        batch = BatchJobCommand(sent)
+        logger.info("sending %d commands to worker %s" % (len(commands), self.uid))
+        logger.debug("%s" % str(batch))
+        response = self._ssh_connection.send_command(batch)
+        logger.debug("response from the worker: %s" % str(response))
+        if not response.is_success \
+                and response.result_string == CommandHandler._UNKNOWN_COMMAND_TEMPLATE % type(batch).__name__:
+            # The worker does not know BatchJobCommand yet.
+            logger.warning("worker %s does not support batches, sending commands one by one" % self.uid)
+            return super().execute_batch(commands)
+        try:
+            responses = BatchJobCommand.get_responses(response)
+        except ValueError:
+            # The worker may have executed the batch, e.g. if only its Response was lost, so it is not sent again.
+            logger.error("worker %s did not answer the batch: %s" % (self.uid, response.result_string))
+            return [Response(response.result_string, False) for _ in commands]
+        if len(responses) != len(commands):
+            logger.error("worker %s answered %d of %d commands" % (self.uid, len(responses), len(commands)))
+            return [Response("Worker %s answered %d of %d commands." % (self.uid, len(responses), len(commands)),
+                             False) for _ in commands]
+
+        for index, (command, sent_command) in enumerate(zip(commands, sent)):
+            if not isinstance(command, StartJobCommand):
+                continue
+            dockerfile_hash = command.job.docker_context.dockerfile_hash
+            if responses[index].is_success:
+                self._known_dockerfiles.add(dockerfile_hash)
+            elif sent_command is not command and self._lost_dockerfile(command.job, responses[index]):
+                # The worker has been restarted in the meantime and lost its Dockerfiles.
+                self._known_dockerfiles.discard(dockerfile_hash)
+                responses[index] = self.dispatch_job(command.job)
+        return responses
+
+    def report_jobs(self) -> Dict[str, JobStatus]:
+        command = ReportJobsCommand()
+        logger.info("requesting job report from worker: %s" % self.uid)
+        response = self._ssh_connection.send_command(command)
+        logger.debug("response from the worker: %s" % str(response))
+        if not response.is_success:
+            raise RuntimeError("Worker %s could not report its jobs: %s" % (self.uid, response.result_string))
+        return ReportJobsCommand.get_job_statuses(response)
+
     def check_connection(self) -> None:
         self._ssh_connection.send_dummy_command()
 
+    def is_connected(self) -> bool:
+        return self._ssh_connection.is_active()
+
 
 class WorkerProxy(WorkerProxyBase):
     """
@@ -120,4 +237,5 @@ class WorkerProxy(WorkerProxyBase):
     def _get_ssh_connection(self, ssh_config: SSHConfig) -> ISSHConnection:
         return SSHConnection(ssh_config=ssh_config,
                              remote_module="/tmp/jobadder-worker.socket",
-                             command_string="ja-remote %s")
+                             command_string="ja-remote %s",
+                             agent_command_string="ja-remote %s --agent")
@@ -1,6 +1,7 @@
 from copy import deepcopy
 from ja.common.job import JobStatus
 from ja.server.database.database import ServerDatabase
+from ja.server.database.types.job_entry import DatabaseJobEntry
 from ja.server.database.types.work_machine import WorkMachineState, WorkMachine
 from ja.server.dispatcher.dispatcher import Dispatcher
 from ja.server.scheduler.algorithm import SchedulingAlgorithm, get_allocation_for_job
@@ -69,7 +70,7 @@ class Scheduler:
     def reschedule(self, database: ServerDatabase) -> None:
         """!
         Fetches the current schedule from the database and redistributes the jobs using the scheduling algorithm.
-        Then each modified job and work machine are updated in the database.
+        Then the modified jobs and work machines are written back to the database in a single transaction.
 
         @param database The database to fetch job schedule from.
         """
@@ -85,27 +86,23 @@ class Scheduler:
         new_schedule = self._algorithm.reschedule_jobs(runnable_entries, available_machines, self.special_resources)
 
         self._recalculate_machine_resources(new_schedule, available_machines)
-        for job in new_schedule:
-            if job.assigned_machine:
-                database.update_job(job.job)
-                database.assign_job_machine(job.job, job.assigned_machine)
-
-        for machine in available_machines:
-            database.update_work_machine(machine)
+        database.apply_schedule([job for job in new_schedule if job.assigned_machine], available_machines)
 
         self._update_special_resources(new_schedule)
         lost_wms = self._dispatcher.set_distribution(new_schedule + cancelled_entries)
+        released_entries: ServerDatabase.JobDistribution = []
         for wm in lost_wms:
-            crashed_jobs = [entry.job for entry in runnable_entries
-                            if entry.assigned_machine and entry.assigned_machine.uid == wm.uid]
-            for crashed_job in crashed_jobs:
-                crashed_job.status = JobStatus.CRASHED
-                database.update_job(crashed_job)
-                database.assign_job_machine(crashed_job, None)
+            crashed_entries = [entry for entry in runnable_entries
+                               if entry.assigned_machine and entry.assigned_machine.uid == wm.uid]
+            for crashed_entry in crashed_entries:
+                crashed_entry.job.status = JobStatus.CRASHED
+                released_entries.append(DatabaseJobEntry(crashed_entry.job, crashed_entry.statistics, None))
 
             wm.state = WorkMachineState.OFFLINE
             wm.resources.deallocate(wm.resources.total_resources - wm.resources.free_resources)
-            database.update_work_machine(wm)
 
         for job in cancelled_entries:
-            database.assign_job_machine(job.job, None)
+            released_entries.append(DatabaseJobEntry(job.job, job.statistics, None))
+
+        if released_entries or lost_wms:
+            database.apply_schedule(released_entries, lost_wms)
@@ -1,15 +1,24 @@
+from ja.common.async_core import AsyncDaemonCore
+from ja.common.identity import IdentityCache
+from ja.server.database.async_database import AsyncServerDatabase
 from ja.server.database.database import ServerDatabase
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from typing import List, Any
+from ja.server.proxy.admission import AdmissionController
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Any, Optional
 
 import ja.server.web.requests as req
+import asyncio
 import threading
 
 import logging
 logger = logging.getLogger(__name__)
 
 
-def WebRequestHandlerFactory(database: ServerDatabase, mock_only: bool = False) -> type:
+def WebRequestHandlerFactory(database: ServerDatabase, mock_only: bool = False,
+                             admission: AdmissionController = None, identities: IdentityCache = None) -> type:
+    # All requests share the cache, so that users are not looked up for every request.
+    identity_cache = identities if identities is not None else IdentityCache()
+
     class WebRequestHandler(BaseHTTPRequestHandler):
         """!
         Handle a request to generate statistics.
@@ -48,14 +57,21 @@ def WebRequestHandlerFactory(database: ServerDatabase, mock_only: bool = False)
             if self._check_match(path_parts, ["v1", "workmachines", "workload"]):
                 return req.WorkMachineWorkloadRequest()
             elif self._check_match(path_parts, ["v1", "jobs", "*"]):
-                return req.JobInformationRequest(self._match_result)
+                return req.JobInformationRequest(self._match_result, identity_cache)
             elif self._check_match(path_parts, ["v1", "user", "*", "jobs"]):
-                return req.UserJobsRequest(self._match_result)
+                return req.UserJobsRequest(self._match_result, identity_cache)
             elif self._check_match(path_parts, ["v1", "jobs", "hours", "*"]):
                 try:
                     return req.PastJobsRequest(int(self._match_result))
                 except ValueError:
                     return None
+            elif self._check_match(path_parts, ["v1", "utilization", "hours", "*"]):
+                try:
+                    return req.UtilizationRequest(int(self._match_result), identity_cache)
+                except ValueError:
+                    return None
+            elif self._check_match(path_parts, ["v1", "admission"]):
+                return req.AdmissionRequest(admission)
             elif self._check_match(path_parts, ["v1", "workmachines", "*"]):
                 return req.WorkMachineJobsRequest(self._match_result)
             else:
@@ -75,7 +91,13 @@ def WebRequestHandlerFactory(database: ServerDatabase, mock_only: bool = False)
             self.send_response(200)
             self.send_header("Content-type", "application/x-yaml")
             self.end_headers()
-            self.wfile.write(request.generate_report(database).encode())
+            try:
+                for part in request.stream_report(database):
+                    self.wfile.write(part.encode())
+            finally:
+                if database is not None:
+                    # Every request is served by its own thread, which ends after the response.
+                    database.release_session()
 
         def do_GET(self) -> None:
             """
@@ -88,11 +110,14 @@ def WebRequestHandlerFactory(database: ServerDatabase, mock_only: bool = False)
 class StatisticsWebServer:
     """
     Creates a web server which enables external applications to obtain statistics about JobAdder.
+    Each request is served by its own thread, so a slow report does not hold up the other clients.
     """
 
-    def _server_thread(self, server_name: str, server_port: int, database: ServerDatabase) -> None:
+    def _server_thread(self, server_name: str, server_port: int, database: ServerDatabase,
+                       admission: Optional[AdmissionController], identities: Optional[IdentityCache]) -> None:
         try:
-            self._server = HTTPServer((server_name, server_port), WebRequestHandlerFactory(database))
+            self._server = ThreadingHTTPServer((server_name, server_port), WebRequestHandlerFactory(
+                database, admission=admission, identities=identities))
             self._server.timeout = 0.5  # Block for at most 0.5 seconds
             while not self._quit:
                 self._server.handle_request()
@@ -101,16 +126,20 @@ class StatisticsWebServer:
             logger.error("Failed to start WebAPI server.")
             logger.error(e)
 
-    def __init__(self, server_name: str, server_port: int, database: ServerDatabase):
+    def __init__(self, server_name: str, server_port: int, database: ServerDatabase,
+                 admission: AdmissionController = None, identities: IdentityCache = None):
         """!
         Initialize the web server.
 
         @param server_name server name for the server, see http.server.HTTPServer.
         @param server_port server port for the server, see http.server.HTTPServer.
         @param database The database to get information from when serving requests.
+        @param admission The admission control of the server, whose counters are reported.
+        @param identities The cache for looking up users, shared by all requests.
         """
         self._quit = False
-        self._thread = threading.Thread(target=self._server_thread, args=(server_name, server_port, database))
+        self._thread = threading.Thread(target=self._server_thread,
+                                        args=(server_name, server_port, database, admission, identities))
         self._thread.setDaemon(True)
         self._thread.start()
 
@@ -121,3 +150,78 @@ class StatisticsWebServer:
         if self._thread.is_alive():
             self._quit = True
             self._thread.join()
+
+
+class AsyncStatisticsWebServer:
+    """
+    Serves the same requests as StatisticsWebServer as a service of an AsyncDaemonCore, so that waiting clients take
+    up no thread. Only the generation of a report runs on a thread, of the pool of the AsyncServerDatabase.
+    """
+
+    """The maximum time to wait for a client, in seconds."""
+    CLIENT_TIMEOUT = 30
+    # The maximum amount of parts of a report generated ahead of sending them to the client.
+    _QUEUED_PARTS = 16
+
+    def __init__(self, server_name: str, server_port: int, database: AsyncServerDatabase,
+                 admission: AdmissionController = None, identities: IdentityCache = None):
+        """!
+        Initialize the web server. It is started by serve().
+
+        @param server_name server name for the server, or "" to listen on all interfaces.
+        @param server_port server port for the server.
+        @param database The database to get information from when serving requests.
+        @param admission The admission control of the server, whose counters are reported.
+        @param identities The cache for looking up users, shared by all requests.
+        """
+        self._server_name = server_name
+        self._server_port = server_port
+        self._database = database
+        self._handler_class = WebRequestHandlerFactory(database.sync, mock_only=True, admission=admission,
+                                                       identities=identities)
+
+    async def _respond(self, request: req.WebRequest, writer: asyncio.StreamWriter) -> None:
+        parts = self._database.stream(request.stream_report, self._database.sync, max_queued=self._QUEUED_PARTS)
+        try:
+            writer.write(b"HTTP/1.0 200 OK\r\nContent-type: application/x-yaml\r\n\r\n")
+            async for part in parts:
+                writer.write(part.encode())
+                await asyncio.wait_for(writer.drain(), self.CLIENT_TIMEOUT)
+        finally:
+            # Stops generating the report if the client is gone.
+            await parts.aclose()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.CLIENT_TIMEOUT)
+            while True:
+                # The headers are not needed for any request.
+                header = await asyncio.wait_for(reader.readline(), self.CLIENT_TIMEOUT)
+                if header in (b"\r\n", b"\n", b""):
+                    break
+            words = request_line.decode("iso-8859-1").split()
+            if len(words) != 3 or words[0] != "GET":
+                writer.write(b"HTTP/1.0 501 Not Implemented\r\nContent-Length: 0\r\n\r\n")
+                return
+            request = self._handler_class().create_request_for_path(words[1])
+            if not request:
+                writer.write(b"HTTP/1.0 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+                return
+            await self._respond(request, writer)
+        except (ConnectionError, asyncio.TimeoutError) as e:
+            logger.warning("lost connection to a WebAPI client: %s" % e)
+        except Exception as e:
+            logger.error("Failed to serve a WebAPI request.")
+            logger.error(e)
+        finally:
+            writer.close()
+
+    async def serve(self, core: AsyncDaemonCore) -> None:
+        """!
+        Serve requests until cancelled.
+
+        @param core The core of the server.
+        """
+        server = await asyncio.start_server(self._serve_client, self._server_name or None, self._server_port)
+        async with server:
+            await server.serve_forever()
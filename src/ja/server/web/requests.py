@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod
+from ja.common.identity import IdentityCache
 from ja.server.database.database import ServerDatabase
 from ja.server.database.types.work_machine import WorkMachine
-from typing import Dict, Any, Optional, cast
+from ja.server.proxy.admission import AdmissionController
+from typing import Dict, Any, Iterator, Optional, cast
 
 import datetime
 import yaml
-import pwd
 
 
 class WebRequest(ABC):
@@ -24,6 +25,16 @@ class WebRequest(ABC):
           exist), the YAML document consists of only one value `error`, explaining the problem.
         """
 
+    def stream_report(self, database: ServerDatabase) -> Iterator[str]:
+        """!
+        Generate the same report as generate_report(), but piece by piece, so that it can be sent while it is still
+        being generated. By default, the whole report is generated at once.
+
+        @param database The database to fetch data from.
+        @return An iterator over consecutive parts of the report.
+        """
+        yield self.generate_report(database)
+
 
 class WorkMachineWorkloadRequest(WebRequest):
     """
@@ -57,13 +68,15 @@ class JobInformationRequest(WebRequest):
     """
     NO_SUCH_JOB_TEMPLATE: str = "No job with UID %s found in the database."
 
-    def __init__(self, uid: str):
+    def __init__(self, uid: str, identities: IdentityCache = None):
         """!
         Initialize the request response.
 
         @param uid The uid of the job the report is for.
+        @param identities The cache for looking up users. A new one is created if None.
         """
         self._job_uid = uid
+        self._identities = identities if identities is not None else IdentityCache()
 
     def generate_report(self, database: ServerDatabase) -> str:
         job = database.find_job_by_id(self._job_uid)
@@ -71,7 +84,7 @@ class JobInformationRequest(WebRequest):
             return cast(str, yaml.dump({"error": self.NO_SUCH_JOB_TEMPLATE % self._job_uid}))
 
         response_dict = {
-            "user_name": pwd.getpwuid(job.job.owner_id).pw_name,
+            "user_name": self._identities.user_name(job.job.owner_id),
             "user_id": job.job.owner_id,
             "priority": job.job.scheduling_constraints.priority.name,
             "scheduled_at": job.statistics.time_added.strftime(WebRequest.TIMESTAMP_FORMAT),
@@ -83,16 +96,32 @@ class JobInformationRequest(WebRequest):
 
 
 class JobListRequestBase(WebRequest, ABC):
+    """
+    Base class for requests which list jobs. The list is built while the jobs are read from the database, so the
+    jobs are never all held in memory at once.
+    """
+
     @staticmethod
-    def _query_database(database: ServerDatabase,
-                        owner: int = -1,
-                        since: datetime.datetime = None,
-                        machine: WorkMachine = None) -> str:
-        jobs = database.query_jobs(user_id=owner, since=since, work_machine=machine)
-        response_dict: Dict[str, Any] = {"jobs": []}
-        for job in jobs:
-            response_dict["jobs"] += [{"job_id": job.job.uid}]
-        return cast(str, yaml.dump(response_dict))
+    def _stream_database(database: ServerDatabase,
+                         owner: int = -1,
+                         since: datetime.datetime = None,
+                         machine: WorkMachine = None) -> Iterator[str]:
+        is_empty = True
+        for job in database.stream_jobs(user_id=owner, since=since, work_machine=machine):
+            if is_empty:
+                yield "jobs:\n"
+                is_empty = False
+            # Every job is dumped on its own as a one element list, which results in exactly one list item.
+            yield cast(str, yaml.dump([{"job_id": job.job.uid}]))
+        if is_empty:
+            yield cast(str, yaml.dump({"jobs": []}))
+
+    @abstractmethod
+    def stream_report(self, database: ServerDatabase) -> Iterator[str]:
+        pass
+
+    def generate_report(self, database: ServerDatabase) -> str:
+        return "".join(self.stream_report(database))
 
 
 class UserJobsRequest(JobListRequestBase):
@@ -101,21 +130,24 @@ class UserJobsRequest(JobListRequestBase):
     """
     NO_SUCH_USER_TEMPLATE = "Unix user with name '%s' does not exist."
 
-    def __init__(self, user: str):
+    def __init__(self, user: str, identities: IdentityCache = None):
         """!
         Initialize the request response.
 
         @param user The user to report jobs for.
+        @param identities The cache for looking up users. A new one is created if None.
         """
         self._user = user
+        self._identities = identities if identities is not None else IdentityCache()
 
-    def generate_report(self, database: ServerDatabase) -> str:
+    def stream_report(self, database: ServerDatabase) -> Iterator[str]:
         try:
-            uid = pwd.getpwnam(self._user).pw_uid
+            uid = self._identities.uid(self._user)
         except KeyError:
-            return cast(str, yaml.dump({"error": self.NO_SUCH_USER_TEMPLATE % self._user}))
+            yield cast(str, yaml.dump({"error": self.NO_SUCH_USER_TEMPLATE % self._user}))
+            return
 
-        return self._query_database(database, owner=uid)
+        yield from self._stream_database(database, owner=uid)
 
 
 class PastJobsRequest(JobListRequestBase):
@@ -131,8 +163,8 @@ class PastJobsRequest(JobListRequestBase):
         """
         self._since = datetime.datetime.now() - datetime.timedelta(hours=since)
 
-    def generate_report(self, database: ServerDatabase) -> str:
-        return self._query_database(database, since=self._since)
+    def stream_report(self, database: ServerDatabase) -> Iterator[str]:
+        yield from self._stream_database(database, since=self._since)
 
 
 class WorkMachineJobsRequest(JobListRequestBase):
@@ -149,10 +181,73 @@ class WorkMachineJobsRequest(JobListRequestBase):
         """
         self._machine_id = workmachine_id
 
-    def generate_report(self, database: ServerDatabase) -> str:
+    def stream_report(self, database: ServerDatabase) -> Iterator[str]:
         machines_with_id = [m for m in database.get_work_machines() if m.uid == self._machine_id]
         if not machines_with_id:
-            return cast(str, yaml.dump({"error": self.NO_SUCH_MACHINE_TEMPLATE % self._machine_id}))
+            yield cast(str, yaml.dump({"error": self.NO_SUCH_MACHINE_TEMPLATE % self._machine_id}))
+            return
 
         assert len(machines_with_id) == 1
-        return self._query_database(database, machine=machines_with_id[0])
+        yield from self._stream_database(database, machine=machines_with_id[0])
+
+
+class UtilizationRequest(WebRequest):
+    """
+    Generates the response to the request for the utilization during the past X hours, hour by hour. The report is
+    built from the hourly rollups of the database, so its cost does not depend on the amount of jobs.
+    """
+    UNASSIGNED = "unassigned"
+
+    def __init__(self, hours: int, identities: IdentityCache = None):
+        """!
+        Initialize the request response.
+
+        @param hours The amount of past hours to report, including the current one.
+        @param identities The cache for looking up users. A new one is created if None.
+        """
+        self._identities = identities if identities is not None else IdentityCache()
+        now = datetime.datetime.now()
+        self._until = now
+        self._since = now.replace(minute=0, second=0, microsecond=0) - datetime.timedelta(hours=max(hours - 1, 0))
+
+    def _user_name(self, owner_id: int) -> str:
+        try:
+            return self._identities.user_name(owner_id)
+        except KeyError:
+            return str(owner_id)
+
+    def generate_report(self, database: ServerDatabase) -> str:
+        hours: Dict[datetime.datetime, Dict[str, Dict[str, Dict[str, Any]]]] = dict()
+        for rollup in database.get_utilization(self._since, self._until):
+            hour = hours.setdefault(rollup.hour, {"machines": dict(), "owners": dict()})
+            machine_uid = rollup.machine_uid if rollup.machine_uid is not None else self.UNASSIGNED
+            for totals in [hour["machines"].setdefault(machine_uid, dict()),
+                           hour["owners"].setdefault(self._user_name(rollup.owner_id), dict())]:
+                totals["jobs_started"] = totals.get("jobs_started", 0) + rollup.jobs_started
+                totals["jobs_finished"] = totals.get("jobs_finished", 0) + rollup.jobs_finished
+                totals["cpu_hours"] = totals.get("cpu_hours", 0.0) + rollup.cpu_hours
+                totals["memory_hours"] = totals.get("memory_hours", 0.0) + rollup.memory_hours
+
+        report = [{"hour": hour.strftime(WebRequest.TIMESTAMP_FORMAT), **utilization}
+                  for hour, utilization in sorted(hours.items())]
+        return cast(str, yaml.dump({"utilization": report}))
+
+
+class AdmissionRequest(WebRequest):
+    """
+    Generates the response to the request for the counters of the admission control.
+    """
+    DISABLED: str = "The admission control is not available."
+
+    def __init__(self, admission: Optional[AdmissionController]):
+        """!
+        Initialize the request response.
+
+        @param admission The admission control of the server, None if it is not available.
+        """
+        self._admission = admission
+
+    def generate_report(self, database: ServerDatabase) -> str:
+        if self._admission is None:
+            return cast(str, yaml.dump({"error": self.DISABLED}))
+        return cast(str, yaml.dump({"enabled": self._admission.is_enabled, "commands": self._admission.snapshot()}))
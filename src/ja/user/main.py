@@ -13,10 +13,13 @@ class JobAdder:
     The main class for the JobAdder user client.
     """
     def __init__(self, config_path: str = "%s/.config/jobadder" % Path.home(),
-                 remote_module: str = "/tmp/jobadder-server.socket", command_string: str = "ja-remote %s") -> None:
+                 remote_module: str = "/tmp/jobadder-server.socket", command_string: str = "ja-remote %s",
+                 agent_command_string: str = "ja-remote %s --agent", multiplexer_idle_timeout: float = 600) -> None:
         self._cli_handler = UserClientCLIHandler(config_path=config_path)
         self._remote_module = remote_module
         self._command_string = command_string
+        self._agent_command_string = agent_command_string
+        self._multiplexer_idle_timeout = multiplexer_idle_timeout
 
     def run(self, cli_args: List[str] = None, suppress_help: bool = False) -> None:
         if cli_args is None:
@@ -26,12 +29,16 @@ class JobAdder:
         if command is not None:
             server_proxy = UserServerProxy(
                 ssh_config=command.config.ssh_config, remote_module=self._remote_module,
-                command_string=self._command_string)
-            if isinstance(command, AddCommand):
-                print(server_proxy.add_job(command).result_string)
-            elif isinstance(command, CancelCommand):
-                print(server_proxy.cancel_job(command).result_string)
-            elif isinstance(command, QueryCommand):
-                print(server_proxy.query(command).result_string)
-            else:
-                raise NotImplementedError("Command type not supported by proxy: %s" % type(command))
+                command_string=self._command_string, agent_command_string=self._agent_command_string,
+                multiplexer_idle_timeout=self._multiplexer_idle_timeout)
+            try:
+                if isinstance(command, AddCommand):
+                    print(server_proxy.add_job(command).result_string)
+                elif isinstance(command, CancelCommand):
+                    print(server_proxy.cancel_job(command).result_string)
+                elif isinstance(command, QueryCommand):
+                    print(server_proxy.query(command).result_string)
+                else:
+                    raise NotImplementedError("Command type not supported by proxy: %s" % type(command))
+            finally:
+                server_proxy.close()
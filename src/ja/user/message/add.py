@@ -12,6 +12,8 @@ class AddCommand(UserServerCommand):
     """
     Command for adding a job.
     """
+    RESPONSE_UNKNOWN_DOCKERFILE = "Dockerfile with hash %s is unknown, the contents of the Dockerfile are required."
+
     def __init__(self, config: AddCommandConfig):
         """!
         @param config: Config to create the add command from.
@@ -25,6 +27,13 @@ class AddCommand(UserServerCommand):
         """
         return self._config  # type: ignore
 
+    def with_dockerfile_reference(self) -> "AddCommand":
+        """!
+        @return A copy of this command whose job only references its Dockerfile by the content hash.
+        """
+        config = AddCommandConfig(self.config, self.config.job.with_dockerfile_reference(), self.config.blocking)
+        return AddCommand(config)
+
     def to_dict(self) -> Dict[str, object]:
         return self._config.to_dict()
 
@@ -45,6 +54,12 @@ class AddCommand(UserServerCommand):
             return Response(result_string="Job with id %s already exists" % job.uid,
                             is_success=False)
 
+        docker_context = job.docker_context
+        if docker_context.dockerfile_source is None \
+                and database.find_dockerfile(docker_context.dockerfile_hash) is None:
+            return Response(result_string=self.RESPONSE_UNKNOWN_DOCKERFILE % docker_context.dockerfile_hash,
+                            is_success=False)
+
         max_sr = database.max_special_resources
         if max_sr is None:
             max_sr = dict()
@@ -3,6 +3,7 @@ from ja.user.message.base import UserServerCommand
 from ja.user.config.base import UserConfig, Verbosity
 from ja.common.job import JobPriority, JobStatus
 from datetime import datetime
+from io import StringIO
 from typing import List, Tuple, Dict, Iterable, cast
 from ja.server.database.types.job_entry import DatabaseJobEntry
 from ja.server.database.database import ServerDatabase
@@ -257,49 +258,50 @@ class QueryCommand(UserServerCommand):
     def _pretty_print(uid: str, label: str, status: str, machine: str) -> str:
         return "%-25s %-30s %-10s %-15s\n" % (uid, label, status, machine)
 
-    def execute(self, database: ServerDatabase) -> Response:
-        jobs: List[DatabaseJobEntry] = database.query_jobs(self.after, -1, None)  # Query all DatabaseJobEntries
-        if self.uid is not None:
-            jobs = [entry for entry in jobs if entry.job.uid in self.uid]
-        if self.label is not None:
-            jobs = [entry for entry in jobs if entry.job.label in self.label]
-        if self.owner is not None:
-            jobs = [entry for entry in jobs if str(entry.job.owner_id) in self.owner]
-        if self.priority is not None:
-            jobs = [entry for entry in jobs if entry.job.scheduling_constraints.priority in self.priority]
-        if self.status is not None:
-            jobs = [entry for entry in jobs if entry.job.status in self.status]
-        if self.is_preemptible is not None:
-            jobs = [entry for entry in jobs if entry.job.scheduling_constraints.is_preemptible == self.is_preemptible]
-        if self.special_resources is not None:
-            jobs_temp: List[DatabaseJobEntry] = []
-            for entry in jobs:
-                for res in self.special_resources:
-                    if set(res) == set(entry.job.scheduling_constraints.special_resources):
-                        jobs_temp.append(entry)
-                        break
-            jobs = jobs_temp
-        if self.cpu_threads is not None:
-            jobs = [entry for entry in jobs if
-                    self.cpu_threads[0] <= entry.job.docker_constraints.cpu_threads <= self.cpu_threads[1]]
-        if self.memory is not None:
-            jobs = [entry for entry in jobs if self.memory[0] <= entry.job.docker_constraints.memory <= self.memory[1]]
-        if self.before is not None:
-            jobs = [entry for entry in jobs if entry.statistics.time_added <= self.before]
+    def _matches(self, entry: DatabaseJobEntry) -> bool:
+        job = entry.job
+        if self.uid is not None and job.uid not in self.uid:
+            return False
+        if self.label is not None and job.label not in self.label:
+            return False
+        if self.owner is not None and str(job.owner_id) not in self.owner:
+            return False
+        if self.priority is not None and job.scheduling_constraints.priority not in self.priority:
+            return False
+        if self.status is not None and job.status not in self.status:
+            return False
+        if self.is_preemptible is not None and job.scheduling_constraints.is_preemptible != self.is_preemptible:
+            return False
+        if self.special_resources is not None \
+                and not any(set(res) == set(job.scheduling_constraints.special_resources)
+                            for res in self.special_resources):
+            return False
+        if self.cpu_threads is not None \
+                and not self.cpu_threads[0] <= job.docker_constraints.cpu_threads <= self.cpu_threads[1]:
+            return False
+        if self.memory is not None and not self.memory[0] <= job.docker_constraints.memory <= self.memory[1]:
+            return False
+        if self.before is not None and entry.statistics.time_added > self.before:
+            return False
+        return True
 
-        message: str = ""
+    def execute(self, database: ServerDatabase) -> Response:
+        # The jobs are streamed from the database and only the lines of the message are kept, not the jobs themselves.
+        message = StringIO()
         if self._config.verbosity != Verbosity.DETAILED:
-            message += self._pretty_print("UID", "Label", "Status", "Work machine")
-            message += self._pretty_print("___", "_____", "______", "____________")
+            message.write(self._pretty_print("UID", "Label", "Status", "Work machine"))
+            message.write(self._pretty_print("___", "_____", "______", "____________"))
 
-        for entry in jobs:
+        for entry in database.stream_jobs(self.after, -1, None):  # Query all DatabaseJobEntries
+            if not self._matches(entry):
+                continue
             job = entry.job
             if self._config.verbosity == Verbosity.DETAILED:
-                message += str(job) + "\n"
+                message.write(str(job) + "\n")
             else:
                 wm_uid: str = None if entry.assigned_machine is None else entry.assigned_machine.uid
-                message += self._pretty_print(job.uid, str(job.label), job.status.name, str(wm_uid))
-        message = message[:-1]
-        if message == "":
-            message = "No jobs satisfy these constraints."
-        return Response(message, is_success=True)
+                message.write(self._pretty_print(job.uid, str(job.label), job.status.name, str(wm_uid)))
+        result_string = message.getvalue()[:-1]
+        if result_string == "":
+            result_string = "No jobs satisfy these constraints."
+        return Response(result_string, is_success=True)
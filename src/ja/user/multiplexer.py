@@ -0,0 +1,197 @@
+"""
+A per-user background process which keeps one SSH connection to the central server open, so that consecutive calls of
+the user client do not each have to set up a new SSH connection. The process is started by the first call of the user
+client which needs it and listens on a Unix named socket in a directory only the user can access. It ends after it has
+not received a Command for a while.
+"""
+from hashlib import sha256
+from select import select
+from threading import Lock, Thread
+from typing import Callable, Dict, Optional, cast
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import yaml
+
+from ja.common.message.base import Response
+from ja.common.message.codec import YAML_LOADER, decode_any, detect_codec
+from ja.common.proxy.local import UnixSocketConnection
+from ja.common.proxy.pipeline import receive_exactly
+from ja.common.proxy.ssh import SSHConfig, SSHConnection
+
+import logging
+logger = logging.getLogger(__name__)
+
+# The line the multiplexer writes to its standard output once it accepts Commands.
+READY = b"ready\n"
+
+
+def control_socket_path(ssh_config: SSHConfig, remote_module: str) -> str:
+    """!
+    @param ssh_config: The SSH config of the connection to the server.
+    @param remote_module: The remote module Commands are sent to on the server.
+    @return: The path of the socket the multiplexer for this connection listens on.
+    """
+    runtime_directory = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_directory:
+        directory = os.path.join(runtime_directory, "jobadder")
+    else:
+        directory = os.path.join(tempfile.gettempdir(), "jobadder-%d" % os.getuid())
+    key = "\0".join([ssh_config.hostname, ssh_config.username or "", remote_module])
+    return os.path.join(directory, "control-%s.socket" % sha256(key.encode()).hexdigest()[:16])
+
+
+def _is_listening(socket_path: str) -> bool:
+    probe = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+class ConnectionMultiplexer:
+    """
+    Accepts Commands on a Unix named socket, in the format used by CommandHandler, and sends them over a single
+    connection. Commands are handled concurrently; the connection is expected to support this (see AgentChannel).
+    """
+
+    def __init__(self, send_command_dict: Callable[[Dict[str, object]], Response], socket_path: str,
+                 idle_timeout: float = 600):
+        """!
+        Bind the socket. Commands are accepted once main_loop() runs.
+        @param send_command_dict: Sends a Command given as dictionary and returns the Response, see
+        SSHConnection.send_command_dict().
+        @param socket_path: The Unix named socket to listen on. Its directory is created if necessary and made
+        accessible for the current user only.
+        @param idle_timeout: The time after which the multiplexer stops if it has not received any Command, in
+        seconds.
+        """
+        self._send_command_dict = send_command_dict
+        self._socket_path = socket_path
+        self._idle_timeout = idle_timeout
+        self._lock = Lock()
+        self._active = 0
+        directory = os.path.dirname(socket_path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        status = os.stat(directory)
+        if status.st_uid != os.getuid() or status.st_mode & 0o077:
+            raise PermissionError("%s must be accessible for its owner only." % directory)
+        if os.path.exists(socket_path):
+            # Left behind by a multiplexer which did not exit cleanly.
+            os.unlink(socket_path)
+        self._socket = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+        self._socket.bind(socket_path)
+        self._socket.listen(socket.SOMAXCONN)
+        self._socket.settimeout(idle_timeout)
+
+    def main_loop(self) -> None:
+        """!
+        Accept Commands until no Command has been received for the idle timeout, then close the socket.
+        """
+        try:
+            while True:
+                try:
+                    connection, _ = self._socket.accept()
+                except socket.timeout:
+                    with self._lock:
+                        if self._active == 0:
+                            break
+                    continue
+                with self._lock:
+                    self._active += 1
+                Thread(target=self._handle_connection, args=(connection,), daemon=True).start()
+        finally:
+            self._socket.close()
+            if os.path.exists(self._socket_path):
+                os.unlink(self._socket_path)
+
+    def _handle_connection(self, connection: socket.socket) -> None:
+        try:
+            length = int.from_bytes(receive_exactly(connection, 8), byteorder="big")
+            command_bytes = receive_exactly(connection, length)
+            codec = detect_codec(command_bytes)
+            command_dict = decode_any(command_bytes)
+            # The server attaches the user it was reached as.
+            command_dict.pop("username", None)
+            response = self._send_command_dict(command_dict)
+            connection.sendall(codec.encode(response.to_dict()))
+        except Exception as e:
+            logger.warning("Failed to forward a Command: %s" % e)
+        finally:
+            connection.close()
+            with self._lock:
+                self._active -= 1
+
+
+def connect(ssh_config: SSHConfig, remote_module: str, command_string: str, agent_command_string: Optional[str],
+            idle_timeout: float = 600, start_timeout: float = 60) -> Optional[UnixSocketConnection]:
+    """!
+    Connect to the multiplexer for a connection to the server, and start it if it is not running yet.
+    @param ssh_config: The SSH config of the connection to the server.
+    @param remote_module: The remote module to send Commands to on the server.
+    @param command_string: The template for starting the remote program on the server.
+    @param agent_command_string: The template for starting the long-lived remote agent on the server.
+    @param idle_timeout: The time after which a newly started multiplexer stops if it is not used, in seconds.
+    @param start_timeout: The maximum time to wait for a newly started multiplexer, in seconds.
+    @return: A connection to the multiplexer, or None if it could not be started.
+    """
+    socket_path = control_socket_path(ssh_config, remote_module)
+    if _is_listening(socket_path):
+        return UnixSocketConnection(socket_path)
+    settings = dict(ssh_config=ssh_config.to_dict(), remote_module=remote_module, command_string=command_string,
+                    agent_command_string=agent_command_string, idle_timeout=idle_timeout, socket_path=socket_path)
+    try:
+        process = subprocess.Popen([sys.executable, "-m", "ja.user.multiplexer"], stdin=subprocess.PIPE,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, start_new_session=True)
+    except OSError as e:
+        logger.warning("Could not start the connection multiplexer: %s" % e)
+        return None
+    try:
+        assert process.stdin is not None and process.stdout is not None
+        # The settings include the SSH password, so they are not passed on the command line.
+        process.stdin.write(yaml.safe_dump(settings).encode())
+        process.stdin.close()
+        readable, _, _ = select([process.stdout], [], [], start_timeout)
+        ready = process.stdout.readline() if readable else b""
+        process.stdout.close()
+    except OSError as e:
+        logger.warning("Could not start the connection multiplexer: %s" % e)
+        ready = b""
+    if ready != READY:
+        logger.warning("The connection multiplexer did not start, connecting directly.")
+        return None
+    return UnixSocketConnection(socket_path)
+
+
+def main() -> None:
+    """!
+    Entry point of the multiplexer process, which reads its settings from the standard input.
+    """
+    settings = cast(Dict[str, object], yaml.load(sys.stdin.buffer.read(), Loader=YAML_LOADER))
+    socket_path = cast(str, settings["socket_path"])
+    if _is_listening(socket_path):
+        # Another client has started a multiplexer in the meantime.
+        sys.stdout.buffer.write(READY)
+        return
+    connection = SSHConnection(ssh_config=SSHConfig.from_dict(cast(Dict[str, object], settings["ssh_config"])),
+                               remote_module=cast(str, settings["remote_module"]),
+                               command_string=cast(str, settings["command_string"]),
+                               agent_command_string=cast(Optional[str], settings["agent_command_string"]))
+    try:
+        multiplexer = ConnectionMultiplexer(connection.send_command_dict, socket_path,
+                                            cast(float, settings["idle_timeout"]))
+        sys.stdout.buffer.write(READY)
+        sys.stdout.buffer.flush()
+        sys.stdout.close()
+        multiplexer.main_loop()
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
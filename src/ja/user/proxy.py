@@ -1,11 +1,15 @@
 from abc import ABC, abstractmethod
+from getpass import getuser
+from typing import Dict
 
 from ja.common.proxy.proxy import SingleMessageProxy
 from ja.common.message.base import Response
+from ja.common.proxy.local import LocalConnection, is_local_host
 from ja.common.proxy.ssh import SSHConnection, ISSHConnection, SSHConfig
 from ja.user.message.add import AddCommand
 from ja.user.message.cancel import CancelCommand
 from ja.user.message.query import QueryCommand
+import ja.user.multiplexer as multiplexer
 
 
 class IUserServerProxy(SingleMessageProxy, ABC):
@@ -43,6 +47,13 @@ class UserServerProxyBase(IUserServerProxy, ABC):
 
     def add_job(self, add_command: AddCommand) -> Response:
         connection = self._get_ssh_connection(add_command.config.ssh_config)
+        docker_context = add_command.config.job.docker_context
+        if len(docker_context.dockerfile_source) > len(docker_context.dockerfile_hash):
+            # Most jobs reuse a Dockerfile the server already knows, so only send its contents if they are required.
+            response = connection.send_command(add_command.with_dockerfile_reference())
+            if response.is_success or \
+                    response.result_string != AddCommand.RESPONSE_UNKNOWN_DOCKERFILE % docker_context.dockerfile_hash:
+                return response
         return connection.send_command(add_command)
 
     def cancel_job(self, cancel_command: CancelCommand) -> Response:
@@ -57,13 +68,50 @@ class UserServerProxyBase(IUserServerProxy, ABC):
 class UserServerProxy(UserServerProxyBase):
     """
     Implementation for the proxy for the central server used on the user client.
+    If the server runs on the same host as the user client, Commands are passed to it without SSH. Otherwise they are
+    sent over a per-user ConnectionMultiplexer which keeps the SSH connection to the server open between calls of the
+    user client, or over a new SSH connection if the multiplexer cannot be used.
     """
     def __init__(self, ssh_config: SSHConfig, remote_module: str = "/tmp/jobadder-server.socket",
-                 command_string: str = "ja-remote %s"):
+                 command_string: str = "ja-remote %s", agent_command_string: str = "ja-remote %s --agent",
+                 multiplexer_idle_timeout: float = 600):
+        """!
+        @param ssh_config: Config for paramiko.
+        @param remote_module: The socket of the server.
+        @param command_string: The template for starting the remote program on the server.
+        @param agent_command_string: The template for starting the long-lived remote agent on the server.
+        @param multiplexer_idle_timeout: The time after which the multiplexer stops if it is not used, in seconds. If
+        0, no multiplexer is used.
+        """
         super().__init__(ssh_config=ssh_config)
         self._remote_module = remote_module
         self._command_string = command_string
+        self._agent_command_string = agent_command_string
+        self._multiplexer_idle_timeout = multiplexer_idle_timeout
+        self._connections: Dict[str, ISSHConnection] = dict()
 
     def _get_ssh_connection(self, ssh_config: SSHConfig) -> ISSHConnection:
+        key = "\0".join([ssh_config.hostname, ssh_config.username or ""])
+        connection = self._connections.get(key, None)
+        if connection is None:
+            connection = self._connections[key] = self._open_connection(ssh_config)
+        return connection
+
+    def _open_connection(self, ssh_config: SSHConfig) -> ISSHConnection:
+        if is_local_host(ssh_config.hostname) and ssh_config.username in (None, getuser()):
+            return LocalConnection(socket_path=self._remote_module, command_string=self._command_string)
+        if self._multiplexer_idle_timeout > 0:
+            connection = multiplexer.connect(ssh_config, self._remote_module, self._command_string,
+                                             self._agent_command_string, self._multiplexer_idle_timeout)
+            if connection is not None:
+                return connection
         return SSHConnection(
             ssh_config=ssh_config, remote_module=self._remote_module, command_string=self._command_string)
+
+    def close(self) -> None:
+        """!
+        Close all connections opened by this proxy. The multiplexer keeps running.
+        """
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
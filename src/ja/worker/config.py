@@ -9,7 +9,8 @@ class WorkerConfig(Config):
     Config for the worker client.
     """
 
-    def __init__(self, uid: str, ssh_config: SSHConfig, resource_allocation: ResourceAllocation, admin_group: str):
+    def __init__(self, uid: str, ssh_config: SSHConfig, resource_allocation: ResourceAllocation, admin_group: str,
+                 event_loop: bool = False):
         """!
         creates resource allocation instance
         """
@@ -22,12 +23,14 @@ class WorkerConfig(Config):
         self._resource_allocation = resource_allocation
         self._uid = uid
         self._admin_group = admin_group
+        self._event_loop = event_loop
 
     def __eq__(self, o: object) -> bool:
         if isinstance(o, WorkerConfig):
             return self._ssh_config == o._ssh_config \
                 and self._uid == o._uid \
-                and self._resource_allocation == o._resource_allocation
+                and self._resource_allocation == o._resource_allocation \
+                and self._event_loop == o._event_loop
         else:
             return False
 
@@ -63,12 +66,20 @@ class WorkerConfig(Config):
         """
         return self._admin_group
 
+    @property
+    def event_loop(self) -> bool:
+        """!
+        @return: If True, the command socket is served by an event loop instead of a thread per connection.
+        """
+        return self._event_loop
+
     def to_dict(self) -> Dict[str, object]:
         d: Dict[str, object] = dict()
         d["ssh_config"] = self._ssh_config.to_dict()
         d["resource_allocation"] = self._resource_allocation.to_dict()
         d["uid"] = self._uid
         d["admin_group"] = self.admin_group
+        d["event_loop"] = self._event_loop
         return d
 
     @classmethod
@@ -79,5 +90,6 @@ class WorkerConfig(Config):
             cls._get_dict_from_dict(property_dict=property_dict, key="resource_allocation", mandatory=True))
         uid = cls._get_str_from_dict(property_dict, "uid", mandatory=False)
         admin_group = cls._get_str_from_dict(property_dict, "admin_group", mandatory=True)
+        event_loop = cls._get_bool_from_dict(property_dict, "event_loop", mandatory=False)
         cls._assert_all_properties_used(property_dict)
-        return WorkerConfig(uid, ssh_config, resource_allocation, admin_group)
+        return WorkerConfig(uid, ssh_config, resource_allocation, admin_group, bool(event_loop))
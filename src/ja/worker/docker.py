@@ -1,12 +1,14 @@
+from collections import OrderedDict
 from io import BytesIO
-from threading import Thread
-from typing import Dict
-import yaml
+from threading import Lock, Thread
+from typing import Dict, Optional
+import json
 import docker  # type: ignore
 from docker.models.containers import Container  # type: ignore
 from docker.types import Mount  # type: ignore
 
-from ja.common.job import Job
+from ja.common.job import Job, JobStatus
+from ja.worker.events import JobEventBatcher
 from ja.worker.proxy.proxy import IWorkerServerProxy
 
 import logging
@@ -14,12 +16,29 @@ logger = logging.getLogger(__name__)
 
 
 class DockerInterface:
-    def __init__(self, server_proxy: IWorkerServerProxy, worker_uid: str):
+    def __init__(self, server_proxy: IWorkerServerProxy, worker_uid: str, event_window: float = 0.1,
+                 max_dockerfiles: int = 64):
+        """!
+        @param server_proxy: The proxy to notify the server about jobs which ended.
+        @param worker_uid: The UID of this work machine.
+        @param event_window: The time to collect ended jobs for before notifying the server about them, in seconds.
+        @param max_dockerfiles: The maximum amount of Dockerfiles kept for jobs which only reference them.
+        """
+        if max_dockerfiles < 1:
+            raise ValueError("At least one Dockerfile must be kept.")
         self._server_proxy = server_proxy
         self._worker_uid = worker_uid
         self._client = docker.from_env()
         self._jobs_by_container_id: Dict[str, Job] = dict()
         self._containers_by_job_uid: Dict[str, Container] = dict()
+        # Dockerfiles of the jobs started last, by content hash, least recently used first. The server only sends the
+        # hash for those, and sends the whole Dockerfile again if it was dropped.
+        self._dockerfiles: "OrderedDict[str, str]" = OrderedDict()
+        self._max_dockerfiles = max_dockerfiles
+        self._dockerfiles_lock = Lock()
+        # Jobs which finished while the server could not be notified are sent again by the batcher, or handed over
+        # with the next job report, whatever comes first.
+        self._event_batcher = JobEventBatcher(server_proxy.notify_job_events, event_window)
         self._listen_thread = Thread(target=self._listen)
         self._listen_thread.daemon = True  # Terminate thread when main thread finishes
         self._listen_thread.start()
@@ -27,27 +46,44 @@ class DockerInterface:
     def _listen(self) -> None:
         events = self._client.events()
         while True:
-            event = yaml.load(events.next().decode(), Loader=yaml.SafeLoader)
+            event = json.loads(events.next().decode())
             actor = event["Actor"]
             attributes = actor["Attributes"]
             if event["Type"] == "container" and event["Action"] == "die":
                 job = self._jobs_by_container_id.pop(event["id"], None)
                 if job is not None:
                     self._containers_by_job_uid.pop(job.uid)
-                    if attributes["exitCode"] == "0":
-                        self._server_proxy.notify_job_finished(job.uid)
-                    else:
-                        self._server_proxy.notify_job_crashed(job.uid)
+                    status = JobStatus.DONE if attributes["exitCode"] == "0" else JobStatus.CRASHED
+                    self._event_batcher.add(job.uid, status)
 
     @property
     def worker_uid(self) -> str:
         return self._worker_uid
 
+    def find_dockerfile(self, dockerfile_hash: str) -> Optional[str]:
+        """!
+        @param dockerfile_hash The content hash of a Dockerfile.
+        @return The contents of the Dockerfile if a job with this Dockerfile has been added before, None otherwise.
+        """
+        with self._dockerfiles_lock:
+            dockerfile_source = self._dockerfiles.get(dockerfile_hash, None)
+            if dockerfile_source is not None:
+                self._dockerfiles.move_to_end(dockerfile_hash)
+            return dockerfile_source
+
+    def _keep_dockerfile(self, dockerfile_hash: str, dockerfile_source: str) -> None:
+        with self._dockerfiles_lock:
+            self._dockerfiles[dockerfile_hash] = dockerfile_source
+            self._dockerfiles.move_to_end(dockerfile_hash)
+            while len(self._dockerfiles) > self._max_dockerfiles:
+                self._dockerfiles.popitem(last=False)
+
     def add_job(self, job: Job) -> None:
         if job.uid in self._containers_by_job_uid:
             raise ValueError("Job with UID %s already exists." % job.uid)
         logger.info("adding job: %s" % job.uid)
         logger.debug(str(job))
+        self._keep_dockerfile(job.docker_context.dockerfile_hash, job.docker_context.dockerfile_source)
         image, build_log = self._client.images.build(fileobj=BytesIO(job.docker_context.dockerfile_source.encode()))
         mounts = [Mount(target=mount_point.mount_path, source=mount_point.source_path, type="bind")
                   for mount_point in job.docker_context.mount_points]
@@ -78,5 +114,25 @@ class DockerInterface:
         logger.debug("container id: " + container.id)
         container.unpause()
 
+    def report_jobs(self) -> Dict[str, JobStatus]:
+        """!
+        Collect the jobs held by this worker for the server. Jobs which finished without the server being notified are
+        included with their final status and are forgotten afterwards.
+        @return: The statuses of all held jobs, by job UID.
+        """
+        job_statuses: Dict[str, JobStatus] = dict()
+        for uid, container in list(self._containers_by_job_uid.items()):
+            container.reload()
+            job_statuses[uid] = JobStatus.PAUSED if container.status == "paused" else JobStatus.RUNNING
+        job_statuses.update(self._event_batcher.take_failed())
+        logger.info("reporting %d jobs" % len(job_statuses))
+        return job_statuses
+
     def has_running_jobs(self) -> bool:
         return len(self._jobs_by_container_id) > 0
+
+    def close(self) -> None:
+        """!
+        Notify the server about the jobs which ended last without waiting for more.
+        """
+        self._event_batcher.close()
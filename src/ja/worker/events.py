@@ -0,0 +1,139 @@
+"""
+Collects the ends of jobs on the worker client, so that the server can be notified about all jobs which ended within a
+short time at once.
+"""
+from threading import Condition, Thread
+from time import monotonic
+from typing import Callable, Dict, Optional
+
+from ja.common.job import JobStatus
+from ja.common.message.base import Response
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class JobEventBatcher:
+    """
+    Sends the final statuses of jobs to the server in batches. A batch is sent a short time after its first job ended,
+    or as soon as it is full. Batches are sent one after another by a background thread, so jobs which end while a
+    batch is being sent are part of the next one. Jobs the server could not be notified about are sent again after a
+    backoff, until they are taken over by take_failed().
+    """
+
+    def __init__(self, send: Callable[[Dict[str, JobStatus]], Response], window: float = 0.1,
+                 max_batch_size: int = 500, retry_delay: float = 1.0, max_retry_delay: float = 60.0):
+        """!
+        Create a batcher and start its background thread.
+        @param send: Notifies the server about a batch, see IWorkerServerProxy.notify_job_events().
+        @param window: The time to wait for more jobs after the first job of a batch ended, in seconds.
+        @param max_batch_size: The maximum amount of jobs in one batch.
+        @param retry_delay: The time to wait before failed jobs are sent again, in seconds. It is doubled after each
+        failed attempt.
+        @param max_retry_delay: The maximum time to wait before failed jobs are sent again, in seconds.
+        """
+        if window < 0 or max_batch_size < 1:
+            raise ValueError("The window must not be negative and the batch size must be positive.")
+        if retry_delay <= 0 or max_retry_delay < retry_delay:
+            raise ValueError("The retry delay must be positive and must not exceed the maximum retry delay.")
+        self._send = send
+        self._window = window
+        self._max_batch_size = max_batch_size
+        self._initial_retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._retry_delay = retry_delay
+        self._condition = Condition()
+        self._pending: Dict[str, JobStatus] = dict()
+        # The monotonic time at which the first pending job ended.
+        self._first_pending: Optional[float] = None
+        self._failed: Dict[str, JobStatus] = dict()
+        # The monotonic time at which the failed jobs are sent again.
+        self._retry_at: Optional[float] = None
+        self._closed = False
+        self._thread = Thread(target=self._send_thread, name="job-events")
+        self._thread.daemon = True  # Terminate thread when main thread finishes
+        self._thread.start()
+
+    def add(self, uid: str, status: JobStatus) -> None:
+        """!
+        Queue the final status of a job for the next batch.
+        @param uid: The UID of the job.
+        @param status: The final status of the job, DONE or CRASHED.
+        """
+        with self._condition:
+            if self._first_pending is None:
+                self._first_pending = monotonic()
+            self._pending[uid] = status
+            self._condition.notify()
+
+    def close(self) -> None:
+        """!
+        Send the pending jobs without waiting for the window to end and stop the background thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def take_failed(self) -> Dict[str, JobStatus]:
+        """!
+        Take over the jobs the server could not be notified about, so that they are not sent again.
+        @return: The final statuses of these jobs, by job UID.
+        """
+        with self._condition:
+            failed = self._failed
+            self._failed = dict()
+            self._retry_at = None
+            return failed
+
+    def _next_batch(self) -> Optional[Dict[str, JobStatus]]:
+        with self._condition:
+            while True:
+                if self._pending and (self._closed or len(self._pending) >= self._max_batch_size):
+                    break
+                if self._closed:
+                    return None
+                now = monotonic()
+                if self._retry_at is not None and self._retry_at <= now:
+                    # Failed jobs are sent with the next batch, which is due right away.
+                    self._pending = {**self._failed, **self._pending}
+                    self._failed = dict()
+                    self._retry_at = None
+                    break
+                deadlines = [] if self._retry_at is None else [self._retry_at]
+                if self._first_pending is not None:
+                    deadlines.append(self._first_pending + self._window)
+                if not deadlines:
+                    self._condition.wait()
+                    continue
+                remaining = min(deadlines) - now
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            uids = list(self._pending)[:self._max_batch_size]
+            batch = {uid: self._pending.pop(uid) for uid in uids}
+            # Jobs which did not fit into this batch are sent after the next window at the latest.
+            self._first_pending = monotonic() if self._pending else None
+            return batch
+
+    def _send_thread(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            logger.info("notifying server about %d jobs" % len(batch))
+            try:
+                response = self._send(batch)
+                if response.is_success:
+                    with self._condition:
+                        self._retry_delay = self._initial_retry_delay
+                    continue
+                logger.error(response.result_string)
+            except Exception as e:
+                logger.error(e)
+            with self._condition:
+                logger.info("could not notify server about %d jobs, retrying in %.1f seconds"
+                            % (len(batch), self._retry_delay))
+                self._failed.update(batch)
+                self._retry_at = monotonic() + self._retry_delay
+                self._retry_delay = min(2 * self._retry_delay, self._max_retry_delay)
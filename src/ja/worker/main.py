@@ -4,6 +4,7 @@ as notifying the CS
 """
 from typing import cast
 
+from ja.common.async_core import AsyncDaemonCore
 from ja.server.database.types.work_machine import WorkMachineResources
 from ja.worker.config import WorkerConfig
 from ja.worker.proxy.proxy import WorkerServerProxy
@@ -26,7 +27,7 @@ class JobWorker:
             self, config_path: str = "/etc/jobadder/worker.conf",
             socket_path: str = "/tmp/jobadder-worker.socket",
             remote_module: str = "/tmp/jobadder-server.socket",
-            command_string: str = "ja-remote %s") -> None:
+            command_string: str = "ja-remote %s", agent_command_string: str = "ja-remote %s --agent") -> None:
         """!
         Reads a WorkerConfig object from the disk.
         Creates WorkerServerProxy, DockerInterface, WorkerCommandHandler objects.
@@ -34,6 +35,8 @@ class JobWorker:
         @param socket_path: the path of the socket to listen on for commands.
         @param remote_module: the module to execute on the server.
         @param command_string: the command template to execute on the server.
+        @param agent_command_string: the command template to start a long-lived agent on the server, or None to
+        execute every command with @command_string.
         """
         logger.info("Using worker config file %s." % config_path)
         self._config_path = config_path
@@ -41,7 +44,8 @@ class JobWorker:
             self._config = cast(WorkerConfig, WorkerConfig.from_string(f.read()))
 
         self._server_proxy = WorkerServerProxy(
-            ssh_config=self._config.ssh_config, remote_module=remote_module, command_string=command_string)
+            ssh_config=self._config.ssh_config, remote_module=remote_module, command_string=command_string,
+            agent_command_string=agent_command_string)
         self._docker_interface = DockerInterface(self._server_proxy, worker_uid=self._config.uid)
         self._command_handler = WorkerCommandHandler(
             admin_group=self._config.admin_group, docker_interface=self._docker_interface, socket_path=socket_path)
@@ -75,9 +79,17 @@ class JobWorker:
         self._thread.daemon = True
         self._thread.start()
 
-        self._command_handler.main_loop()
+        if self._config.event_loop:
+            # The Docker event thread and the SSH connection to the server stay on their own threads, as neither the
+            # Docker SDK nor paramiko can be used from an event loop.
+            core = AsyncDaemonCore()
+            core.add_service(self._command_handler.serve)
+            core.run()
+        else:
+            self._command_handler.main_loop()
 
         self._server_proxy.unregister_self(self._config.uid)
         # Wait for commands to finish, but check periodically whether all of them have finished
         while self._docker_interface.has_running_jobs():
             time.sleep(1)
+        self._docker_interface.close()
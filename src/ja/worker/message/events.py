@@ -0,0 +1,117 @@
+from typing import Callable, Dict, List, Type, cast
+
+from ja.common.job import JobStatus
+from ja.common.message.base import Response, SchemaSerializable
+from ja.common.message.schema import Field
+from ja.server.database.database import ServerDatabase
+from ja.server.database.types.job_entry import DatabaseJobEntry
+from ja.server.database.types.work_machine import WorkMachine, WorkMachineState
+from ja.server.scheduler.algorithm import get_allocation_for_job
+from ja.worker.message.base import WorkerServerCommand
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _encode_statuses(job_statuses: Dict[str, JobStatus]) -> Dict[str, object]:
+    return {uid: status.name for uid, status in job_statuses.items()}
+
+
+def _decode_statuses(cls: Type["JobEventsCommand"], jobs: Dict[object, object]) -> Dict[str, JobStatus]:
+    job_statuses: Dict[str, JobStatus] = dict()
+    for uid, status in jobs.items():
+        if not isinstance(status, str) or status not in JobStatus.__members__:
+            cls._raise_error_wrong_type(key="jobs", expected_type="Dict[str, JobStatus]",
+                                        actual_type=status.__class__.__name__)
+        job_statuses[str(uid)] = JobStatus[cast(str, status)]
+    return job_statuses
+
+
+class _JobStatusesField(Field):
+    """
+    An entry which maps job UIDs to the names of job statuses.
+    """
+
+    def check(self, value: str, wrong_type: Callable[[str, str], str]) -> List[str]:
+        return self._simple_check(value, wrong_type, "dict")
+
+    def decode(self, value: str) -> str:
+        return "_decode_statuses(cls, %s)" % value
+
+    def encode(self, value: str) -> str:
+        return "_encode_statuses(%s)" % value
+
+    @property
+    def globals(self) -> Dict[str, object]:
+        return {"_decode_statuses": _decode_statuses, "_encode_statuses": _encode_statuses}
+
+
+class JobEventsCommand(WorkerServerCommand, SchemaSerializable):
+    """
+    Informs the server that several jobs are done or have crashed. Sent by the worker client instead of single
+    JobDoneCommands and JobCrashedCommands if several jobs ended within a short time. All jobs are loaded at once and
+    updated in a single transaction, after which the scheduler is called once.
+    """
+
+    # The final statuses a job can be reported with.
+    STATUSES = [JobStatus.DONE, JobStatus.CRASHED]
+
+    _schema = [_JobStatusesField("jobs", attribute="job_statuses", argument="job_statuses")]
+
+    def __init__(self, job_statuses: Dict[str, JobStatus]):
+        """!
+        @param job_statuses: The final statuses of the jobs, by job UID.
+        """
+        for uid, status in job_statuses.items():
+            if status not in self.STATUSES:
+                raise ValueError("Job %s cannot be reported with status %s." % (uid, status.name))
+        self._job_statuses = job_statuses
+
+    @property
+    def job_statuses(self) -> Dict[str, JobStatus]:
+        """!
+        @return: The final statuses of the jobs, by job UID.
+        """
+        return self._job_statuses
+
+    def execute(self, database: ServerDatabase) -> Response:
+        schedule: ServerDatabase.JobDistribution = []
+        machines: Dict[str, WorkMachine] = dict()
+        skipped: List[str] = []
+        # All jobs are loaded at once instead of one query per job.
+        job_entries = database.find_jobs_by_ids(list(self._job_statuses.keys()))
+        for uid, status in self._job_statuses.items():
+            job_entry = job_entries.get(uid, None)
+            if job_entry is None:
+                skipped.append(uid)
+                continue
+            try:
+                job_entry.job.status = status
+            except ValueError as e:
+                # For example a job which has been cancelled in the meantime.
+                logger.warning(e)
+                skipped.append(uid)
+                continue
+            machine = job_entry.assigned_machine
+            if machine is not None:
+                # Several of the jobs may have run on the same work machine.
+                machine = machines.setdefault(machine.uid, machine)
+                machine.resources.deallocate(get_allocation_for_job(job_entry.job))
+            schedule.append(DatabaseJobEntry(job_entry.job, job_entry.statistics, None))
+
+        for machine in machines.values():
+            if machine.state is WorkMachineState.RETIRED \
+                    and machine.resources.free_resources == machine.resources.total_resources:
+                # No more jobs on this work machine
+                machine.state = WorkMachineState.OFFLINE
+        database.apply_schedule(schedule, list(machines.values()))
+
+        result_string = "Updated %d jobs." % len(schedule)
+        if skipped:
+            result_string += " Could not update the jobs with uids: %s" % ", ".join(skipped)
+        return Response(result_string, True)
+
+    def __eq__(self, o: object) -> bool:
+        if isinstance(o, JobEventsCommand):
+            return self._job_statuses == o._job_statuses
+        return False
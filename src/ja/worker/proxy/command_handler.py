@@ -10,6 +10,8 @@ from ja.common.message.worker_commands.start_job import StartJobCommand
 from ja.common.message.worker_commands.pause_job import PauseJobCommand
 from ja.common.message.worker_commands.resume_job import ResumeJobCommand
 from ja.common.message.worker_commands.cancel_job import CancelJobCommand
+from ja.common.message.worker_commands.report_jobs import ReportJobsCommand
+from ja.common.message.worker_commands.batch_job import BatchJobCommand
 from ja.common.message.base import Response
 from ja.worker.docker import DockerInterface
 
@@ -27,6 +29,9 @@ class WorkerCommandHandler(CommandHandler):
         super().__init__(socket_path=socket_path, admin_group=admin_group)
         self._docker_interface = docker_interface
 
+    # Reports only read the state of the jobs, all other commands change it and are executed one after another.
+    _unordered_commands = {"ReportJobsCommand"}
+
     def _process_command_dict(self, command_dict: Dict[str, object], type_name: str, username: str) -> Dict[
             str, object]:
         if not self._user_is_admin(user=username):
@@ -41,6 +46,10 @@ class WorkerCommandHandler(CommandHandler):
             command = ResumeJobCommand.from_dict(command_dict)
         elif type_name == "CancelJobCommand":
             command = CancelJobCommand.from_dict(command_dict)
+        elif type_name == "ReportJobsCommand":
+            command = ReportJobsCommand.from_dict(command_dict)
+        elif type_name == "BatchJobCommand":
+            command = BatchJobCommand.from_dict(command_dict)
         else:
             return Response(result_string=self._UNKNOWN_COMMAND_TEMPLATE % type_name, is_success=False).to_dict()
         return command.execute(docker_interface=self._docker_interface).to_dict()
@@ -1,12 +1,16 @@
 from abc import ABC, abstractmethod
+from typing import Dict
+from ja.common.proxy.command_handler import CommandHandler
 from ja.common.proxy.ssh import ISSHConnection, SSHConnection
 from ja.common.proxy.proxy import ContinuousProxy
+from ja.common.job import JobStatus
 from ja.common.message.base import Response
 from ja.common.proxy.ssh import SSHConfig
 from ja.server.database.types.work_machine import WorkMachineResources, WorkMachine, WorkMachineState
 from ja.worker.message.register import RegisterWorkerCommand
 from ja.worker.message.crashed import JobCrashedCommand
 from ja.worker.message.done import JobDoneCommand
+from ja.worker.message.events import JobEventsCommand
 from ja.worker.message.retire import RetireWorkerCommand
 import socket
 from paramiko.ssh_exception import SSHException  # type: ignore
@@ -63,6 +67,18 @@ class IWorkerServerProxy(ContinuousProxy, ABC):
         @return: The Response from the Server.
         """
 
+    def notify_job_events(self, job_statuses: Dict[str, JobStatus]) -> Response:
+        """!
+        Notify the server about several jobs which are done or have crashed. By default, the server is notified about
+        every job separately.
+        @param job_statuses: The final statuses of the jobs, DONE or CRASHED, by job UID.
+        @return: The Response from the Server, which is only successful if the server was notified about all jobs.
+        """
+        responses = [self.notify_job_finished(uid) if status == JobStatus.DONE else self.notify_job_crashed(uid)
+                     for uid, status in job_statuses.items()]
+        return Response("\n".join(response.result_string for response in responses),
+                        all(response.is_success for response in responses))
+
 
 class WorkerServerProxy(IWorkerServerProxy):
     """
@@ -71,15 +87,17 @@ class WorkerServerProxy(IWorkerServerProxy):
 
     def __init__(
             self, ssh_config: SSHConfig, remote_module: str = "/tmp/jobadder-server.socket",
-            command_string: str = "ja-remote %s"):
+            command_string: str = "ja-remote %s", agent_command_string: str = "ja-remote %s --agent"):
         self._ssh_config = ssh_config
         self._remote_module = remote_module
         self._command_string = command_string
+        self._agent_command_string = agent_command_string
         super().__init__(ssh_config)
 
     def _get_ssh_connection(self, ssh_config: SSHConfig) -> ISSHConnection:
         return SSHConnection(
-            ssh_config=ssh_config, remote_module=self._remote_module, command_string=self._command_string)
+            ssh_config=ssh_config, remote_module=self._remote_module, command_string=self._command_string,
+            agent_command_string=self._agent_command_string)
 
     def _guess_ssh_config(self, server_config: SSHConfig) -> SSHConfig:
         # XXX: We assume that the worker and the server are using the same users, credentials, etc.
@@ -127,5 +145,16 @@ class WorkerServerProxy(IWorkerServerProxy):
             self._timeout(uid)
         return response
 
+    def notify_job_events(self, job_statuses: Dict[str, JobStatus]) -> Response:
+        if len(job_statuses) == 1:
+            return super().notify_job_events(job_statuses)
+        events_command = JobEventsCommand(job_statuses)
+        response = self._ssh_connection.send_command(events_command)
+        if not response.is_success \
+                and response.result_string == CommandHandler._UNKNOWN_COMMAND_TEMPLATE % type(events_command).__name__:
+            # The server does not know JobEventsCommand yet.
+            return super().notify_job_events(job_statuses)
+        return response
+
     def _timeout(self, uid: str) -> None:
         logger.error("Failed to connect work machine with uid %s to the central server." % uid)
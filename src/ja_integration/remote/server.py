@@ -1,5 +1,9 @@
-from ja.common.proxy.remote import Remote
+from ja.common.proxy.remote import Remote, RemoteAgent
 from ja_integration.remote import SERVER_SOCKET_PATH
+import sys
 
 if __name__ == "__main__":
-    Remote(socket_path=SERVER_SOCKET_PATH)
+    if "--agent" in sys.argv:
+        RemoteAgent(socket_path=SERVER_SOCKET_PATH)
+    else:
+        Remote(socket_path=SERVER_SOCKET_PATH)
@@ -11,7 +11,7 @@ setup(
     author='Ilia Bozhinov, Johannes Gäßler, Nikola Tzotchev, Malik Bouguila',
     author_email='ammen99@gmail.com, johannesg@5d6.de, ntzotchev@gmail.com, malikbouguila5@gmail.com',
     url='https://github.com/DistributedTaskScheduling/JobAdder',
-    packages=find_packages(exclude=["test", "test.*"]),
+    packages=find_packages(exclude=["test", "test.*", "benchmark", "benchmark.*"]),
     package_data={},
     keywords=[],
     license='GPL3',
@@ -1,17 +1,19 @@
 from unittest import TestCase
-from typing import List
+from typing import List, Optional, cast
 from pathlib import Path
 from threading import Thread
 from getpass import getuser
 from time import sleep
 
+from ja.server.database.database import ServerDatabase
 from ja.server.database.types.work_machine import WorkMachine
 from ja.worker.main import JobWorker
 from ja.common.proxy.ssh import SSHConfig, ISSHConnection, SSHConnection
 from ja.common.work_machine import ResourceAllocation
 from ja.user.main import JobAdder
 from ja.server.main import JobCenter
-from ja.server.config import ServerConfig, LoginConfig
+from ja.server.database.sql.database import SQLDatabase
+from ja.server.config import ServerConfig, LoginConfig, DatabaseConfig
 from ja.worker.config import WorkerConfig
 from ja.server.proxy.proxy import WorkerProxyBase, IWorkerProxy
 from ja.server.dispatcher.proxy_factory import WorkerProxyFactoryBase
@@ -28,6 +30,8 @@ if getuser() == "travis":
     COMMAND_STRING = "~/virtualenv/python3.7/bin/python3 -m %s"
 else:
     COMMAND_STRING = "python3 -m %s"
+# Starts the test remote modules as long-lived agents, like "ja-remote %s --agent" does in production.
+AGENT_COMMAND_STRING = COMMAND_STRING + " --agent"
 
 DOCKERFILE_PATH_TEMPLATE = TESTING_DIRECTORY + "Dockerfile-%s"
 DOCKERFILE_SOURCE_TEMPLATE = """
@@ -41,31 +45,47 @@ CMD sleep %s
 
 class TestWorkerProxy(WorkerProxyBase):
 
+    def __init__(self, uid: str, ssh_config: SSHConfig, agent_command_string: Optional[str]):
+        self._agent_command_string = agent_command_string
+        super().__init__(uid=uid, ssh_config=ssh_config)
+
     def _get_ssh_connection(self, ssh_config: SSHConfig) -> ISSHConnection:
         return SSHConnection(
             ssh_config=ssh_config,
             remote_module=WORKER_REMOTE_MODULE % self._uid,
-            command_string=COMMAND_STRING
+            command_string=COMMAND_STRING,
+            agent_command_string=self._agent_command_string
         )
 
 
 class TestWorkerProxyFactory(WorkerProxyFactoryBase):
 
+    def __init__(self, database: ServerDatabase, agent_command_string: Optional[str]):
+        self._agent_command_string = agent_command_string
+        super().__init__(database)
+
     def _create_proxy(self, work_machine: WorkMachine) -> IWorkerProxy:
-        return TestWorkerProxy(uid=work_machine.uid, ssh_config=SSHConfig(hostname="127.0.0.1"))
+        return TestWorkerProxy(uid=work_machine.uid, ssh_config=SSHConfig(hostname="127.0.0.1"),
+                               agent_command_string=self._agent_command_string)
 
 
 class TestJobCenter(JobCenter):
+    def __init__(self, agent_command_string: Optional[str], config_file: str, socket_path: str,
+                 database_name: str):
+        self._agent_command_string = agent_command_string
+        super().__init__(config_file=config_file, socket_path=socket_path, database_name=database_name)
+
     def _get_proxy_factory(self) -> WorkerProxyFactoryBase:
-        return TestWorkerProxyFactory(self._database)
+        return TestWorkerProxyFactory(self._database, self._agent_command_string)
 
 
 class TestJobWorker(JobWorker):
-    def __init__(self, index: int):
+    def __init__(self, index: int, agent_command_string: Optional[str]):
         self._index = index
         super().__init__(
             config_path=WORKER_CONF_PATH % self._index, socket_path=WORKER_SOCKET_PATH % self._index,
-            remote_module=SERVER_REMOTE_MODULE, command_string=COMMAND_STRING)
+            remote_module=SERVER_REMOTE_MODULE, command_string=COMMAND_STRING,
+            agent_command_string=agent_command_string)
 
 
 class IntegrationTest(TestCase):
@@ -74,7 +94,7 @@ class IntegrationTest(TestCase):
         Path(TESTING_DIRECTORY).mkdir(parents=True, exist_ok=True)
         with open(SERVER_CONF_PATH, "w") as f:
             f.write(str(self.server_config))
-        self._server = TestJobCenter(config_file=SERVER_CONF_PATH,
+        self._server = TestJobCenter(agent_command_string=self.agent_command_string, config_file=SERVER_CONF_PATH,
                                      socket_path=SERVER_SOCKET_PATH, database_name=DATABASE_NAME)
         Thread(target=self._server.run, name="server-main", daemon=True).start()
 
@@ -89,7 +109,8 @@ class IntegrationTest(TestCase):
         self._clients: List[JobAdder] = []
         for i in range(self.num_clients):
             client = JobAdder(
-                config_path=SSH_CONF_PATH, remote_module=SERVER_REMOTE_MODULE, command_string=COMMAND_STRING)
+                config_path=SSH_CONF_PATH, remote_module=SERVER_REMOTE_MODULE, command_string=COMMAND_STRING,
+                agent_command_string=self.agent_command_string)
             self._clients.append(client)
 
         self._workers: List[JobWorker] = []
@@ -100,12 +121,12 @@ class IntegrationTest(TestCase):
     def _add_worker(self, worker_id: int) -> None:
         with open(WORKER_CONF_PATH % worker_id, "w") as f:
             f.write(str(self.get_worker_config(worker_id)))
-        worker = TestJobWorker(index=worker_id)
+        worker = TestJobWorker(index=worker_id, agent_command_string=self.agent_command_string)
         Thread(target=worker.run, name="worker_%s" % worker_id, daemon=True).start()
         self._workers.append(worker)
 
     def tearDown(self) -> None:
-        database = self._server._database
+        database = cast(SQLDatabase, self._server._database)
         for table in reversed(database._metadata.sorted_tables):
             database.engine.execute(table.delete())
 
@@ -115,7 +136,7 @@ class IntegrationTest(TestCase):
 
     @property
     def server_config(self) -> ServerConfig:
-        database_config = LoginConfig(host="127.0.0.1", port=None, username="jobadder", password="jobadder")
+        database_config = DatabaseConfig(host="127.0.0.1", port=None, username="jobadder", password="jobadder")
         email_config = LoginConfig(host="127.0.0.1", port=1337, username="", password="")
         return ServerConfig(
             admin_group="jobadder", database_config=database_config, email_config=email_config,
@@ -132,6 +153,13 @@ class IntegrationTest(TestCase):
     def get_resource_allocation(self, index: int) -> ResourceAllocation:
         return ResourceAllocation(cpu_threads=4, memory=16 * 1024, swap=16 * 1024)
 
+    @property
+    def agent_command_string(self) -> Optional[str]:
+        """!
+        @return: The template to start the remote agents with, or None to start a remote module for every command.
+        """
+        return None
+
     @property
     def num_clients(self) -> int:
         return 1
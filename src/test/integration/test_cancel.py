@@ -1,8 +1,9 @@
 from ja.common.job import JobStatus
 from ja.common.work_machine import ResourceAllocation
+from ja.server.database.sql.database import SQLDatabase
 from test.integration.base import IntegrationTest
 from time import sleep
-from typing import Any, List, Tuple
+from typing import Any, List, Tuple, cast
 
 
 class TestJobCancel(IntegrationTest):
@@ -23,7 +24,7 @@ class TestJobCancel(IntegrationTest):
         jobs = self._server._database.query_jobs(None, -1, None)
         db_lo = [job for job in jobs if job.job.label == "lo"][0]
         db_me = [job for job in jobs if job.job.label == "me"][0]
-        db_wm = self._server._database.get_all_work_machines()[0]
+        db_wm = cast(SQLDatabase, self._server._database).get_all_work_machines()[0]
         self.assertEqual(db_lo.job.status, JobStatus.RUNNING)
         self.assertEqual(db_me.job.status, JobStatus.CANCELLED)
         self.assertEqual(db_wm.resources.free_resources, ResourceAllocation(0, 0, 16 * 1024))
@@ -33,7 +34,7 @@ class TestJobCancel(IntegrationTest):
         jobs = self._server._database.query_jobs(None, -1, None)
         db_lo = [job for job in jobs if job.job.label == "lo"][0]
         db_me = [job for job in jobs if job.job.label == "me"][0]
-        db_wm = self._server._database.get_all_work_machines()[0]
+        db_wm = cast(SQLDatabase, self._server._database).get_all_work_machines()[0]
         self.assertEqual(db_lo.job.status, JobStatus.CANCELLED)
         self.assertEqual(db_me.job.status, JobStatus.CANCELLED)
         self.assertEqual(db_wm.resources.free_resources, ResourceAllocation(4, 16 * 1024, 16 * 1024))
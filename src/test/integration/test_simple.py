@@ -1,6 +1,7 @@
 from time import sleep
+from typing import Optional
 
-from test.integration.base import IntegrationTest
+from test.integration.base import AGENT_COMMAND_STRING, IntegrationTest
 
 
 class SimpleIntegrationTest(IntegrationTest):
@@ -56,3 +57,13 @@ class SimpleIntegrationTest(IntegrationTest):
 
     def test_no_user_cli_args(self) -> None:
         self._clients[0].run(cli_args=[], suppress_help=True)  # Assure that the program doesn't just crash
+
+
+class AgentChannelIntegrationTest(SimpleIntegrationTest):
+    """
+    Runs the simple tests with all commands sent over long-lived remote agents, as they are in production.
+    """
+
+    @property
+    def agent_command_string(self) -> Optional[str]:
+        return AGENT_COMMAND_STRING
@@ -172,3 +172,10 @@ class AbstractWorkerProxyTest(TestCase):
         self.assertFalse(response_empty.is_success)
         response_busy = self._empty_worker.resume_job(self._uid_unknown)
         self.assertFalse(response_busy.is_success)
+
+    @skipIfAbstract
+    def test_report_jobs(self) -> None:
+        self.assertDictEqual(self._empty_worker.report_jobs(), {})
+        self.assertTrue(self._busy_worker.pause_job(self._uid_2).is_success)
+        self.assertDictEqual(self._busy_worker.report_jobs(),
+                             {self._uid_1: JobStatus.RUNNING, self._uid_2: JobStatus.PAUSED})
@@ -0,0 +1,79 @@
+from threading import Event, Thread, current_thread
+from typing import List
+from unittest import TestCase
+import asyncio
+
+from ja.common.async_core import AsyncDaemonCore
+
+
+class AsyncDaemonCoreTest(TestCase):
+    """
+    Class for testing AsyncDaemonCore.
+    """
+    def setUp(self) -> None:
+        self._core = AsyncDaemonCore(max_workers=2)
+
+    def _run_in_background(self) -> Thread:
+        thread = Thread(target=self._core.run, daemon=True)
+        thread.start()
+        return thread
+
+    def test_invalid_arguments(self) -> None:
+        with self.assertRaises(ValueError):
+            AsyncDaemonCore(max_workers=0)
+        with self.assertRaises(ValueError):
+            self._core.add_timer(0, lambda: None, "never")
+
+    def test_timer(self) -> None:
+        calls: List[str] = []
+        called = Event()
+
+        def tick() -> None:
+            calls.append(current_thread().name)
+            if len(calls) == 3:
+                called.set()
+
+        self._core.add_timer(0.01, tick, "tick")
+        thread = self._run_in_background()
+        self.assertTrue(called.wait(5))
+        self._core.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(all(name.startswith("daemon-core") for name in calls))
+
+    def test_failing_timer(self) -> None:
+        calls: List[int] = []
+        called = Event()
+
+        def fail() -> None:
+            calls.append(1)
+            if len(calls) == 2:
+                called.set()
+            raise RuntimeError("failed")
+
+        self._core.add_timer(0.01, fail, "fail")
+        thread = self._run_in_background()
+        # A failing call does not stop the timer.
+        self.assertTrue(called.wait(5))
+        self._core.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_service_ends(self) -> None:
+        results: List[int] = []
+
+        async def service(core: AsyncDaemonCore) -> None:
+            results.append(await core.run_blocking(sum, [1, 2, 3]))
+
+        async def forever(core: AsyncDaemonCore) -> None:
+            await asyncio.Event().wait()
+
+        self._core.add_service(service)
+        self._core.add_service(forever)
+        # The core stops once the first of its services has ended.
+        self._core.run()
+        self.assertEqual(results, [6])
+
+    def test_stop_before_run(self) -> None:
+        # Nothing runs yet, so there is nothing to stop.
+        self._core.stop()
@@ -0,0 +1,101 @@
+from typing import List
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from ja.common.identity import IdentityCache
+
+
+class _Passwd:
+    def __init__(self, name: str, uid: int):
+        self.pw_name = name
+        self.pw_uid = uid
+
+
+class _Group:
+    def __init__(self, name: str, members: List[str]):
+        self.gr_name = name
+        self.gr_mem = members
+
+
+class IdentityCacheTest(TestCase):
+    """
+    Class for testing the IdentityCache with a fake clock and a fake user database.
+    """
+    def setUp(self) -> None:
+        self._time = 0.0
+        self._cache = IdentityCache(ttl=60, negative_ttl=5, max_entries=2, clock=lambda: self._time)
+        users = [_Passwd("alice", 1000), _Passwd("bob", 1001)]
+
+        def getpwnam(name: str) -> _Passwd:
+            for user in users:
+                if user.pw_name == name:
+                    return user
+            raise KeyError(name)
+
+        def getpwuid(uid: int) -> _Passwd:
+            for user in users:
+                if user.pw_uid == uid:
+                    return user
+            raise KeyError(uid)
+
+        self._getpwnam = MagicMock(side_effect=getpwnam)
+        self._getpwuid = MagicMock(side_effect=getpwuid)
+        self._getgrall = MagicMock(return_value=[_Group("jobadder", ["alice"]), _Group("users", ["alice", "bob"])])
+        for target, mock in [("pwd.getpwnam", self._getpwnam), ("pwd.getpwuid", self._getpwuid),
+                             ("grp.getgrall", self._getgrall)]:
+            patcher = patch(target, mock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_uid(self) -> None:
+        self.assertEqual(self._cache.uid("alice"), 1000)
+        self.assertEqual(self._cache.uid("alice"), 1000)
+        self.assertEqual(self._getpwnam.call_count, 1)
+        self._time = 61
+        self.assertEqual(self._cache.uid("alice"), 1000)
+        self.assertEqual(self._getpwnam.call_count, 2)
+
+    def test_user_name(self) -> None:
+        self.assertEqual(self._cache.user_name(1001), "bob")
+        self.assertEqual(self._cache.user_name(1001), "bob")
+        self.assertEqual(self._getpwuid.call_count, 1)
+
+    def test_unknown_user(self) -> None:
+        for _ in range(2):
+            with self.assertRaises(KeyError):
+                self._cache.uid("mallory")
+            with self.assertRaises(KeyError):
+                self._cache.user_name(4242)
+        self.assertEqual(self._getpwnam.call_count, 1)
+        self.assertEqual(self._getpwuid.call_count, 1)
+        # Unknown users are looked up again much sooner.
+        self._time = 6
+        with self.assertRaises(KeyError):
+            self._cache.uid("mallory")
+        self.assertEqual(self._getpwnam.call_count, 2)
+
+    def test_groups(self) -> None:
+        self.assertEqual(self._cache.groups("alice"), {"jobadder", "users"})
+        self.assertEqual(self._cache.groups("bob"), {"users"})
+        self.assertEqual(self._cache.groups("mallory"), set())
+        self.assertEqual(self._getgrall.call_count, 1)
+        self._time = 61
+        self._cache.groups("bob")
+        self.assertEqual(self._getgrall.call_count, 2)
+
+    def test_max_entries(self) -> None:
+        self._cache.uid("alice")
+        self._cache.uid("bob")
+        with self.assertRaises(KeyError):
+            self._cache.uid("mallory")
+        self._cache.uid("alice")
+        self.assertEqual(self._getpwnam.call_count, 4)
+
+    def test_clear(self) -> None:
+        self._cache.uid("alice")
+        self._cache.groups("alice")
+        self._cache.clear()
+        self._cache.uid("alice")
+        self._cache.groups("alice")
+        self.assertEqual(self._getpwnam.call_count, 2)
+        self.assertEqual(self._getgrall.call_count, 2)
@@ -1,10 +1,15 @@
 from time import sleep
 from getpass import getuser
-from typing import List, Dict
+from typing import List, Dict, cast
+from unittest import TestCase
+from unittest.mock import Mock
 
 from ja.common.job import Job
+from ja.common.message.base import Response
+from ja.common.message.worker_commands.batch_job import BatchJobCommand
 from ja.common.message.worker_commands.cancel_job import CancelJobCommand
 from ja.common.message.worker_commands.pause_job import PauseJobCommand
+from ja.common.message.worker_commands.report_jobs import ReportJobsCommand
 from ja.common.message.worker_commands.resume_job import ResumeJobCommand
 from ja.common.message.worker_commands.start_job import StartJobCommand
 from ja.common.proxy.ssh import SSHConfig, ISSHConnection
@@ -48,6 +53,9 @@ class WorkerCommandHandlerDummy(ThreadedCommandHandler):
         elif type_name == "ResumeJobCommand":
             resume_command = ResumeJobCommand.from_dict(command_dict)
             response = self._worker_proxy_dummy.resume_job(resume_command.uid)
+        elif type_name == "ReportJobsCommand":
+            ReportJobsCommand.from_dict(command_dict)
+            response = ReportJobsCommand.create_response(self._worker_proxy_dummy.report_jobs())
         else:
             raise ValueError("Unknown Command type: %s" % type_name)
         return response.to_dict()
@@ -64,3 +72,103 @@ class WorkerProxyTest(AbstractWorkerProxyTest):
         self._command_handler_empty = WorkerCommandHandlerDummy(
             socket_path="./dummy_socket_busy", jobs=[self._job_1, self._job_2])
         sleep(0.01)  # Wait until the command handler has created the socket.
+
+
+class MockWorkerProxy(WorkerProxyBase):
+    def _get_ssh_connection(self, ssh_config: SSHConfig) -> ISSHConnection:
+        return Mock()
+
+
+class WorkerProxyDockerfileTest(TestCase):
+    """
+    Test that a worker proxy only sends the hash of Dockerfiles the worker already knows.
+    """
+    def setUp(self) -> None:
+        abstract_test = AbstractWorkerProxyTest()
+        abstract_test.setUp()
+        self._job_1 = abstract_test._job_1
+        self._job_2 = abstract_test._job_2
+        self._proxy = MockWorkerProxy(uid="worker", ssh_config=SSHConfig(hostname="mock"))
+        self._connection = cast(Mock, self._proxy._ssh_connection)
+        self._connection.send_command.return_value = Response("", is_success=True)
+
+    def _sent_dockerfile_sources(self) -> List[str]:
+        return [call[0][0].job.docker_context.dockerfile_source
+                for call in self._connection.send_command.call_args_list]
+
+    def test_known_dockerfile(self) -> None:
+        self._proxy.dispatch_job(self._job_1)
+        self._proxy.dispatch_job(self._job_2)
+        self.assertEqual(self._sent_dockerfile_sources(), ["", None])
+
+    def _unknown_dockerfile(self, job: Job) -> Response:
+        return Response(StartJobCommand.RESPONSE_UNKNOWN_DOCKERFILE % (
+            job.uid, "worker", job.docker_context.dockerfile_hash), is_success=False)
+
+    def test_unknown_dockerfile(self) -> None:
+        self._proxy.dispatch_job(self._job_1)
+        self._connection.send_command.side_effect = [self._unknown_dockerfile(self._job_2),
+                                                     Response("", is_success=True)]
+        self.assertTrue(self._proxy.dispatch_job(self._job_2).is_success)
+        self.assertEqual(self._sent_dockerfile_sources(), ["", None, ""])
+
+    def test_failed_reference(self) -> None:
+        # Any other failure, e.g. of the build, is not fixed by sending the Dockerfile again.
+        self._proxy.dispatch_job(self._job_1)
+        self._connection.send_command.return_value = Response("Failed communication with remote", is_success=False)
+        self.assertFalse(self._proxy.dispatch_job(self._job_2).is_success)
+        self.assertEqual(self._sent_dockerfile_sources(), ["", None])
+        # The worker still knows the Dockerfile.
+        self._connection.send_command.return_value = Response("", is_success=True)
+        self._proxy.dispatch_job(self._job_2)
+        self.assertEqual(self._sent_dockerfile_sources(), ["", None, None])
+
+    def test_batch(self) -> None:
+        self._proxy.dispatch_job(self._job_1)
+        self._connection.send_command.return_value = BatchJobCommand.create_response(
+            [Response("", is_success=True), Response("", is_success=True)])
+        responses = self._proxy.execute_batch([PauseJobCommand(self._job_1.uid), StartJobCommand(self._job_2)])
+        self.assertEqual(len(responses), 2)
+        self.assertEqual(self._connection.send_command.call_count, 2)
+        batch = self._connection.send_command.call_args[0][0]
+        self.assertIsInstance(batch, BatchJobCommand)
+        self.assertEqual(batch.commands[0], PauseJobCommand(self._job_1.uid))
+        self.assertIsNone(batch.commands[1].job.docker_context.dockerfile_source)
+
+    def test_batch_unsupported(self) -> None:
+        # A worker without batch support answers with an unknown command error, so the commands are sent one by one.
+        self._connection.send_command.return_value = Response("Unknown command: BatchJobCommand.", is_success=False)
+        responses = self._proxy.execute_batch([PauseJobCommand(self._job_1.uid), CancelJobCommand(self._job_2.uid)])
+        self.assertEqual(len(responses), 2)
+        self.assertEqual([type(call[0][0]) for call in self._connection.send_command.call_args_list],
+                         [BatchJobCommand, PauseJobCommand, CancelJobCommand])
+
+    def test_batch_unknown_dockerfile(self) -> None:
+        self._proxy.dispatch_job(self._job_1)
+        self._connection.send_command.return_value = None
+        self._connection.send_command.side_effect = [
+            BatchJobCommand.create_response([Response("", is_success=True), self._unknown_dockerfile(self._job_2)]),
+            Response("", is_success=True)]
+        responses = self._proxy.execute_batch([PauseJobCommand(self._job_1.uid), StartJobCommand(self._job_2)])
+        self.assertTrue(all(response.is_success for response in responses))
+        self.assertEqual(self._connection.send_command.call_args[0][0].job.docker_context.dockerfile_source, "")
+
+    def test_batch_failed_reference(self) -> None:
+        self._proxy.dispatch_job(self._job_1)
+        self._connection.send_command.return_value = BatchJobCommand.create_response(
+            [Response("", is_success=True), Response("Build failed", is_success=False)])
+        responses = self._proxy.execute_batch([PauseJobCommand(self._job_1.uid), StartJobCommand(self._job_2)])
+        self.assertFalse(responses[1].is_success)
+        self.assertEqual(self._connection.send_command.call_count, 2)
+
+    def test_batch_not_answered(self) -> None:
+        # The batch may have been executed, so it is not sent again command by command.
+        self._connection.send_command.return_value = Response("Failed communication with remote", is_success=False)
+        responses = self._proxy.execute_batch([PauseJobCommand(self._job_1.uid), CancelJobCommand(self._job_2.uid)])
+        self.assertEqual([response.is_success for response in responses], [False, False])
+        self.assertEqual(self._connection.send_command.call_count, 1)
+
+    def test_batch_incomplete(self) -> None:
+        self._connection.send_command.return_value = BatchJobCommand.create_response([Response("", is_success=True)])
+        responses = self._proxy.execute_batch([PauseJobCommand(self._job_1.uid), CancelJobCommand(self._job_2.uid)])
+        self.assertEqual([response.is_success for response in responses], [False, False])
@@ -1,9 +1,10 @@
-from typing import List
+from typing import Dict, List
 
 from ja.common.job import Job, JobStatus
 from ja.common.message.base import Response
 from ja.common.message.worker_commands.cancel_job import CancelJobCommand
 from ja.common.message.worker_commands.pause_job import PauseJobCommand
+from ja.common.message.worker_commands.report_jobs import ReportJobsCommand
 from ja.common.message.worker_commands.resume_job import ResumeJobCommand
 from ja.common.message.worker_commands.start_job import StartJobCommand
 from ja.common.proxy.ssh import SSHConfig, ISSHConnection
@@ -19,6 +20,8 @@ class WorkerProxyDummy(IWorkerProxy):
             job_copy = Job.from_dict(job.to_dict())
             job_copy.status = JobStatus.RUNNING
             self._jobs.append(job_copy)
+        # Jobs which finished without the server being notified.
+        self._unreported_jobs: Dict[str, JobStatus] = dict()
 
     def _get_remote_path(self) -> str:
         pass
@@ -29,6 +32,9 @@ class WorkerProxyDummy(IWorkerProxy):
     def check_connection(self) -> None:
         pass
 
+    def close_ssh_connection(self) -> None:
+        pass
+
     def _find_job(self, uid: str) -> Job:
         for job in self._jobs:
             if job.uid == uid:
@@ -89,6 +95,12 @@ class WorkerProxyDummy(IWorkerProxy):
         return Response.from_dict(Response(
             result_string=ResumeJobCommand.RESPONSE_UNKNOWN_JOB % (uid, self.uid), is_success=False).to_dict())
 
+    def report_jobs(self) -> Dict[str, JobStatus]:
+        job_statuses = {job.uid: job.status for job in self._jobs}
+        job_statuses.update(self._unreported_jobs)
+        self._unreported_jobs.clear()
+        return ReportJobsCommand.get_job_statuses(ReportJobsCommand.create_response(job_statuses))
+
 
 class WorkerProxyDummyTest(AbstractWorkerProxyTest):
     def setUp(self) -> None:
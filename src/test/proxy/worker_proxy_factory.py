@@ -1,10 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
 from itertools import permutations
+from threading import Barrier, Lock
 from unittest import TestCase
 from typing import List, Tuple
 
 from ja.common.proxy.ssh import SSHConfig
 from ja.server.database.types.work_machine import WorkMachine
-from ja.server.dispatcher.proxy_factory import WorkerProxyFactoryBase
+from ja.server.dispatcher.proxy_factory import ProxyUnavailableError, WorkerProxyFactoryBase
 from ja.server.proxy.proxy import IWorkerProxy
 from test.proxy.worker_proxy import SSHDummyWorkerProxy
 from test.proxy.worker_proxy_dummy import WorkerProxyDummy
@@ -73,3 +75,117 @@ class WorkerProxyFactoryTest(AbstractWorkerProxyFactoryTest):
     """
     def _get_factory(self) -> WorkerProxyFactoryBase:
         return SSHDummyWorkerProxyFactory(database=None)
+
+
+class PooledWorkerProxyDummy(WorkerProxyDummy):
+    def __init__(self, uid: str):
+        super().__init__(uid=uid, jobs=[])
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def close_ssh_connection(self) -> None:
+        self.closed = True
+
+
+class FlakyWorkerProxyFactory(WorkerProxyFactoryBase):
+    """
+    Factory class for PooledWorkerProxyDummy which fails to connect to work machines in the unreachable set.
+    """
+    def __init__(self, **kwargs: object):
+        self.time = 0.0
+        super().__init__(database=None, clock=lambda: self.time, **kwargs)  # type: ignore
+        self.unreachable: List[str] = []
+        self.created: List[str] = []
+
+    def _create_proxy(self, work_machine: WorkMachine) -> IWorkerProxy:
+        self.created.append(work_machine.uid)
+        if work_machine.uid in self.unreachable:
+            raise ConnectionError("Work machine %s is unreachable." % work_machine.uid)
+        return PooledWorkerProxyDummy(work_machine.uid)
+
+
+class ProxyPoolTest(TestCase):
+    """
+    Class for testing the management of proxies by WorkerProxyFactoryBase.
+    """
+    def setUp(self) -> None:
+        self._factory = FlakyWorkerProxyFactory(idle_timeout=100, backoff_base=1, backoff_max=4)
+        self._machine = WorkMachine(uid="worker001", ssh_config=SSHConfig(hostname="host1"))
+
+    def test_unhealthy(self) -> None:
+        proxy = self._factory.get_proxy(self._machine)
+        assert isinstance(proxy, PooledWorkerProxyDummy)
+        proxy.connected = False
+        new_proxy = self._factory.get_proxy(self._machine)
+        self.assertIsNot(new_proxy, proxy)
+        self.assertTrue(proxy.closed)
+        self.assertEqual(self._factory.metrics.snapshot()["evicted_unhealthy"], 1)
+        self.assertEqual(self._factory.metrics.snapshot()["reconnected"], 1)
+
+    def test_ssh_config_changed(self) -> None:
+        proxy = self._factory.get_proxy(self._machine)
+        self.assertIs(self._factory.get_proxy(WorkMachine(uid="worker001", ssh_config=SSHConfig(hostname="host1"))),
+                      proxy)
+        self.assertIsNot(self._factory.get_proxy(WorkMachine(uid="worker001", ssh_config=SSHConfig(hostname="host2"))),
+                         proxy)
+        self.assertEqual(self._factory.metrics.snapshot()["evicted_config"], 1)
+
+    def test_idle(self) -> None:
+        proxy = self._factory.get_proxy(self._machine)
+        self._factory.time = 50
+        self.assertIs(self._factory.get_proxy(self._machine), proxy)
+        self._factory.time = 149
+        self._factory.evict_idle()
+        self.assertIs(self._factory.get_proxy(self._machine), proxy)
+        self._factory.time = 300
+        self._factory.evict_idle()
+        assert isinstance(proxy, PooledWorkerProxyDummy)
+        self.assertTrue(proxy.closed)
+        self.assertIsNot(self._factory.get_proxy(self._machine), proxy)
+
+    def test_evict(self) -> None:
+        proxy = self._factory.get_proxy(self._machine)
+        self._factory.evict(self._machine.uid)
+        self._factory.evict("worker-unknown")
+        self.assertIsNot(self._factory.get_proxy(self._machine), proxy)
+        self.assertEqual(self._factory.metrics.snapshot()["evicted"], 1)
+
+    def test_backoff(self) -> None:
+        self._factory.unreachable.append(self._machine.uid)
+        for time, expected_attempts in [(0, 1), (0.5, 1), (1, 2), (2.5, 2), (3, 3), (6.9, 3), (7, 4), (11, 5)]:
+            self._factory.time = time
+            with self.assertRaises(ProxyUnavailableError):
+                self._factory.get_proxy(self._machine)
+            self.assertEqual(len(self._factory.created), expected_attempts, "at time %s" % time)
+        self._factory.unreachable.clear()
+        self._factory.time = 15
+        self._factory.get_proxy(self._machine)
+        self.assertEqual(self._factory.metrics.snapshot()["failed"], 5)
+
+    def test_concurrent_connects(self) -> None:
+        factory = FlakyWorkerProxyFactory(max_concurrent_connects=2)
+        barrier = Barrier(2)
+        active = [0, 0]
+        lock = Lock()
+        create_proxy = factory._create_proxy
+
+        def create_proxy_slowly(work_machine: WorkMachine) -> IWorkerProxy:
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            try:
+                barrier.wait(timeout=1)
+            except Exception:
+                pass
+            with lock:
+                active[0] -= 1
+            return create_proxy(work_machine)
+
+        factory._create_proxy = create_proxy_slowly  # type: ignore
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(factory.get_proxy, [WorkMachine(uid="worker%d" % i) for i in range(4)] * 2))
+        self.assertEqual(active[1], 2)
+        self.assertEqual(sorted(factory.created), ["worker%d" % i for i in range(4)])
@@ -0,0 +1,237 @@
+from getpass import getuser
+from threading import Barrier, BrokenBarrierError, Lock, Thread
+from typing import Dict, List
+from unittest import TestCase
+import os
+import socket
+
+from ja.common.async_core import AsyncDaemonCore
+from ja.common.message.codec import YAML
+from ja.common.proxy.command_handler import CommandHandler
+from ja.common.proxy.pipeline import CommandSession, SessionPool, SessionUnsupportedError
+from ja.common.proxy.remote import forward_command, prepare_command
+
+
+class BlockingCommandHandler(CommandHandler):
+    """
+    Reads wait for each other at a barrier, writes count how many of them run at the same time.
+    """
+    _unordered_commands = {"READ"}
+
+    def __init__(self, socket_path: str):
+        super().__init__(socket_path=socket_path, admin_group=getuser(), max_workers=4)
+        self.barrier = Barrier(3, timeout=5)
+        self.lock = Lock()
+        self.active_writes = 0
+        self.max_active_writes = 0
+
+    def _process_command_dict(
+            self, command_dict: Dict[str, object], type_name: str, username: str) -> Dict[str, object]:
+        if type_name == "READ":
+            try:
+                self.barrier.wait()
+            except BrokenBarrierError:
+                return dict(result="timeout")
+            return dict(result="read")
+        if type_name == "WRITE":
+            with self.lock:
+                self.active_writes += 1
+                self.max_active_writes = max(self.max_active_writes, self.active_writes)
+            barrier = Barrier(2, timeout=0.2)
+            try:
+                barrier.wait()  # Give other writes the chance to run concurrently.
+            except BrokenBarrierError:
+                pass
+            with self.lock:
+                self.active_writes -= 1
+            return dict(result="write")
+        if type_name == "ECHO":
+            return dict(result=command_dict["payload"])
+        raise RuntimeError("unknown command")
+
+
+class CommandHandlerTest(TestCase):
+    """
+    Class for testing the concurrent handling of Commands by CommandHandler.
+    """
+    def setUp(self) -> None:
+        self._socket_path = "./command_handler_socket"
+        self._handler = BlockingCommandHandler(self._socket_path)
+        self._thread = Thread(target=self._handler.main_loop, daemon=True)
+        self._thread.start()
+
+    def tearDown(self) -> None:
+        if self._thread.is_alive():
+            self._send("KillCommand")
+            self._thread.join(5)
+
+    def _send(self, type_name: str, payload: str = "") -> Dict[str, object]:
+        command_dict: Dict[str, object] = dict(command=dict(payload=payload), type_name=type_name)
+        return YAML.decode(forward_command(self._socket_path, YAML.encode(command_dict)))
+
+    def _send_concurrently(self, type_names: List[str]) -> List[Dict[str, object]]:
+        results: List[Dict[str, object]] = [dict() for _ in type_names]
+
+        def send(index: int) -> None:
+            results[index] = self._send(type_names[index])
+
+        threads = [Thread(target=send, args=(index,)) for index in range(len(type_names))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_reads(self) -> None:
+        # The reads only pass the barrier if all three of them are executed at the same time.
+        self.assertEqual(self._send_concurrently(["READ"] * 3), [dict(result="read")] * 3)
+
+    def test_ordered_writes(self) -> None:
+        self.assertEqual(self._send_concurrently(["WRITE"] * 4), [dict(result="write")] * 4)
+        self.assertEqual(self._handler.max_active_writes, 1)
+
+    def test_large_command(self) -> None:
+        payload = "x" * (8 * 1024 * 1024)
+        self.assertEqual(self._send("ECHO", payload), dict(result=payload))
+
+    def test_failing_command(self) -> None:
+        response = self._send("UNKNOWN")
+        self.assertFalse(response["is_success"])
+        self.assertEqual(self._send("ECHO", "still running"), dict(result="still running"))
+
+    def test_truncated_command(self) -> None:
+        client = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+        client.connect(self._socket_path)
+        client.sendall((100).to_bytes(length=8, byteorder="big") + b"type_name: ECHO")
+        client.close()
+        self.assertEqual(self._send("ECHO", "next"), dict(result="next"))
+
+    def _echo(self, payload: str) -> bytes:
+        return prepare_command(YAML.encode(dict(command=dict(payload=payload), type_name="ECHO")))
+
+    def test_session(self) -> None:
+        session = CommandSession(self._socket_path, timeout=5)
+        self.assertEqual(YAML.decode(session.request(self._echo("first"))), dict(result="first"))
+        responses = session.request_all([self._echo(str(i)) for i in range(100)])
+        self.assertEqual([YAML.decode(response) for response in responses], [dict(result=str(i)) for i in range(100)])
+        self.assertTrue(session.is_open)
+        session.close()
+        self.assertFalse(session.is_open)
+        self.assertEqual(self._handler.metrics.snapshot()["ECHO"]["count"], 101)
+
+    def test_concurrent_session_requests(self) -> None:
+        session = CommandSession(self._socket_path, timeout=5)
+        results: List[Dict[str, object]] = [dict() for _ in range(10)]
+
+        def request(index: int) -> None:
+            results[index] = YAML.decode(session.request(self._echo(str(index))))
+
+        threads = [Thread(target=request, args=(index,)) for index in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [dict(result=str(index)) for index in range(10)])
+        session.close()
+
+    def test_idle_sessions(self) -> None:
+        # Idle sessions do not occupy any of the four threads of the handler.
+        sessions = [CommandSession(self._socket_path, timeout=5) for _ in range(8)]
+        for session in sessions:
+            self.assertEqual(YAML.decode(session.request(self._echo("a"))), dict(result="a"))
+        self.assertEqual(self._send_concurrently(["READ"] * 3), [dict(result="read")] * 3)
+        self.assertEqual(YAML.decode(sessions[0].request(self._echo("b"))), dict(result="b"))
+        for session in sessions:
+            session.close()
+
+    def test_session_too_long(self) -> None:
+        client = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+        client.settimeout(5)
+        client.connect(self._socket_path)
+        client.sendall(b"\xff" * 8 + (2 ** 40).to_bytes(length=8, byteorder="big"))
+        self.assertEqual(client.recv(8), b"\xff" * 8)
+        length = int.from_bytes(client.recv(8), byteorder="big")
+        response = b""
+        while len(response) < length:
+            response += client.recv(length - len(response))
+        self.assertFalse(YAML.decode(response)["is_success"])
+        self.assertEqual(client.recv(1), b"")
+        client.close()
+
+    def test_session_pool(self) -> None:
+        pool = SessionPool(self._socket_path, max_idle=1)
+        for payload in ["a", "b"]:
+            self.assertEqual(YAML.decode(pool.request(self._echo(payload))), dict(result=payload))
+        pool.close()
+
+    def test_metrics(self) -> None:
+        self._send("ECHO", "a")
+        self._send("ECHO", "b")
+        metrics = self._handler.metrics.snapshot()
+        self.assertEqual(metrics["ECHO"]["count"], 2)
+        self.assertGreaterEqual(metrics["ECHO"]["max_execution_ms"], 0)
+        self.assertNotIn("READ", metrics)
+
+    def test_kill(self) -> None:
+        response = self._send("KillCommand")
+        self.assertTrue(response["is_success"])
+        self._thread.join(5)
+        self.assertFalse(self._thread.is_alive())
+
+
+class AsyncCommandHandlerTest(CommandHandlerTest):
+    """
+    Runs the same tests with the CommandHandler served by the event loop of an AsyncDaemonCore.
+    """
+    def setUp(self) -> None:
+        self._socket_path = "./command_handler_socket"
+        self._handler = BlockingCommandHandler(self._socket_path)
+        core = AsyncDaemonCore(max_workers=4)
+        core.add_service(self._handler.serve)
+        self._thread = Thread(target=core.run, daemon=True)
+        self._thread.start()
+
+
+class SessionUnsupportedTest(TestCase):
+    """
+    Class for testing sessions with a command handler which only accepts one Command per connection.
+    """
+    def setUp(self) -> None:
+        self._socket_path = "./command_handler_socket_legacy"
+        self._listener = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        self._listener.bind(self._socket_path)
+        self._listener.listen(4)
+        self._connections = 0
+        Thread(target=self._serve, daemon=True).start()
+
+    def tearDown(self) -> None:
+        self._listener.close()
+        os.unlink(self._socket_path)
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                connection, _ = self._listener.accept()
+            except OSError:
+                return
+            self._connections += 1
+            length = int.from_bytes(connection.recv(8), byteorder="big")
+            if length > 1024:
+                response: Dict[str, object] = dict(result_string="Command exceeds the maximum length.",
+                                                   is_success=False)
+            else:
+                response = dict(result=YAML.decode(connection.recv(length))["command"])
+            connection.sendall(YAML.encode(response))
+            connection.close()
+
+    def test_fallback(self) -> None:
+        with self.assertRaises(SessionUnsupportedError):
+            CommandSession(self._socket_path, timeout=5)
+        pool = SessionPool(self._socket_path)
+        command = YAML.encode(dict(command=dict(payload="x"), type_name="ECHO"))
+        self.assertEqual(YAML.decode(pool.request(command)), dict(result=dict(payload="x")))
+        self.assertEqual(YAML.decode(pool.request(command)), dict(result=dict(payload="x")))
+        # The pool tries to open a session only once, then sends one Command per connection.
+        self.assertEqual(self._connections, 4)
@@ -1,3 +1,4 @@
+import json
 import yaml
 from subprocess import run, PIPE
 from unittest import TestCase
@@ -38,6 +39,18 @@ class RemoteTest(TestCase):
         response_dict = yaml.load(stdout.decode(), yaml.SafeLoader)
         return str(response_dict["payload"])
 
+    def _call_remote_json(self, command_string: str) -> str:
+        command_dict = dict(command=dict(payload=command_string), type_name=self._command_string)
+        finished_process = run(
+            [
+                "python3",
+                "-m",
+                "test.remote.remote"
+            ], timeout=10, input=json.dumps(command_dict).encode(), stdout=PIPE)
+        # The Response is encoded in the codec of the Command.
+        response_dict = json.loads(finished_process.stdout.decode())
+        return str(response_dict["payload"])
+
     def setUp(self) -> None:
         self._command_string = "COMMAND"
         self._response_string = "RESPONSE"
@@ -52,3 +65,7 @@ class RemoteTest(TestCase):
     def test_long_command(self) -> None:
         response_string = self._call_remote(self._long_command_string)
         self.assertEqual(self._long_response_string, response_string)
+
+    def test_json_command(self) -> None:
+        response_string = self._call_remote_json(self._long_command_string)
+        self.assertEqual(self._long_response_string, response_string)
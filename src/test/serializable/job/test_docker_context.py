@@ -1,4 +1,6 @@
-from ja.common.docker_context import DockerContext, MountPoint
+from typing import cast
+
+from ja.common.docker_context import DockerContext, MountPoint, get_dockerfile_hash
 from test.serializable.base import AbstractSerializableTest
 
 
@@ -28,3 +30,22 @@ class DockerContextTest(AbstractSerializableTest):
                 {"source_path": "/home/user", "mount_path": "/home/user"},
             ]
         }
+
+    def test_reference_roundtrip(self) -> None:
+        reference = cast(DockerContext, self._object).without_source()
+        self.assertIsNone(reference.dockerfile_source)
+        self.assertEqual(reference.to_dict(), {
+            "dockerfile_hash": get_dockerfile_hash("sudo apt install docker"),
+            "mount_points": self._object_dict["mount_points"]
+        })
+        recreated = DockerContext.from_dict(reference.to_dict())
+        self.assertEqual(recreated, self._object)
+        recreated.attach_dockerfile_source("sudo apt install docker")
+        self.assertEqual(recreated.to_dict(), self._object_dict)
+
+    def test_wrong_dockerfile_source(self) -> None:
+        reference = cast(DockerContext, self._object).without_source()
+        with self.assertRaises(ValueError):
+            reference.attach_dockerfile_source("sudo apt install podman")
+        with self.assertRaises(ValueError):
+            DockerContext("sudo apt install podman", [], dockerfile_hash=reference.dockerfile_hash)
@@ -0,0 +1,75 @@
+from typing import Dict
+from unittest import TestCase, skipIf
+
+from ja.common.job import JobSchedulingConstraints, JobPriority, Job
+from ja.common.docker_context import DockerContext, DockerConstraints, MountPoint
+from ja.common.message.base import Response
+from ja.common.message.codec import CODECS, JSON, YAML, available_codecs, choose_codec, decode_any, detect_codec
+from ja.common.message.worker_commands.start_job import StartJobCommand
+
+
+class CodecTest(TestCase):
+    """
+    Class for testing the message codecs.
+    """
+    def setUp(self) -> None:
+        job = Job(
+            owner_id=1008,
+            email="user@website.com",
+            scheduling_constraints=JobSchedulingConstraints(
+                priority=JobPriority.MEDIUM, is_preemptible=False, special_resources=["THING"]
+            ),
+            docker_context=DockerContext(
+                dockerfile_source="FROM alpine\nCMD echo \"ä\"",
+                mount_points=[MountPoint(source_path="/home/user", mount_path="/home/user")]
+            ),
+            docker_constraints=DockerConstraints(cpu_threads=4, memory=4096),
+            label="thing"
+        )
+        command = StartJobCommand(job=job)
+        self._command_dict: Dict[str, object] = dict(
+            command=command.to_dict(), type_name=command.__class__.__name__, username="user")
+        self._response = Response(result_string="line1\nline2", is_success=True, uid="job1")
+
+    def test_round_trip(self) -> None:
+        for codec in CODECS.values():
+            with self.subTest(codec=codec.name):
+                data = codec.encode(self._command_dict)
+                self.assertEqual(codec.decode(data), self._command_dict)
+                self.assertIs(detect_codec(data), codec)
+                self.assertEqual(decode_any(data), self._command_dict)
+                response_dict = codec.decode(codec.encode(self._response.to_dict()))
+                self.assertEqual(Response.from_dict(response_dict), self._response)
+
+    def test_yaml_compatible(self) -> None:
+        # Messages encoded by YAMLCodec must stay readable by Serializable.from_string() and vice versa.
+        self.assertEqual(Response.from_string(YAML.encode(self._response.to_dict()).decode()), self._response)
+        self.assertEqual(YAML.decode(str(self._response).encode()), self._response.to_dict())
+
+    def test_decode_invalid(self) -> None:
+        for codec in CODECS.values():
+            if codec is not YAML:  # A truncated YAML document is usually still valid.
+                with self.subTest(codec=codec.name):
+                    with self.assertRaises(ValueError):
+                        codec.decode(codec.encode(self._command_dict)[:-3])
+        with self.assertRaises(ValueError):
+            YAML.decode(b"a: [1")
+        with self.assertRaises(ValueError):
+            JSON.decode(b"[1, 2]")
+        with self.assertRaises(ValueError):
+            YAML.decode(b"just a string")
+
+    def test_decode_any_flow_yaml(self) -> None:
+        self.assertEqual(decode_any(b"{a: 1}"), {"a": 1})
+        self.assertIs(detect_codec(b""), YAML)
+
+    def test_choose_codec(self) -> None:
+        self.assertIs(choose_codec([]), YAML)
+        self.assertIs(choose_codec(["yaml"]), YAML)
+        self.assertIs(choose_codec(["yaml", "json"]), JSON)
+        self.assertIs(choose_codec(["unknown"]), YAML)
+        self.assertEqual(available_codecs()[-2:], ["json", "yaml"])
+
+    @skipIf("msgpack" not in CODECS, "msgpack is not installed")
+    def test_choose_msgpack(self) -> None:
+        self.assertIs(choose_codec(["json", "msgpack"]), CODECS["msgpack"])
@@ -0,0 +1,48 @@
+from unittest import TestCase
+import os
+
+from ja.common.message.compression import CompressionMetrics, is_enveloped, pack, unpack
+
+
+class CompressionTest(TestCase):
+    """
+    Class for testing the compression of encoded messages.
+    """
+    def setUp(self) -> None:
+        self._large = b"dockerfile_source: FROM alpine\n" * 100
+        self._metrics = CompressionMetrics()
+
+    def test_round_trip(self) -> None:
+        for data in [b"", b"a: b\n", self._large]:
+            with self.subTest(length=len(data)):
+                packed = pack(data, metrics=self._metrics)
+                self.assertTrue(is_enveloped(packed))
+                self.assertEqual(unpack(packed), (data, True))
+
+    def test_threshold(self) -> None:
+        self.assertEqual(pack(b"a: b\n", metrics=self._metrics)[2:], b"a: b\n")
+        self.assertLess(len(pack(self._large, metrics=self._metrics)), len(self._large) // 10)
+        self.assertEqual(pack(self._large, threshold=None)[2:], self._large)
+        self.assertEqual(self._metrics.snapshot(), dict(messages=2, compressed_messages=1,
+                                                        bytes_before=5 + len(self._large),
+                                                        bytes_after=7 + len(pack(self._large))))
+
+    def test_incompressible(self) -> None:
+        data = os.urandom(2048)
+        self.assertEqual(pack(data, threshold=0), b"\x00p" + data)
+
+    def test_not_enveloped(self) -> None:
+        for data in [b"", b"{}", b"a: b\n", b"\x00"]:
+            with self.subTest(data=data):
+                self.assertFalse(is_enveloped(data))
+                self.assertEqual(unpack(data), (data, False))
+
+    def test_malformed(self) -> None:
+        packed = pack(self._large)
+        with self.assertRaises(ValueError):
+            unpack(packed[:-5])
+        with self.assertRaises(ValueError):
+            unpack(b"\x00z" + b"garbage")
+        with self.assertRaises(ValueError):
+            unpack(packed, max_length=len(self._large) - 1)
+        self.assertEqual(unpack(packed, max_length=len(self._large)), (self._large, True))
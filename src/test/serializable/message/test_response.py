@@ -7,7 +7,10 @@ class ResponseTest(AbstractSerializableTest):
     Class for testing Response.
     """
     def setUp(self) -> None:
-        self._optional_properties = ["uid"]
-        self._object = Response(result_string="SUCCESS", is_success=True, uid="job1")
-        self._object_dict = {"result_string": "SUCCESS", "is_success": True, "uid": "job1"}
+        self._optional_properties = ["uid", "retry_after", "responses"]
+        self._object = Response(result_string="SUCCESS", is_success=True, uid="job1", retry_after=5,
+                                responses=[Response("Job started.", True, uid="job2")])
+        self._object_dict = {"result_string": "SUCCESS", "is_success": True, "uid": "job1", "retry_after": 5,
+                             "responses": [{"result_string": "Job started.", "is_success": True, "uid": "job2",
+                                            "retry_after": None, "responses": None}]}
         self._other_object_dict = {"result_string": "FAILURE", "is_success": False, "uid": "job1"}
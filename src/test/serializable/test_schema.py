@@ -0,0 +1,173 @@
+from abc import ABC
+from copy import deepcopy
+from enum import Enum
+from typing import Dict, List, Optional
+
+from ja.common.docker_context import MountPoint
+from ja.common.message.base import SchemaSerializable, Serializable
+from ja.common.message.schema import BoolField, EnumField, IntField, NestedField, NestedListField, StrField, \
+    StrListField
+from test.serializable.base import AbstractSerializableTest
+
+
+class Color(Enum):
+    RED = 0
+    GREEN = 1
+
+
+class HandWritten(Serializable):
+    """
+    Reads in the same dictionaries as Declared using the helper methods of Serializable.
+    """
+
+    @classmethod
+    def from_dict(cls, property_dict: Dict[str, object]) -> "HandWritten":
+        cls._get_str_from_dict(property_dict=property_dict, key="name")
+        cls._get_int_from_dict(property_dict=property_dict, key="count")
+        cls._get_bool_from_dict(property_dict=property_dict, key="flag")
+        cls._get_str_list_from_dict(property_dict=property_dict, key="tags")
+        cls._get_from_dict(property_dict=property_dict, key="color")
+        cls._get_dict_from_dict(property_dict=property_dict, key="mount_point")
+        cls._get_from_dict(property_dict=property_dict, key="mount_points")
+        cls._get_str_from_dict(property_dict=property_dict, key="comment", mandatory=False)
+        cls._assert_all_properties_used(property_dict)
+        return cls()
+
+    def to_dict(self) -> Dict[str, object]:
+        return dict()
+
+
+class Declared(SchemaSerializable):
+    _schema = [
+        StrField("name"),
+        IntField("count"),
+        BoolField("flag"),
+        StrListField("tags"),
+        EnumField("color", Color),
+        NestedField("mount_point", MountPoint),
+        NestedListField("mount_points", MountPoint, attribute="points", argument="points"),
+        StrField("comment", mandatory=False),
+        NestedField("extra", MountPoint, mandatory=False),
+    ]
+
+    def __init__(self, name: str, count: int, flag: bool, tags: List[str], color: Color, mount_point: MountPoint,
+                 points: List[MountPoint], comment: str = None, extra: MountPoint = None):
+        self.name = name
+        self.count = count
+        self.flag = flag
+        self.tags = tags
+        self.color = color
+        self.mount_point = mount_point
+        self.points = points
+        self.comment = comment
+        self.extra = extra
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Declared) and self.to_dict() == other.to_dict()
+
+
+class Renamed(Declared):
+    """
+    Inherits the generated methods of Declared and creates its objects with _from_properties().
+    """
+
+    @classmethod
+    def _from_properties(cls, **properties: object) -> "Renamed":
+        renamed = super()._from_properties(**properties)
+        renamed.name = renamed.name.upper()
+        return renamed
+
+
+class CustomToDict(SchemaSerializable):
+    _schema = [IntField("value")]
+
+    def __init__(self, value: int):
+        self.value = value
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"value": self.value + 1}
+
+
+class DeclaredTest(AbstractSerializableTest):
+    """
+    Class for testing the methods generated for a SchemaSerializable.
+    """
+
+    def setUp(self) -> None:
+        self._optional_properties = ["comment", "extra"]
+        self._object = Declared(name="name", count=3, flag=True, tags=["a", "b"], color=Color.GREEN,
+                                mount_point=MountPoint("/a", "/b"), points=[MountPoint("/c", "/d")],
+                                comment="comment")
+        self._object_dict = {
+            "name": "name", "count": 3, "flag": True, "tags": ["a", "b"], "color": 1,
+            "mount_point": {"source_path": "/a", "mount_path": "/b"},
+            "mount_points": [{"source_path": "/c", "mount_path": "/d"}], "comment": "comment", "extra": None
+        }
+        self._other_object_dict = deepcopy(self._object_dict)
+        self._other_object_dict["extra"] = {"source_path": "/e", "mount_path": "/f"}
+
+    def test_to_dict(self) -> None:
+        self.assertEqual(self._object.to_dict(), self._object_dict)
+
+    def test_from_dict_does_not_modify(self) -> None:
+        object_dict = deepcopy(self._object_dict)
+        Declared.from_dict(object_dict)
+        self.assertEqual(object_dict, self._object_dict)
+
+    def _assert_same_error(self, property_dict: Dict[str, object]) -> None:
+        with self.assertRaises(ValueError) as expected:
+            HandWritten.from_dict(deepcopy(property_dict))
+        with self.assertRaises(ValueError) as actual:
+            Declared.from_dict(deepcopy(property_dict))
+        self.assertEqual(str(actual.exception), str(expected.exception).replace("HandWritten", "Declared"))
+
+    def test_same_errors(self) -> None:
+        wrong_values: Dict[str, List[object]] = {
+            "name": [1, None], "count": ["1"], "flag": [1], "tags": ["a", ["a", 1]], "mount_point": [[]],
+            "mount_points": [None]
+        }
+        for key, values in wrong_values.items():
+            for value in values:
+                with self.subTest(key=key, value=value):
+                    property_dict = deepcopy(self._object_dict)
+                    property_dict[key] = value
+                    self._assert_same_error(property_dict)
+        property_dict = deepcopy(self._object_dict)
+        del property_dict["extra"]
+        property_dict["unexpected"] = 1
+        self._assert_same_error(property_dict)
+
+    def test_invalid_nested(self) -> None:
+        for key, value in [("mount_points", "a"), ("mount_points", ["a"]), ("color", 7), ("extra", "a")]:
+            with self.subTest(key=key):
+                property_dict = deepcopy(self._object_dict)
+                property_dict[key] = value
+                with self.assertRaises(ValueError):
+                    Declared.from_dict(property_dict)
+
+    def test_from_properties(self) -> None:
+        renamed = Renamed.from_dict(deepcopy(self._object_dict))
+        self.assertIsInstance(renamed, Renamed)
+        self.assertEqual(renamed.name, "NAME")
+
+    def test_declared_method_kept(self) -> None:
+        self.assertEqual(CustomToDict(1).to_dict(), {"value": 2})
+        self.assertEqual(CustomToDict.from_dict({"value": 5}).value, 5)
+
+    def test_optional_none(self) -> None:
+        property_dict = deepcopy(self._object_dict)
+        del property_dict["comment"]
+        declared: Optional[Declared] = Declared.from_dict(property_dict)
+        assert declared is not None
+        self.assertIsNone(declared.comment)
+        self.assertIsNone(declared.extra)
+
+    def test_missing_schema(self) -> None:
+        with self.assertRaises(TypeError):
+            type("Undeclared", (SchemaSerializable,), {})
+        with self.assertRaises(TypeError):
+            type("HalfDeclared", (SchemaSerializable,), {"to_dict": lambda self: dict()})
+        # Classes deriving from ABC directly leave the methods to their subclasses.
+        abstract = type("Abstract", (SchemaSerializable, ABC), {})
+        concrete = type("Concrete", (abstract,), {"_schema": [IntField("value")]})
+        self.assertEqual(getattr(concrete, "__abstractmethods__"), frozenset())
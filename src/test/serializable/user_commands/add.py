@@ -27,3 +27,19 @@ class AddCommandTest(TestCase):
         self._cmd.effective_user = 2
         response = self._cmd.execute(self._db)
         self.assertFalse(response.is_success)
+
+    def test_add_dockerfile_reference(self) -> None:
+        self._cmd.effective_user = 0
+        reference_cmd = self._cmd.with_dockerfile_reference()
+        reference_cmd.effective_user = 0
+        dockerfile_hash = self._job.docker_context.dockerfile_hash
+        response = reference_cmd.execute(self._db)
+        self.assertFalse(response.is_success)
+        self.assertEqual(response.result_string, AddCommand.RESPONSE_UNKNOWN_DOCKERFILE % dockerfile_hash)
+
+        self.assertTrue(self._cmd.execute(self._db).is_success)
+        reference_cmd.config.job.uid = "2"
+        self.assertTrue(reference_cmd.execute(self._db).is_success)
+        self.assertEqual(self._db.find_job_by_id("2").job.docker_context, self._job.docker_context)
+        self.assertEqual(self._db.find_job_by_id("2").job.docker_context.dockerfile_source,
+                         self._job.docker_context.dockerfile_source)
@@ -0,0 +1,46 @@
+from unittest.mock import Mock
+
+from ja.common.message.base import Response
+from ja.common.message.worker_commands.batch_job import BatchJobCommand
+from ja.common.message.worker_commands.cancel_job import CancelJobCommand
+from ja.common.message.worker_commands.pause_job import PauseJobCommand
+from test.serializable.base import AbstractSerializableTest
+
+
+class BatchJobCommandTest(AbstractSerializableTest):
+    def setUp(self) -> None:
+        self._optional_properties = []
+        self._object = BatchJobCommand([CancelJobCommand(uid="job123"), PauseJobCommand(uid="job456")])
+        self._object_dict = {"commands": [{"type_name": "CancelJobCommand", "command": {"uid": "job123"}},
+                                          {"type_name": "PauseJobCommand", "command": {"uid": "job456"}}]}
+        self._other_object_dict = {"commands": [{"type_name": "PauseJobCommand", "command": {"uid": "job456"}}]}
+
+    def test_unknown_action(self) -> None:
+        with self.assertRaises(ValueError):
+            BatchJobCommand.from_dict({"commands": [{"type_name": "ReportJobsCommand", "command": {}}]})
+
+    def test_malformed_action(self) -> None:
+        for commands in ["a", ["a"], [{"type_name": "PauseJobCommand"}]]:
+            with self.subTest(commands=commands):
+                with self.assertRaises(ValueError):
+                    BatchJobCommand.from_dict({"commands": commands})
+
+    def test_failing_action(self) -> None:
+        docker_interface = Mock(worker_uid="worker")
+        docker_interface.cancel_job.side_effect = RuntimeError("Docker is gone.")
+        command = BatchJobCommand([CancelJobCommand(uid="job123"), PauseJobCommand(uid="job456")])
+        response = command.execute(docker_interface)
+        self.assertFalse(response.is_success)
+        responses = BatchJobCommand.get_responses(response)
+        self.assertEqual([single.is_success for single in responses], [False, True])
+        self.assertIn("Docker is gone.", responses[0].result_string)
+        # The action after the failing one was executed nonetheless.
+        docker_interface.pause_job.assert_called_once_with(uid="job456")
+
+    def test_responses(self) -> None:
+        responses = [Response("Job cancelled.", True), Response("Job not found.", False)]
+        response = Response.from_dict(BatchJobCommand.create_response(responses).to_dict())
+        self.assertFalse(response.is_success)
+        self.assertEqual(BatchJobCommand.get_responses(response), responses)
+        with self.assertRaises(ValueError):
+            BatchJobCommand.get_responses(Response("Unknown command: BatchJobCommand.", False))
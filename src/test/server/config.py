@@ -1,5 +1,5 @@
 from test.serializable.base import AbstractSerializableTest
-from ja.server.config import ServerConfig, LoginConfig
+from ja.server.config import AdmissionConfig, ServerConfig, LoginConfig, DatabaseConfig
 
 
 class ServerConfigTest(AbstractSerializableTest):
@@ -7,13 +7,19 @@ class ServerConfigTest(AbstractSerializableTest):
     Class for testing ServerConfig.
     """
     def setUp(self) -> None:
-        self._optional_properties = []
+        self._optional_properties = ["job_archive_days", "reconcile_jobs", "command_threads",
+                                     "heartbeat_interval", "heartbeat_misses", "admission_config", "event_loop"]
 
-        database_config: LoginConfig = LoginConfig("database-host", 8090, "db-sam", "0000")
+        database_config: DatabaseConfig = DatabaseConfig("database-host", 8090, "db-sam", "0000")
         email_config: LoginConfig = LoginConfig("email-host", 25, "friendly-user", "Password")
         self._object: ServerConfig = ServerConfig("techfa", database_config, email_config,
                                                   special_resources={"lic": 4, "bloke": 5},
-                                                  blocking_enabled=False, web_server_port=678)
+                                                  blocking_enabled=False, web_server_port=678, job_archive_days=7,
+                                                  reconcile_jobs=True, command_threads=4,
+                                                  heartbeat_interval=10, heartbeat_misses=2,
+                                                  admission_config=AdmissionConfig(user_jobs_per_minute=600,
+                                                                                   max_queued_jobs_per_user=1000),
+                                                  event_loop=True)
 
         self._object_dict = {"admin_group": "techfa",
                              "database_config":
@@ -30,7 +36,16 @@ class ServerConfigTest(AbstractSerializableTest):
                              {"lic": 4, "bloke": 5},
                              "blocking_enabled": False,
                              "preemption_enabled": True,
-                             "web_server_port": 678}
+                             "web_server_port": 678,
+                             "job_archive_days": 7,
+                             "reconcile_jobs": True,
+                             "command_threads": 4,
+                             "heartbeat_interval": 10,
+                             "heartbeat_misses": 2,
+                             "admission_config":
+                             {"user_jobs_per_minute": 600,
+                              "max_queued_jobs_per_user": 1000},
+                             "event_loop": True}
         self._other_object_dict = {"admin_group": "kit",
                                    "database_config":
                                    {"host": "database-host23",
@@ -47,3 +62,66 @@ class ServerConfigTest(AbstractSerializableTest):
                                    "blocking_enabled": True,
                                    "preemption_enabled": True,
                                    "web_server_port": 0}
+
+    def test_invalid_command_threads(self) -> None:
+        self._object_dict["command_threads"] = 0
+        with self.assertRaises(ValueError):
+            ServerConfig.from_dict(self._object_dict)
+
+    def test_invalid_heartbeat(self) -> None:
+        for key, value in [("heartbeat_interval", -1), ("heartbeat_misses", 0)]:
+            with self.subTest(key=key):
+                property_dict = dict(self._object_dict)
+                property_dict[key] = value
+                with self.assertRaises(ValueError):
+                    ServerConfig.from_dict(property_dict)
+
+
+class AdmissionConfigTest(AbstractSerializableTest):
+    """
+    Class for testing AdmissionConfig.
+    """
+    def setUp(self) -> None:
+        self._optional_properties = ["user_jobs_per_minute", "user_burst", "global_jobs_per_minute", "global_burst",
+                                     "max_queued_jobs_per_user"]
+        self._object: AdmissionConfig = AdmissionConfig(60, 10, 600, 100, 5000)
+        self._object_dict = {"user_jobs_per_minute": 60,
+                             "user_burst": 10,
+                             "global_jobs_per_minute": 600,
+                             "global_burst": 100,
+                             "max_queued_jobs_per_user": 5000}
+        self._other_object_dict = {"max_queued_jobs_per_user": 100}
+
+    def test_disabled_by_default(self) -> None:
+        self.assertEqual(AdmissionConfig.from_dict({}), AdmissionConfig(0, 0, 0, 0, 0))
+
+    def test_invalid_limit(self) -> None:
+        with self.assertRaises(ValueError):
+            AdmissionConfig.from_dict({"user_burst": -1})
+
+
+class DatabaseConfigTest(AbstractSerializableTest):
+    """
+    Class for testing DatabaseConfig with a backend which needs no database server.
+    """
+    def setUp(self) -> None:
+        self._optional_properties = ["path", "pool_size", "max_overflow", "pool_timeout"]
+        self._object: DatabaseConfig = DatabaseConfig(None, None, None, None, backend="sqlite",
+                                                      path="/var/lib/jobadder/jobadder.db", pool_size=8,
+                                                      max_overflow=0, pool_timeout=5)
+        self._object_dict = {"backend": "sqlite",
+                             "path": "/var/lib/jobadder/jobadder.db",
+                             "pool_size": 8,
+                             "max_overflow": 0,
+                             "pool_timeout": 5}
+        self._other_object_dict = {"backend": "memory"}
+
+    def test_unknown_backend(self) -> None:
+        with self.assertRaises(ValueError):
+            DatabaseConfig.from_dict({"backend": "mongodb"})
+
+    def test_invalid_pool(self) -> None:
+        with self.assertRaises(ValueError):
+            DatabaseConfig.from_dict({"backend": "memory", "pool_size": 0})
+        with self.assertRaises(ValueError):
+            DatabaseConfig.from_dict({"backend": "memory", "pool_timeout": -1})
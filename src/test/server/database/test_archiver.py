@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+from typing import Callable
+from unittest import TestCase
+from unittest.mock import Mock
+
+from ja.server.database.archiver import JobArchiver
+
+
+class JobArchiverTest(TestCase):
+    """
+    Class for testing JobArchiver.
+    """
+
+    def setUp(self) -> None:
+        self.database = Mock()
+        self.database.archive_jobs.return_value = 0
+        self.archiver = JobArchiver(self.database, timedelta(days=2), batch_size=10, interval=3600)
+
+    def tearDown(self) -> None:
+        self.archiver.stop()
+
+    def test_archive_in_batches(self) -> None:
+        self.database.archive_jobs.reset_mock()
+        self.database.archive_jobs.side_effect = [10, 10, 3]
+        self.assertEqual(23, self.archiver.archive())
+        self.assertEqual(3, self.database.archive_jobs.call_count)
+        older_than, batch_size = self.database.archive_jobs.call_args[0]
+        self.assertEqual(10, batch_size)
+        self.assertLess(older_than, datetime.now() - timedelta(days=2) + timedelta(minutes=1))
+        self.assertGreater(older_than, datetime.now() - timedelta(days=2) - timedelta(minutes=1))
+
+    def test_run_ordered(self) -> None:
+        batches = []
+
+        def run_ordered(archive_batch: Callable[[], int]) -> int:
+            batches.append(archive_batch)
+            return archive_batch()
+
+        archiver = JobArchiver(self.database, timedelta(days=2), batch_size=10, background=False,
+                               run_ordered=run_ordered)
+        self.database.archive_jobs.side_effect = [10, 4]
+        self.assertEqual(14, archiver.archive())
+        self.assertEqual(2, len(batches))
@@ -0,0 +1,131 @@
+from asyncio import gather, run
+from copy import deepcopy
+from threading import Event, get_ident
+from typing import Any, Iterator, List
+from unittest import TestCase
+from unittest.mock import Mock
+
+from ja.common.docker_context import DockerContext, DockerConstraints
+from ja.common.job import Job, JobSchedulingConstraints, JobPriority, JobStatus
+from ja.server.database.async_database import AsyncServerDatabase
+from ja.server.database.sql.mock_database import MockDatabase
+from ja.server.database.types.job_entry import DatabaseJobEntry
+
+
+class AsyncServerDatabaseTest(TestCase):
+    """
+    Class for testing AsyncServerDatabase.
+    """
+
+    def setUp(self) -> None:
+        self._database = MockDatabase()
+        self._async_database = AsyncServerDatabase(self._database, max_workers=3)
+        self._job = Job(owner_id=1008, email=None,
+                        scheduling_constraints=JobSchedulingConstraints(JobPriority.MEDIUM, False, []),
+                        docker_context=DockerContext("FROM alpine", []),
+                        docker_constraints=DockerConstraints(2, 1024), label="async")
+        self._job.uid = "job0"
+
+    def tearDown(self) -> None:
+        self._async_database.shutdown()
+
+    def test_update_and_find_job(self) -> None:
+        database = self._async_database.sync
+
+        async def access() -> DatabaseJobEntry:
+            await self._async_database.run(database.update_job, self._job)
+            return await self._async_database.run(database.find_job_by_id, self._job.uid)
+
+        self.assertEqual(run(access()).job, self._job)
+        self.assertEqual(self._async_database.call(database.find_job_by_id, self._job.uid).job, self._job)
+
+    def test_concurrent_calls(self) -> None:
+        for i in range(1, 6):
+            job = deepcopy(self._job)
+            job.uid = "job%d" % i
+            job.status = JobStatus.QUEUED
+            self._database.update_job(job)
+        database = self._async_database.sync
+
+        async def access() -> List[Any]:
+            return list(await gather(*[self._async_database.run(database.find_job_by_id, "job%d" % i)
+                                       for i in range(1, 6)],
+                                     self._async_database.run(database.query_jobs, None, 1008, None),
+                                     self._async_database.run(database.find_job_by_label, "async")))
+
+        results = run(access())
+        self.assertEqual([job_entry.job.uid for job_entry in results[:5]], ["job1", "job2", "job3", "job4", "job5"])
+        self.assertEqual(len(results[5]), 5)
+        self.assertEqual(len(results[6]), 5)
+
+    def test_runs_outside_event_loop_thread(self) -> None:
+        database = Mock()
+        async_database = AsyncServerDatabase(database)
+        self.assertNotEqual(run(async_database.run(get_ident)), get_ident())
+        self.assertNotEqual(async_database.call(get_ident), get_ident())
+        self.assertEqual(database.release_session.call_count, 2)
+        async_database.shutdown()
+
+    def test_release_session_on_error(self) -> None:
+        database = Mock()
+        database.archive_jobs.side_effect = RuntimeError("database gone")
+        async_database = AsyncServerDatabase(database)
+        with self.assertRaises(RuntimeError):
+            run(async_database.run(database.archive_jobs, None, 10))
+        with self.assertRaises(RuntimeError):
+            async_database.call(database.archive_jobs, None, 10)
+        self.assertEqual(database.release_session.call_count, 2)
+        async_database.shutdown()
+
+    def test_nested_call(self) -> None:
+        async_database = AsyncServerDatabase(Mock(), max_workers=1)
+
+        def outer() -> int:
+            # Would wait forever for the only thread of the pool if it was not run directly.
+            return async_database.call(get_ident)
+
+        self.assertNotEqual(async_database.call(outer), get_ident())
+        async_database.shutdown()
+
+    def test_stream(self) -> None:
+        async def collect() -> List[int]:
+            return [item async for item in self._async_database.stream(lambda: iter(range(50)), max_queued=4)]
+
+        self.assertEqual(run(collect()), list(range(50)))
+
+    def test_stream_error(self) -> None:
+        def fail() -> Iterator[int]:
+            yield 1
+            raise RuntimeError("database gone")
+
+        async def collect() -> List[int]:
+            return [item async for item in self._async_database.stream(fail)]
+
+        with self.assertRaises(RuntimeError):
+            run(collect())
+
+    def test_stream_closed_early(self) -> None:
+        produced: List[int] = []
+        finished = Event()
+
+        def generate() -> Iterator[int]:
+            try:
+                for i in range(1000):
+                    produced.append(i)
+                    yield i
+            finally:
+                finished.set()
+
+        async def take() -> List[int]:
+            items = self._async_database.stream(generate, max_queued=2)
+            taken = [await items.__anext__() for _ in range(3)]
+            await items.aclose()
+            return taken
+
+        self.assertEqual(run(take()), [0, 1, 2])
+        self.assertTrue(finished.wait(5))
+        self.assertLess(len(produced), 1000)
+
+    def test_invalid_max_workers(self) -> None:
+        with self.assertRaises(ValueError):
+            AsyncServerDatabase(Mock(), max_workers=0)
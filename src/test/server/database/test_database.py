@@ -1,15 +1,25 @@
+from copy import deepcopy
 from unittest import TestCase
 from unittest.mock import Mock
 from datetime import datetime, timedelta
 from ja.common.work_machine import ResourceAllocation
-from ja.server.database.sql.mock_database import MockDatabase
+from ja.server.config import DatabaseConfig
+from ja.server.database.backend import create_database
+from ja.server.database.memory.database import MemoryDatabase
+from ja.server.database.sql.database import SQLDatabase
+from ja.server.database.sql.mock_database import MockDatabase, PostgresMockDatabase
 from ja.common.job import Job, JobSchedulingConstraints, JobPriority, JobStatus
 from ja.common.docker_context import DockerContext, MountPoint, DockerConstraints
 from ja.server.database.types.work_machine import WorkMachine, WorkMachineState, WorkMachineResources
 from ja.common.proxy.ssh import SSHConfig
+import os
 import time
+from pwd import getpwuid
+from typing import Any, List, Union
+from sqlalchemy import event
 
 from ja.server.database.database import ServerDatabase
+from ja.server.database.types.job_entry import DatabaseJobEntry
 
 
 class DatabaseTest(TestCase):
@@ -18,7 +28,7 @@ class DatabaseTest(TestCase):
     """
 
     def setUp(self) -> None:
-        self.mockDatabase = MockDatabase()
+        self.mockDatabase: Union[SQLDatabase, MemoryDatabase] = MockDatabase()
         self.job: Job = Job(
             owner_id=1008,
             email="user@website.com",
@@ -146,7 +156,16 @@ class DatabaseTest(TestCase):
         self.mockDatabase.update_job(self.job)
         self.mockDatabase.update_work_machine(self.work_machine)
         self.mockDatabase.update_work_machine(self.work_machine3)
+        self.assertEqual(self.mockDatabase.get_jobs_on_machine(self.work_machine), [])
+        self.mockDatabase.assign_job_machine(self.job, self.work_machine)
         self.assertEqual(self.mockDatabase.get_jobs_on_machine(self.work_machine), [self.job])
+        self.mockDatabase.update_work_machine(self.work_machine2)
+        self.assertEqual(self.mockDatabase.get_jobs_on_machine(self.work_machine2), [])
+
+    def test_assign_unknown_job(self) -> None:
+        self.mockDatabase.update_work_machine(self.work_machine)
+        with self.assertRaises(RuntimeError):
+            self.mockDatabase.assign_job_machine(self.job, self.work_machine)
 
     def test_schedule(self) -> None:
         self.mockDatabase.update_work_machine(self.work_machine)
@@ -285,3 +304,337 @@ class DatabaseTest(TestCase):
         self.mockDatabase.end_atomic_update()
         call.assert_called_once_with(self.mockDatabase)
         self.assertFalse(self.mockDatabase.in_atomic_update)
+
+    def test_apply_schedule(self) -> None:
+        self.mockDatabase.update_work_machine(self.work_machine)
+        self.job.status = JobStatus.QUEUED
+        self.mockDatabase.update_job(self.job)
+        self.job2.uid = "job2"
+        self.job2.status = JobStatus.QUEUED
+        self.mockDatabase.update_job(self.job2)
+
+        scheduler_call: Mock = Mock()
+        status_call: Mock = Mock()
+        self.mockDatabase.set_scheduler_callback(scheduler_call)
+        self.mockDatabase.set_job_status_callback(status_call)
+
+        schedule = self.mockDatabase.get_current_schedule()
+        for entry in schedule:
+            entry.job.status = JobStatus.RUNNING
+            entry.assigned_machine = self.work_machine
+        self.work_machine.resources.allocate(ResourceAllocation(8, 8, 0))
+        self.mockDatabase.apply_schedule(schedule, [self.work_machine])
+
+        scheduler_call.assert_called_once_with(self.mockDatabase)
+        self.assertEqual(2, status_call.call_count)
+        for uid in [self.job.uid, self.job2.uid]:
+            entry = self.mockDatabase.find_job_by_id(uid)
+            self.assertEqual(entry.job.status, JobStatus.RUNNING)
+            self.assertEqual(entry.assigned_machine, self.work_machine)
+            self.assertIsNotNone(entry.statistics.time_started)
+        self.assertEqual(self.mockDatabase.get_work_machines(), [self.work_machine])
+
+    def test_apply_schedule_unknown_job(self) -> None:
+        self.mockDatabase.update_job(self.job)
+        self.job2.uid = "unknown"
+        entry = DatabaseJobEntry(self.job2, None, None)
+        with self.assertRaises(RuntimeError):
+            self.mockDatabase.apply_schedule([entry], [])
+
+    def test_archive_jobs(self) -> None:
+        self.mockDatabase.update_work_machine(self.work_machine)
+        job3 = deepcopy(self.job)
+        self.job.status = JobStatus.QUEUED
+        self.job.status = JobStatus.RUNNING
+        self.job.status = JobStatus.DONE
+        self.mockDatabase.update_job(self.job)
+        self.job2.uid = "job2"
+        self.job2.status = JobStatus.QUEUED
+        self.mockDatabase.update_job(self.job2)
+        job3.uid = "job3"
+        job3.status = JobStatus.QUEUED
+        job3.status = JobStatus.CANCELLED
+        self.mockDatabase.update_job(job3)
+        self.mockDatabase.assign_job_machine(job3, self.work_machine)
+        entry = self.mockDatabase.find_job_by_id(self.job.uid)
+
+        self.assertEqual(0, self.mockDatabase.archive_jobs(datetime.now() - timedelta(hours=1), 10))
+        self.assertEqual(1, self.mockDatabase.archive_jobs(datetime.now() + timedelta(seconds=1), 10))
+        self.assertEqual(0, self.mockDatabase.archive_jobs(datetime.now() + timedelta(seconds=1), 10))
+
+        self.assertEqual(self.mockDatabase.find_job_by_id(self.job.uid), entry)
+        self.assertEqual(self.mockDatabase.find_job_by_label("thig"), [self.job, job3])
+        self.assertEqual([job_entry.job.uid for job_entry in self.mockDatabase.get_current_schedule()],
+                         [self.job2.uid, job3.uid])
+        self.assertEqual([job_entry.job.uid for job_entry in self.mockDatabase.query_jobs(None, 1008, None)],
+                         [self.job.uid, self.job2.uid, job3.uid])
+        self.assertEqual(self.mockDatabase.query_jobs(None, 12, None), [])
+        self.assertEqual(self.mockDatabase.query_jobs(datetime.now() + timedelta(seconds=1), -1, None), [])
+        self.assertEqual([job_entry.job.uid for job_entry in self.mockDatabase.query_jobs(None, -1, self.work_machine)],
+                         [job3.uid])
+
+    def test_archive_jobs_limit(self) -> None:
+        for i in range(3):
+            job = deepcopy(self.job)
+            job.uid = "job%d" % i
+            job.status = JobStatus.QUEUED
+            job.status = JobStatus.CANCELLED
+            self.mockDatabase.update_job(job)
+        self.assertEqual(2, self.mockDatabase.archive_jobs(datetime.now() + timedelta(seconds=1), 2))
+        self.assertEqual(1, self.mockDatabase.archive_jobs(datetime.now() + timedelta(seconds=1), 2))
+        self.assertEqual(len(self.mockDatabase.find_job_by_label("thig")), 3)
+
+    def test_find_jobs_by_ids(self) -> None:
+        self.mockDatabase.update_work_machine(self.work_machine)
+        for i in range(3):
+            job = deepcopy(self.job)
+            job.uid = "job%d" % i
+            job.status = JobStatus.QUEUED
+            if i == 0:
+                job.status = JobStatus.CANCELLED
+            self.mockDatabase.update_job(job)
+        self.mockDatabase.assign_job_machine(self.mockDatabase.find_job_by_id("job1").job, self.work_machine)
+        self.assertEqual(1, self.mockDatabase.archive_jobs(datetime.now() + timedelta(seconds=1), 10))
+
+        job_entries = self.mockDatabase.find_jobs_by_ids(["job0", "job1", "job2", "unknown"])
+        self.assertEqual(set(job_entries.keys()), {"job0", "job1", "job2"})
+        for uid, job_entry in job_entries.items():
+            self.assertEqual(job_entry.job, self.mockDatabase.find_job_by_id(uid).job)
+        self.assertEqual(job_entries["job1"].assigned_machine, self.work_machine)
+        self.assertIsNone(job_entries["job2"].assigned_machine)
+        self.assertEqual(self.mockDatabase.find_jobs_by_ids([]), dict())
+
+    def test_dockerfile_store(self) -> None:
+        docker_context = self.job.docker_context
+        self.assertIsNone(self.mockDatabase.find_dockerfile(docker_context.dockerfile_hash))
+        with self.assertRaises(ValueError):
+            self.mockDatabase.update_job(self.job.with_dockerfile_reference())
+        self.mockDatabase.update_job(self.job)
+        self.assertEqual(self.mockDatabase.find_dockerfile(docker_context.dockerfile_hash),
+                         docker_context.dockerfile_source)
+        self.job2.uid = "job2"
+        self.mockDatabase.update_job(self.job2.with_dockerfile_reference())
+        job_entry = self.mockDatabase.find_job_by_id(self.job2.uid)
+        self.assertEqual(job_entry.job.docker_context.dockerfile_source, docker_context.dockerfile_source)
+        self.assertEqual(job_entry.job, self.job2)
+
+    def test_archive_keeps_dockerfile(self) -> None:
+        self.job.status = JobStatus.QUEUED
+        self.job.status = JobStatus.CANCELLED
+        self.mockDatabase.update_job(self.job)
+        self.mockDatabase.archive_jobs(datetime.now() + timedelta(seconds=1), 10)
+        job_entry = self.mockDatabase.find_job_by_id(self.job.uid)
+        self.assertEqual(job_entry.job.docker_context.dockerfile_source, self.job.docker_context.dockerfile_source)
+
+    def test_generate_uids(self) -> None:
+        self.job.owner_id = os.getuid()
+        username = getpwuid(self.job.owner_id).pw_name
+        uids = []
+        for _ in range(3):
+            job = deepcopy(self.job)
+            job.uid = None
+            uids.append(self.mockDatabase.update_job(job))
+            self.assertEqual(job.uid, uids[-1])
+        self.assertEqual(uids, sorted(set(uids)))
+        self.assertTrue(all(uid.startswith(username) for uid in uids))
+        self.assertEqual([job_entry.job.uid for job_entry in self.mockDatabase.query_jobs(None, -1, None)], uids)
+
+    def test_generate_uids_after_stored(self) -> None:
+        self.job.owner_id = os.getuid()
+        username = getpwuid(self.job.owner_id).pw_name
+        # A UID allocated before a restart of the server, with the clock set back since then.
+        self.job.uid = username + "9999999999999000"
+        self.mockDatabase.update_job(self.job)
+        job = deepcopy(self.job)
+        job.uid = None
+        self.assertEqual(self.mockDatabase.update_job(job), username + "9999999999999001")
+
+    def test_count_queued_jobs(self) -> None:
+        self.assertEqual(self.mockDatabase.count_queued_jobs(self.job.owner_id), 0)
+        self.job.status = JobStatus.QUEUED
+        self.mockDatabase.update_job(self.job)
+        self.job2.uid = "job2"
+        self.mockDatabase.update_job(self.job2)
+        self.assertEqual(self.mockDatabase.count_queued_jobs(self.job.owner_id), 2)
+        self.assertEqual(self.mockDatabase.count_queued_jobs(self.job.owner_id + 1), 0)
+        self.job.status = JobStatus.RUNNING
+        self.mockDatabase.update_job(self.job)
+        self.assertEqual(self.mockDatabase.count_queued_jobs(self.job.owner_id), 1)
+
+    def test_event_log(self) -> None:
+        self.mockDatabase.update_work_machine(self.work_machine)
+        self.job.status = JobStatus.QUEUED
+        self.mockDatabase.update_job(self.job)
+        self.job.status = JobStatus.RUNNING
+        self.mockDatabase.apply_schedule([DatabaseJobEntry(self.job, None, self.work_machine)], [])
+        self.job.status = JobStatus.DONE
+        self.mockDatabase.apply_schedule([DatabaseJobEntry(self.job, None, None)], [])
+        self.mockDatabase.update_job(self.job)
+        self.assertEqual([(event.status, event.machine_uid) for event in self.mockDatabase.get_job_events("asv")],
+                         [(JobStatus.QUEUED, None), (JobStatus.RUNNING, "machi1"), (JobStatus.DONE, None)])
+        self.assertTrue(all(event.owner_id == 1008 for event in self.mockDatabase.get_job_events("asv")))
+        self.assertEqual(self.mockDatabase.get_job_events("other"), [])
+
+        self.work_machine.state = WorkMachineState.RETIRED
+        self.mockDatabase.update_work_machine(self.work_machine)
+        self.mockDatabase.apply_schedule([], [self.work_machine])
+        self.work_machine.state = WorkMachineState.OFFLINE
+        self.mockDatabase.apply_schedule([], [self.work_machine])
+        self.assertEqual([event.state for event in self.mockDatabase.get_machine_events("machi1")],
+                         [WorkMachineState.ONLINE, WorkMachineState.RETIRED, WorkMachineState.OFFLINE])
+
+    def test_utilization(self) -> None:
+        self.mockDatabase.update_work_machine(self.work_machine)
+        jobs = []
+        for i in range(3):
+            job = deepcopy(self.job)
+            job.uid = "job%d" % i
+            job.status = JobStatus.QUEUED
+            self.mockDatabase.update_job(job)
+            job.status = JobStatus.RUNNING
+            jobs.append(job)
+        self.mockDatabase.apply_schedule([DatabaseJobEntry(job, None, self.work_machine) for job in jobs], [])
+        jobs[0].status = JobStatus.DONE
+        jobs[1].status = JobStatus.CRASHED
+        self.mockDatabase.apply_schedule([DatabaseJobEntry(job, None, None) for job in jobs[:2]], [])
+
+        now = datetime.now()
+        rollups = self.mockDatabase.get_utilization(now - timedelta(hours=2), now + timedelta(hours=1))
+        self.assertEqual(sum(rollup.jobs_started for rollup in rollups), 3)
+        self.assertEqual(sum(rollup.jobs_finished for rollup in rollups), 2)
+        self.assertTrue(all(rollup.machine_uid == "machi1" and rollup.owner_id == 1008 for rollup in rollups))
+        self.assertEqual(rollups, sorted(rollups, key=lambda rollup: rollup.hour))
+        self.assertEqual(self.mockDatabase.get_utilization(now + timedelta(hours=1), now + timedelta(hours=2)), [])
+
+    def _count_event_statements(self, statements: List[str]) -> None:
+        # Counts the statements touching the event log or the rollups, an executemany() counting as one statement.
+        def count(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+            if "job_event" in statement or "utilization" in statement:
+                statements.append(statement)
+
+        if isinstance(self.mockDatabase, SQLDatabase):
+            event.listen(self.mockDatabase.engine, "before_cursor_execute", count)  # type: ignore
+            self.addCleanup(event.remove, self.mockDatabase.engine, "before_cursor_execute", count)
+
+    def _run_jobs(self, amount: int, statements: List[str]) -> None:
+        # Only the statements of apply_schedule() are kept, update_job() takes the same statements for every job.
+        jobs = []
+        for i in range(amount):
+            job = deepcopy(self.job)
+            job.uid = "job%d-%d" % (amount, i)
+            job.status = JobStatus.QUEUED
+            self.mockDatabase.update_job(job)
+            jobs.append(job)
+        statements.clear()
+        for job in jobs:
+            job.status = JobStatus.RUNNING
+        self.mockDatabase.apply_schedule(
+            [DatabaseJobEntry(job, None, self.work_machine if i % 2 else self.work_machine2)
+             for i, job in enumerate(jobs)], [])
+        for i, job in enumerate(jobs):
+            job.status = JobStatus.DONE if i % 3 else JobStatus.CRASHED
+        self.mockDatabase.apply_schedule([DatabaseJobEntry(job, None, None) for job in jobs], [])
+
+    def test_utilization_batched(self) -> None:
+        self.mockDatabase.update_work_machine(self.work_machine)
+        self.mockDatabase.update_work_machine(self.work_machine2)
+        statements: List[str] = []
+        self._count_event_statements(statements)
+        self._run_jobs(2, statements)
+        statements_for_two = len(statements)
+        self._run_jobs(20, statements)
+        self.assertEqual(len(statements), statements_for_two)
+
+        # A job which is cancelled before it started is accounted for without a work machine.
+        self.job.status = JobStatus.QUEUED
+        self.mockDatabase.update_job(self.job)
+        self.job.status = JobStatus.CANCELLED
+        self.mockDatabase.apply_schedule([DatabaseJobEntry(self.job, None, None)], [])
+
+        now = datetime.now()
+        rollups = self.mockDatabase.get_utilization(now - timedelta(hours=2), now + timedelta(hours=1))
+        self.assertEqual(len(rollups), len(set(rollup.key for rollup in rollups)))
+        for machine_uid, started in [("machi1", 11), ("machi2", 11), (None, 0)]:
+            machine_rollups = [rollup for rollup in rollups if rollup.machine_uid == machine_uid]
+            self.assertEqual(sum(rollup.jobs_started for rollup in machine_rollups), started)
+            self.assertEqual(sum(rollup.jobs_finished for rollup in machine_rollups), started or 1)
+        self.assertEqual([event.status for event in self.mockDatabase.get_job_events("job20-1")],
+                         [JobStatus.QUEUED, JobStatus.RUNNING, JobStatus.DONE])
+
+    def test_stream_jobs(self) -> None:
+        self.mockDatabase.update_work_machine(self.work_machine)
+        for i in range(5):
+            job = deepcopy(self.job)
+            job.uid = "job%d" % i
+            job.status = JobStatus.QUEUED
+            if i < 2:
+                job.status = JobStatus.CANCELLED
+            self.mockDatabase.update_job(job)
+            if i == 4:
+                self.mockDatabase.assign_job_machine(job, self.work_machine)
+        self.mockDatabase.archive_jobs(datetime.now() + timedelta(seconds=1), 10)
+
+        for user_id, work_machine in [(-1, None), (1008, None), (12, None), (-1, self.work_machine)]:
+            jobs = self.mockDatabase.query_jobs(None, user_id, work_machine)
+            self.assertEqual(list(self.mockDatabase.stream_jobs(None, user_id, work_machine, chunk_size=2)), jobs)
+        self.assertEqual([job_entry.job.uid for job_entry in self.mockDatabase.stream_jobs(None, -1, None, 2)],
+                         ["job0", "job1", "job2", "job3", "job4"])
+        self.assertEqual(list(self.mockDatabase.stream_jobs(datetime.now() + timedelta(seconds=1), -1, None)), [])
+
+    def test_stream_jobs_by_label(self) -> None:
+        for i in range(3):
+            job = deepcopy(self.job)
+            job.uid = "job%d" % i
+            job.status = JobStatus.QUEUED
+            job.status = JobStatus.CANCELLED
+            self.mockDatabase.update_job(job)
+        self.mockDatabase.archive_jobs(datetime.now() + timedelta(seconds=1), 1)
+        self.assertEqual([job.uid for job in self.mockDatabase.stream_jobs_by_label("thig", chunk_size=1)],
+                         ["job0", "job1", "job2"])
+        self.assertEqual(list(self.mockDatabase.stream_jobs_by_label("thig")),
+                         self.mockDatabase.find_job_by_label("thig"))
+        self.assertEqual(list(self.mockDatabase.stream_jobs_by_label("thing")), [])
+
+    def test_stream_all_work_machines(self) -> None:
+        self.work_machine2.state = WorkMachineState.OFFLINE
+        self.mockDatabase.update_work_machine(self.work_machine)
+        self.mockDatabase.update_work_machine(self.work_machine2)
+        self.assertEqual(list(self.mockDatabase.stream_all_work_machines(chunk_size=1)),
+                         [self.work_machine, self.work_machine2])
+        self.assertEqual(self.mockDatabase.get_all_work_machines(), [self.work_machine, self.work_machine2])
+
+
+class PostgresDatabaseTest(DatabaseTest):
+    """
+    Class for testing SQLDatabase with PostgreSQL.
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        try:
+            self.mockDatabase = PostgresMockDatabase()
+        except (ImportError, RuntimeError) as e:
+            self.skipTest("PostgreSQL is not available: %s" % e)
+
+
+class MemoryDatabaseTest(DatabaseTest):
+    """
+    Class for testing MemoryDatabase.
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.mockDatabase = MemoryDatabase()
+
+
+class CreateDatabaseTest(TestCase):
+    """
+    Class for testing the selection of the database backend.
+    """
+
+    def test_sqlite_needs_path(self) -> None:
+        with self.assertRaises(ValueError):
+            create_database(DatabaseConfig(None, None, None, None, backend="sqlite"))
+
+    def test_memory(self) -> None:
+        self.assertIsInstance(create_database(DatabaseConfig(None, None, None, None, backend="memory")), MemoryDatabase)
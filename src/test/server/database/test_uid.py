@@ -0,0 +1,67 @@
+from threading import Thread
+from typing import List, Optional
+from unittest import TestCase
+
+from ja.server.database.uid import UIDAllocator
+
+
+class UIDAllocatorTest(TestCase):
+    """
+    Class for testing UIDAllocator.
+    """
+
+    def setUp(self) -> None:
+        self._time = 1593000000.0
+        self._allocator = UIDAllocator(clock=lambda: self._time)
+
+    def test_format(self) -> None:
+        self.assertEqual(self._allocator.allocate("jdoe"), "jdoe1593000000000000")
+        self._time = 1593000000.0421
+        self.assertEqual(self._allocator.allocate("jdoe"), "jdoe1593000000042000")
+
+    def test_same_millisecond(self) -> None:
+        uids = [self._allocator.allocate("jdoe") for _ in range(3)]
+        self.assertEqual(uids, ["jdoe1593000000000000", "jdoe1593000000000001", "jdoe1593000000000002"])
+
+    def test_sequence_overflow(self) -> None:
+        uids = [self._allocator.allocate("jdoe") for _ in range(1001)]
+        self.assertEqual(uids[-1], "jdoe1593000000001000")
+        self.assertEqual(len(set(uids)), 1001)
+
+    def test_clock_set_back(self) -> None:
+        first = self._allocator.allocate("jdoe")
+        self._time -= 60
+        self.assertGreater(self._allocator.allocate("jdoe"), first)
+
+    def test_stored_uids(self) -> None:
+        stored = {"jdoe": "jdoe1593000060000007", "jane": "jane159300006000", "jdoe2": "jdoe2abc0000000000000"}
+        looked_up: List[str] = []
+
+        def find_last_uid(username: str) -> Optional[str]:
+            looked_up.append(username)
+            return stored.get(username, None)
+
+        allocator = UIDAllocator(clock=lambda: self._time, find_last_uid=find_last_uid)
+        self.assertEqual(allocator.allocate("jdoe"), "jdoe1593000060000008")
+        self.assertEqual(allocator.allocate("jdoe"), "jdoe1593000060000009")
+        self.assertEqual(allocator.allocate("jdoe2"), "jdoe21593000060000010")
+        self.assertEqual(allocator.allocate("jane"), "jane1593000060000011")
+        self.assertEqual(looked_up, ["jdoe", "jdoe2", "jane"])
+
+    def test_concurrent_allocation(self) -> None:
+        allocator = UIDAllocator()
+        results: List[List[str]] = [[] for _ in range(8)]
+
+        def allocate(uids: List[str]) -> None:
+            for _ in range(600):
+                uids.append(allocator.allocate("jdoe"))
+
+        threads = [Thread(target=allocate, args=(uids,)) for uids in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        all_uids = [uid for uids in results for uid in uids]
+        self.assertEqual(len(set(all_uids)), 8 * 600)
+        for uids in results:
+            self.assertEqual(uids, sorted(uids))
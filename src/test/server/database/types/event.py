@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import Optional
+from unittest import TestCase
+
+from ja.common.docker_context import DockerContext, DockerConstraints
+from ja.common.job import Job, JobSchedulingConstraints, JobPriority, JobStatus
+from ja.server.database.types.event import JobEvent, UtilizationRollup, compute_rollups, \
+    merge_rollups, start_of_hour
+
+
+class ComputeRollupsTest(TestCase):
+    """
+    Class to test compute_rollups().
+    """
+
+    def setUp(self) -> None:
+        self._job = Job(owner_id=42, email=None,
+                        scheduling_constraints=JobSchedulingConstraints(JobPriority.MEDIUM, False, []),
+                        docker_context=DockerContext("FROM alpine", []),
+                        docker_constraints=DockerConstraints(4, 1000))
+        self._job.uid = "job"
+
+    def _event(self, hour: int, minute: int, status: JobStatus, machine_uid: Optional[str] = "m1") -> JobEvent:
+        return JobEvent(datetime(2020, 6, 1, hour, minute), "job", 42, machine_uid, status)
+
+    def test_start_of_hour(self) -> None:
+        self.assertEqual(start_of_hour(datetime(2020, 6, 1, 10, 59, 59, 999)), datetime(2020, 6, 1, 10))
+
+    def test_queued(self) -> None:
+        self.assertEqual(compute_rollups(self._job, self._event(10, 0, JobStatus.QUEUED, None), None), [])
+
+    def test_started(self) -> None:
+        rollups = compute_rollups(self._job, self._event(10, 30, JobStatus.RUNNING),
+                                  self._event(10, 0, JobStatus.QUEUED, None))
+        self.assertEqual(rollups, [UtilizationRollup(datetime(2020, 6, 1, 10), "m1", 42, jobs_started=1)])
+
+    def test_resumed(self) -> None:
+        rollups = compute_rollups(self._job, self._event(10, 30, JobStatus.RUNNING),
+                                  self._event(10, 0, JobStatus.PAUSED))
+        self.assertEqual(rollups, [])
+
+    def test_running_across_hours(self) -> None:
+        rollups = compute_rollups(self._job, self._event(12, 15, JobStatus.DONE, None),
+                                  self._event(10, 30, JobStatus.RUNNING))
+        self.assertEqual(rollups, [
+            UtilizationRollup(datetime(2020, 6, 1, 10), "m1", 42, cpu_hours=2, memory_hours=500),
+            UtilizationRollup(datetime(2020, 6, 1, 11), "m1", 42, cpu_hours=4, memory_hours=1000),
+            UtilizationRollup(datetime(2020, 6, 1, 12), "m1", 42, jobs_finished=1, cpu_hours=1, memory_hours=250)])
+
+    def test_paused(self) -> None:
+        rollups = compute_rollups(self._job, self._event(10, 45, JobStatus.PAUSED),
+                                  self._event(10, 30, JobStatus.RUNNING))
+        self.assertEqual(rollups, [UtilizationRollup(datetime(2020, 6, 1, 10), "m1", 42, cpu_hours=1,
+                                                     memory_hours=250)])
+
+    def test_cancelled_before_start(self) -> None:
+        rollups = compute_rollups(self._job, self._event(10, 45, JobStatus.CANCELLED, None),
+                                  self._event(10, 30, JobStatus.QUEUED, None))
+        self.assertEqual(rollups, [UtilizationRollup(datetime(2020, 6, 1, 10), None, 42, jobs_finished=1)])
+
+    def test_merge_rollups(self) -> None:
+        hour = datetime(2020, 6, 1, 10)
+        first = UtilizationRollup(hour, "m1", 42, jobs_started=1, cpu_hours=2)
+        rollups = [first, UtilizationRollup(hour, None, 42, jobs_finished=1),
+                   UtilizationRollup(hour, "m1", 42, jobs_finished=1, cpu_hours=1)]
+        self.assertEqual(merge_rollups(rollups), {
+            (hour, "m1", 42): UtilizationRollup(hour, "m1", 42, jobs_started=1, jobs_finished=1, cpu_hours=3),
+            (hour, None, 42): UtilizationRollup(hour, None, 42, jobs_finished=1)})
+        self.assertEqual(first, UtilizationRollup(hour, "m1", 42, jobs_started=1, cpu_hours=2))
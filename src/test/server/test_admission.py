@@ -0,0 +1,117 @@
+from unittest import TestCase
+
+from ja.server.proxy.admission import AdmissionController, TokenBucket
+
+
+class TokenBucketTest(TestCase):
+    """
+    Class for testing the TokenBucket with a fake clock.
+    """
+    def setUp(self) -> None:
+        self._time = 0.0
+        self._bucket = TokenBucket(rate=2, burst=3, clock=lambda: self._time)
+
+    def test_burst(self) -> None:
+        for _ in range(3):
+            self.assertEqual(self._bucket.try_acquire(), 0)
+        self.assertAlmostEqual(self._bucket.try_acquire(), 0.5)
+
+    def test_refill(self) -> None:
+        for _ in range(3):
+            self._bucket.try_acquire()
+        self._time = 0.5
+        self.assertEqual(self._bucket.try_acquire(), 0)
+        self.assertGreater(self._bucket.try_acquire(), 0)
+        self._time = 100
+        self.assertTrue(self._bucket.is_full)
+
+    def test_invalid(self) -> None:
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0, burst=1)
+
+
+class AdmissionControllerTest(TestCase):
+    """
+    Class for testing the AdmissionController with a fake clock.
+    """
+    def setUp(self) -> None:
+        self._time = 0.0
+        self._queued = 0
+        self._counted = 0
+
+    def _count_queued_jobs(self) -> int:
+        self._counted += 1
+        return self._queued
+
+    def _controller(self, **kwargs: float) -> AdmissionController:
+        return AdmissionController(clock=lambda: self._time, **kwargs)  # type: ignore
+
+    def test_disabled(self) -> None:
+        controller = self._controller()
+        self.assertFalse(controller.is_enabled)
+        for _ in range(100):
+            self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        self.assertEqual(self._counted, 0)
+        self.assertEqual(controller.snapshot()["admitted"], 100)
+
+    def test_user_rate(self) -> None:
+        controller = self._controller(user_rate=1, user_burst=2)
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        rejection = controller.admit("alice", self._count_queued_jobs)
+        self.assertIsNotNone(rejection)
+        self.assertFalse(rejection.is_success)
+        self.assertEqual(rejection.retry_after, 1)
+        # Other users are not affected.
+        self.assertIsNone(controller.admit("bob", self._count_queued_jobs))
+        self._time = 1
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        self.assertEqual(controller.snapshot(), dict(admitted=4, throttled_user_rate=1, throttled_global_rate=0,
+                                                     rejected_queue_full=0))
+
+    def test_global_rate(self) -> None:
+        controller = self._controller(user_rate=10, user_burst=2, global_rate=0.5, global_burst=2)
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        self.assertIsNone(controller.admit("bob", self._count_queued_jobs))
+        rejection = controller.admit("carol", self._count_queued_jobs)
+        self.assertEqual(rejection.retry_after, 2)
+        # The token of the user is given back if the global limit rejects the command.
+        self._time = 2
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        self.assertEqual(controller.snapshot()["throttled_global_rate"], 1)
+
+    def test_queued_jobs(self) -> None:
+        controller = self._controller(max_queued_jobs=5)
+        self._queued = 4
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        self._queued = 5
+        rejection = controller.admit("alice", self._count_queued_jobs)
+        self.assertEqual(rejection.retry_after, AdmissionController.QUEUE_FULL_RETRY_AFTER)
+        self.assertIn("5 queued jobs", rejection.result_string)
+        self.assertEqual(controller.snapshot()["rejected_queue_full"], 1)
+
+    def test_queued_jobs_give_back(self) -> None:
+        controller = self._controller(user_rate=1, user_burst=1, global_rate=1, global_burst=1, max_queued_jobs=5)
+        self._queued = 5
+        controller.admit("alice", self._count_queued_jobs)
+        # The rejected command did not spend the tokens, so only the amount of queued jobs is the reason to wait.
+        self._queued = 0
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+
+    def test_give_back(self) -> None:
+        controller = self._controller(user_rate=1, user_burst=1, global_rate=1, global_burst=1)
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        self.assertIsNotNone(controller.admit("alice", self._count_queued_jobs))
+        controller.give_back("alice")
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        # Returning more tokens than were taken does not raise the burst.
+        for _ in range(3):
+            controller.give_back("alice")
+        self.assertIsNone(controller.admit("alice", self._count_queued_jobs))
+        self.assertIsNotNone(controller.admit("alice", self._count_queued_jobs))
+
+    def test_rate_checked_first(self) -> None:
+        controller = self._controller(user_rate=1, max_queued_jobs=5)
+        controller.admit("alice", self._count_queued_jobs)
+        controller.admit("alice", self._count_queued_jobs)
+        self.assertEqual(self._counted, 1)
@@ -1,6 +1,9 @@
+from ja.common.identity import IdentityCache
 from ja.common.message.base import Response
 from ja.common.message.server import ServerCommand
+from ja.server.database.async_database import AsyncServerDatabase
 from ja.server.database.database import ServerDatabase
+from ja.server.proxy.admission import AdmissionController
 from ja.server.proxy.command_handler import ServerCommandHandler
 from ja.worker.message.base import WorkerServerCommand
 from ja.user.message.base import UserServerCommand
@@ -51,7 +54,8 @@ class ServerCommandHandlerNoExecute(ServerCommandHandler):
     # Override user/worker commands.
     # Otherwise, to test a user command we need to create a full SSH Config, Command config, etc.
     _user_commands = {
-        "UserCommand": UserMockCommand
+        "UserCommand": UserMockCommand,
+        "AddCommand": UserMockCommand
     }
 
     _worker_commands = {
@@ -64,6 +68,8 @@ class ServerCommandHandlerNoExecute(ServerCommandHandler):
         self._execute_count = 0
         self._running = True
         self._user = -1
+        self._admission = None
+        self._identities = IdentityCache()
         self.response: Dict[str, object] = {}
 
     def _execute_command(self, command: ServerCommand) -> Dict[str, object]:
@@ -158,6 +164,34 @@ class ServerCommandHandlerTest(TestCase):
         self.assertTrue(Response.from_dict(response).is_success)
         self.assertFalse(self._handler._running)
 
+    def test_admission(self) -> None:
+        self.assertIsNone(self._handler._admit("AddCommand", "user2"))
+        self._handler._database = MagicMock()
+        self._handler._database.count_queued_jobs = MagicMock(return_value=3)
+        self._handler._async_database = AsyncServerDatabase(self._handler._database)
+        self.addCleanup(self._handler._async_database.shutdown)
+        self._handler._admission = AdmissionController(user_rate=1, max_queued_jobs=3)
+        self.assertIsNone(self._handler._admit("QueryCommand", "user2"))
+        rejection = self._handler._admit("AddCommand", "user2")
+        self.assertFalse(rejection.is_success)
+        self.assertEqual(rejection.retry_after, AdmissionController.QUEUE_FULL_RETRY_AFTER)
+        self._handler._database.count_queued_jobs.assert_called_once_with(2)
+        # The rejection gave back the token of the user, so the amount of queued jobs is checked again.
+        self.assertEqual(self._handler._admit("AddCommand", "user2").retry_after,
+                         AdmissionController.QUEUE_FULL_RETRY_AFTER)
+        self.assertEqual(self._handler._database.count_queued_jobs.call_count, 2)
+
+    def test_admission_give_back(self) -> None:
+        self._handler._admission = AdmissionController(user_rate=1, user_burst=1)
+        self.assertIsNone(self._handler._admit("AddCommand", "user2"))
+        self._handler.response = Response("Dockerfile unknown.", False).to_dict()
+        self._handler._check_exit_or_process_command({}, "AddCommand", "user2")
+        # The job was not added, so the retry is admitted.
+        self.assertIsNone(self._handler._admit("AddCommand", "user2"))
+        self._handler.response = Response("Job added.", True).to_dict()
+        self._handler._check_exit_or_process_command({}, "AddCommand", "user2")
+        self.assertEqual(self._handler._admit("AddCommand", "user2").retry_after, 1)
+
     def test_kill_fails_nonadmin(self) -> None:
         response = self._handler._check_exit_or_process_command({"user": "user2"}, "KillCommand", "user2")
         self.assertFalse(Response.from_dict(response).is_success)
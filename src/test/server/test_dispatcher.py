@@ -1,11 +1,22 @@
 from copy import deepcopy
+from threading import Barrier, Lock
+from typing import List, Tuple
 from unittest import TestCase
 
 from ja.common.job import Job, JobStatus
+from ja.common.message.base import Response
+from ja.common.proxy.ssh import ISSHConnection
+from ja.common.work_machine import ResourceAllocation
+from ja.server.database.memory.database import MemoryDatabase
 from ja.server.database.types.job_entry import DatabaseJobEntry
-from ja.server.database.types.work_machine import WorkMachine
+from ja.server.database.types.work_machine import WorkMachine, WorkMachineResources, WorkMachineState
 from ja.server.dispatcher.dispatcher import Dispatcher
+from ja.server.dispatcher.liveness import LivenessMonitor
+from ja.server.proxy.proxy import IWorkerProxy
+from paramiko.ssh_exception import SSHException  # type: ignore
+from test.proxy.worker_proxy_dummy import WorkerProxyDummy
 from test.proxy.worker_proxy_factory import WorkerProxyDummyFactory
+from test.server.test_liveness import CountingWorkerProxyFactory
 
 
 class TestDispatcher(TestCase):
@@ -126,3 +137,295 @@ class TestDispatcher(TestCase):
         self._dispatcher.set_distribution(self._distribution_b)
         self._dispatcher.set_distribution(self._distribution_b)
         self._assert_distribution_correct_ab()
+
+
+class RecordingWorkerProxy(WorkerProxyDummy):
+    """
+    WorkerProxyDummy which records the commands it receives and waits at a barrier before the first one.
+    """
+    def __init__(self, uid: str, barrier: Barrier, log: List[Tuple[str, str, str]], lock: Lock):
+        super().__init__(uid, [])
+        self._barrier = barrier
+        self._log = log
+        self._lock = lock
+        self._waited = False
+
+    def _record(self, command: str, uid: str) -> None:
+        if not self._waited:
+            self._waited = True
+            self._barrier.wait(timeout=5)
+        with self._lock:
+            self._log.append((self.uid, command, uid))
+
+    def dispatch_job(self, job: Job) -> Response:
+        self._record("start", job.uid)
+        return super().dispatch_job(job)
+
+    def cancel_job(self, uid: str) -> Response:
+        self._record("cancel", uid)
+        return super().cancel_job(uid)
+
+    def pause_job(self, uid: str) -> Response:
+        self._record("pause", uid)
+        return super().pause_job(uid)
+
+
+class RecordingWorkerProxyFactory(WorkerProxyDummyFactory):
+    def __init__(self, machines: int):
+        super().__init__(database=None)
+        # Every work machine waits for all others, so the test only finishes if they are contacted in parallel.
+        self.barrier = Barrier(machines)
+        self.log: List[Tuple[str, str, str]] = []
+        self._lock = Lock()
+
+    def _create_proxy(self, work_machine: WorkMachine) -> IWorkerProxy:
+        return RecordingWorkerProxy(work_machine.uid, self.barrier, self.log, self._lock)
+
+
+class FailingWorkerProxy(WorkerProxyDummy):
+    def dispatch_job(self, job: Job) -> Response:
+        raise SSHException("Connection reset.")
+
+
+class RejectingWorkerProxy(WorkerProxyDummy):
+    """
+    WorkerProxyDummy which rejects jobs with "reject" in their UID and loses the Responses for jobs with "mute" in
+    their UID.
+    """
+    def dispatch_job(self, job: Job) -> Response:
+        if "reject" in job.uid:
+            return Response("Build failed.", is_success=False)
+        if "mute" in job.uid:
+            return Response(ISSHConnection.RESPONSE_FAILED_COMMUNICATION, is_success=False)
+        return super().dispatch_job(job)
+
+
+class RejectingWorkerProxyFactory(WorkerProxyDummyFactory):
+    def _create_proxy(self, work_machine: WorkMachine) -> IWorkerProxy:
+        return RejectingWorkerProxy(work_machine.uid, [])
+
+
+class PartlyFailingWorkerProxyFactory(WorkerProxyDummyFactory):
+    """
+    Factory class for WorkerProxyDummy which loses the connection to work machines with "lost" in their UID.
+    """
+    def _create_proxy(self, work_machine: WorkMachine) -> IWorkerProxy:
+        if "lost" in work_machine.uid:
+            return FailingWorkerProxy(work_machine.uid, [])
+        return super()._create_proxy(work_machine)
+
+
+class TestDispatcherParallel(TestCase):
+
+    def _entry(self, uid: str, status: JobStatus, machine: WorkMachine) -> DatabaseJobEntry:
+        job = Job.from_dict({
+            "status": status.value, "owner_id": 0,
+            "scheduling_constraints": {"priority": 1, "is_preemptible": True, "special_resources": []},
+            "docker_context": {"dockerfile_source": "FROM scratch", "mount_points": []},
+            "docker_constraints": {"cpu_threads": 1, "memory": 1024}
+        })
+        job.uid = uid
+        return DatabaseJobEntry(job=job, stats=None, machine=machine)
+
+    def setUp(self) -> None:
+        self._machines = [WorkMachine(uid="worker-%d" % i) for i in range(4)]
+        self._factory = RecordingWorkerProxyFactory(len(self._machines))
+        self._dispatcher = Dispatcher(self._factory, max_workers=len(self._machines))
+
+    def test_parallel_dispatch(self) -> None:
+        distribution = []
+        for index, machine in enumerate(self._machines):
+            distribution.append(self._entry("run-%d" % index, JobStatus.RUNNING, machine))
+            distribution.append(self._entry("cancel-%d" % index, JobStatus.CANCELLED, machine))
+        self.assertEqual(self._dispatcher.set_distribution(distribution), [])
+        self.assertEqual(len(self._factory.log), 8)
+        for index, machine in enumerate(self._machines):
+            commands = [(command, uid) for machine_uid, command, uid in self._factory.log if machine_uid == machine.uid]
+            self.assertEqual(commands, [("cancel", "cancel-%d" % index), ("start", "run-%d" % index)])
+        self.assertEqual(self._dispatcher._previous_statuses, {"run-%d" % i: JobStatus.RUNNING for i in range(4)})
+
+        cycle = self._dispatcher.last_cycle
+        assert cycle is not None
+        self.assertEqual(cycle.commands, 8)
+        # The work machines do not know the cancelled jobs.
+        self.assertEqual(cycle.failures, 4)
+        self.assertEqual(len(cycle.results), 4)
+
+    def test_lost_machine(self) -> None:
+        self._dispatcher = Dispatcher(PartlyFailingWorkerProxyFactory(database=None))
+        lost_machine = WorkMachine(uid="worker-lost")
+        lost = self._dispatcher.set_distribution([
+            self._entry("a", JobStatus.RUNNING, self._machines[0]),
+            self._entry("b", JobStatus.RUNNING, lost_machine),
+            self._entry("c", JobStatus.RUNNING, lost_machine),
+        ])
+        self.assertEqual(lost, [lost_machine])
+        self.assertEqual(self._dispatcher._previous_statuses, {"a": JobStatus.RUNNING})
+        cycle = self._dispatcher.last_cycle
+        assert cycle is not None
+        self.assertEqual(cycle.failures, 2)
+
+    def test_rejected_commands(self) -> None:
+        factory = RejectingWorkerProxyFactory(database=None)
+        monitor = LivenessMonitor(factory, interval=60)
+        dispatcher = Dispatcher(factory, liveness_monitor=monitor)
+        machine = self._machines[0]
+        monitor.watch(machine)
+        distribution = [self._entry("a", JobStatus.RUNNING, machine), self._entry("reject", JobStatus.RUNNING, machine)]
+        self.assertEqual(dispatcher.set_distribution(distribution), [])
+        # The rejected job is not remembered as running, so it is started again in the next cycle.
+        self.assertEqual(dispatcher._previous_statuses, {"a": JobStatus.RUNNING})
+        cycle = dispatcher.last_cycle
+        assert cycle is not None
+        self.assertEqual(cycle.failures, 1)
+        self.assertEqual(cycle.results[0].statuses, {"a": JobStatus.RUNNING})
+        self.assertTrue(monitor.is_alive(machine.uid))
+
+    def test_lost_responses(self) -> None:
+        factory = RejectingWorkerProxyFactory(database=None)
+        monitor = LivenessMonitor(factory, interval=60, max_missed=1)
+        dispatcher = Dispatcher(factory, liveness_monitor=monitor)
+        machine = self._machines[0]
+        monitor.watch(machine)
+        monitor.record_heartbeat(machine.uid)
+        lost = dispatcher.set_distribution([self._entry("mute", JobStatus.RUNNING, machine)])
+        self.assertEqual(dispatcher._previous_statuses, dict())
+        # No Response was received, so the work machine missed a heartbeat and is lost.
+        self.assertEqual(lost, [machine])
+        self.assertIsNone(monitor.is_alive(machine.uid))
+
+    def test_liveness_monitor(self) -> None:
+        factory = CountingWorkerProxyFactory()
+        monitor = LivenessMonitor(factory, interval=60)
+        dispatcher = Dispatcher(factory, liveness_monitor=monitor)
+        distribution = [self._entry("job-%d" % i, JobStatus.RUNNING, self._machines[0]) for i in range(10)]
+        dispatcher.set_distribution(distribution)
+        dispatcher.set_distribution(distribution)
+        # The first cycle pings the work machine once, afterwards the heartbeats of the monitor are trusted.
+        self.assertEqual(factory.pings, {self._machines[0].uid: 1})
+
+        for _ in range(3):
+            monitor.record_miss(self._machines[0].uid)
+        self.assertEqual(dispatcher.set_distribution(distribution), [self._machines[0]])
+
+    def test_lost_idle_machine(self) -> None:
+        factory = CountingWorkerProxyFactory()
+        monitor = LivenessMonitor(factory, interval=60)
+        dispatcher = Dispatcher(factory, liveness_monitor=monitor)
+        dispatcher.set_distribution([self._entry("job-1", JobStatus.RUNNING, self._machines[0])])
+        for _ in range(3):
+            monitor.record_miss(self._machines[0].uid)
+        # The work machine has no jobs to dispatch anymore, but is reported as lost nonetheless, and only once.
+        self.assertEqual(dispatcher.set_distribution([]), [self._machines[0]])
+        self.assertEqual(dispatcher.set_distribution([]), [])
+
+
+class UnreachableWorkerProxyDummyFactory(WorkerProxyDummyFactory):
+    """
+    Factory class for WorkerProxyDummy which fails to connect to new work machines.
+    """
+    def _create_proxy(self, work_machine: WorkMachine) -> IWorkerProxy:
+        raise ConnectionError("Work machine %s is unreachable." % work_machine.uid)
+
+
+class TestDispatcherReconcile(TestCase):
+
+    def _new_job(self, uid: str, statuses: List[JobStatus]) -> Job:
+        job = Job.from_dict(deepcopy(self._generic_job_dict))
+        job.uid = uid
+        for status in statuses:
+            job.status = status
+        return job
+
+    def _add_job(self, uid: str, statuses: List[JobStatus], machine: WorkMachine) -> Job:
+        job = self._new_job(uid, [])
+        self._database.update_job(job)
+        for status in statuses:
+            job.status = status
+            self._database.update_job(job)
+        self._database.assign_job_machine(job, machine)
+        return job
+
+    def setUp(self) -> None:
+        self._database = MemoryDatabase()
+        self._factory = UnreachableWorkerProxyDummyFactory(database=None)
+        self._dispatcher = Dispatcher(self._factory)
+        self._generic_job_dict = {
+            "status": JobStatus.QUEUED,
+            "owner_id": 1008,
+            "email": "user@website.com",
+            "scheduling_constraints": {"priority": 1, "is_preemptible": True, "special_resources": []},
+            "docker_context": {"dockerfile_source": "ssh localhost", "mount_points": []},
+            "docker_constraints": {"cpu_threads": 4, "memory": 1024},
+            "label": "thing"
+        }
+        self._work_machine_alpha = WorkMachine("worker-alpha", WorkMachineState.ONLINE,
+                                               WorkMachineResources(ResourceAllocation(16, 8192, 8192)))
+        self._work_machine_beta = WorkMachine("worker-beta", WorkMachineState.ONLINE,
+                                              WorkMachineResources(ResourceAllocation(16, 8192, 8192)))
+        for machine in [self._work_machine_alpha, self._work_machine_beta]:
+            machine.resources.allocate(ResourceAllocation(16, 8192, 0))
+            self._database.update_work_machine(machine)
+
+        running = [JobStatus.RUNNING]
+        self._job_running = self._add_job("job-running", running, self._work_machine_alpha)
+        self._job_paused = self._add_job("job-paused", running, self._work_machine_alpha)
+        self._job_finished = self._add_job("job-finished", running, self._work_machine_alpha)
+        self._job_lost = self._add_job("job-lost", [JobStatus.RUNNING, JobStatus.PAUSED], self._work_machine_alpha)
+        self._job_unreachable = self._add_job("job-unreachable", running, self._work_machine_beta)
+        self._job_queued = self._add_job("job-queued", [], None)
+
+        self._proxy_alpha = WorkerProxyDummy(uid=self._work_machine_alpha.uid, jobs=[
+            self._new_job(uid, []) for uid in [self._job_running.uid, self._job_paused.uid, "job-unknown"]])
+        self._proxy_alpha.pause_job(self._job_paused.uid)
+        self._proxy_alpha._unreported_jobs = {self._job_finished.uid: JobStatus.DONE}
+        self._factory._proxy_dict[self._work_machine_alpha.uid] = self._proxy_alpha
+
+    def _get_status(self, job: Job) -> JobStatus:
+        return self._database.find_job_by_id(job.uid).job.status
+
+    def test_reconcile_job_statuses(self) -> None:
+        self._dispatcher.reconcile(self._database)
+        self.assertEqual(self._get_status(self._job_running), JobStatus.RUNNING)
+        self.assertEqual(self._get_status(self._job_paused), JobStatus.PAUSED)
+        self.assertEqual(self._get_status(self._job_finished), JobStatus.DONE)
+        self.assertEqual(self._get_status(self._job_lost), JobStatus.CRASHED)
+        self.assertEqual(self._get_status(self._job_unreachable), JobStatus.CRASHED)
+        self.assertEqual(self._get_status(self._job_queued), JobStatus.QUEUED)
+
+    def test_reconcile_assignments(self) -> None:
+        self._dispatcher.reconcile(self._database)
+        adopted_jobs = self._database.get_jobs_on_machine(self._work_machine_alpha)
+        self.assertCountEqual([job.uid for job in adopted_jobs], [self._job_running.uid, self._job_paused.uid])
+        self.assertListEqual(self._database.get_jobs_on_machine(self._work_machine_beta), [])
+
+    def test_reconcile_work_machines(self) -> None:
+        self._dispatcher.reconcile(self._database)
+        alpha = self._database.find_work_machine_by_uid(self._work_machine_alpha.uid)
+        self.assertEqual(alpha.state, WorkMachineState.ONLINE)
+        self.assertEqual(alpha.resources.free_resources, ResourceAllocation(12, 8192 - 1024, 8192 - 1024))
+        beta = self._database.find_work_machine_by_uid(self._work_machine_beta.uid)
+        self.assertEqual(beta.state, WorkMachineState.OFFLINE)
+        self.assertEqual(beta.resources.free_resources, beta.resources.total_resources)
+
+    def test_reconcile_cancels_unknown_jobs(self) -> None:
+        self._dispatcher.reconcile(self._database)
+        self.assertFalse(self._proxy_alpha.cancel_job("job-unknown").is_success)
+
+    def test_reconcile_cancel_fails(self) -> None:
+        def cancel_job(uid: str) -> Response:
+            raise SSHException("Connection reset.")
+
+        self._proxy_alpha.cancel_job = cancel_job  # type: ignore
+        self._dispatcher.reconcile(self._database)
+        self.assertEqual(self._get_status(self._job_running), JobStatus.RUNNING)
+        self.assertEqual(self._get_status(self._job_finished), JobStatus.DONE)
+
+    def test_reconcile_does_not_redispatch(self) -> None:
+        self._dispatcher.reconcile(self._database)
+        self.assertDictEqual(self._dispatcher._previous_statuses,
+                             {self._job_running.uid: JobStatus.RUNNING, self._job_paused.uid: JobStatus.PAUSED})
+        distribution = [entry for entry in self._database.get_current_schedule() if entry.assigned_machine]
+        self._dispatcher.set_distribution(distribution)
+        self.assertDictEqual(self._proxy_alpha.report_jobs(),
+                             {self._job_running.uid: JobStatus.RUNNING, self._job_paused.uid: JobStatus.PAUSED})
@@ -0,0 +1,125 @@
+from time import sleep
+from typing import Dict, List, Set
+from unittest import TestCase
+
+from paramiko.ssh_exception import SSHException  # type: ignore
+
+from ja.server.database.types.work_machine import WorkMachine
+from ja.server.dispatcher.liveness import LivenessMonitor
+from ja.server.proxy.proxy import IWorkerProxy
+from test.proxy.worker_proxy_dummy import WorkerProxyDummy
+from test.proxy.worker_proxy_factory import WorkerProxyDummyFactory
+
+
+class CountingWorkerProxy(WorkerProxyDummy):
+    """
+    WorkerProxyDummy which counts its pings and can be made unreachable.
+    """
+    def __init__(self, uid: str, pings: Dict[str, int], unreachable: Set[str]):
+        super().__init__(uid, [])
+        self._pings = pings
+        self._unreachable = unreachable
+
+    def check_connection(self) -> None:
+        self._pings[self.uid] = self._pings.get(self.uid, 0) + 1
+        if self.uid in self._unreachable:
+            raise SSHException("Work machine %s is unreachable." % self.uid)
+
+
+class CountingWorkerProxyFactory(WorkerProxyDummyFactory):
+    def __init__(self) -> None:
+        super().__init__(database=None)
+        self.pings: Dict[str, int] = dict()
+        self.unreachable: Set[str] = set()
+
+    def _create_proxy(self, work_machine: WorkMachine) -> IWorkerProxy:
+        return CountingWorkerProxy(work_machine.uid, self.pings, self.unreachable)
+
+
+class LivenessMonitorTest(TestCase):
+    """
+    Class for testing the LivenessMonitor with a fake clock.
+    """
+    def setUp(self) -> None:
+        self._time = 0.0
+        self._factory = CountingWorkerProxyFactory()
+        self._monitor = LivenessMonitor(self._factory, interval=10, max_missed=2, clock=lambda: self._time)
+        self._alpha = WorkMachine(uid="worker-alpha")
+        self._beta = WorkMachine(uid="worker-beta")
+        self._monitor.watch(self._alpha)
+        self._monitor.watch(self._beta)
+
+    def test_unknown(self) -> None:
+        self.assertIsNone(self._monitor.is_alive(self._alpha.uid))
+        self.assertIsNone(self._monitor.is_alive("worker-unwatched"))
+
+    def test_ping(self) -> None:
+        self._monitor.ping_all()
+        self.assertEqual(self._factory.pings, {self._alpha.uid: 1, self._beta.uid: 1})
+        self.assertTrue(self._monitor.is_alive(self._alpha.uid))
+
+    def test_ttl(self) -> None:
+        self._monitor.ping_all()
+        self._time = 20
+        self.assertTrue(self._monitor.is_alive(self._alpha.uid))
+        self._time = 21
+        self.assertIsNone(self._monitor.is_alive(self._alpha.uid))
+
+    def test_heartbeat_skips_ping(self) -> None:
+        self._monitor.ping_all()
+        self._time = 15
+        self._monitor.record_heartbeat(self._alpha.uid)
+        self._time = 20
+        self._monitor.ping_all()
+        self.assertEqual(self._factory.pings, {self._alpha.uid: 1, self._beta.uid: 2})
+
+    def test_lost_after_missed_pings(self) -> None:
+        self._monitor.ping_all()
+        self._factory.unreachable.add(self._beta.uid)
+        self._time = 10
+        self._monitor.ping_all()
+        # A single missed ping makes the state unknown, but the work machine is not lost yet.
+        self.assertIsNone(self._monitor.is_alive(self._beta.uid))
+        self.assertEqual(self._monitor.lost_machines(), [])
+        self._time = 20
+        self._monitor.ping_all()
+        self.assertFalse(self._monitor.is_alive(self._beta.uid))
+        self.assertEqual(self._monitor.lost_machines(), [self._beta])
+        self.assertTrue(self._monitor.is_alive(self._alpha.uid))
+
+        self._factory.unreachable.clear()
+        self._time = 30
+        self._monitor.ping_all()
+        self.assertTrue(self._monitor.is_alive(self._beta.uid))
+
+    def test_lost_callback(self) -> None:
+        reported: List[List[WorkMachine]] = []
+        self._monitor.set_lost_callback(reported.append)
+        self._factory.unreachable.add(self._beta.uid)
+        self._monitor.ping_all()
+        self.assertEqual(reported, [])
+        self._time = 10
+        self._monitor.ping_all()
+        self.assertEqual(reported, [[self._beta]])
+        # A work machine is only reported by the round of pings which lost it.
+        self._time = 20
+        self._monitor.ping_all()
+        self.assertEqual(reported, [[self._beta]])
+
+    def test_forget(self) -> None:
+        self._monitor.forget(self._beta.uid)
+        self._monitor.ping_all()
+        self.assertEqual(self._factory.pings, {self._alpha.uid: 1})
+
+    def test_background_thread(self) -> None:
+        monitor = LivenessMonitor(self._factory, interval=0.01)
+        monitor.watch(self._alpha)
+        monitor.start()
+        try:
+            for _ in range(500):
+                if monitor.is_alive(self._alpha.uid):
+                    break
+                sleep(0.01)
+        finally:
+            monitor.stop()
+        self.assertTrue(monitor.is_alive(self._alpha.uid))
@@ -0,0 +1,54 @@
+from copy import deepcopy
+from unittest import TestCase
+from unittest.mock import Mock
+
+from ja.common.job import Job, JobStatus
+from ja.common.work_machine import ResourceAllocation
+from ja.server.database.memory.database import MemoryDatabase
+from ja.server.database.types.work_machine import WorkMachine, WorkMachineResources, WorkMachineState
+from ja.server.main import JobCenter
+
+
+class CrashActiveJobsTest(TestCase):
+    def setUp(self) -> None:
+        self._database = MemoryDatabase()
+        self._machine = WorkMachine("worker", WorkMachineState.ONLINE,
+                                    WorkMachineResources(ResourceAllocation(8, 8192, 8192)))
+        self._machine.resources.allocate(ResourceAllocation(4, 1024, 1024))
+        self._database.update_work_machine(self._machine)
+        job_dict = {
+            "status": JobStatus.QUEUED,
+            "owner_id": 1008,
+            "email": "user@website.com",
+            "scheduling_constraints": {"priority": 1, "is_preemptible": True, "special_resources": []},
+            "docker_context": {"dockerfile_source": "ssh localhost", "mount_points": []},
+            "docker_constraints": {"cpu_threads": 4, "memory": 1024},
+            "label": "thing"
+        }
+        self._jobs = []
+        for uid, statuses in [("running", [JobStatus.RUNNING]), ("paused", [JobStatus.RUNNING, JobStatus.PAUSED]),
+                              ("queued", [])]:
+            job = Job.from_dict(deepcopy(job_dict))
+            job.uid = uid
+            self._database.update_job(job)
+            for status in statuses:
+                job.status = status
+                self._database.update_job(job)
+            if statuses:
+                self._database.assign_job_machine(job, self._machine)
+            self._jobs.append(job)
+
+    def test_crash_active_jobs(self) -> None:
+        JobCenter.crash_active_jobs(self._database)
+        statuses = [self._database.find_job_by_id(job.uid).job.status for job in self._jobs]
+        self.assertListEqual(statuses, [JobStatus.CRASHED, JobStatus.CRASHED, JobStatus.QUEUED])
+        self.assertListEqual(self._database.get_jobs_on_machine(self._machine), [])
+        machine = self._database.find_work_machine_by_uid(self._machine.uid)
+        self.assertEqual(machine.state, WorkMachineState.OFFLINE)
+        self.assertEqual(machine.resources.free_resources, machine.resources.total_resources)
+
+    def test_crash_active_jobs_single_transaction(self) -> None:
+        scheduler_callback = Mock()
+        self._database.set_scheduler_callback(scheduler_callback)
+        JobCenter.crash_active_jobs(self._database)
+        scheduler_callback.assert_called_once_with(self._database)
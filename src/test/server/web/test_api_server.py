@@ -1,12 +1,16 @@
 from datetime import datetime
 from freezegun import freeze_time  # type: ignore
+from ja.common.async_core import AsyncDaemonCore
+from ja.server.database.async_database import AsyncServerDatabase
 from ja.server.database.database import ServerDatabase
-from ja.server.web.api_server import WebRequestHandlerFactory, StatisticsWebServer
+from ja.server.database.memory.database import MemoryDatabase
+from ja.server.web.api_server import AsyncStatisticsWebServer, WebRequestHandlerFactory, StatisticsWebServer
 from unittest import TestCase
 from unittest.mock import MagicMock
 
 import ja.server.web.requests as req
 import socket
+import threading
 import time
 
 
@@ -40,6 +44,7 @@ class WebRequestHandlerTest(TestCase):
         self.assertIsNone(self._handler.create_request_for_path("/v2/workmachines/workload"))
         self.assertIsNone(self._handler.create_request_for_path("/v1/admins"))
         self.assertIsNone(self._handler.create_request_for_path("/v1/jobs/hours/ab"))
+        self.assertIsNone(self._handler.create_request_for_path("/v1/utilization/hours/ab"))
         self.assertIsNone(self._handler.create_request_for_path("/v1/user//jobs"))
 
     def test_parse_correct_requests(self) -> None:
@@ -50,6 +55,8 @@ class WebRequestHandlerTest(TestCase):
         self.assertIsInstance(job_info_request, req.JobInformationRequest)
         self.assertEqual(job_info_request._job_uid, "abc123")
 
+        self.assertIsInstance(self._handler.create_request_for_path("/v1/admission"), req.AdmissionRequest)
+
         user_jobs_request = self._handler.create_request_for_path("/v1/user/root/jobs")
         self.assertIsInstance(user_jobs_request, req.UserJobsRequest)
         self.assertEqual(user_jobs_request._user, "root")
@@ -59,6 +66,11 @@ class WebRequestHandlerTest(TestCase):
             self.assertIsInstance(past_jobs_request, req.PastJobsRequest)
             self.assertEqual(past_jobs_request._since, datetime(2020, 1, 1, 6, 0, 0))
 
+        with freeze_time("2020-01-01 12:30:00"):
+            utilization_request = self._handler.create_request_for_path("/v1/utilization/hours/6")
+            self.assertIsInstance(utilization_request, req.UtilizationRequest)
+            self.assertEqual(utilization_request._since, datetime(2020, 1, 1, 7, 0, 0))
+
         workmachine_jobs_request = self._handler.create_request_for_path("/v1/workmachines/123abc")
         self.assertIsInstance(workmachine_jobs_request, req.WorkMachineJobsRequest)
         self.assertEqual(workmachine_jobs_request._machine_id, "123abc")
@@ -103,3 +115,43 @@ class StatisticsWebServerTest(TestCase):
 
         # Clean up
         server.stop()
+
+
+class AsyncStatisticsWebServerTest(TestCase):
+    def setUp(self) -> None:
+        self._core = AsyncDaemonCore(max_workers=2)
+        self._database = AsyncServerDatabase(MemoryDatabase())
+        self._core.add_service(AsyncStatisticsWebServer("127.0.0.1", 12346, self._database).serve)
+        self._thread = threading.Thread(target=self._core.run, daemon=True)
+        self._thread.start()
+
+    def tearDown(self) -> None:
+        self._core.stop()
+        self._thread.join(5)
+        self._database.shutdown()
+
+    def _get(self, path: str) -> bytes:
+        for _ in range(50):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if sock.connect_ex(("127.0.0.1", 12346)) == 0:
+                break
+            sock.close()
+            time.sleep(0.1)
+        sock.sendall(("GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n" % path).encode())
+        response = b""
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                break
+            response += data
+        sock.close()
+        return response
+
+    def test_report(self) -> None:
+        response = self._get("/v1/admission")
+        self.assertTrue(response.startswith(b"HTTP/1.0 200 OK\r\n"))
+        body = response.split(b"\r\n\r\n", 1)[1]
+        self.assertEqual(body.decode(), req.AdmissionRequest(None).generate_report(None))
+
+    def test_invalid_path(self) -> None:
+        self.assertTrue(self._get("/v2/workmachines/workload").startswith(b"HTTP/1.0 404 Not Found\r\n"))
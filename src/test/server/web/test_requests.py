@@ -4,10 +4,11 @@ from ja.common.work_machine import ResourceAllocation
 from ja.server.database.sql.mock_database import MockDatabase
 from ja.server.database.types.job_entry import DatabaseJobEntry
 from ja.server.database.types.work_machine import WorkMachine
+from ja.server.proxy.admission import AdmissionController
 from test.server.scheduler.common import get_job, get_machine
 from typing import Dict, Any, cast
 from unittest import TestCase
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import ja.server.web.requests as req
 import pwd
@@ -74,8 +75,12 @@ class AbstractWebRequestTest(TestCase):
         with freeze_time("2020-01-01 00:00:00"):
             self._job4 = self._add_job(JobPriority.HIGH, since=0, status=JobStatus.DONE, user=0)
 
-        pwd.getpwuid = MagicMock(side_effect=(lambda user: MockPwuid(user)))
-        pwd.getpwnam = MagicMock(side_effect=(lambda user: MockPwnam(user)))
+        # Patched only for the duration of a test, other tests need the real user database.
+        for name, mock in [("getpwuid", MagicMock(side_effect=(lambda user: MockPwuid(user)))),
+                           ("getpwnam", MagicMock(side_effect=(lambda user: MockPwnam(user))))]:
+            patcher = patch.object(pwd, name, mock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
 
     def _do_report(self) -> Dict[str, Any]:
         return cast(Dict[str, Any], yaml.load(self._request.generate_report(self._db), Loader=yaml.SafeLoader))
@@ -189,3 +194,58 @@ class WorkMachineJobsTest(AbstractWebRequestTest):
         expect = {"jobs": [{"job_id": self._job3.job.uid}]}
         self._request = req.WorkMachineJobsRequest(self._machine2.uid)
         self.assertDictEqual(expect, self._do_report())
+
+
+class UtilizationTest(AbstractWebRequestTest):
+    def setUp(self) -> None:
+        super().setUp()
+        with freeze_time("2020-01-02 10:30:00"):
+            self._job5 = self._add_job(cpu=4, ram=8, user=2)
+            self._job5.job.status = JobStatus.RUNNING
+            self._db.apply_schedule([DatabaseJobEntry(self._job5.job, None, self._machine2)], [])
+        with freeze_time("2020-01-02 12:15:00"):
+            self._job5.job.status = JobStatus.DONE
+            self._db.apply_schedule([DatabaseJobEntry(self._job5.job, None, None)], [])
+
+    def test_no_utilization(self) -> None:
+        with freeze_time("2020-01-03 12:00:00"):
+            self._request = req.UtilizationRequest(12)
+            self.assertDictEqual({"utilization": []}, self._do_report())
+
+    def test_utilization(self) -> None:
+        with freeze_time("2020-01-02 12:30:00"):
+            self._request = req.UtilizationRequest(2)
+            expect = {"utilization": [
+                {"hour": "2020-02-01 11:00:00",
+                 "machines": {self._machine2.uid: {"jobs_started": 0, "jobs_finished": 0, "cpu_hours": 4.0,
+                                                   "memory_hours": 8.0}},
+                 "owners": {"test": {"jobs_started": 0, "jobs_finished": 0, "cpu_hours": 4.0,
+                                     "memory_hours": 8.0}}},
+                {"hour": "2020-02-01 12:00:00",
+                 "machines": {self._machine2.uid: {"jobs_started": 0, "jobs_finished": 1, "cpu_hours": 1.0,
+                                                   "memory_hours": 2.0}},
+                 "owners": {"test": {"jobs_started": 0, "jobs_finished": 1, "cpu_hours": 1.0,
+                                     "memory_hours": 2.0}}}]}
+            self.assertDictEqual(expect, self._do_report())
+
+    def test_started(self) -> None:
+        with freeze_time("2020-01-02 10:59:00"):
+            self._request = req.UtilizationRequest(1)
+            report = self._do_report()
+            self.assertEqual(len(report["utilization"]), 1)
+            self.assertEqual(report["utilization"][0]["machines"][self._machine2.uid]["jobs_started"], 1)
+            self.assertEqual(report["utilization"][0]["owners"]["test"]["cpu_hours"], 2.0)
+
+
+class AdmissionTest(AbstractWebRequestTest):
+    def test_counters(self) -> None:
+        admission = AdmissionController(max_queued_jobs=1)
+        admission.admit("test", lambda: 0)
+        admission.admit("test", lambda: 1)
+        self._request = req.AdmissionRequest(admission)
+        self.assertDictEqual(self._do_report(), {"enabled": True, "commands": {
+            "admitted": 1, "throttled_user_rate": 0, "throttled_global_rate": 0, "rejected_queue_full": 1}})
+
+    def test_unavailable(self) -> None:
+        self._request = req.AdmissionRequest(None)
+        self.assertDictEqual(self._do_report(), {"error": req.AdmissionRequest.DISABLED})
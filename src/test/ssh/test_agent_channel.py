@@ -0,0 +1,261 @@
+from io import BytesIO
+from threading import Thread
+from time import sleep
+from typing import Any, BinaryIO, Dict, List
+from unittest import TestCase
+from unittest.mock import patch
+import os
+import yaml
+
+from ja.common.message.codec import JSON, available_codecs
+from ja.common.message.compression import COMPRESSIONS, CompressionMetrics, pack, unpack
+
+from ja.common.message.base import Response
+from ja.common.proxy.channel import AGENT_HELLO, AgentChannel, AgentUnavailableError, agent_hello, \
+    parse_agent_hello, read_frame, write_frame
+from ja.common.proxy.remote import RemoteAgent
+from ja.common.proxy.ssh import SSHConfig, SSHConnection
+from test.ssh.test_ssh_dummy import CommandHandlerDummy, ServerCommandDummy
+
+
+def _run_agent(socket_path: str, input_stream: BinaryIO, output_stream: BinaryIO, max_workers: int) -> None:
+    try:
+        RemoteAgent(socket_path, input_stream, output_stream, max_workers=max_workers)
+    finally:
+        output_stream.close()
+        input_stream.close()
+
+
+def start_pipe_agent(socket_path: str, max_workers: int = 8) -> AgentChannel.Streams:
+    """!
+    Start a RemoteAgent in a thread, connected by pipes instead of SSH.
+    @param socket_path: The Unix named socket the agent passes the Commands on to.
+    @param max_workers: The maximum amount of Commands the agent passes on at the same time.
+    @return: The streams connected to the agent.
+    """
+    to_agent_read, to_agent_write = os.pipe()
+    from_agent_read, from_agent_write = os.pipe()
+    Thread(target=_run_agent, args=(socket_path, os.fdopen(to_agent_read, "rb"), os.fdopen(from_agent_write, "wb"),
+                                    max_workers), daemon=True).start()
+    writer = os.fdopen(to_agent_write, "wb")
+    return writer, os.fdopen(from_agent_read, "rb"), writer.close
+
+
+class RecordingCommandHandlerDummy(CommandHandlerDummy):
+    """
+    Records the payloads of the Commands in the order they are handled.
+    """
+    def __init__(self, socket_path: str):
+        self.payloads: List[str] = []
+        super().__init__(socket_path=socket_path)
+
+    def _process_command_dict(
+            self, command_dict: Dict[str, object], type_name: str, username: str) -> Dict[str, object]:
+        self.payloads.append(str(command_dict["payload"]))
+        return super()._process_command_dict(command_dict, type_name, username)
+
+
+class FramingTest(TestCase):
+    """
+    Class for testing the frames of the agent channel.
+    """
+    def test_round_trip(self) -> None:
+        stream = BytesIO()
+        write_frame(stream, 7, b"first")
+        write_frame(stream, 2 ** 40, b"")
+        stream.seek(0)
+        self.assertEqual(read_frame(stream), (7, b"first"))
+        self.assertEqual(read_frame(stream), (2 ** 40, b""))
+        self.assertIsNone(read_frame(stream))
+
+    def test_hello(self) -> None:
+        self.assertEqual(parse_agent_hello(agent_hello(["json", "yaml"])), ["json", "yaml"])
+        self.assertEqual(parse_agent_hello(AGENT_HELLO), ["yaml"])
+        self.assertIsNone(parse_agent_hello(b"something else"))
+
+    def test_truncated(self) -> None:
+        stream = BytesIO()
+        write_frame(stream, 1, b"payload")
+        self.assertIsNone(read_frame(BytesIO(stream.getvalue()[:-1])))
+
+
+class AgentChannelTest(TestCase):
+    """
+    Class for testing AgentChannel together with RemoteAgent, connected by pipes instead of SSH.
+    """
+    def setUp(self) -> None:
+        self._socket_path = "./agent_dummy_socket"
+        self._command_handler = RecordingCommandHandlerDummy(socket_path=self._socket_path)
+        sleep(0.01)  # Wait until the command handler has created the socket.
+        self._agents_started = 0
+        self._agent_workers = 8
+        self._channel = AgentChannel(self._start_agent, timeout=10, hello_timeout=1)
+
+    def tearDown(self) -> None:
+        self._channel.close()
+
+    def _start_agent(self) -> AgentChannel.Streams:
+        self._agents_started += 1
+        return start_pipe_agent(self._socket_path, self._agent_workers)
+
+    def _request(self, payload: str) -> Response:
+        command = ServerCommandDummy(payload)
+        command_dict = dict(command=command.to_dict(), type_name=command.__class__.__name__)
+        return Response.from_string(self._channel.request(yaml.dump(command_dict).encode()).decode())
+
+    def test_request(self) -> None:
+        response = self._request("abc")
+        self.assertTrue(response.is_success)
+        self.assertEqual(response.result_string, "abcabc")
+        self.assertEqual(self._request("x").result_string, "xx")
+        self.assertEqual(self._agents_started, 1)
+
+    def test_json_request(self) -> None:
+        self.assertEqual(self._channel.remote_codecs(), available_codecs())
+        command = ServerCommandDummy("abc")
+        command_dict: Dict[str, object] = dict(command=command.to_dict(), type_name=command.__class__.__name__)
+        response = Response.from_dict(JSON.decode(self._channel.request(JSON.encode(command_dict))))
+        self.assertEqual(response.result_string, "abcabc")
+        self.assertEqual(self._agents_started, 1)
+
+    def test_compressed_request(self) -> None:
+        self.assertEqual(self._channel.remote_compressions(), COMPRESSIONS)
+        command = ServerCommandDummy("abc" * 1000)
+        command_dict: Dict[str, object] = dict(command=command.to_dict(), type_name=command.__class__.__name__)
+        metrics = CompressionMetrics()
+        response_bytes = self._channel.request(pack(JSON.encode(command_dict), metrics=metrics))
+        self.assertEqual(metrics.snapshot()["compressed_messages"], 1)
+        self.assertLess(len(response_bytes), 1000)
+        response_bytes, enveloped = unpack(response_bytes)
+        self.assertTrue(enveloped)
+        self.assertEqual(Response.from_dict(JSON.decode(response_bytes)).result_string, "abc" * 2000)
+        self.assertEqual(self._command_handler.compression_metrics.snapshot()["compressed_messages"], 1)
+
+        # Small responses are sent in an envelope, but not compressed.
+        response_bytes, enveloped = unpack(self._channel.request(pack(JSON.encode(dict(
+            command=ServerCommandDummy("x").to_dict(), type_name="ServerCommandDummy")))))
+        self.assertTrue(enveloped)
+        self.assertEqual(Response.from_dict(JSON.decode(response_bytes)).result_string, "xx")
+        self.assertEqual(self._command_handler.compression_metrics.snapshot()["messages"], 2)
+
+    def test_concurrent_requests(self) -> None:
+        results: List[str] = [""] * 10
+
+        def request(index: int) -> None:
+            results[index] = self._request(str(index)).result_string
+
+        threads = [Thread(target=request, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [str(i) * 2 for i in range(10)])
+        self.assertEqual(self._agents_started, 1)
+
+    def test_single_worker_agent(self) -> None:
+        # More requests than the agent reads ahead of its only thread.
+        self._agent_workers = 1
+        self.test_concurrent_requests()
+
+    def test_sender_order(self) -> None:
+        # The Commands of one sender are handled in order, while other senders keep all threads of the agent busy.
+        def send_other(index: int) -> None:
+            for i in range(20):
+                self._request("other%d-%d" % (index, i))
+
+        threads = [Thread(target=send_other, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for i in range(20):
+            self.assertEqual(self._request("own%d" % i).result_string, "own%d" % i * 2)
+        for thread in threads:
+            thread.join()
+        self.assertEqual([payload for payload in self._command_handler.payloads if payload.startswith("own")],
+                         ["own%d" % i for i in range(20)])
+        self.assertEqual(len(self._command_handler.payloads), 180)
+
+    def test_reconnect(self) -> None:
+        self.assertEqual(self._request("a").result_string, "aa")
+        self._channel.close()
+        self.assertEqual(self._request("b").result_string, "bb")
+        self.assertEqual(self._agents_started, 2)
+
+    def test_agent_unavailable(self) -> None:
+        def start_missing_agent() -> AgentChannel.Streams:
+            # The remote command exits at once without announcing itself, like a ja-remote without agent support.
+            return BytesIO(), BytesIO(), lambda: None
+
+        channel = AgentChannel(start_missing_agent, timeout=10, hello_timeout=1)
+        with self.assertRaises(AgentUnavailableError):
+            channel.request(b"")
+
+
+class SSHConnectionAgentTest(TestCase):
+    """
+    Class for testing how SSHConnection uses a remote agent, which is connected by pipes instead of SSH.
+    """
+    def setUp(self) -> None:
+        self._socket_path = "./ssh_agent_dummy_socket"
+        self._command_handler = CommandHandlerDummy(socket_path=self._socket_path)
+        sleep(0.01)  # Wait until the command handler has created the socket.
+        self._now = 0.0
+        self._agent_failures = 0
+        self._agents_started = 0
+        patchers: List[Any] = [patch.object(SSHConnection, "_connect"),
+                               patch.object(SSHConnection, "_open_agent_streams", self._start_agent),
+                               patch.object(SSHConnection, "_send_command_exec", self._send_command_exec),
+                               patch("ja.common.proxy.ssh.monotonic", lambda: self._now)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self._connection = SSHConnection(SSHConfig("localhost"), "ja.server.remote", agent_command_string="%s")
+
+    def tearDown(self) -> None:
+        self._connection.close()
+
+    def _start_agent(self, *args: Any) -> AgentChannel.Streams:
+        if self._agent_failures > 0:
+            self._agent_failures -= 1
+            raise OSError("Cannot start the agent.")
+        self._agents_started += 1
+        return start_pipe_agent(self._socket_path)
+
+    @staticmethod
+    def _send_command_exec(*args: Any) -> Response:
+        return Response("exec", True)
+
+    def _send(self, payload: str) -> str:
+        return self._connection.send_command(ServerCommandDummy(payload)).result_string
+
+    def test_agent_back_off(self) -> None:
+        self._agent_failures = 2
+        self.assertEqual(self._send("a"), "exec")
+        self._now += SSHConnection.AGENT_RETRY_DELAY - 1
+        self.assertEqual(self._send("a"), "exec")
+        self.assertEqual(self._agent_failures, 1)
+
+        # The agent fails to start once more, after which it is not started again for twice as long.
+        self._now += 1
+        self.assertEqual(self._send("a"), "exec")
+        self.assertEqual(self._agent_failures, 0)
+        self._now += SSHConnection.AGENT_RETRY_DELAY
+        self.assertEqual(self._send("a"), "exec")
+        self._now += SSHConnection.AGENT_RETRY_DELAY
+        self.assertEqual(self._send("a"), "aa")
+        self.assertEqual(self._agents_started, 1)
+
+        # A successful request resets the delay.
+        with patch("ja.common.proxy.ssh.decode_any", side_effect=ValueError("Garbled response.")):
+            self.assertEqual(self._send("b"), SSHConnection.RESPONSE_FAILED_COMMUNICATION)
+        self._agent_failures = 1
+        self.assertEqual(self._send("b"), "exec")
+        self._now += SSHConnection.AGENT_RETRY_DELAY
+        self.assertEqual(self._send("b"), "bb")
+        self.assertEqual(self._agents_started, 2)
+
+    def test_broken_agent_replaced(self) -> None:
+        self.assertEqual(self._send("a"), "aa")
+        with patch("ja.common.proxy.ssh.decode_any", side_effect=ValueError("Garbled response.")):
+            self.assertEqual(self._send("a"), SSHConnection.RESPONSE_FAILED_COMMUNICATION)
+        self.assertEqual(self._send("b"), "bb")
+        self.assertEqual(self._agents_started, 2)
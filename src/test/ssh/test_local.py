@@ -0,0 +1,61 @@
+from time import sleep
+from unittest import TestCase
+import os
+import sys
+
+from ja.common.proxy.local import LocalConnection, UnixSocketConnection, is_local_host
+from test.ssh.test_ssh_dummy import CommandHandlerDummy, ServerCommandDummy
+
+
+class SubprocessLocalConnection(LocalConnection):
+    """
+    LocalConnection which always starts the remote program, as if the socket belonged to another user.
+    """
+    def _can_connect_directly(self) -> bool:
+        return False
+
+
+class LocalConnectionTest(TestCase):
+    """
+    Class for testing the connections which reach a CommandHandler without SSH.
+    """
+    def setUp(self) -> None:
+        self._socket_path = "./local_socket"
+        self._payload = "PAYLOAD"
+        self._command = ServerCommandDummy(self._payload)
+        self._command_handler = CommandHandlerDummy(socket_path=self._socket_path)
+        sleep(0.01)  # Wait until the command handler has created the socket.
+
+    def test_unix_socket(self) -> None:
+        connection = UnixSocketConnection(self._socket_path)
+        connection.send_dummy_command()
+        for _ in range(2):
+            response = connection.send_command(self._command)
+            self.assertTrue(response.is_success)
+            self.assertEqual(response.result_string, self._payload * 2)
+
+    def test_unix_socket_missing(self) -> None:
+        response = UnixSocketConnection("./missing_socket").send_command(self._command)
+        self.assertFalse(response.is_success)
+
+    def test_direct(self) -> None:
+        response = LocalConnection(self._socket_path, "false %s").send_command(self._command)
+        self.assertTrue(response.is_success)
+        self.assertEqual(response.result_string, self._payload * 2)
+
+    def test_subprocess(self) -> None:
+        command_string = '"%s" -c "import sys; from ja.common.proxy.remote import Remote; Remote(sys.argv[1])" %%s' \
+            % sys.executable
+        connection = SubprocessLocalConnection(os.path.abspath(self._socket_path), command_string)
+        response = connection.send_command(self._command)
+        self.assertTrue(response.is_success)
+        self.assertEqual(response.result_string, self._payload * 2)
+
+    def test_subprocess_failure(self) -> None:
+        response = SubprocessLocalConnection(self._socket_path, "false %s").send_command(self._command)
+        self.assertFalse(response.is_success)
+
+    def test_is_local_host(self) -> None:
+        self.assertTrue(is_local_host("localhost"))
+        self.assertTrue(is_local_host("127.0.0.1"))
+        self.assertFalse(is_local_host("host.invalid"))
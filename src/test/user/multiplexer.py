@@ -0,0 +1,66 @@
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import monotonic
+from typing import Dict, List, cast
+from unittest import TestCase
+import os
+
+from ja.common.message.base import Response
+from ja.common.proxy.local import UnixSocketConnection
+from ja.common.proxy.ssh import SSHConfig
+from ja.user.multiplexer import ConnectionMultiplexer, control_socket_path
+from test.ssh.test_ssh_dummy import ServerCommandDummy
+
+
+class ConnectionMultiplexerTest(TestCase):
+    """
+    Class for testing the ConnectionMultiplexer with a fake connection to the server.
+    """
+    def setUp(self) -> None:
+        self._directory = TemporaryDirectory()
+        self._socket_path = os.path.join(self._directory.name, "jobadder", "control.socket")
+        self._sent: List[Dict[str, object]] = []
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _send_command_dict(self, command_dict: Dict[str, object]) -> Response:
+        self._sent.append(command_dict)
+        command = ServerCommandDummy.from_dict(cast(Dict[str, object], command_dict["command"]))
+        return command.execute(database=None)
+
+    def test_forward(self) -> None:
+        multiplexer = ConnectionMultiplexer(self._send_command_dict, self._socket_path, idle_timeout=0.2)
+        thread = Thread(target=multiplexer.main_loop)
+        thread.start()
+        connection = UnixSocketConnection(self._socket_path)
+        for _ in range(3):
+            response = connection.send_command(ServerCommandDummy("PAYLOAD"))
+            self.assertTrue(response.is_success)
+            self.assertEqual(response.result_string, "PAYLOAD" * 2)
+        self.assertEqual(len(self._sent), 3)
+        for command_dict in self._sent:
+            self.assertNotIn("username", command_dict)
+            self.assertEqual(command_dict["type_name"], "ServerCommandDummy")
+
+        start = monotonic()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+        self.assertLess(monotonic() - start, 5)
+        self.assertFalse(os.path.exists(self._socket_path))
+
+    def test_private_directory(self) -> None:
+        directory = os.path.dirname(self._socket_path)
+        os.makedirs(directory, mode=0o755)
+        os.chmod(directory, 0o755)
+        with self.assertRaises(PermissionError):
+            ConnectionMultiplexer(self._send_command_dict, self._socket_path)
+
+    def test_control_socket_path(self) -> None:
+        path = control_socket_path(SSHConfig(hostname="server", username="user"), "/tmp/jobadder-server.socket")
+        self.assertEqual(path, control_socket_path(SSHConfig(hostname="server", username="user"),
+                                                   "/tmp/jobadder-server.socket"))
+        self.assertNotEqual(path, control_socket_path(SSHConfig(hostname="server", username="other"),
+                                                      "/tmp/jobadder-server.socket"))
+        self.assertNotEqual(path, control_socket_path(SSHConfig(hostname="other", username="user"),
+                                                      "/tmp/jobadder-server.socket"))
@@ -0,0 +1,57 @@
+from typing import List, cast
+from unittest import TestCase
+from unittest.mock import Mock
+
+from ja.common.docker_context import DockerConstraints, DockerContext
+from ja.common.job import Job, JobPriority, JobSchedulingConstraints
+from ja.common.message.base import Response
+from ja.common.proxy.ssh import ISSHConnection, SSHConfig
+from ja.user.config.add import AddCommandConfig
+from ja.user.config.base import UserConfig
+from ja.user.message.add import AddCommand
+from ja.user.proxy import UserServerProxyBase
+
+
+class MockUserServerProxy(UserServerProxyBase):
+    def __init__(self, ssh_config: SSHConfig):
+        super().__init__(ssh_config=ssh_config)
+        self.connection = Mock()
+
+    def _get_ssh_connection(self, ssh_config: SSHConfig) -> ISSHConnection:
+        return cast(ISSHConnection, self.connection)
+
+
+class UserServerProxyTest(TestCase):
+    """
+    Test that the user client only uploads Dockerfiles the server does not know yet.
+    """
+    def setUp(self) -> None:
+        self._proxy = MockUserServerProxy(ssh_config=SSHConfig(hostname="mock"))
+        job = Job(owner_id=1, email=None,
+                  scheduling_constraints=JobSchedulingConstraints(JobPriority.MEDIUM, True, []),
+                  docker_context=DockerContext("FROM ubuntu:20.04\nRUN apt-get update\n" * 4, []),
+                  docker_constraints=DockerConstraints(1, 1024))
+        self._command = AddCommand(AddCommandConfig(UserConfig(), job))
+
+    def _sent_dockerfile_sources(self) -> List[str]:
+        return [call[0][0].config.job.docker_context.dockerfile_source
+                for call in self._proxy.connection.send_command.call_args_list]
+
+    def test_known_dockerfile(self) -> None:
+        self._proxy.connection.send_command.return_value = Response("", is_success=True)
+        self.assertTrue(self._proxy.add_job(self._command).is_success)
+        self.assertEqual(self._sent_dockerfile_sources(), [None])
+
+    def test_unknown_dockerfile(self) -> None:
+        dockerfile_hash = self._command.config.job.docker_context.dockerfile_hash
+        self._proxy.connection.send_command.side_effect = [
+            Response(AddCommand.RESPONSE_UNKNOWN_DOCKERFILE % dockerfile_hash, is_success=False),
+            Response("", is_success=True)]
+        self.assertTrue(self._proxy.add_job(self._command).is_success)
+        self.assertEqual(self._sent_dockerfile_sources(),
+                         [None, self._command.config.job.docker_context.dockerfile_source])
+
+    def test_failure(self) -> None:
+        self._proxy.connection.send_command.return_value = Response("Cannot submit jobs", is_success=False)
+        self.assertFalse(self._proxy.add_job(self._command).is_success)
+        self.assertEqual(self._proxy.connection.send_command.call_count, 1)
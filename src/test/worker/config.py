@@ -33,6 +33,7 @@ class WorkMachineConfigTest(TestCase):
         d["resource_allocation"] = self._wmc.resources.to_dict()
         d["uid"] = self._wmc.uid
         d["admin_group"] = self._wmc.admin_group
+        d["event_loop"] = self._wmc.event_loop
         wc = WorkerConfig.to_dict(self._wmc)
         self.assertDictEqual(wc, d)
 
@@ -43,11 +44,11 @@ class WorkerMachineDictTest(AbstractSerializableTest):
     """
 
     def setUp(self) -> None:
-        self._optional_properties = ["uid"]
+        self._optional_properties = ["uid", "event_loop"]
         ssh_config = SSHConfig(hostname="127.0.1.1", username="someuser", key_filename=None)
         self._object = WorkerConfig(
             uid="3", ssh_config=ssh_config, resource_allocation=ResourceAllocation(cpu_threads=1, memory=2, swap=3),
-            admin_group="jobadder"
+            admin_group="jobadder", event_loop=True
         )
         self._object_dict = {
             "uid": "3",
@@ -63,7 +64,8 @@ class WorkerMachineDictTest(AbstractSerializableTest):
                 "memory": 2,
                 "swap": 3
             },
-            "admin_group": "jobadder"
+            "admin_group": "jobadder",
+            "event_loop": True
         }
         self._other_object_dict = {
             "uid": "3",
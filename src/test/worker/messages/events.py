@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+from ja.common.job import JobStatus
+from ja.server.database.database import ServerDatabase
+from ja.server.database.sql.mock_database import MockDatabase
+from ja.server.database.types.work_machine import WorkMachineState
+from ja.server.scheduler.algorithm import get_allocation_for_job
+from ja.worker.message.events import JobEventsCommand
+from test.serializable.base import AbstractSerializableTest
+from test.server.scheduler.common import get_machine, get_job
+
+
+class EventsMessageTest(AbstractSerializableTest):
+
+    def setUp(self) -> None:
+        self._db = MockDatabase()
+        self._scheduler_calls = 0
+        self._machine = get_machine(8, 8, 8)
+        self._jobs = [get_job(status=JobStatus.QUEUED).job for _ in range(3)]
+        for job in self._jobs:
+            self._db.update_job(job)
+            job.status = JobStatus.RUNNING
+            self._db.update_job(job)
+            self._machine.resources.allocate(get_allocation_for_job(job))
+        self._machine.state = WorkMachineState.RETIRED
+        self._db.update_work_machine(self._machine)
+        for job in self._jobs:
+            self._db.assign_job_machine(job, self._machine)
+
+        self._optional_properties = []
+        self._object = JobEventsCommand({"52": JobStatus.DONE, "53": JobStatus.CRASHED})
+        self._object_dict = {"jobs": {"52": "DONE", "53": "CRASHED"}}
+        self._other_object_dict = {"jobs": {"52": "CRASHED"}}
+
+    def _count_scheduler_call(self, database: ServerDatabase) -> None:
+        self._scheduler_calls += 1
+
+    def test_jobs_ended(self) -> None:
+        self._db.set_scheduler_callback(self._count_scheduler_call)
+        command = JobEventsCommand({self._jobs[0].uid: JobStatus.DONE, self._jobs[1].uid: JobStatus.CRASHED,
+                                    "unknown": JobStatus.DONE})
+        response = command.execute(self._db)
+        self.assertTrue(response.is_success)
+        self.assertIn("unknown", response.result_string)
+        self.assertEqual(self._scheduler_calls, 1)
+
+        self.assertEqual(self._db.find_job_by_id(self._jobs[0].uid).job.status, JobStatus.DONE)
+        self.assertEqual(self._db.find_job_by_id(self._jobs[1].uid).job.status, JobStatus.CRASHED)
+        self.assertIsNone(self._db.find_job_by_id(self._jobs[1].uid).assigned_machine)
+        self.assertEqual(self._db.find_job_by_id(self._jobs[2].uid).job.status, JobStatus.RUNNING)
+        machine = [m for m in self._db.get_all_work_machines() if m.uid == self._machine.uid][0]
+        self.assertEqual(machine.state, WorkMachineState.RETIRED)
+        self.assertEqual(machine.resources.free_resources + get_allocation_for_job(self._jobs[2]),
+                         machine.resources.total_resources)
+
+        JobEventsCommand({self._jobs[2].uid: JobStatus.DONE}).execute(self._db)
+        machine = [m for m in self._db.get_all_work_machines() if m.uid == self._machine.uid][0]
+        self.assertEqual(machine.state, WorkMachineState.OFFLINE)
+        self.assertEqual(machine.resources.free_resources, machine.resources.total_resources)
+
+    def test_jobs_loaded_at_once(self) -> None:
+        with patch.object(self._db, "find_job_by_id", side_effect=AssertionError("Jobs are loaded one by one.")), \
+                patch.object(self._db, "find_jobs_by_ids", wraps=self._db.find_jobs_by_ids) as find_jobs_by_ids, \
+                patch.object(self._db, "apply_schedule", wraps=self._db.apply_schedule) as apply_schedule:
+            JobEventsCommand({job.uid: JobStatus.DONE for job in self._jobs}).execute(self._db)
+        find_jobs_by_ids.assert_called_once_with([job.uid for job in self._jobs])
+        apply_schedule.assert_called_once()
+
+    def test_job_already_ended(self) -> None:
+        JobEventsCommand({self._jobs[0].uid: JobStatus.DONE}).execute(self._db)
+        response = JobEventsCommand({self._jobs[0].uid: JobStatus.CRASHED}).execute(self._db)
+        self.assertTrue(response.is_success)
+        self.assertIn(self._jobs[0].uid, response.result_string)
+        self.assertEqual(self._db.find_job_by_id(self._jobs[0].uid).job.status, JobStatus.DONE)
+
+    def test_illegal_status(self) -> None:
+        with self.assertRaises(ValueError):
+            JobEventsCommand({"52": JobStatus.RUNNING})
+        with self.assertRaises(ValueError):
+            JobEventsCommand.from_dict({"jobs": {"52": "FINISHED"}})
@@ -72,6 +72,22 @@ class DockerInterfaceTest(TestCase):
     def test_add_job(self) -> None:
         self._docker_interface.add_job(self._job_1)
 
+    def test_dockerfile_cache(self) -> None:
+        docker_interface = DockerInterface(
+            server_proxy=WorkerServerProxyDummy(wmcs=dict(), jobs=dict()), worker_uid="worker", max_dockerfiles=2)
+        for index, job in enumerate([self._job_1, self._job_2, self._job_3]):
+            job.uid = "job-%d" % index
+        for job in [self._job_1, self._job_2]:
+            docker_interface.add_job(job)
+        hash_1 = self._job_1.docker_context.dockerfile_hash
+        self.assertEqual(docker_interface.find_dockerfile(hash_1), DOCKERFILE_SOURCE_1)
+        # The Dockerfile of the second job is now the least recently used one.
+        docker_interface.add_job(self._job_3)
+        self.assertIsNone(docker_interface.find_dockerfile(self._job_2.docker_context.dockerfile_hash))
+        self.assertEqual(docker_interface.find_dockerfile(hash_1), DOCKERFILE_SOURCE_1)
+        self.assertEqual(docker_interface.find_dockerfile(self._job_3.docker_context.dockerfile_hash),
+                         DOCKERFILE_SOURCE_3)
+
     def test_cancel_job(self) -> None:
         self.assertFalse(self._docker_interface.has_running_jobs())
         self._docker_interface.add_job(self._job_2)
@@ -0,0 +1,91 @@
+from threading import Event
+from time import sleep
+from typing import Dict, List
+from unittest import TestCase
+
+from ja.common.job import JobStatus
+from ja.common.message.base import Response
+from ja.worker.events import JobEventBatcher
+
+
+class JobEventBatcherTest(TestCase):
+    """
+    Class for testing the JobEventBatcher.
+    """
+    def setUp(self) -> None:
+        self._batches: List[Dict[str, JobStatus]] = []
+        self._success = True
+        self._sent = Event()
+
+    def _send(self, job_statuses: Dict[str, JobStatus]) -> Response:
+        self._batches.append(job_statuses)
+        self._sent.set()
+        return Response("sent", self._success)
+
+    def test_window(self) -> None:
+        batcher = JobEventBatcher(self._send, window=0.2)
+        batcher.add("job-1", JobStatus.DONE)
+        batcher.add("job-2", JobStatus.CRASHED)
+        batcher.add("job-3", JobStatus.DONE)
+        self.assertTrue(self._sent.wait(5))
+        batcher.close()
+        self.assertEqual(self._batches, [{"job-1": JobStatus.DONE, "job-2": JobStatus.CRASHED,
+                                          "job-3": JobStatus.DONE}])
+        self.assertEqual(batcher.take_failed(), {})
+
+    def test_full_batch(self) -> None:
+        batcher = JobEventBatcher(self._send, window=60, max_batch_size=2)
+        batcher.add("job-1", JobStatus.DONE)
+        batcher.add("job-2", JobStatus.DONE)
+        self.assertTrue(self._sent.wait(5))
+        self.assertEqual(self._batches, [{"job-1": JobStatus.DONE, "job-2": JobStatus.DONE}])
+
+        batcher.add("job-3", JobStatus.CRASHED)
+        sleep(0.05)
+        self.assertEqual(len(self._batches), 1)
+        batcher.close()
+        self.assertEqual(self._batches[1], {"job-3": JobStatus.CRASHED})
+
+    def test_failure(self) -> None:
+        self._success = False
+        batcher = JobEventBatcher(self._send, window=0)
+        batcher.add("job-1", JobStatus.DONE)
+        batcher.close()
+        self.assertEqual(batcher.take_failed(), {"job-1": JobStatus.DONE})
+        self.assertEqual(batcher.take_failed(), {})
+
+    def test_exception(self) -> None:
+        def send(job_statuses: Dict[str, JobStatus]) -> Response:
+            raise ConnectionError("The server is unreachable.")
+
+        batcher = JobEventBatcher(send, window=0)
+        batcher.add("job-1", JobStatus.CRASHED)
+        batcher.close()
+        self.assertEqual(batcher.take_failed(), {"job-1": JobStatus.CRASHED})
+
+    def test_retry(self) -> None:
+        self._success = False
+        batcher = JobEventBatcher(self._send, window=0, retry_delay=0.1)
+        batcher.add("job-1", JobStatus.DONE)
+        self.assertTrue(self._sent.wait(5))
+        self._sent.clear()
+        self._success = True
+        self.assertTrue(self._sent.wait(5))
+        batcher.close()
+        self.assertEqual(self._batches, [{"job-1": JobStatus.DONE}, {"job-1": JobStatus.DONE}])
+        self.assertEqual(batcher.take_failed(), {})
+
+    def test_retry_after_report(self) -> None:
+        self._success = False
+        batcher = JobEventBatcher(self._send, window=0, retry_delay=0.2)
+        batcher.add("job-1", JobStatus.DONE)
+        self.assertTrue(self._sent.wait(5))
+        sleep(0.05)
+        self.assertEqual(batcher.take_failed(), {"job-1": JobStatus.DONE})
+        sleep(0.3)
+        batcher.close()
+        self.assertEqual(self._batches, [{"job-1": JobStatus.DONE}])
+
+    def test_invalid_retry_delay(self) -> None:
+        self.assertRaises(ValueError, JobEventBatcher, self._send, retry_delay=0)
+        self.assertRaises(ValueError, JobEventBatcher, self._send, retry_delay=2, max_retry_delay=1)
@@ -1,5 +1,6 @@
 from unittest import TestCase
 
+from ja.common.message.worker_commands.batch_job import BatchJobCommand
 from ja.common.message.worker_commands.cancel_job import CancelJobCommand
 from ja.common.message.worker_commands.pause_job import PauseJobCommand
 from ja.common.message.worker_commands.resume_job import ResumeJobCommand
@@ -75,3 +76,12 @@ class WorkerCommandTest(TestCase):
         command_resume_unknown = ResumeJobCommand(self._uid_unknown)
         response_resume_unknown = command_resume_unknown.execute(self._docker_interface)
         self.assertFalse(response_resume_unknown.is_success)
+
+    def test_batch_job(self) -> None:
+        command = BatchJobCommand([StartJobCommand(self._job_2), PauseJobCommand(self._uid_2),
+                                   CancelJobCommand(self._uid_unknown)])
+        response = command.execute(self._docker_interface)
+        self.assertFalse(response.is_success)
+        self.assertEqual([single.is_success for single in BatchJobCommand.get_responses(response)],
+                         [True, True, False])
+        self.assertFalse(PauseJobCommand(self._uid_2).execute(self._docker_interface).is_success)
@@ -121,6 +121,15 @@ class AbstractWorkerServerProxyTest(TestCase):
         response_2 = self._worker_Server_proxy.notify_job_crashed("bbbbb")
         self.assertFalse(response_2.is_success)
 
+    @skipIfAbstract
+    def test_notify_job_events(self) -> None:
+        response_1 = self._worker_Server_proxy.notify_job_events(
+            {self._job_1.uid: JobStatus.DONE, self._job_2.uid: JobStatus.CRASHED})
+        self.assertTrue(response_1.is_success)
+        response_2 = self._worker_Server_proxy.notify_job_events({self._job_1.uid: JobStatus.DONE,
+                                                                  "bbbbb": JobStatus.CRASHED})
+        self.assertFalse(response_2.is_success)
+
 
 class WorkerProxyDummyTest(AbstractWorkerServerProxyTest):
     def setUp(self) -> None: